@@ -0,0 +1,234 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Latency and accuracy of the CHASE-SQL candidate selection for N=1..8.
+
+A stubbed model answers each question after a random latency with a correct
+query (in one of several equivalent spellings) with probability
+`P_CORRECT`, and otherwise with a wrong or invalid one. Each question is
+answered with N candidates, generated in parallel, and one of them is selected
+by each `SelectionMethod`. A selection is accurate if its query returns the
+same rows as the reference query on the example rows of the schema.
+
+    python benchmarks/bench_candidate_selection.py
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tabulate import tabulate
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../data_science/sub_agents/bigquery")
+)
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__), "../data_science/sub_agents/bigquery/chase_sql"
+    ),
+)
+
+from schema_cache import table_ddl  # noqa: E402
+from sql_postprocessor import candidate_selection  # noqa: E402
+
+P_CORRECT = 0.5
+MAX_CANDIDATES = 8
+MEDIAN_LATENCY = 0.05
+NUM_QUESTIONS = 40
+NUM_ROWS = 30
+SEED = 0
+
+PROJECT, DATASET = "project", "dataset"
+ORDERS = f"`{PROJECT}.{DATASET}.orders`"
+CUSTOMERS = f"`{PROJECT}.{DATASET}.customers`"
+COUNTRIES = ("FR", "DE", "US", "JP", "BR")
+
+
+class FakeField:
+    def __init__(self, name, field_type):
+        self.name = name
+        self.field_type = field_type
+        self.mode = "NULLABLE"
+        self.description = None
+
+
+class FakeRow:
+    def __init__(self, values):
+        self._values = values
+
+    def values(self):
+        return self._values
+
+
+def synthetic_ddl(rng):
+    customers = [
+        FakeRow([c, f"customer {c}", COUNTRIES[c % len(COUNTRIES)]])
+        for c in range(NUM_ROWS // 3)
+    ]
+    orders = [
+        FakeRow([o, rng.randrange(len(customers)), round(rng.uniform(1, 500), 2)])
+        for o in range(NUM_ROWS)
+    ]
+    return table_ddl(
+        f"{PROJECT}.{DATASET}.customers",
+        [
+            FakeField("customer_id", "INT64"),
+            FakeField("name", "STRING"),
+            FakeField("country", "STRING"),
+        ],
+        customers,
+    ) + table_ddl(
+        f"{PROJECT}.{DATASET}.orders",
+        [
+            FakeField("order_id", "INT64"),
+            FakeField("customer_id", "INT64"),
+            FakeField("amount", "FLOAT64"),
+        ],
+        orders,
+    )
+
+
+def questions(rng):
+    """(correct spellings, wrong answers) of each synthetic question"""
+    result = []
+    for _ in range(NUM_QUESTIONS):
+        country = rng.choice(COUNTRIES)
+        threshold = rng.randrange(50, 400, 50)
+        result.append(
+            (
+                [
+                    f"SELECT c.name, SUM(o.amount) AS total FROM {ORDERS} AS o "
+                    f"JOIN {CUSTOMERS} AS c ON o.customer_id = c.customer_id "
+                    f"WHERE c.country = '{country}' AND o.amount > {threshold} "
+                    "GROUP BY c.name",
+                    f"select c.name, sum(o.amount) as total\nfrom {CUSTOMERS} c "
+                    f"join {ORDERS} o on c.customer_id = o.customer_id\n"
+                    f"where o.amount > {threshold} and c.country = '{country}'\n"
+                    "group by 1",
+                    f"SELECT name, SUM(amount) AS total FROM {ORDERS} "
+                    f"JOIN {CUSTOMERS} USING (customer_id) "
+                    f"WHERE country = '{country}' AND amount > {threshold} "
+                    "GROUP BY name",
+                ],
+                [
+                    f"SELECT c.name, AVG(o.amount) AS total FROM {ORDERS} AS o "
+                    f"JOIN {CUSTOMERS} AS c ON o.customer_id = c.customer_id "
+                    f"WHERE c.country = '{country}' AND o.amount > {threshold} "
+                    "GROUP BY c.name",
+                    f"SELECT c.name, SUM(o.amount) AS total FROM {ORDERS} AS o "
+                    f"JOIN {CUSTOMERS} AS c ON o.customer_id = c.customer_id "
+                    f"WHERE c.country = '{country}' GROUP BY c.name",
+                    f"SELECT c.name, SUM(o.amount) AS total FROM {ORDERS} AS o "
+                    f"JOIN {CUSTOMERS} AS c ON o.customer_id = c.customer_id "
+                    f"WHERE c.country != '{country}' AND o.amount > {threshold} "
+                    "GROUP BY c.name",
+                    f"SELECT c.name, SUM(o.amout) AS total FROM {ORDERS} AS o "
+                    f"JOIN {CUSTOMERS} AS c ON o.customer_id = c.customer_id "
+                    "GROUP BY c.name",
+                    f"SELECT name, SUM(amount) FROM {ORDERS} WHERE GROUP BY name",
+                ],
+            )
+        )
+    return result
+
+
+class StubModel:
+    """Stands in for `GeminiModel.call_parallel`, one thread per prompt"""
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def answer(self, question):
+        correct, wrong = question
+        latency = self.rng.lognormvariate(0, 0.5) * MEDIAN_LATENCY
+        if self.rng.random() < P_CORRECT:
+            response = self.rng.choice(correct)
+        else:
+            response = self.rng.choice(wrong)
+        return latency, response
+
+    def call_parallel(self, prompts):
+        answers = [self.answer(prompt) for prompt in prompts]
+
+        def worker(answer):
+            latency, response = answer
+            time.sleep(latency)
+            return response
+
+        with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+            return list(executor.map(worker, answers))
+
+
+def main():
+    rng = random.Random(SEED)
+    ddl = synthetic_ddl(rng)
+    executor = candidate_selection.get_sample_executor(ddl)
+    all_questions = questions(rng)
+    expected = [executor.execute(correct[0]) for correct, _ in all_questions]
+
+    rows = []
+    for num_candidates in range(1, MAX_CANDIDATES + 1):
+        model = StubModel(random.Random(SEED + num_candidates))
+        # The same generated candidates are used for every selection method.
+        generated, generation_latencies = [], []
+        for question in all_questions:
+            start = time.perf_counter()
+            generated.append(model.call_parallel([question] * num_candidates))
+            generation_latencies.append(time.perf_counter() - start)
+
+        for method in candidate_selection.SelectionMethod:
+            correct, latencies = 0, []
+            for responses, generation_latency, result in zip(
+                generated, generation_latencies, expected
+            ):
+                selection = candidate_selection.select_candidate(
+                    responses,
+                    db=DATASET,
+                    catalog=PROJECT,
+                    ddl_schema=ddl,
+                    method=method,
+                )
+                latencies.append(generation_latency + selection.latency)
+                try:
+                    correct += executor.execute(selection.sql) == result
+                except Exception:  # pylint: disable=broad-exception-caught
+                    pass
+            rows.append(
+                [
+                    num_candidates,
+                    method.value,
+                    f"{correct / len(all_questions):.2f}",
+                    f"{statistics.mean(latencies) * 1000:.0f}",
+                    f"{statistics.quantiles(latencies, n=10)[-1] * 1000:.0f}",
+                ]
+            )
+
+    print(
+        f"{NUM_QUESTIONS} questions, P(correct candidate) = {P_CORRECT}, "
+        f"median generation latency {MEDIAN_LATENCY * 1000:.0f} ms"
+    )
+    print(
+        tabulate(
+            rows,
+            headers=["N", "selection", "accuracy", "mean latency ms", "p90 ms"],
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Batch LLM calls against a fake model injecting latency, failures and hangs.
+
+Several threads, standing in for concurrent agent sessions, each send batches of
+candidate prompts through `llm_batch`. All of them share the process-wide
+concurrency limiter. The report gives the batch latency, the share of prompts
+answered, and the peak number of calls in flight, which never exceeds the limit.
+
+    python benchmarks/bench_llm_batch.py
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tabulate import tabulate
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__), "../data_science/sub_agents/bigquery/chase_sql"
+    ),
+)
+
+import llm_batch  # noqa: E402
+
+NUM_SESSIONS = 8
+NUM_BATCHES = 10
+BATCH_SIZE = 8
+MEDIAN_LATENCY = 0.05
+TIMEOUT = 1.0
+RETRY_POLICY = llm_batch.RetryPolicy(max_attempts=4, base_delay=0.05, max_delay=0.5)
+
+
+class FakeModel:
+    """Answers after a random latency; fails or hangs with given probabilities"""
+
+    def __init__(self, failure_rate, hang_rate):
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    async def generate_content_async(self, prompt):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if random.random() < self.hang_rate:
+                await asyncio.sleep(3600)
+            await asyncio.sleep(random.lognormvariate(0, 0.5) * MEDIAN_LATENCY)
+            if random.random() < self.failure_rate:
+                raise RuntimeError("429 Resource exhausted")
+            return f"SELECT {prompt}"
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def run_session(model):
+    latencies, answered = [], 0
+    for batch in range(NUM_BATCHES):
+        start = time.perf_counter()
+        deadline = llm_batch.deadline_after(TIMEOUT)
+        results = llm_batch.run_sync(
+            llm_batch.gather_with_deadline(
+                (
+                    llm_batch.call_with_retries(
+                        lambda i=i: model.generate_content_async(i),
+                        policy=RETRY_POLICY,
+                        deadline=deadline,
+                    )
+                    for i in range(BATCH_SIZE)
+                ),
+                deadline=deadline,
+            )
+        )
+        latencies.append(time.perf_counter() - start)
+        answered += sum(not isinstance(r, BaseException) for r in results)
+    return latencies, answered
+
+
+def main():
+    rows = []
+    for failure_rate, hang_rate in ((0.0, 0.0), (0.2, 0.0), (0.2, 0.02), (0.5, 0.05)):
+        model = FakeModel(failure_rate, hang_rate)
+        start = time.perf_counter()
+        # Silence the retry messages.
+        with contextlib.redirect_stdout(io.StringIO()):
+            with ThreadPoolExecutor(max_workers=NUM_SESSIONS) as executor:
+                outputs = list(executor.map(run_session, [model] * NUM_SESSIONS))
+        wall_time = time.perf_counter() - start
+        latencies = [latency for output in outputs for latency in output[0]]
+        answered = sum(output[1] for output in outputs)
+        assert model.max_in_flight <= llm_batch.MAX_CONCURRENT_CALLS
+        assert llm_batch.get_limiter().active == 0
+        rows.append(
+            [
+                failure_rate,
+                hang_rate,
+                f"{answered / (NUM_SESSIONS * NUM_BATCHES * BATCH_SIZE):.3f}",
+                f"{statistics.median(latencies) * 1000:.0f}",
+                f"{max(latencies) * 1000:.0f}",
+                model.max_in_flight,
+                f"{wall_time:.1f}",
+            ]
+        )
+
+    print(
+        f"{NUM_SESSIONS} sessions x {NUM_BATCHES} batches x {BATCH_SIZE} prompts, "
+        f"limit {llm_batch.MAX_CONCURRENT_CALLS} calls in flight, "
+        f"deadline {TIMEOUT:.1f}s"
+    )
+    print(
+        tabulate(
+            rows,
+            headers=[
+                "failure rate",
+                "hang rate",
+                "answered",
+                "p50 batch ms",
+                "max batch ms",
+                "max in flight",
+                "wall s",
+            ],
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Latency and recall of the local BQML reference guide index.
+
+Without arguments, searches synthetic indexes of clustered 768-dimension
+embeddings: the latency of the exhaustive and IVF searches, the recall@3 of
+the IVF search against the exhaustive one, and the latency of the query cache.
+
+With `--index_dir` of an index built by `local_rag_index.py` and Vertex AI
+credentials, compares the local answers to the BQML questions with the
+`rag.retrieval_query` answers of the `BQML_RAG_CORPUS_NAME` corpus. A Vertex
+context is recalled if a local context of the same source shares at least half
+of its words, as the two chunkings do not align exactly.
+
+    python benchmarks/bench_local_rag.py
+    python benchmarks/bench_local_rag.py --index_dir <index dir>
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../data_science/utils"))
+
+import local_rag_index  # noqa: E402
+
+DIMENSION = 768
+NUM_CHUNKS = (500, 5_000, 50_000)
+NUM_CLUSTERS = 64
+NUM_QUERIES = 200
+TOP_K = 3
+THRESHOLD = 0.5
+SEED = 0
+
+QUESTIONS = [
+    "How do I create an ARIMA_PLUS time series model?",
+    "What options does CREATE MODEL support for logistic regression?",
+    "How do I evaluate a BigQuery ML model?",
+    "How do I get predictions with ML.PREDICT?",
+    "How can I forecast with ML.FORECAST and a horizon?",
+    "What is ML.EXPLAIN_FORECAST?",
+    "How do I train a boosted tree classifier?",
+    "How do I export a BigQuery ML model?",
+    "How do I detect anomalies with ML.DETECT_ANOMALIES?",
+    "How do I tune hyperparameters in BigQuery ML?",
+]
+
+
+def synthetic_embeddings(num_chunks, rng):
+    centers = local_rag_index.normalize(rng.standard_normal((NUM_CLUSTERS, DIMENSION)))
+    assignments = rng.integers(NUM_CLUSTERS, size=num_chunks)
+    noise = rng.standard_normal((num_chunks, DIMENSION)) * 0.04
+    return local_rag_index.normalize(centers[assignments] + noise).astype(np.float32)
+
+
+def timed_searches(index, queries, **kwargs):
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(index.search(query, TOP_K, **kwargs))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def recall(results, expected):
+    found = sum(
+        len({i for i, _ in result} & {i for i, _ in reference})
+        for result, reference in zip(results, expected)
+    )
+    return found / sum(len(reference) for reference in expected)
+
+
+def ms(latencies):
+    return f"{statistics.median(latencies) * 1000:.2f}"
+
+
+def synthetic_benchmark():
+    rng = np.random.default_rng(SEED)
+    rows = []
+    for num_chunks in NUM_CHUNKS:
+        embeddings = synthetic_embeddings(num_chunks, rng)
+        queries = local_rag_index.normalize(
+            embeddings[rng.integers(num_chunks, size=NUM_QUERIES)]
+            + rng.standard_normal((NUM_QUERIES, DIMENSION)) * 0.03
+        ).astype(np.float32)
+        chunks = [
+            {"text": f"chunk {i}", "source_uri": "", "source_display_name": ""}
+            for i in range(num_chunks)
+        ]
+        with tempfile.TemporaryDirectory() as index_dir:
+            num_lists = int(np.sqrt(num_chunks))
+            local_rag_index.save_index(index_dir, chunks, embeddings, {}, num_lists)
+            index = local_rag_index.LocalRagIndex(index_dir)
+            ivf = index.ivf
+            index.ivf = None
+            exact, exact_latencies = timed_searches(index, queries)
+            index.ivf = ivf
+            for nprobe in (1, max(1, num_lists // 4)):
+                approximate, latencies = timed_searches(index, queries, nprobe=nprobe)
+                rows.append(
+                    [
+                        num_chunks,
+                        f"{num_lists} lists, nprobe {nprobe}",
+                        ms(exact_latencies),
+                        ms(latencies),
+                        f"{recall(approximate, exact):.3f}",
+                    ]
+                )
+
+    print(f"{NUM_QUERIES} queries, top {TOP_K}, dimension {DIMENSION}")
+    print(
+        tabulate(
+            rows,
+            headers=["chunks", "IVF", "exhaustive ms", "IVF ms", "IVF recall@3"],
+        )
+    )
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        embeddings = synthetic_embeddings(NUM_CHUNKS[0], rng)
+        local_rag_index.save_index(
+            index_dir, chunks[: NUM_CHUNKS[0]], embeddings, {}, 0
+        )
+        index = local_rag_index.LocalRagIndex(
+            index_dir, embed_query=lambda query: embeddings[len(query)]
+        )
+        cold, warm = [], []
+        for latencies in (cold, warm):
+            for question in QUESTIONS:
+                start = time.perf_counter()
+                index.retrieval_query(question, TOP_K, THRESHOLD)
+                latencies.append(time.perf_counter() - start)
+    print(
+        f"\nretrieval_query over {NUM_CHUNKS[0]} chunks, without the embedding"
+        f" call: first query {ms(cold)} ms, cached query embedding {ms(warm)} ms"
+    )
+
+
+def context_words(text):
+    return set(text.lower().split())
+
+
+def vertex_benchmark(index_dir):
+    import vertexai  # pylint: disable=import-outside-toplevel
+    from vertexai import rag  # pylint: disable=import-outside-toplevel
+
+    vertexai.init(
+        project=os.getenv("GOOGLE_CLOUD_PROJECT"),
+        location=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1"),
+    )
+    corpus_name = os.getenv("BQML_RAG_CORPUS_NAME")
+    index = local_rag_index.LocalRagIndex(index_dir)
+
+    rows, vertex_latencies, local_latencies, cached_latencies = [], [], [], []
+    num_recalled = num_expected = 0
+    for question in QUESTIONS:
+        start = time.perf_counter()
+        response = rag.retrieval_query(
+            rag_resources=[rag.RagResource(rag_corpus=corpus_name)],
+            text=question,
+            rag_retrieval_config=rag.RagRetrievalConfig(
+                top_k=TOP_K, filter=rag.Filter(vector_distance_threshold=THRESHOLD)
+            ),
+        )
+        vertex_latencies.append(time.perf_counter() - start)
+        expected = [
+            (context.source_uri, context_words(context.text))
+            for context in response.contexts.contexts
+        ]
+
+        start = time.perf_counter()
+        index.retrieval_query(question, TOP_K, THRESHOLD)
+        local_latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        results = index.search(index.embed_query(question), TOP_K, THRESHOLD)
+        cached_latencies.append(time.perf_counter() - start)
+        found = [
+            (index.chunks[i]["source_uri"], context_words(index.chunks[i]["text"]))
+            for i, _ in results
+        ]
+
+        recalled = sum(
+            any(
+                uri == found_uri
+                and len(words & found_words) >= 0.5 * len(words)
+                for found_uri, found_words in found
+            )
+            for uri, words in expected
+        )
+        num_recalled += recalled
+        num_expected += len(expected)
+        rows.append([question, len(expected), len(found), recalled])
+
+    print(
+        tabulate(rows, headers=["question", "vertex contexts", "local", "recalled"])
+    )
+    print(
+        f"\nrecall@{TOP_K}: {num_recalled / max(num_expected, 1):.3f}"
+        f"\nmedian latency: Vertex RAG {ms(vertex_latencies)} ms,"
+        f" local {ms(local_latencies)} ms,"
+        f" local with cached query embedding {ms(cached_latencies)} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--index_dir", help="Compare the index of this directory with Vertex RAG."
+    )
+    args = parser.parse_args()
+    if args.index_dir:
+        vertex_benchmark(args.index_dir)
+    else:
+        synthetic_benchmark()
+
+
+if __name__ == "__main__":
+    main()
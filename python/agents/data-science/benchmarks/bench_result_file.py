@@ -0,0 +1,110 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Size of the query result handed from the database to the analytics agent.
+
+Compares the rows interpolated into the analytics agent prompt (what
+`call_ds_agent` used to do) with the Parquet file and column summary of
+`result_file`, for synthetic sales results of increasing size. Prompt tokens
+are estimated at 4 characters per token.
+
+    python benchmarks/bench_result_file.py
+"""
+
+import datetime
+import os
+import random
+import sys
+import time
+
+import pyarrow as pa
+from tabulate import tabulate
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../data_science/sub_agents/bigquery")
+)
+
+import result_file  # noqa: E402
+
+NUM_ROWS = (80, 1_000, 10_000, 100_000)
+STORES = ("Kaggle Store", "Kagglazon", "Kaggle Learn")
+COUNTRIES = ("Canada", "Finland", "Italy", "Kenya", "Norway", "Singapore")
+CHARS_PER_TOKEN = 4
+SEED = 0
+
+
+def synthetic_result(num_rows, rng):
+    start = datetime.date(2010, 1, 1)
+    return pa.table(
+        {
+            "date": pa.array(
+                [start + datetime.timedelta(days=i // 18) for i in range(num_rows)]
+            ),
+            "country": [rng.choice(COUNTRIES) for _ in range(num_rows)],
+            "store": [rng.choice(STORES) for _ in range(num_rows)],
+            "num_sold": [
+                None if rng.random() < 0.02 else rng.randrange(5, 5000)
+                for _ in range(num_rows)
+            ],
+            "price": [round(rng.uniform(1, 20), 2) for _ in range(num_rows)],
+        }
+    )
+
+
+def main():
+    rng = random.Random(SEED)
+    rows = []
+    for num_rows in NUM_ROWS:
+        table = synthetic_result(num_rows, rng)
+
+        start = time.perf_counter()
+        inline_prompt = str(table.to_pylist())
+        inline_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        data = result_file.to_parquet_bytes(table)
+        summary = result_file.summarize_table(table)
+        file_time = time.perf_counter() - start
+        assert result_file.from_parquet_bytes(data).equals(table)
+
+        rows.append(
+            [
+                num_rows,
+                f"{len(inline_prompt) // CHARS_PER_TOKEN:,}",
+                f"{len(summary) // CHARS_PER_TOKEN:,}",
+                f"{len(data) / 1024:,.0f}",
+                f"{inline_time * 1000:.1f}",
+                f"{file_time * 1000:.1f}",
+            ]
+        )
+
+    print(
+        tabulate(
+            rows,
+            headers=[
+                "rows",
+                "inline prompt tokens",
+                "summary prompt tokens",
+                "parquet KiB",
+                "inline ms",
+                "parquet + summary ms",
+            ],
+        )
+    )
+    print()
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
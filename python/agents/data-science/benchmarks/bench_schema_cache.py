@@ -0,0 +1,140 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Schema DDL latency against a fake BigQuery client with per-call latency.
+
+Compares a sequential, uncached walk over the tables (what
+`get_bigquery_schema` used to do), a cold concurrent `SchemaCache` fill, a
+warm refresh with no table change, and a refresh after a few tables changed.
+
+    python benchmarks/bench_schema_cache.py
+"""
+
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+from tabulate import tabulate
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../data_science/sub_agents/bigquery")
+)
+
+from schema_cache import SchemaCache, table_ddl  # noqa: E402
+
+NUM_TABLES = 200
+NUM_CHANGED = 10
+METADATA_LATENCY = 0.02
+ROWS_LATENCY = 0.1
+
+
+class FakeField:
+    def __init__(self, name, field_type):
+        self.name = name
+        self.field_type = field_type
+        self.mode = "NULLABLE"
+        self.description = None
+
+
+class FakeRow:
+    def __init__(self, values):
+        self._values = values
+
+    def values(self):
+        return self._values
+
+
+class FakeTable:
+    def __init__(self, table_id, modified):
+        self.table_id = table_id
+        self.table_type = "TABLE"
+        self.modified = modified
+        self.schema = [
+            FakeField("id", "INTEGER"),
+            FakeField("name", "STRING"),
+            FakeField("amount", "FLOAT"),
+            FakeField("day", "DATE"),
+        ]
+
+
+class FakeClient:
+    """Answers the BigQuery calls used by `SchemaCache` after a fixed delay"""
+
+    def __init__(self, num_tables):
+        now = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        self.tables = {f"table_{i}": FakeTable(f"table_{i}", now) for i in range(num_tables)}
+
+    def touch(self, num_tables):
+        for table in list(self.tables.values())[:num_tables]:
+            table.modified += datetime.timedelta(hours=1)
+
+    def list_tables(self, dataset):
+        time.sleep(METADATA_LATENCY)
+        return list(self.tables.values())
+
+    def get_table(self, table_ref):
+        time.sleep(METADATA_LATENCY)
+        return self.tables[table_ref.split(".")[-1]]
+
+    def list_rows(self, table, max_results=None, page_size=None):
+        time.sleep(ROWS_LATENCY)
+        return [
+            FakeRow((i, f"name {i}", i * 1.5, datetime.date(2025, 1, i + 1)))
+            for i in range(max_results)
+        ]
+
+
+def sequential_ddl(client, dataset):
+    ddl = ""
+    for table in client.list_tables(dataset):
+        table_ref = f"{dataset}.{table.table_id}"
+        table_obj = client.get_table(table_ref)
+        ddl += table_ddl(table_ref, table_obj.schema, client.list_rows(table_obj, 5))
+    return ddl
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    client = FakeClient(NUM_TABLES)
+    rows = []
+    expected, elapsed = timed(lambda: sequential_ddl(client, "project.dataset"))
+    rows.append(["sequential, uncached", NUM_TABLES, f"{elapsed:.2f}"])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bq_schema.json")
+        for label, prepare in (
+            ("cold cache", lambda: None),
+            ("warm cache, new process", lambda: None),
+            (f"{NUM_CHANGED} tables modified", lambda: client.touch(NUM_CHANGED)),
+        ):
+            prepare()
+            cache = SchemaCache(path)
+            ddl, elapsed = timed(
+                lambda: cache.get_ddl(client, "project", "dataset")
+            )
+            assert ddl == expected
+            rows.append([label, cache.num_fetched, f"{elapsed:.2f}"])
+
+    print(tabulate(rows, headers=["run", "tables fetched", "seconds"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cost of parsing a synthetic 500-table DDL schema for SQLGlot.
+
+Compares parsing the DDL string on every `SqlTranslator` error fixing pass
+(what `_fix_errors` used to do, twice per `translate`) with the content-hash
+cache of `schema_parser.parse_ddl_schema`, next to the SQLGlot optimization of
+a query against the parsed schema.
+
+    python benchmarks/bench_schema_parser.py
+"""
+
+import datetime
+import os
+import sys
+import time
+
+import sqlglot
+import sqlglot.optimizer
+from tabulate import tabulate
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../data_science/sub_agents/bigquery")
+)
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__),
+        "../data_science/sub_agents/bigquery/chase_sql/sql_postprocessor",
+    ),
+)
+
+import schema_parser  # noqa: E402
+from schema_cache import table_ddl  # noqa: E402
+
+NUM_TABLES = 500
+NUM_COLUMNS = 20
+NUM_EXAMPLE_ROWS = 5
+NUM_REPEATS = 5
+COLUMN_TYPES = ("INT64", "STRING", "FLOAT64", "DATE", "BOOL")
+
+
+class FakeField:
+    def __init__(self, name, field_type, description=None):
+        self.name = name
+        self.field_type = field_type
+        self.mode = "NULLABLE"
+        self.description = description
+
+
+class FakeRow:
+    def __init__(self, values):
+        self._values = values
+
+    def values(self):
+        return self._values
+
+
+def example_value(field_type, i):
+    return {
+        "INT64": i,
+        "STRING": f"value {i} of a fairly long example string",
+        "FLOAT64": i * 1.25,
+        "DATE": datetime.date(2025, 1, 1 + i),
+        "BOOL": i % 2 == 0,
+    }[field_type]
+
+
+def synthetic_ddl(num_tables):
+    ddl = ""
+    for t in range(num_tables):
+        schema = [
+            FakeField(
+                f"column_{c}",
+                COLUMN_TYPES[c % len(COLUMN_TYPES)],
+                f"Description of column {c}" if c % 4 == 0 else None,
+            )
+            for c in range(NUM_COLUMNS)
+        ]
+        rows = [
+            FakeRow([example_value(field.field_type, i) for field in schema])
+            for i in range(NUM_EXAMPLE_ROWS)
+        ]
+        ddl += table_ddl(f"project.dataset.table_{t}", schema, rows)
+    return ddl
+
+
+def timed(fn, repeats=NUM_REPEATS):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeats
+
+
+def main():
+    ddl = synthetic_ddl(NUM_TABLES)
+    schema_parser.clear_schema_cache()
+
+    expected, uncached = timed(
+        lambda: schema_parser.format_schema(
+            schema_parser.extract_schema_from_ddls(ddl)
+        )
+    )
+    schema_dict, cold = timed(lambda: schema_parser.parse_ddl_schema(ddl), repeats=1)
+    assert schema_dict == expected
+    # A copy of the DDL, as read back from the session state.
+    ddl_copy = "".join(list(ddl))
+    _, warm = timed(lambda: schema_parser.parse_ddl_schema(ddl_copy))
+    assert schema_parser.schema_cache_stats()["hits"] == NUM_REPEATS
+
+    query = sqlglot.parse_one(
+        "SELECT a.column_0, SUM(b.column_2) FROM table_1 AS a "
+        "JOIN table_2 AS b ON a.column_0 = b.column_0 GROUP BY a.column_0",
+        read="bigquery",
+    )
+    _, optimize = timed(
+        lambda: sqlglot.optimizer.optimize(
+            query.copy(),
+            dialect="bigquery",
+            schema=schema_dict,
+            db="dataset",
+            catalog="project",
+        )
+    )
+
+    print(f"DDL: {NUM_TABLES} tables, {len(ddl) / 1e6:.1f} MB")
+    print(
+        tabulate(
+            [
+                ["parse DDL, uncached", f"{uncached * 1000:.1f}"],
+                ["translate, uncached (2 passes)", f"{2 * uncached * 1000:.1f}"],
+                ["parse_ddl_schema, cold", f"{cold * 1000:.1f}"],
+                ["parse_ddl_schema, warm", f"{warm * 1000:.1f}"],
+                ["sqlglot optimize", f"{optimize * 1000:.1f}"],
+            ],
+            headers=["step", "ms"],
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -75,6 +75,8 @@ def return_instructions_ds() -> str:
 
   **Available files:** Only use the files that are available as specified in the list of available files.
 
+  **Data files:** Some queries give the input data as a file, e.g. `query_result.parquet`, with a summary of its columns. Load the whole file into a pandas DataFrame with the code given in the query, and compute on the DataFrame rather than on the summary.
+
   **Data in prompt:** Some queries contain the input data directly in the prompt. You have to parse that data into a pandas DataFrame. ALWAYS parse all the data. NEVER edit the data that are given to you.
 
   **Answerability:** Some queries may not be answerable with the available data. In those cases, inform the user why you cannot process their query and suggest what type of data would be needed to fulfill their request.
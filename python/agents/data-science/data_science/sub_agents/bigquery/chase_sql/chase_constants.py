@@ -30,6 +30,10 @@ chase_sql_constants_dict: immutabledict.immutabledict[str, Any] = (
             "process_tool_output_errors": True,
             # Number of candidates to generate.
             "number_of_candidates": 1,
+            # How to select among the candidates: "first", "majority" (of the
+            # normalised queries) or "execution" (agreement of the results on
+            # the example rows of the schema).
+            "candidate_selection": "execution",
             # Model to use for generation.
             "model": os.getenv("CHASE_NL2SQL_MODEL"),
             # Temperature for generation.
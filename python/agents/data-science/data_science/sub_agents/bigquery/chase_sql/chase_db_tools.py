@@ -19,10 +19,13 @@ import os
 
 from google.adk.tools import ToolContext
 
+from .. import tools
+
 # pylint: disable=g-importing-member
 from .dc_prompt_template import DC_PROMPT_TEMPLATE
 from .llm_utils import GeminiModel
 from .qp_prompt_template import QP_PROMPT_TEMPLATE
+from .sql_postprocessor import candidate_selection
 from .sql_postprocessor import sql_translator
 
 # pylint: enable=g-importing-member
@@ -91,6 +94,9 @@ def initial_bq_nl2sql(
 
     Returns:
       str: An SQL statement to answer this question.
+
+    Raises:
+      RuntimeError: If no candidate gives an SQL statement.
     """
     print("****** Running agent with ChaseSQL algorithm.")
     ddl_schema = tool_context.state["database_settings"]["bq_ddl_schema"]
@@ -108,10 +114,28 @@ def initial_bq_nl2sql(
     number_of_candidates = tool_context.state["database_settings"][
         "number_of_candidates"
     ]
+    selection_method = tool_context.state["database_settings"].get(
+        "candidate_selection", candidate_selection.SelectionMethod.FIRST.value
+    )
     model = tool_context.state["database_settings"]["model"]
     temperature = tool_context.state["database_settings"]["temperature"]
     generate_sql_type = tool_context.state["database_settings"]["generate_sql_type"]
 
+    cache_settings = {
+        "method": "CHASE",
+        "model": model,
+        "temperature": temperature,
+        "generate_sql_type": generate_sql_type,
+        "number_of_candidates": number_of_candidates,
+        "candidate_selection": selection_method,
+        "transpile_to_bigquery": transpile_to_bigquery,
+        "process_input_errors": process_input_errors,
+        "process_tool_output_errors": process_tool_output_errors,
+    }
+    cached_sql = tools.get_cached_sql(question, tool_context, cache_settings)
+    if cached_sql is not None:
+        return cached_sql
+
     if generate_sql_type == GenerateSQLType.DC.value:
         prompt = DC_PROMPT_TEMPLATE.format(
             SCHEMA=ddl_schema, QUESTION=question, BQ_PROJECT_ID=BQ_PROJECT_ID
@@ -126,11 +150,10 @@ def initial_bq_nl2sql(
     model = GeminiModel(model_name=model, temperature=temperature)
     requests = [prompt for _ in range(number_of_candidates)]
     responses = model.call_parallel(requests, parser_func=parse_response)
-    # Take just the first response.
-    responses = responses[0]
 
     # If postprocessing of the SQL to transpile it to BigQuery is required,
-    # then do it here.
+    # then do it here, for every candidate.
+    translate = None
     if transpile_to_bigquery:
         translator = sql_translator.SqlTranslator(
             model=model,
@@ -138,10 +161,30 @@ def initial_bq_nl2sql(
             process_input_errors=process_input_errors,
             process_tool_output_errors=process_tool_output_errors,
         )
-        # pylint: disable=g-bad-todo
-        # pylint: enable=g-bad-todo
-        responses: str = translator.translate(
-            responses, ddl_schema=ddl_schema, db=db, catalog=project
+
+        def translate(sql_query: str) -> str:
+            return translator.translate(
+                sql_query, ddl_schema=ddl_schema, db=db, catalog=project
+            )
+
+    # Translate and validate the candidates concurrently, and keep the one most
+    # of the others agree with.
+    selection = candidate_selection.select_candidate(
+        responses,
+        translate=translate,
+        db=db,
+        catalog=project,
+        ddl_schema=ddl_schema,
+        method=selection_method,
+    )
+    print("****** Candidate selection:", selection.summary())
+    if selection.sql is None:
+        # Never hand prose on to run_bigquery_validation as if it were SQL.
+        raise RuntimeError(
+            f"No SQL query could be generated for this question: none of the"
+            f" {len(responses)} candidates is usable."
         )
+    responses: str = selection.sql
+    tools.record_generated_sql(tool_context, responses)
 
     return responses
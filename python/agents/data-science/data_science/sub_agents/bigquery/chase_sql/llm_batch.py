@@ -0,0 +1,286 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Asyncio batch calls to LLMs for the CHASE-SQL Agent.
+
+All the calls of the process share one concurrency limiter, whatever event loop
+or thread they run in. Each call is retried with a single jittered exponential
+backoff policy until an overall deadline, and the calls still running when the
+deadline expires, or once enough of them succeeded, are cancelled.
+"""
+
+import asyncio
+import collections
+import dataclasses
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Coroutine, Iterable, TypeVar
+
+# Maximum number of LLM calls in flight in the process.
+MAX_CONCURRENT_CALLS = int(os.getenv("CHASE_MAX_CONCURRENT_CALLS", "32"))
+
+T = TypeVar("T")
+
+
+class ConcurrencyLimiter:
+    """Bounds the number of concurrent calls across threads and event loops.
+
+    Slots are handed over in FIFO order. Waiting is asynchronous: the waiters of
+    every event loop are woken up through their own loop.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters = collections.deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just before the cancellation.
+                    self._release()
+                else:
+                    try:
+                        self._waiters.remove((loop, waiter))
+                    except ValueError:
+                        # The hand over is scheduled and will release the slot.
+                        pass
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            self._release()
+
+    def _release(self) -> None:
+        while self._waiters:
+            # Hand the slot over to the next waiter, keeping it active.
+            loop, waiter = self._waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(self._wake, waiter)
+                return
+            except RuntimeError:
+                # The event loop of the waiter is closed.
+                continue
+        self.active -= 1
+
+    def _wake(self, waiter: asyncio.Future) -> None:
+        if waiter.cancelled():
+            self.release()
+        else:
+            waiter.set_result(None)
+
+    async def __aenter__(self) -> "ConcurrencyLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+
+_limiter = ConcurrencyLimiter(MAX_CONCURRENT_CALLS)
+
+
+def get_limiter() -> ConcurrencyLimiter:
+    """Returns the concurrency limiter shared by the process."""
+    return _limiter
+
+
+@dataclasses.dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with full jitter.
+
+    Attributes:
+      max_attempts: The maximum number of attempts of a call.
+      base_delay: The maximum delay in seconds before the first retry.
+      max_delay: The maximum delay in seconds before any retry.
+    """
+
+    max_attempts: int = 6
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int) -> float:
+        """Returns the delay before retrying after `attempt` failed attempts."""
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+def deadline_after(timeout: float | None) -> float | None:
+    """Returns the `time.monotonic()` deadline `timeout` seconds from now."""
+    return None if timeout is None else time.monotonic() + timeout
+
+
+def _remaining(deadline: float | None) -> float | None:
+    return None if deadline is None else deadline - time.monotonic()
+
+
+async def call_with_retries(
+    func: Callable[[], Awaitable[T]],
+    policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+    deadline: float | None = None,
+    limiter: ConcurrencyLimiter | None = None,
+) -> T:
+    """Awaits `func()` within the concurrency limit, retrying its failures.
+
+    Args:
+      func: Returns the awaitable of one attempt.
+      policy: The retry policy.
+      deadline: The `time.monotonic()` time after which no attempt is made and
+        the running attempt is cancelled. There is no deadline if None.
+      limiter: The concurrency limiter, the process-wide one if None.
+
+    Returns:
+      The result of the first successful attempt.
+
+    Raises:
+      TimeoutError: If the deadline expired.
+      Exception: The error of the last attempt.
+    """
+    limiter = limiter or get_limiter()
+    attempt = 0
+    while True:
+        remaining = _remaining(deadline)
+        if remaining is not None and remaining <= 0:
+            raise TimeoutError("Deadline exceeded")
+        timeout = asyncio.timeout(remaining)
+        try:
+            async with timeout:
+                async with limiter:
+                    return await func()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            if timeout.expired():
+                raise TimeoutError("Deadline exceeded") from None
+            attempt += 1
+            if attempt >= policy.max_attempts:
+                raise
+            delay = policy.delay(attempt)
+            remaining = _remaining(deadline)
+            if remaining is not None and delay >= remaining:
+                raise
+            print(f"Attempt {attempt} failed with error: {e}")
+            await asyncio.sleep(delay)
+
+
+async def gather_with_deadline(
+    awaitables: Iterable[Awaitable[T]],
+    deadline: float | None = None,
+    num_required: int | None = None,
+) -> list[T | BaseException]:
+    """Runs awaitables concurrently until they complete or the deadline.
+
+    Args:
+      awaitables: The awaitables to run.
+      deadline: The `time.monotonic()` time at which the awaitables still
+        running are cancelled. There is no deadline if None.
+      num_required: Cancel the awaitables still running once this many
+        succeeded. All of them run to completion if None.
+
+    Returns:
+      The result of each awaitable, in order, or the exception it raised. The
+      cancelled awaitables get a `TimeoutError` or a `asyncio.CancelledError`,
+      depending on whether the deadline expired.
+    """
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    pending = set(tasks)
+    num_succeeded = 0
+    timed_out = False
+    while pending:
+        done, pending = await asyncio.wait(
+            pending,
+            timeout=_remaining(deadline),
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        if not done:
+            timed_out = True
+            break
+        num_succeeded += sum(
+            not task.cancelled() and task.exception() is None for task in done
+        )
+        if num_required is not None and num_succeeded >= num_required:
+            break
+
+    # Cancel the stragglers, and wait for them to release their slots.
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    results = []
+    for task in tasks:
+        if task in pending:
+            results.append(
+                TimeoutError("Deadline exceeded")
+                if timed_out
+                else asyncio.CancelledError("Enough results")
+            )
+        elif task.cancelled():
+            results.append(asyncio.CancelledError())
+        else:
+            results.append(task.exception() or task.result())
+    return results
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Returns the event loop shared by the process, running in its own thread.
+
+    Clients such as the grpc.aio channel of a vertexai `GenerativeModel` are
+    bound to the event loop they were first used in, so all the calls made from
+    synchronous code run in this one long-lived loop.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="llm-batch-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def run_sync(coroutine: Coroutine[Any, Any, T]) -> T:
+    """Runs a coroutine to completion from synchronous code.
+
+    The coroutine runs in the event loop shared by the process, whether or not
+    this thread already runs one, e.g. when called from a tool of an async agent
+    runner or from the threads of the candidate selection.
+    """
+    loop = get_event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coroutine.close()
+        raise RuntimeError("run_sync cannot be called from the shared event loop")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
@@ -14,11 +14,10 @@
 
 """This code contains the LLM utils for the CHASE-SQL Agent."""
 
+import dataclasses
 import functools
 import os
 import random
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Callable, List, Optional
 
 import dotenv
@@ -29,6 +28,8 @@ from vertexai.generative_models import (GenerationConfig, HarmBlockThreshold,
 from vertexai.preview import caching
 from vertexai.preview.generative_models import GenerativeModel
 
+from . import llm_batch
+
 dotenv.load_dotenv(override=True)
 
 SAFETY_FILTER_CONFIG = {
@@ -80,38 +81,24 @@ aiplatform.init(
 vertexai.init(project=GCP_PROJECT, location=GCP_LOCATION)
 
 
-def retry(max_attempts=8, base_delay=1, backoff_factor=2):
-    """Decorator to add retry logic to a function.
+@functools.lru_cache(maxsize=None)
+def get_generative_model(
+    model_name: str, cache_name: str | None = None
+) -> GenerativeModel:
+    """Returns the client of a model, created once per model (and region) or
+    cached content.
 
     Args:
-        max_attempts (int): The maximum number of attempts.
-        base_delay (int): The base delay in seconds for the exponential backoff.
-        backoff_factor (int): The factor by which to multiply the delay for each
-          subsequent attempt.
+        model_name (str): The model name, or its URL in a given region.
+        cache_name (str, optional): The name of the cached content to use.
 
     Returns:
-        Callable: The decorator function.
+        GenerativeModel: The model client, shared by all the callers.
     """
-
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            attempts = 0
-            while attempts < max_attempts:
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:  # pylint: disable=broad-exception-caught
-                    print(f"Attempt {attempts + 1} failed with error: {e}")
-                    attempts += 1
-                    if attempts >= max_attempts:
-                        raise e
-                    delay = base_delay * (backoff_factor**attempts)
-                    delay = delay + random.uniform(0, 0.1 * delay)
-                    time.sleep(delay)
-
-        return wrapper
-
-    return decorator
+    if cache_name is not None:
+        cached_content = caching.CachedContent(cached_content_name=cache_name)
+        return GenerativeModel.from_cached_content(cached_content=cached_content)
+    return GenerativeModel(model_name=model_name)
 
 
 class GeminiModel:
@@ -124,13 +111,31 @@ class GeminiModel:
         distribute_requests: bool = False,
         cache_name: str | None = None,
         temperature: float = 0.01,
+        retry_policy: llm_batch.RetryPolicy = llm_batch.DEFAULT_RETRY_POLICY,
+        generative_model: GenerativeModel | None = None,
         **kwargs,
     ):
+        """Initializes the model.
+
+        Args:
+            model_name (str): The model name.
+            finetuned_model (bool): Whether the model is a finetuned model.
+            distribute_requests (bool): Whether to send the requests to a random
+              region.
+            cache_name (str, optional): The name of the cached content to use.
+            temperature (float): The generation temperature.
+            retry_policy (llm_batch.RetryPolicy): How failed calls are retried.
+            generative_model (GenerativeModel, optional): The client to call,
+              e.g. a fake one with `generate_content_async` in tests. The shared
+              client of the model is used if None.
+            **kwargs: Additional `GenerationConfig` arguments.
+        """
         self.model_name = model_name
         self.finetuned_model = finetuned_model
         self.arguments = kwargs
         self.distribute_requests = distribute_requests
         self.temperature = temperature
+        self.retry_policy = retry_policy
         model_name = self.model_name
         if not self.finetuned_model and self.distribute_requests:
             random_region = random.choice(GEMINI_AVAILABLE_REGIONS)
@@ -139,15 +144,52 @@ class GeminiModel:
                 region=random_region,
                 model_name=self.model_name,
             )
-        if cache_name is not None:
-            cached_content = caching.CachedContent(cached_content_name=cache_name)
-            self.model = GenerativeModel.from_cached_content(
-                cached_content=cached_content
-            )
+        if generative_model is not None:
+            self.model = generative_model
         else:
-            self.model = GenerativeModel(model_name=model_name)
+            self.model = get_generative_model(model_name, cache_name)
+
+    async def _generate(self, prompt: str, parser_func=None) -> str:
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config=GenerationConfig(
+                temperature=self.temperature,
+                **self.arguments,
+            ),
+            safety_settings=SAFETY_FILTER_CONFIG,
+        )
+        if parser_func:
+            return parser_func(response.text)
+        return response.text
+
+    async def call_async(
+        self,
+        prompt: str,
+        parser_func=None,
+        deadline: float | None = None,
+        retry_policy: llm_batch.RetryPolicy | None = None,
+    ) -> str:
+        """Calls the Gemini model with the given prompt, retrying failures.
+
+        Args:
+            prompt (str): The prompt to call the model with.
+            parser_func (callable, optional): A function that processes the LLM
+              output. It takes the model"s response as input and returns the
+              processed result.
+            deadline (float, optional): The `time.monotonic()` time after which
+              the call is abandoned.
+            retry_policy (llm_batch.RetryPolicy, optional): Overrides the retry
+              policy of the model.
+
+        Returns:
+            str: The processed response from the model.
+        """
+        return await llm_batch.call_with_retries(
+            lambda: self._generate(prompt, parser_func),
+            policy=retry_policy or self.retry_policy,
+            deadline=deadline,
+        )
 
-    @retry(max_attempts=12, base_delay=2, backoff_factor=2)
     def call(self, prompt: str, parser_func=None) -> str:
         """Calls the Gemini model with the given prompt.
 
@@ -160,17 +202,52 @@ class GeminiModel:
         Returns:
             str: The processed response from the model.
         """
-        response = self.model.generate_content(
-            prompt,
-            generation_config=GenerationConfig(
-                temperature=self.temperature,
-                **self.arguments,
+        return llm_batch.run_sync(self.call_async(prompt, parser_func))
+
+    async def call_parallel_async(
+        self,
+        prompts: List[str],
+        parser_func: Optional[Callable[[str], str]] = None,
+        timeout: float | None = 60,
+        num_required: int | None = None,
+        retry_policy: llm_batch.RetryPolicy | None = None,
+    ) -> List[Optional[str]]:
+        """Calls the Gemini model for multiple prompts concurrently.
+
+        The calls share the process-wide concurrency limit with all the other
+        calls, and the ones still running at the deadline are cancelled.
+
+        Args:
+            prompts (List[str]): A list of prompts to call the model with.
+            parser_func (callable, optional): A function to process each response.
+            timeout (float, optional): The overall deadline of the calls, in
+              seconds, including their retries.
+            num_required (int, optional): Cancel the remaining calls once this
+              many succeeded.
+            retry_policy (llm_batch.RetryPolicy, optional): Overrides the retry
+              policy of the model.
+
+        Returns:
+            List[Optional[str]]:
+            A list of responses, or None for calls that failed or were cancelled.
+        """
+        deadline = llm_batch.deadline_after(timeout)
+        results = await llm_batch.gather_with_deadline(
+            (
+                self.call_async(prompt, parser_func, deadline, retry_policy)
+                for prompt in prompts
             ),
-            safety_settings=SAFETY_FILTER_CONFIG,
-        ).text
-        if parser_func:
-            return parser_func(response)
-        return response
+            deadline=deadline,
+            num_required=num_required,
+        )
+        responses = []
+        for index, result in enumerate(results):
+            if isinstance(result, BaseException):
+                print(f"No response for prompt {index}: {result!r}")
+                responses.append(None)
+            else:
+                responses.append(result)
+        return responses
 
     def call_parallel(
         self,
@@ -179,55 +256,25 @@ class GeminiModel:
         timeout: int = 60,
         max_retries: int = 5,
     ) -> List[Optional[str]]:
-        """Calls the Gemini model for multiple prompts in parallel using threads with retry logic.
+        """Calls the Gemini model for multiple prompts in parallel.
+
+        See `call_parallel_async`.
 
         Args:
             prompts (List[str]): A list of prompts to call the model with.
             parser_func (callable, optional): A function to process each response.
-            timeout (int): The maximum time (in seconds) to wait for each thread.
-            max_retries (int): The maximum number of retries for timed-out threads.
+            timeout (int): The overall deadline of the calls, in seconds.
+            max_retries (int): The maximum number of retries of each call.
 
         Returns:
             List[Optional[str]]:
-            A list of responses, or None for threads that failed.
+            A list of responses, or None for calls that failed.
         """
-        results = [None] * len(prompts)
-
-        def worker(index: int, prompt: str):
-            """Thread worker function to call the model and store the result with retries."""
-            retries = 0
-            while retries <= max_retries:
-                try:
-                    return self.call(prompt, parser_func)
-                except Exception as e:  # pylint: disable=broad-exception-caught
-                    print(f"Error for prompt {index}: {str(e)}")
-                    retries += 1
-                    if retries <= max_retries:
-                        print(f"Retrying ({retries}/{max_retries}) for prompt {index}")
-                        time.sleep(1)  # Small delay before retrying
-                    else:
-                        return f"Error after retries: {str(e)}"
-
-        # Create and start one thread for each prompt
-        with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
-            future_to_index = {
-                executor.submit(worker, i, prompt): i
-                for i, prompt in enumerate(prompts)
-            }
-
-            for future in as_completed(future_to_index, timeout=timeout):
-                index = future_to_index[future]
-                try:
-                    results[index] = future.result()
-                except Exception as e:  # pylint: disable=broad-exception-caught
-                    print(f"Unhandled error for prompt {index}: {e}")
-                    results[index] = "Unhandled Error"
-
-        # Handle remaining unfinished tasks after the timeout
-        for future in future_to_index:
-            index = future_to_index[future]
-            if not future.done():
-                print(f"Timeout occurred for prompt {index}")
-                results[index] = "Timeout"
-
-        return results
+        retry_policy = dataclasses.replace(
+            self.retry_policy, max_attempts=max_retries + 1
+        )
+        return llm_batch.run_sync(
+            self.call_parallel_async(
+                prompts, parser_func, timeout=timeout, retry_policy=retry_policy
+            )
+        )
@@ -0,0 +1,484 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Selection of one SQL query among several generated candidates.
+
+All the candidates are translated and validated with SQLGlot concurrently, then
+grouped by their normalised (optimized) SQLGlot AST. When the distinct queries
+disagree, one query per group is executed against an in-memory DuckDB database
+holding the example rows of the DDL schema, and the winner is taken from the
+largest group of candidates returning the same result. Without usable example
+rows, the winner is taken from the largest group of identical normalised
+queries instead.
+"""
+
+import collections
+import dataclasses
+import decimal
+import enum
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Final, Sequence
+
+import duckdb
+import sqlglot
+import sqlglot.optimizer
+
+from . import schema_parser
+from .schema_parser import SQLGlotSchemaType
+
+# Seconds a candidate may run against the example rows before it is interrupted.
+DEFAULT_EXECUTION_TIMEOUT: Final[float] = 5.0
+
+# Number of DuckDB databases of example rows kept in memory.
+EXECUTOR_CACHE_SIZE: Final[int] = 2
+
+# Digits floats are rounded to before execution results are compared.
+RESULT_FLOAT_DIGITS: Final[int] = 6
+
+
+class SelectionMethod(enum.Enum):
+    """Enum for the different ways of selecting a candidate.
+
+    FIRST: The first candidate, the others are ignored.
+    MAJORITY: A candidate of the largest group of identical normalised queries.
+    EXECUTION: A candidate of the largest group of queries returning the same
+      result on the example rows, or MAJORITY without example rows.
+    """
+
+    FIRST = "first"
+    MAJORITY = "majority"
+    EXECUTION = "execution"
+
+
+@dataclasses.dataclass
+class Candidate:
+    """A generated SQL query and the outcome of its validation.
+
+    Attributes:
+      index: Position of the candidate in the generated responses.
+      response: The generated response.
+      sql: The translated SQL query, or None if the translation failed.
+      normalized: The SQL of the optimized SQLGlot AST, or None if the query is
+        invalid.
+      errors: The translation or validation errors, if any.
+      result: The rows returned on the example rows, sorted, if executed.
+      execution_error: The error raised executing the query, if any.
+      latency: Seconds spent translating and validating the candidate.
+    """
+
+    index: int
+    response: str | None
+    sql: str | None = None
+    normalized: str | None = None
+    errors: str | None = None
+    result: tuple[tuple[Any, ...], ...] | None = None
+    execution_error: str | None = None
+    latency: float = 0.0
+
+
+@dataclasses.dataclass
+class Selection:
+    """The selected candidate, with the candidates it was selected from.
+
+    Attributes:
+      sql: The selected SQL query.
+      candidates: All the evaluated candidates.
+      winner: Index of the selected candidate, or None if none could be used.
+      method: How the winner was selected, a `SelectionMethod` value.
+      agreement: Number of candidates agreeing with the winner.
+      num_distinct: Number of distinct valid normalised queries.
+      latency: Seconds spent selecting the candidate.
+    """
+
+    sql: str | None
+    candidates: list[Candidate]
+    winner: int | None
+    method: str
+    agreement: int
+    num_distinct: int
+    latency: float
+
+    def summary(self) -> str:
+        """Returns a one line summary of the selection."""
+        num_valid = sum(c.normalized is not None for c in self.candidates)
+        return (
+            f"selected candidate {self.winner} by {self.method}"
+            f" ({self.agreement} agreeing, {num_valid}/{len(self.candidates)}"
+            f" valid, {self.num_distinct} distinct) in {self.latency:.3f}s"
+        )
+
+
+def validate_sql(
+    sql_query: str,
+    sql_dialect: str,
+    db: str | None = None,
+    catalog: str | None = None,
+    schema_dict: SQLGlotSchemaType | None = None,
+) -> tuple[str | None, str]:
+    """Checks for errors in the SQL query.
+
+    Args:
+      sql_query: The SQL query to check for errors.
+      sql_dialect: The SQL dialect of the SQL query.
+      db: The database to use for the translation. This field is optional.
+      catalog: The catalog to use for the translation. `catalog` is the SQLGlot
+        term for the project ID. This field is optional.
+      schema_dict: The DDL schema to use for the translation. The DDL format is
+        in the SQLGlot format. This field is optional.
+
+    Returns:
+      tuple of the errors in the SQL query, or None if there are no errors, and
+      the SQL query after optimization.
+    """
+    try:
+        # First, try to parse the SQL query into a SQLGlot AST.
+        sql_query_ast = sqlglot.parse_one(
+            sql=sql_query,
+            read=sql_dialect.lower(),
+            error_level=sqlglot.ErrorLevel.IMMEDIATE,
+        )
+        # Then add the database and catalog information for each table to the AST.
+        for table in sql_query_ast.find_all(sqlglot.exp.Table):
+            table.set("catalog", sqlglot.exp.Identifier(this=catalog, quoted=True))
+            table.set("db", sqlglot.exp.Identifier(this=db, quoted=True))
+        # Then, try to optimize the SQL query.
+        sql_query_ast = sqlglot.optimizer.optimize(
+            sql_query_ast,
+            dialect=sql_dialect.lower(),
+            schema=schema_dict,
+            db=db,
+            catalog=catalog,
+            error_level=sqlglot.ErrorLevel.IMMEDIATE,
+        )
+        sql_query = sql_query_ast.sql(sql_dialect.lower())
+    except sqlglot.errors.SqlglotError as e:
+        return str(e), sql_query
+    return None, sql_query
+
+
+def _unqualify_tables(ast: sqlglot.exp.Expression) -> sqlglot.exp.Expression:
+    """Drops the project and dataset of the tables, which DuckDB does not have."""
+    for table in ast.find_all(sqlglot.exp.Table):
+        # BigQuery allows `project.dataset.table` as a single quoted identifier.
+        table.set("this", sqlglot.exp.to_identifier(table.name.split(".")[-1]))
+        table.set("db", None)
+        table.set("catalog", None)
+    return ast
+
+
+def _normalize_value(value: Any) -> Any:
+    if isinstance(value, decimal.Decimal):
+        value = float(value)
+    if isinstance(value, float):
+        return round(value, RESULT_FLOAT_DIGITS)
+    return value
+
+
+class SampleExecutor:
+    """In-memory DuckDB database holding the example rows of a DDL schema.
+
+    The tables are created from the columns of the `CREATE TABLE` statements and
+    filled with their `INSERT INTO` example rows; rows that cannot be inserted
+    are skipped. Table names are stripped of their project and dataset.
+
+    The generated queries are untrusted: the database has no access to files,
+    extensions or the network, and its configuration is locked so that a query
+    cannot enable them again.
+    """
+
+    def __init__(self, ddls: str, timeout: float = DEFAULT_EXECUTION_TIMEOUT):
+        """Initializes the database.
+
+        Args:
+          ddls: A string containing multiple DDL statements, with example rows.
+          timeout: Seconds a query may run before it is interrupted.
+        """
+        self.timeout = timeout
+        self.num_rows = 0
+        self._connection = duckdb.connect(
+            ":memory:",
+            config={"enable_external_access": False, "lock_configuration": True},
+        )
+        for table_name, columns in schema_parser.extract_schema_from_ddls(ddls):
+            self._create_table(table_name, columns)
+        for statement in ddls.split(";\n"):
+            # Drop the comment lines, e.g. the one before the first example row.
+            statement = "\n".join(
+                line for line in statement.splitlines()
+                if not line.lstrip().startswith("--")
+            ).strip()
+            if statement.upper().startswith("INSERT INTO"):
+                self._insert(statement)
+
+    def _create_table(
+        self, table_name: str, columns: schema_parser.AllColumnsSchemaType
+    ) -> None:
+        table = sqlglot.exp.to_identifier(table_name.split(".")[-1]).sql("duckdb")
+        column_defs = []
+        for column_name, column_type in columns:
+            try:
+                column_type = sqlglot.exp.DataType.build(
+                    column_type, dialect="bigquery"
+                ).sql("duckdb")
+            except sqlglot.errors.SqlglotError:
+                column_type = "VARCHAR"
+            column = sqlglot.exp.to_identifier(column_name).sql("duckdb")
+            column_defs.append(f"{column} {column_type}")
+        try:
+            self._connection.execute(
+                f"CREATE TABLE {table} ({', '.join(column_defs)})"
+            )
+        except duckdb.Error as e:
+            print(f"Skipping example rows of {table_name}: {e}")
+
+    def _insert(self, statement: str) -> None:
+        try:
+            ast = sqlglot.parse_one(statement, read="bigquery")
+            self._connection.execute(_unqualify_tables(ast).sql("duckdb"))
+            self.num_rows += 1
+        except (sqlglot.errors.SqlglotError, duckdb.Error):
+            pass
+
+    def execute(
+        self, sql_query: str, sql_dialect: str = "bigquery"
+    ) -> tuple[tuple[Any, ...], ...]:
+        """Executes a query on the example rows.
+
+        Args:
+          sql_query: The SQL query to execute. Only queries are executed.
+          sql_dialect: The SQL dialect of the SQL query.
+
+        Returns:
+          The returned rows, sorted so that results can be compared regardless of
+          the row order.
+
+        Raises:
+          ValueError: If the statement is not a query.
+          sqlglot.errors.SqlglotError: If the query cannot be translated.
+          duckdb.Error: If the query fails or times out.
+        """
+        ast = sqlglot.parse_one(sql_query, read=sql_dialect.lower())
+        if not isinstance(ast, sqlglot.exp.Query):
+            raise ValueError(f"Not a query: {sql_query}")
+        duckdb_sql = _unqualify_tables(ast).sql("duckdb")
+        cursor = self._connection.cursor()
+        timer = threading.Timer(self.timeout, cursor.interrupt)
+        timer.start()
+        try:
+            rows = cursor.execute(duckdb_sql).fetchall()
+        finally:
+            timer.cancel()
+            cursor.close()
+        rows = [tuple(_normalize_value(value) for value in row) for row in rows]
+        return tuple(sorted(rows, key=repr))
+
+
+_executor_cache: collections.OrderedDict[str, SampleExecutor] = (
+    collections.OrderedDict()
+)
+_executor_cache_lock = threading.Lock()
+
+
+def get_sample_executor(ddls: str) -> SampleExecutor:
+    """Returns the executor of the example rows of `ddls`, built once per
+    content."""
+    key = schema_parser.ddl_schema_hash(ddls)
+    with _executor_cache_lock:
+        executor = _executor_cache.get(key)
+        if executor is None:
+            executor = SampleExecutor(ddls)
+            _executor_cache[key] = executor
+        _executor_cache.move_to_end(key)
+        while len(_executor_cache) > EXECUTOR_CACHE_SIZE:
+            _executor_cache.popitem(last=False)
+    return executor
+
+
+def _evaluate(
+    index: int,
+    response: str | None,
+    translate: Callable[[str], str] | None,
+    sql_dialect: str,
+    db: str | None,
+    catalog: str | None,
+    schema_dict: SQLGlotSchemaType | None,
+) -> Candidate:
+    start = time.perf_counter()
+    candidate = Candidate(index=index, response=response)
+    if response:
+        try:
+            candidate.sql = translate(response) if translate else response
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            candidate.errors = f"Translation failed: {e}"
+    if candidate.sql:
+        errors, normalized = validate_sql(
+            candidate.sql, sql_dialect, db=db, catalog=catalog, schema_dict=schema_dict
+        )
+        if errors:
+            candidate.errors = errors
+        else:
+            candidate.normalized = normalized
+    candidate.latency = time.perf_counter() - start
+    return candidate
+
+
+def _execute(
+    executor: SampleExecutor, candidate: Candidate, sql_dialect: str
+) -> Candidate:
+    try:
+        candidate.result = executor.execute(candidate.sql, sql_dialect)
+    except (ValueError, sqlglot.errors.SqlglotError, duckdb.Error) as e:
+        candidate.execution_error = str(e)
+    return candidate
+
+
+def _largest_group(
+    groups: dict[Any, list[Candidate]],
+) -> tuple[Any, list[Candidate]]:
+    """Returns the largest group, preferring non-empty results and then the
+    earliest candidates."""
+    return max(
+        groups.items(),
+        key=lambda item: (
+            len(item[1]),
+            bool(item[0]),
+            -min(c.index for c in item[1]),
+        ),
+    )
+
+
+def select_candidate(
+    responses: Sequence[str | None],
+    translate: Callable[[str], str] | None = None,
+    sql_dialect: str = "bigquery",
+    db: str | None = None,
+    catalog: str | None = None,
+    ddl_schema: str | None = None,
+    schema_dict: SQLGlotSchemaType | None = None,
+    method: SelectionMethod | str = SelectionMethod.EXECUTION,
+    executor: SampleExecutor | None = None,
+) -> Selection:
+    """Selects one SQL query among generated candidates.
+
+    Args:
+      responses: The generated SQL queries, None for failed generations.
+      translate: Translates a generated query to `sql_dialect`, e.g.
+        `SqlTranslator.translate`. The queries are used as is if None.
+      sql_dialect: The SQL dialect of the translated queries.
+      db: The database to use for the validation. This field is optional.
+      catalog: The catalog to use for the validation. This field is optional.
+      ddl_schema: A string containing multiple DDL statements, used to validate
+        the queries and, with its example rows, to execute them. This field is
+        optional.
+      schema_dict: The schema in the SQLGlot format, used when `ddl_schema` is
+        not provided. This field is optional.
+      method: How to select the candidate, a `SelectionMethod`.
+      executor: The executor of the example rows, built from `ddl_schema` if
+        None.
+
+    Returns:
+      The selection. Its `sql` is the first translated candidate if no candidate
+      is valid. A single candidate is only translated, not validated.
+
+    Raises:
+      Exception: The translation error of the first candidate if no candidate
+        could be translated.
+    """
+    start = time.perf_counter()
+    method = SelectionMethod(method)
+    if method == SelectionMethod.FIRST or len(responses) == 1:
+        # Nothing to select from: only translate the first candidate.
+        candidate = Candidate(index=0, response=responses[0])
+        if candidate.response:
+            candidate.sql = (
+                translate(candidate.response) if translate else candidate.response
+            )
+        candidate.latency = time.perf_counter() - start
+        return Selection(
+            sql=candidate.sql,
+            candidates=[candidate],
+            winner=0,
+            method=SelectionMethod.FIRST.value,
+            agreement=1,
+            num_distinct=1,
+            latency=candidate.latency,
+        )
+
+    if ddl_schema:
+        schema_dict = schema_parser.parse_ddl_schema(ddl_schema)
+
+    def evaluate(index: int, response: str | None) -> Candidate:
+        return _evaluate(
+            index, response, translate, sql_dialect, db, catalog, schema_dict
+        )
+
+    with ThreadPoolExecutor(max_workers=len(responses)) as pool:
+        candidates = list(pool.map(evaluate, range(len(responses)), responses))
+
+    by_query = collections.defaultdict(list)
+    for candidate in candidates:
+        if candidate.normalized is not None:
+            by_query[candidate.normalized].append(candidate)
+
+    def selection(winner, selected_by, agreement):
+        return Selection(
+            sql=winner.sql if winner else None,
+            candidates=candidates,
+            winner=winner.index if winner else None,
+            method=selected_by,
+            agreement=agreement,
+            num_distinct=len(by_query),
+            latency=time.perf_counter() - start,
+        )
+
+    if not by_query:
+        # No valid candidate: keep the first translated one, as before.
+        for candidate in candidates:
+            if candidate.sql:
+                return selection(candidate, SelectionMethod.FIRST.value, 1)
+        if candidates[0].errors and candidates[0].response:
+            raise RuntimeError(candidates[0].errors)
+        return selection(None, SelectionMethod.FIRST.value, 0)
+
+    if method == SelectionMethod.EXECUTION and len(by_query) > 1:
+        if executor is None and ddl_schema:
+            executor = get_sample_executor(ddl_schema)
+        if executor is not None and executor.num_rows:
+            # Execute one query per group of identical normalised queries.
+            representatives = [group[0] for group in by_query.values()]
+            with ThreadPoolExecutor(max_workers=len(representatives)) as pool:
+                list(
+                    pool.map(
+                        lambda c: _execute(executor, c, sql_dialect), representatives
+                    )
+                )
+            by_result = collections.defaultdict(list)
+            for group in by_query.values():
+                if group[0].result is not None:
+                    for candidate in group:
+                        candidate.result = group[0].result
+                    by_result[group[0].result] += group
+            if by_result:
+                _, group = _largest_group(by_result)
+                # Within the agreeing candidates, prefer the most common query.
+                votes = collections.Counter(c.normalized for c in group)
+                winner = min(group, key=lambda c: (-votes[c.normalized], c.index))
+                return selection(winner, SelectionMethod.EXECUTION.value, len(group))
+
+    _, group = max(
+        by_query.items(), key=lambda item: (len(item[1]), -item[1][0].index)
+    )
+    return selection(group[0], SelectionMethod.MAJORITY.value, len(group))
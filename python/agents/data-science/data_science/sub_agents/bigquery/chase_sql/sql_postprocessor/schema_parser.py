@@ -0,0 +1,192 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Parsing of DDL schemas into the SQLGlot schema format.
+
+Parsing a DDL string with example rows is expensive for large datasets, so the
+parsed schemas are memoised by content hash in a small, process-wide LRU cache
+shared by all the `SqlTranslator` instances.
+"""
+
+import collections
+import hashlib
+import re
+import threading
+from typing import Any, Final
+
+import regex
+
+
+ColumnSchemaType = tuple[str, str]
+AllColumnsSchemaType = list[ColumnSchemaType]
+TableSchemaType = tuple[str, AllColumnsSchemaType]
+DDLSchemaType = list[TableSchemaType]
+
+SQLGlotColumnsDictType = dict[str, str]
+SQLGlotSchemaType = dict[str, Any]
+
+# Number of parsed DDL schemas kept in memory.
+SCHEMA_CACHE_SIZE: Final[int] = 8
+
+# Match the following pattern:
+# CREATE [OR REPLACE] TABLE [`]<table_name>[`] (<all_columns>);
+_SPLITTER_PATTERN: Final[Any] = regex.compile(
+    # CREATE [OR REPLACE] TABLE
+    r"^\s*CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+"
+    # Match the table name, optionally surrounded by backticks.
+    r"(?:`)?(?P<table_name>[\w\d\-\_\.]+)(?:`)?\s*"
+    # Match the column name as everything between the first and last
+    # parentheses followed by a semicolon.
+    r"\((?P<all_columns>.*)\);$",
+    flags=re.DOTALL | re.VERBOSE | re.MULTILINE,
+)
+
+# Match the following pattern:
+# <column_name> <column_type> [<ignored_text>]
+# [, <column_name> <column_type> [<ignored_text>]]*
+# Ignore any comments. Ignore any INSERT INTO statements. Ignore any
+# lines beginning with a parenthesis (these are example values).
+_COLUMN_PATTERN: Final[Any] = regex.compile(
+    # Ignore any comments.
+    r"\s*--.*(*SKIP)(*FAIL)"
+    # Ignore any INSERT INTO statements.
+    r"|\s*INSERT\s+INTO.*(*SKIP)(*FAIL)"
+    # Ignore any lines beginning with a parenthesis.
+    r"|\s*\(.*(*SKIP)(*FAIL)"
+    # Match the column name and type, optionally with backticks.
+    r"|\s*(?:`)?\s*(?P<column_name>\w+)(?:`)?\s+(?P<column_type>\w+).*",
+    flags=re.VERBOSE,
+)
+
+_schema_cache: collections.OrderedDict[str, SQLGlotSchemaType] = (
+    collections.OrderedDict()
+)
+_schema_cache_lock = threading.Lock()
+_schema_cache_hits = 0
+_schema_cache_misses = 0
+
+
+def extract_schema_from_ddl_statement(ddl_statement: str) -> TableSchemaType:
+    """Extracts the schema from a single DDL statement."""
+    # Split the DDL statement into table name and columns.
+    split_match = _SPLITTER_PATTERN.search(ddl_statement)
+    if not split_match:
+        return None, None
+
+    table_name = split_match.group("table_name")
+    all_columns = split_match.group("all_columns").strip()
+    if not table_name or not all_columns:
+        return None, None
+
+    # Extract the columns from the DDL statement.
+    columns = _COLUMN_PATTERN.findall(all_columns)
+    return table_name, columns
+
+
+def extract_schema_from_ddls(ddls: str) -> DDLSchemaType:
+    """Extracts the schema from multiple DDL statements."""
+    ddl_statements = ddls.split(";\n")
+    ddl_statements = [ddl.strip() for ddl in ddl_statements if ddl.strip()]
+    schema = []
+    for ddl_statement in ddl_statements:
+        if ddl_statement:
+            ddl_statement = ddl_statement.strip() + ";"  # Add the semicolon back.
+            table_name, columns = extract_schema_from_ddl_statement(ddl_statement)
+            if table_name and columns:
+                schema.append((table_name, columns))
+    return schema
+
+
+def get_table_parts(table_name: str) -> tuple[str | None, str | None, str]:
+    """Returns the table parts from the table name."""
+    table_parts = table_name.split(".")
+    if len(table_parts) == 3:
+        return table_parts
+    elif len(table_parts) == 2:
+        return None, *table_parts
+    elif len(table_parts) == 1:
+        return None, None, *table_parts
+    else:
+        raise ValueError(f"Invalid table name: {table_name}")
+
+
+def format_schema(schema: DDLSchemaType) -> SQLGlotSchemaType:
+    """Formats the DDL schema for use in SQLGlot."""
+    schema_dict = {}
+    catalog, db = None, None
+    for table_name, columns in schema:
+        catalog, db, table_name = get_table_parts(table_name)
+        schema_dict[table_name] = {}
+        for column_name, column_type in columns:
+            schema_dict[table_name][column_name] = column_type
+    if db:
+        schema_dict = {db: schema_dict}
+    if catalog:
+        schema_dict = {catalog: schema_dict}
+    return schema_dict
+
+
+def ddl_schema_hash(ddls: str) -> str:
+    """Returns the content hash the parsed schema of `ddls` is cached under."""
+    return hashlib.sha256(ddls.encode()).hexdigest()
+
+
+def parse_ddl_schema(ddls: str) -> SQLGlotSchemaType:
+    """Parses DDL statements into the SQLGlot schema format, once per content.
+
+    Args:
+      ddls: A string containing multiple DDL statements, possibly with comments
+        and `INSERT INTO` example rows, which are ignored.
+
+    Returns:
+      The schema in the SQLGlot format. The dictionary is shared by all the
+      callers parsing the same DDL statements and must not be modified.
+    """
+    global _schema_cache_hits, _schema_cache_misses
+    key = ddl_schema_hash(ddls)
+    with _schema_cache_lock:
+        schema_dict = _schema_cache.get(key)
+        if schema_dict is not None:
+            _schema_cache.move_to_end(key)
+            _schema_cache_hits += 1
+            return schema_dict
+        _schema_cache_misses += 1
+    # Parse outside of the lock; concurrent misses on the same DDL statements
+    # parse them redundantly but produce the same schema.
+    schema_dict = format_schema(extract_schema_from_ddls(ddls))
+    with _schema_cache_lock:
+        _schema_cache[key] = schema_dict
+        _schema_cache.move_to_end(key)
+        while len(_schema_cache) > SCHEMA_CACHE_SIZE:
+            _schema_cache.popitem(last=False)
+    return schema_dict
+
+
+def schema_cache_stats() -> dict[str, int]:
+    """Returns the hits, misses and size of the parsed schema cache."""
+    with _schema_cache_lock:
+        return {
+            "hits": _schema_cache_hits,
+            "misses": _schema_cache_misses,
+            "size": len(_schema_cache),
+        }
+
+
+def clear_schema_cache() -> None:
+    """Empties the parsed schema cache and resets its counters."""
+    global _schema_cache_hits, _schema_cache_misses
+    with _schema_cache_lock:
+        _schema_cache.clear()
+        _schema_cache_hits = 0
+        _schema_cache_misses = 0
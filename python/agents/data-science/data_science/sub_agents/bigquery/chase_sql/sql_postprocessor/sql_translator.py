@@ -17,24 +17,26 @@
 import re
 from typing import Any, Final
 
-import regex
 import sqlglot
-import sqlglot.optimizer
 
 from ..llm_utils import GeminiModel  # pylint: disable=g-importing-member
+from . import candidate_selection
+from . import schema_parser
 from .correction_prompt_template import (
     CORRECTION_PROMPT_TEMPLATE_V1_0,
 )  # pylint: disable=g-importing-member
+# pylint: disable=g-importing-member,unused-import
+from .schema_parser import (
+    AllColumnsSchemaType,
+    ColumnSchemaType,
+    DDLSchemaType,
+    SQLGlotColumnsDictType,
+    SQLGlotSchemaType,
+    TableSchemaType,
+)
+# pylint: enable=g-importing-member,unused-import
 
 
-ColumnSchemaType = tuple[str, str]
-AllColumnsSchemaType = list[ColumnSchemaType]
-TableSchemaType = tuple[str, AllColumnsSchemaType]
-DDLSchemaType = list[TableSchemaType]
-
-SQLGlotColumnsDictType = dict[str, str]
-SQLGlotSchemaType = dict[str, Any]
-
 BirdSampleType = dict[str, Any]
 
 
@@ -156,65 +158,12 @@ class SqlTranslator:
     @classmethod
     def _extract_schema_from_ddl_statement(cls, ddl_statement: str) -> TableSchemaType:
         """Extracts the schema from a single DDL statement."""
-        # Split the DDL statement into table name and columns.
-        # Match the following pattern:
-        # CREATE [OR REPLACE] TABLE [`]<table_name>[`] (<all_columns>);
-        splitter_pattern = (
-            # CREATE [OR REPLACE] TABLE
-            r"^\s*CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+"
-            # Match the table name, optionally surrounded by backticks.
-            r"(?:`)?(?P<table_name>[\w\d\-\_\.]+)(?:`)?\s*"
-            # Match the column name as everything between the first and last
-            # parentheses followed by a semicolon.
-            r"\((?P<all_columns>.*)\);$"
-        )
-        split_match = regex.search(
-            splitter_pattern,
-            ddl_statement,
-            flags=re.DOTALL | re.VERBOSE | re.MULTILINE,
-        )
-        if not split_match:
-            return None, None
-
-        table_name = split_match.group("table_name")
-        all_columns = split_match.group("all_columns").strip()
-        if not table_name or not all_columns:
-            return None, None
-
-        # Extract the columns from the DDL statement.
-        # Match the following pattern:
-        # <column_name> <column_type> [<ignored_text>]
-        # [, <column_name> <column_type> [<ignored_text>]]*
-        # Ignore any comments. Ignore any INSERT INTO statements. Ignore any
-        # lines beginning with a parenthesis (these are example values).
-        column_pattern = (
-            # Ignore any comments.
-            r"\s*--.*(*SKIP)(*FAIL)"
-            # Ignore any INSERT INTO statements.
-            r"|\s*INSERT\s+INTO.*(*SKIP)(*FAIL)"
-            # Ignore any lines beginning with a parenthesis.
-            r"|\s*\(.*(*SKIP)(*FAIL)"
-            # Match the column name and type, optionally with backticks.
-            r"|\s*(?:`)?\s*(?P<column_name>\w+)(?:`)?\s+(?P<column_type>\w+).*"
-        )  # (?:,)?
-        columns = regex.findall(column_pattern, all_columns, flags=re.VERBOSE)
-        return table_name, columns
+        return schema_parser.extract_schema_from_ddl_statement(ddl_statement)
 
     @classmethod
     def extract_schema_from_ddls(cls, ddls: str) -> DDLSchemaType:
         """Extracts the schema from multiple DDL statements."""
-        ddl_statements = ddls.split(";\n")
-        ddl_statements = [ddl.strip() for ddl in ddl_statements if ddl.strip()]
-        schema = []
-        for ddl_statement in ddl_statements:
-            if ddl_statement:
-                ddl_statement = ddl_statement.strip() + ";"  # Add the semicolon back.
-                table_name, columns = cls._extract_schema_from_ddl_statement(
-                    ddl_statement
-                )
-                if table_name and columns:
-                    schema.append((table_name, columns))
-        return schema
+        return schema_parser.extract_schema_from_ddls(ddls)
 
     @classmethod
     def _get_schema_from_bird_sample(
@@ -250,42 +199,26 @@ class SqlTranslator:
     @classmethod
     def _get_table_parts(cls, table_name: str) -> tuple[str | None, str | None, str]:
         """Returns the table parts from the table name."""
-        table_parts = table_name.split(".")
-        if len(table_parts) == 3:
-            return table_parts
-        elif len(table_parts) == 2:
-            return None, *table_parts
-        elif len(table_parts) == 1:
-            return None, None, *table_parts
-        else:
-            raise ValueError(f"Invalid table name: {table_name}")
+        return schema_parser.get_table_parts(table_name)
 
     @classmethod
     def format_schema(cls, schema: DDLSchemaType) -> SQLGlotSchemaType:
         """Formats the DDL schema for use in SQLGlot."""
-        schema_dict = {}
-        catalog, db = None, None
-        for table_name, columns in schema:
-            catalog, db, table_name = cls._get_table_parts(table_name)
-            schema_dict[table_name] = {}
-            for column_name, column_type in columns:
-                schema_dict[table_name][column_name] = column_type
-        if db:
-            schema_dict = {db: schema_dict}
-        if catalog:
-            schema_dict = {catalog: schema_dict}
-        return schema_dict
+        return schema_parser.format_schema(schema)
 
     @classmethod
     def rewrite_schema_for_sqlglot(
         cls, schema: str | SQLGlotSchemaType | BirdSampleType
     ) -> SQLGlotSchemaType:
-        """Rewrites the schema for use in SQLGlot."""
+        """Rewrites the schema for use in SQLGlot.
+
+        DDL strings are parsed once per content and shared through the
+        `schema_parser` cache, so the returned schema must not be modified.
+        """
         schema_dict = None
         if schema:
             if isinstance(schema, str):
-                schema = cls.extract_schema_from_ddls(schema)
-                schema_dict = cls.format_schema(schema)
+                schema_dict = schema_parser.parse_ddl_schema(schema)
             elif _isinstance_sqlglot_schema_type(schema):
                 schema_dict = schema
             elif _isinstance_bird_sample_type(schema):
@@ -307,43 +240,15 @@ class SqlTranslator:
     ) -> tuple[str | None, str]:
         """Checks for errors in the SQL query.
 
-        Args:
-          sql_query: The SQL query to check for errors.
-          sql_dialect: The SQL dialect of the SQL query.
-          db: The database to use for the translation. This field is optional.
-          catalog: The catalog to use for the translation. `catalog` is the SQLGlot
-            term for the project ID. This field is optional.
-          schema_dict: The DDL schema to use for the translation. The DDL format is
-            in the SQLGlot format. This field is optional.
-
-        Returns:
-          tuple of the errors in the SQL query, or None if there are no errors, and
-          the SQL query after optimization.
+        See `candidate_selection.validate_sql`.
         """
-        try:
-            # First, try to parse the SQL query into a SQLGlot AST.
-            sql_query_ast = sqlglot.parse_one(
-                sql=sql_query,
-                read=sql_dialect.lower(),
-                error_level=sqlglot.ErrorLevel.IMMEDIATE,
-            )
-            # Then add the database and catalog information for each table to the AST.
-            for table in sql_query_ast.find_all(sqlglot.exp.Table):
-                table.set("catalog", sqlglot.exp.Identifier(this=catalog, quoted=True))
-                table.set("db", sqlglot.exp.Identifier(this=db, quoted=True))
-            # Then, try to optimize the SQL query.
-            sql_query_ast = sqlglot.optimizer.optimize(
-                sql_query_ast,
-                dialect=sql_dialect.lower(),
-                schema=schema_dict,
-                db=db,
-                catalog=catalog,
-                error_level=sqlglot.ErrorLevel.IMMEDIATE,
-            )
-            sql_query = sql_query_ast.sql(sql_dialect.lower())
-        except sqlglot.errors.SqlglotError as e:
-            return str(e), sql_query
-        return None, sql_query
+        return candidate_selection.validate_sql(
+            sql_query,
+            sql_dialect,
+            db=db,
+            catalog=catalog,
+            schema_dict=schema_dict,
+        )
 
     def _fix_errors(
         self,
@@ -352,7 +257,7 @@ class SqlTranslator:
         apply_heuristics: bool,
         db: str | None = None,
         catalog: str | None = None,
-        ddl_schema: str | SQLGlotSchemaType | BirdSampleType | None = None,
+        schema_dict: SQLGlotSchemaType | None = None,
         number_of_candidates: int = 1,
     ) -> str:
         """Fixes errors in the SQL query.
@@ -364,9 +269,8 @@ class SqlTranslator:
           db: The database to use for the translation. This field is optional.
           catalog: The catalog to use for the translation. `catalog` is the SQLGlot
             term for the project ID. This field is optional.
-          ddl_schema: The DDL schema to use for the translation. The DDL format can
-            be the SQLGlot format, the DDL schema format, a Bird dataset example, or
-            a string containing multiple DDL statements. This field is optional.
+          schema_dict: The schema to use for the translation, as returned by
+            `rewrite_schema_for_sqlglot`. This field is optional.
           number_of_candidates: The number of candidates to generate, default is 1.
 
         Returns:
@@ -374,9 +278,6 @@ class SqlTranslator:
         """
         if apply_heuristics:
             sql_query = self._apply_heuristics(sql_query)
-        # Reformat the schema if provided. This will remove any comments and
-        # `INSERT INTO` statements.
-        schema_dict = self.rewrite_schema_for_sqlglot(ddl_schema)
         errors_and_sql: tuple[str | None, str] = self._check_for_errors(
             sql_query=sql_query,
             sql_dialect=self.OUTPUT_DIALECT,
@@ -404,15 +305,17 @@ class SqlTranslator:
                 requests, parser_func=self._parse_response
             )
             if responses:
-                # We only use the first response. Therefore the `number_of_candidates`
-                # parameter is not used.
-                # pylint: disable=g-bad-todo
-                # pylint: enable=g-bad-todo
-                # First, find the first non-None response.
-                responses = [r for r in responses if r is not None]
-                if responses:
-                    # Then, return the first non-None response.
-                    responses = responses[0]
+                # Select the most common valid fix among the candidates, or the
+                # first one if none is valid, or keep the query if all failed.
+                selection = candidate_selection.select_candidate(
+                    responses,
+                    sql_dialect=sql_dialect,
+                    db=db,
+                    catalog=catalog,
+                    schema_dict=schema_dict,
+                    method=candidate_selection.SelectionMethod.MAJORITY,
+                )
+                responses = selection.sql or sql_query
         return responses
 
     def translate(
@@ -436,13 +339,16 @@ class SqlTranslator:
           The translated SQL query.
         """
         print("****** sql_query at translator entry:", sql_query)
+        # Reformat the schema once for both error fixing passes. This will remove
+        # any comments and `INSERT INTO` statements.
+        schema_dict = self.rewrite_schema_for_sqlglot(ddl_schema)
         if self._process_input_errors:
             sql_query = self._fix_errors(
                 sql_query,
                 db=db,
                 catalog=catalog,
                 sql_dialect=self.OUTPUT_DIALECT,
-                ddl_schema=ddl_schema,
+                schema_dict=schema_dict,
                 apply_heuristics=True,
             )
         print("****** sql_query after fix_errors:", sql_query)
@@ -461,7 +367,7 @@ class SqlTranslator:
                 db=db,
                 catalog=catalog,
                 sql_dialect=self.OUTPUT_DIALECT,
-                ddl_schema=ddl_schema,
+                schema_dict=schema_dict,
                 apply_heuristics=True,
             )
 
@@ -0,0 +1,249 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cache of the SQL generated for natural language questions.
+
+Entries are keyed by the normalised question, a hash of the DDL schema the SQL
+was generated against and the generation settings, so that a schema change or
+a different model invalidates them. Entries expire after a TTL and the least
+recently used ones are evicted beyond a maximum number of entries. Generated
+SQL is only cached once `run_bigquery_validation` accepted it, and cached SQL
+is still validated like freshly generated SQL: its entry is invalidated if it
+is rejected.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_TTL = 24 * 60 * 60
+
+
+def normalize_question(question):
+    """Normalises a question so that trivially different spellings match.
+
+    Unicode compatibility characters are folded, the question is lowercased,
+    whitespace is collapsed and trailing punctuation is dropped.
+    """
+    question = unicodedata.normalize("NFKC", question).lower()
+    question = re.sub(r"\s+", " ", question).strip()
+    return question.rstrip(" ?!.")
+
+
+def cache_key(question, ddl_schema_hash, settings):
+    """Returns the cache key of a question.
+
+    Args:
+        question (str): The natural language question.
+        ddl_schema_hash (str): A hash of the DDL schema the SQL is generated
+          against.
+        settings (dict): The generation settings, e.g. model and temperature.
+          Their values must be JSON serializable.
+
+    Returns:
+        str: The key of the cache entry.
+    """
+    key = json.dumps(
+        [normalize_question(question), ddl_schema_hash, settings], sort_keys=True
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class InMemoryBackend:
+    """LRU dictionary of (sql, created) entries, local to the process."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.num_evicted = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, sql, created):
+        with self._lock:
+            self._entries[key] = (sql, created)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.num_evicted += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """SQLite file of (sql, created) entries, shared by processes and restarts.
+
+    The least recently read or written entries are evicted first.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.num_evicted = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=10
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS nl2sql_cache ("
+            " key TEXT PRIMARY KEY,"
+            " sql TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS nl2sql_cache_accessed"
+            " ON nl2sql_cache (accessed)"
+        )
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT sql, created FROM nl2sql_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._connection.execute(
+                    "UPDATE nl2sql_cache SET accessed = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+            return row
+
+    def set(self, key, sql, created):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO nl2sql_cache VALUES (?, ?, ?, ?)",
+                (key, sql, created, time.time()),
+            )
+            cursor = self._connection.execute(
+                "DELETE FROM nl2sql_cache WHERE key IN ("
+                " SELECT key FROM nl2sql_cache ORDER BY accessed DESC"
+                " LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.num_evicted += max(cursor.rowcount, 0)
+
+    def delete(self, key):
+        with self._lock:
+            self._connection.execute("DELETE FROM nl2sql_cache WHERE key = ?", (key,))
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM nl2sql_cache"
+            ).fetchone()[0]
+
+
+class NL2SQLCache:
+    """SQL generated per question, schema and settings, with a TTL."""
+
+    def __init__(self, backend=None, ttl=DEFAULT_TTL):
+        """Initializes the cache.
+
+        Args:
+            backend: Where the entries are stored, an `InMemoryBackend` or a
+              `SQLiteBackend`. A new `InMemoryBackend` if None.
+            ttl (float): Seconds after which an entry expires. Entries never
+              expire if None.
+        """
+        self.backend = backend if backend is not None else InMemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the SQL cached under `key`, or None."""
+        entry = self.backend.get(key)
+        expired = (
+            entry is not None
+            and self.ttl is not None
+            and time.time() - entry[1] > self.ttl
+        )
+        if expired:
+            self.backend.delete(key)
+        with self._lock:
+            if entry is None or expired:
+                self.misses += 1
+                self.expired += expired
+                return None
+            self.hits += 1
+        return entry[0]
+
+    def put(self, key, sql):
+        """Caches the SQL generated for `key`."""
+        self.backend.set(key, sql, time.time())
+
+    def invalidate(self, key):
+        """Drops the entry of `key`, e.g. after its SQL failed validation."""
+        self.backend.delete(key)
+
+    def stats(self):
+        """Returns the hits, misses, expirations and evictions of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evicted": self.backend.num_evicted,
+                "entries": len(self.backend),
+            }
+
+
+def make_nl2sql_cache(
+    backend, path=None, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL
+):
+    """Creates a cache from its configuration.
+
+    Args:
+        backend (str): "memory", "sqlite", or "none" to disable caching.
+        path (str): The SQLite file of the "sqlite" backend.
+        max_entries (int): The maximum number of entries.
+        ttl (float): Seconds after which an entry expires.
+
+    Returns:
+        NL2SQLCache: The cache, or None if caching is disabled.
+    """
+    backend = backend.lower()
+    if backend in ("", "none"):
+        return None
+    if backend == "memory":
+        return NL2SQLCache(InMemoryBackend(max_entries), ttl=ttl)
+    if backend == "sqlite":
+        if not path:
+            raise ValueError("The sqlite NL2SQL cache backend requires a path")
+        return NL2SQLCache(SQLiteBackend(path, max_entries), ttl=ttl)
+    raise ValueError(f"Unknown NL2SQL cache backend: {backend}")
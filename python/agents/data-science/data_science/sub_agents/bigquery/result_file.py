@@ -0,0 +1,117 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Columnar files of query results, handed from the database agent to the
+analytics agent.
+
+The result of a query is written once as a Parquet artifact of the session,
+next to a compact text summary of its schema and column statistics. The
+analytics agent gets the summary in its prompt and loads the file in its code
+execution environment, instead of parsing the rows from the prompt.
+"""
+
+import io
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+QUERY_RESULT_FILE_NAME = "query_result.parquet"
+PARQUET_MIME_TYPE = "application/vnd.apache.parquet"
+
+# Number of most frequent values listed for string and boolean columns.
+MAX_TOP_VALUES = 5
+# Values longer than this are truncated in the summary.
+MAX_VALUE_LENGTH = 40
+
+
+def to_parquet_bytes(table):
+    """Serializes an Arrow table to compressed Parquet bytes."""
+    sink = io.BytesIO()
+    pq.write_table(table, sink, compression="zstd")
+    return sink.getvalue()
+
+
+def from_parquet_bytes(data):
+    """Deserializes Parquet bytes to an Arrow table."""
+    return pq.read_table(io.BytesIO(data))
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    value = str(value)
+    if len(value) > MAX_VALUE_LENGTH:
+        value = value[: MAX_VALUE_LENGTH - 3] + "..."
+    return value
+
+
+def _column_statistics(column):
+    """Returns the statistics of a column, as "name=value" strings."""
+    data_type = column.type
+    statistics = [f"nulls={column.null_count}"]
+    if column.null_count == len(column):
+        return statistics
+    if pa.types.is_integer(data_type) or pa.types.is_floating(data_type):
+        min_max = pc.min_max(column)
+        statistics += [
+            f"min={_format_value(min_max['min'].as_py())}",
+            f"max={_format_value(min_max['max'].as_py())}",
+            f"mean={_format_value(pc.mean(column).as_py())}",
+            f"stddev={_format_value(pc.stddev(column).as_py())}",
+        ]
+    elif pa.types.is_decimal(data_type):
+        min_max = pc.min_max(column)
+        statistics += [
+            f"min={min_max['min'].as_py()}",
+            f"max={min_max['max'].as_py()}",
+        ]
+    elif pa.types.is_temporal(data_type):
+        min_max = pc.min_max(column)
+        statistics += [
+            f"min={min_max['min'].as_py()}",
+            f"max={min_max['max'].as_py()}",
+        ]
+    elif (
+        pa.types.is_string(data_type)
+        or pa.types.is_large_string(data_type)
+        or pa.types.is_boolean(data_type)
+    ):
+        counts = pc.value_counts(column.drop_null()).to_pylist()
+        counts.sort(key=lambda count: count["counts"], reverse=True)
+        top_values = ", ".join(
+            f"{_format_value(count['values'])} ({count['counts']})"
+            for count in counts[:MAX_TOP_VALUES]
+        )
+        statistics += [f"distinct={len(counts)}", f"top=[{top_values}]"]
+    return statistics
+
+
+def summarize_table(table):
+    """Summarizes the schema and column statistics of an Arrow table.
+
+    Args:
+        table (pyarrow.Table): The query result.
+
+    Returns:
+        str: One line with the shape of the table, then one line per column
+          with its name, type, number of nulls, and min/max/mean/stddev for
+          numbers, min/max for dates and times, or the number of distinct
+          values and the most frequent ones for strings and booleans.
+    """
+    lines = [f"{table.num_rows} rows, {table.num_columns} columns:"]
+    for field, column in zip(table.schema, table.columns):
+        statistics = ", ".join(_column_statistics(column))
+        lines.append(f"- {field.name} ({field.type}): {statistics}")
+    return "\n".join(lines)
@@ -0,0 +1,174 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Persisted, incrementally refreshed cache of BigQuery dataset DDL.
+
+The DDL of each table (columns plus a few example rows) is stored with the
+table's `modified` timestamp. Refreshing a dataset only fetches the metadata
+of its tables, concurrently, and re-reads the example rows of the tables that
+changed since they were cached.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import json
+import os
+import threading
+
+CACHE_VERSION = 1
+DEFAULT_MAX_WORKERS = 16
+NUM_EXAMPLE_ROWS = 5
+
+
+def table_ddl(table_ref, schema, rows):
+    """Generates the DDL statement of a table, with its example rows.
+
+    Args:
+        table_ref (str): Fully qualified table ID, `project.dataset.table`.
+        schema (list[bigquery.SchemaField]): The table schema.
+        rows (Iterable[bigquery.Row]): Example rows.
+
+    Returns:
+        str: The `CREATE OR REPLACE TABLE` statement followed by one `INSERT`
+          statement per example row.
+    """
+    ddl_statement = f"CREATE OR REPLACE TABLE `{table_ref}` (\n"
+
+    for field in schema:
+        ddl_statement += f"  `{field.name}` {field.field_type}"
+        if field.mode == "REPEATED":
+            ddl_statement += " ARRAY"
+        if field.description:
+            ddl_statement += f" COMMENT '{field.description}'"
+        ddl_statement += ",\n"
+
+    ddl_statement = ddl_statement[:-2] + "\n);\n\n"
+
+    example_rows = ""
+    for row in rows:
+        example_rows += f"INSERT INTO `{table_ref}` VALUES\n"
+        example_row_str = "("
+        for value in row.values():
+            if isinstance(value, (str, datetime.date, datetime.time)):
+                # Dates and times are quoted, as BigQuery (and DuckDB, which
+                # runs the example rows) coerces the literals to the column type.
+                example_row_str += f"'{value}',"
+            elif value is None:
+                example_row_str += "NULL,"
+            else:
+                example_row_str += f"{value},"
+        example_rows += example_row_str[:-1] + ");\n\n"  # remove trailing comma
+    if example_rows:
+        ddl_statement += f"-- Example values for table `{table_ref}`:\n"
+        ddl_statement += example_rows
+
+    return ddl_statement
+
+
+class SchemaCache:
+    """DDL of BigQuery tables keyed by dataset, table and `modified` timestamp."""
+
+    def __init__(self, path=None, max_workers=DEFAULT_MAX_WORKERS):
+        """Initializes the cache.
+
+        Args:
+            path (str): JSON file the cache is loaded from and saved to. The
+              cache is only kept in memory if None.
+            max_workers (int): Number of tables fetched concurrently.
+        """
+        self.path = path
+        self.max_workers = max_workers
+        self.datasets = self._load()
+        self.num_fetched = 0
+        self.num_reused = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring schema cache at {self.path}: {e}")
+            return {}
+        if cache.get("version") != CACHE_VERSION:
+            return {}
+        return cache["datasets"]
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": CACHE_VERSION, "datasets": self.datasets}, f)
+        os.replace(tmp_path, self.path)
+
+    def get_ddl(self, client, project_id, dataset_id):
+        """Returns the DDL of all the tables of a dataset, refreshing the tables
+        modified since they were cached.
+
+        Args:
+            client (bigquery.Client): A BigQuery client.
+            project_id (str): The ID of your Google Cloud Project.
+            dataset_id (str): The ID of the BigQuery dataset.
+
+        Returns:
+            str: The DDL statements of the dataset tables, in listing order.
+        """
+        dataset = f"{project_id}.{dataset_id}"
+        cached = self.datasets.get(dataset, {})
+        table_ids = [
+            table.table_id
+            for table in client.list_tables(dataset)
+            if table.table_type == "TABLE"
+        ]
+
+        def fetch(table_id):
+            table_ref = f"{dataset}.{table_id}"
+            table_obj = client.get_table(table_ref)
+            if table_obj.table_type != "TABLE":
+                return None
+            modified = (
+                table_obj.modified.isoformat() if table_obj.modified else None
+            )
+            entry = cached.get(table_id)
+            if entry is not None and modified and entry["modified"] == modified:
+                with self._lock:
+                    self.num_reused += 1
+                return entry
+            # A single page of the tabledata.list API, without a DataFrame.
+            rows = client.list_rows(
+                table_obj, max_results=NUM_EXAMPLE_ROWS, page_size=NUM_EXAMPLE_ROWS
+            )
+            with self._lock:
+                self.num_fetched += 1
+            return {
+                "modified": modified,
+                "ddl": table_ddl(table_ref, table_obj.schema, rows),
+            }
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            entries = list(executor.map(fetch, table_ids))
+
+        tables = {
+            table_id: entry
+            for table_id, entry in zip(table_ids, entries)
+            if entry is not None
+        }
+        if tables != cached:
+            self.datasets[dataset] = tables
+            self._save()
+        return "".join(entry["ddl"] for entry in tables.values())
@@ -14,17 +14,29 @@
 
 """This file contains the tools used by the database agent."""
 
-import datetime
+import asyncio
 import logging
 import os
 import re
 
+import pyarrow as pa
+import pyarrow.compute as pc
+import sqlglot
 from data_science.utils.utils import get_env_var
 from google.adk.tools import ToolContext
 from google.cloud import bigquery
-from google.genai import Client
+from google.genai import Client, types
 
+from . import result_file
 from .chase_sql import chase_constants
+from .chase_sql.sql_postprocessor import schema_parser
+from .nl2sql_cache import (
+    DEFAULT_MAX_ENTRIES,
+    DEFAULT_TTL,
+    cache_key,
+    make_nl2sql_cache,
+)
+from .schema_cache import SchemaCache
 
 # Assume that `BQ_PROJECT_ID` is set in the environment. See the
 # `data_agent` README for more details.
@@ -34,9 +46,56 @@ llm_client = Client(vertexai=True, project=project, location=location)
 
 MAX_NUM_ROWS = 80
 
+# Maximum number of rows of a query result saved for the analytics agent, as a
+# Parquet artifact; 0 disables the file. The rows are only fetched when the
+# result is handed to the analytics agent.
+MAX_RESULT_FILE_ROWS = int(os.getenv("BQ_MAX_RESULT_FILE_ROWS", 100_000))
+
+# Queries processing more bytes than this, according to their dry run, are
+# rejected; 0 disables the budget.
+MAX_BYTES_PROCESSED = int(os.getenv("BQ_MAX_BYTES_PROCESSED", 10 * 1024**3))
+
+DML_DDL_PATTERN = (
+    r"(?i)\b(update|delete|drop|insert|create|alter|truncate|merge)\b"
+)
+DML_DDL_EXPRESSIONS = (
+    sqlglot.exp.Alter,
+    sqlglot.exp.Create,
+    sqlglot.exp.Delete,
+    sqlglot.exp.Drop,
+    sqlglot.exp.Insert,
+    sqlglot.exp.Merge,
+    sqlglot.exp.TruncateTable,
+    sqlglot.exp.Update,
+)
+
+# Where the DDL of the dataset tables is cached across processes; set to an
+# empty string to only cache it in memory.
+SCHEMA_CACHE_PATH = os.getenv(
+    "BQ_SCHEMA_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "data_science", "bq_schema.json"),
+)
+
+# Cache of the SQL generated per question: "memory", "sqlite" (stored at
+# NL2SQL_CACHE_PATH) or "none".
+NL2SQL_CACHE_BACKEND = os.getenv("NL2SQL_CACHE_BACKEND", "memory")
+NL2SQL_CACHE_PATH = os.path.expanduser(
+    os.getenv(
+        "NL2SQL_CACHE_PATH",
+        os.path.join("~", ".cache", "data_science", "nl2sql.sqlite"),
+    )
+)
+NL2SQL_CACHE_TTL = float(os.getenv("NL2SQL_CACHE_TTL", DEFAULT_TTL))
+NL2SQL_CACHE_MAX_ENTRIES = int(
+    os.getenv("NL2SQL_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+)
+
 
 database_settings = None
 bq_client = None
+schema_cache = None
+nl2sql_cache = None
+nl2sql_cache_created = False
 
 
 def get_bq_client():
@@ -67,74 +126,137 @@ def update_database_settings():
         "bq_project_id": get_env_var("BQ_PROJECT_ID"),
         "bq_dataset_id": get_env_var("BQ_DATASET_ID"),
         "bq_ddl_schema": ddl_schema,
+        "bq_ddl_schema_hash": schema_parser.ddl_schema_hash(ddl_schema),
         # Include ChaseSQL-specific constants.
         **chase_constants.chase_sql_constants_dict,
     }
+    if (
+        os.getenv("NL2SQL_METHOD") == "CHASE"
+        and database_settings["transpile_to_bigquery"]
+    ):
+        # Parse the schema for the SQL translator before the first question.
+        schema_parser.parse_ddl_schema(ddl_schema)
     return database_settings
 
 
-def get_bigquery_schema(dataset_id, client=None, project_id=None):
-    """Retrieves schema and generates DDL with example values for a BigQuery dataset.
+def get_schema_cache():
+    """Get the schema cache shared by this process."""
+    global schema_cache
+    if schema_cache is None:
+        schema_cache = SchemaCache(SCHEMA_CACHE_PATH or None)
+    return schema_cache
+
+
+def get_nl2sql_cache():
+    """Get the NL2SQL cache shared by this process, None if disabled."""
+    global nl2sql_cache, nl2sql_cache_created
+    if not nl2sql_cache_created:
+        nl2sql_cache = make_nl2sql_cache(
+            NL2SQL_CACHE_BACKEND,
+            path=NL2SQL_CACHE_PATH,
+            max_entries=NL2SQL_CACHE_MAX_ENTRIES,
+            ttl=NL2SQL_CACHE_TTL,
+        )
+        nl2sql_cache_created = True
+    return nl2sql_cache
+
+
+def get_cached_sql(question, tool_context, settings):
+    """Looks up the SQL generated for a question with the same schema and
+    settings.
+
+    The cache key is kept in the session state with the SQL, so that the SQL is
+    only cached once it passes validation and the entry is invalidated if its
+    SQL fails validation.
 
     Args:
-        dataset_id (str): The ID of the BigQuery dataset (e.g., 'my_dataset').
-        client (bigquery.Client): A BigQuery client.
-        project_id (str): The ID of your Google Cloud Project.
+        question (str): Natural language question.
+        tool_context (ToolContext): The tool context holding the database
+          settings.
+        settings (dict): The generation settings the SQL depends on.
 
     Returns:
-        str: A string containing the generated DDL statements.
+        str: The cached SQL, or None.
     """
+    cache = get_nl2sql_cache()
+    if cache is None:
+        return None
+    db_settings = tool_context.state["database_settings"]
+    ddl_schema_hash = db_settings.get("bq_ddl_schema_hash") or (
+        schema_parser.ddl_schema_hash(db_settings["bq_ddl_schema"])
+    )
+    key = cache_key(question, ddl_schema_hash, settings)
+    sql = cache.get(key)
+    tool_context.state["nl2sql_cache_entry"] = {
+        "key": key,
+        "sql": sql,
+        "cached": sql is not None,
+    }
+    if sql is not None:
+        print("\n NL2SQL cache hit:", cache.stats())
+    return sql
 
-    if client is None:
-        client = bigquery.Client(project=project_id)
 
-    # dataset_ref = client.dataset(dataset_id)
-    dataset_ref = bigquery.DatasetReference(project_id, dataset_id)
+def record_generated_sql(tool_context, sql):
+    """Records the SQL generated for the question last looked up.
 
-    ddl_statements = ""
+    It is only cached once `run_bigquery_validation` accepts this exact SQL.
+    """
+    entry = tool_context.state.get("nl2sql_cache_entry")
+    if entry and sql:
+        tool_context.state["nl2sql_cache_entry"] = dict(
+            entry, sql=sql, cached=False
+        )
 
-    for table in client.list_tables(dataset_ref):
-        table_ref = dataset_ref.table(table.table_id)
-        table_obj = client.get_table(table_ref)
 
-        # Check if table is a view
-        if table_obj.table_type != "TABLE":
-            continue
+def settle_cached_sql(tool_context, sql_string, valid):
+    """Caches or invalidates the SQL of the question last looked up, after
+    validating `sql_string`.
 
-        ddl_statement = f"CREATE OR REPLACE TABLE `{table_ref}` (\n"
+    Nothing happens unless `sql_string` is the SQL generated for, or served
+    from the cache for, that question: the agent may validate other queries.
 
-        for field in table_obj.schema:
-            ddl_statement += f"  `{field.name}` {field.field_type}"
-            if field.mode == "REPEATED":
-                ddl_statement += " ARRAY"
-            if field.description:
-                ddl_statement += f" COMMENT '{field.description}'"
-            ddl_statement += ",\n"
+    Args:
+        tool_context (ToolContext): The tool context.
+        sql_string (str): The validated SQL, after `cleanup_sql`.
+        valid (bool): Whether the SQL passed validation.
+    """
+    cache = get_nl2sql_cache()
+    entry = tool_context.state.get("nl2sql_cache_entry")
+    if cache is None or not entry or not entry.get("sql"):
+        return
+    if cleanup_sql(entry["sql"]).strip() != sql_string.strip():
+        return
+    if not valid:
+        # Do not serve this SQL for the question again.
+        cache.invalidate(entry["key"])
+        tool_context.state["nl2sql_cache_entry"] = None
+    elif not entry["cached"]:
+        cache.put(entry["key"], entry["sql"])
+        tool_context.state["nl2sql_cache_entry"] = dict(entry, cached=True)
+
+
+def get_bigquery_schema(dataset_id, client=None, project_id=None, cache=None):
+    """Retrieves schema and generates DDL with example values for a BigQuery dataset.
 
-        ddl_statement = ddl_statement[:-2] + "\n);\n\n"
+    Only the tables modified since they were last cached are re-fetched.
 
-        # Add example values if available (limited to first row)
-        rows = client.list_rows(table_ref, max_results=5).to_dataframe()
-        if not rows.empty:
-            ddl_statement += f"-- Example values for table `{table_ref}`:\n"
-            for _, row in rows.iterrows():  # Iterate over DataFrame rows
-                ddl_statement += f"INSERT INTO `{table_ref}` VALUES\n"
-                example_row_str = "("
-                for value in row.values:  # Now row is a pandas Series and has values
-                    if isinstance(value, str):
-                        example_row_str += f"'{value}',"
-                    elif value is None:
-                        example_row_str += "NULL,"
-                    else:
-                        example_row_str += f"{value},"
-                example_row_str = (
-                    example_row_str[:-1] + ");\n\n"
-                )  # remove trailing comma
-                ddl_statement += example_row_str
+    Args:
+        dataset_id (str): The ID of the BigQuery dataset (e.g., 'my_dataset').
+        client (bigquery.Client): A BigQuery client.
+        project_id (str): The ID of your Google Cloud Project.
+        cache (SchemaCache): Schema cache to use, the process-wide one if None.
 
-        ddl_statements += ddl_statement
+    Returns:
+        str: A string containing the generated DDL statements.
+    """
 
-    return ddl_statements
+    if client is None:
+        client = bigquery.Client(project=project_id)
+    if cache is None:
+        cache = get_schema_cache()
+
+    return cache.get_ddl(client, project_id, dataset_id)
 
 
 def initial_bq_nl2sql(
@@ -183,6 +305,13 @@ The database structure is defined by the following table schemas (possibly with
 
    """
 
+    nl2sql_model = os.getenv("BASELINE_NL2SQL_MODEL")
+    cache_settings = {"method": "BASELINE", "model": nl2sql_model, "temperature": 0.1}
+    sql = get_cached_sql(question, tool_context, cache_settings)
+    if sql is not None:
+        tool_context.state["sql_query"] = sql
+        return sql
+
     ddl_schema = tool_context.state["database_settings"]["bq_ddl_schema"]
 
     prompt = prompt_template.format(
@@ -190,7 +319,7 @@ The database structure is defined by the following table schemas (possibly with
     )
 
     response = llm_client.models.generate_content(
-        model=os.getenv("BASELINE_NL2SQL_MODEL"),
+        model=nl2sql_model,
         contents=prompt,
         config={"temperature": 0.1},
     )
@@ -202,11 +331,183 @@ The database structure is defined by the following table schemas (possibly with
     print("\n sql:", sql)
 
     tool_context.state["sql_query"] = sql
+    record_generated_sql(tool_context, sql)
 
     return sql
 
 
-def run_bigquery_validation(
+def enforce_read_only_limit(sql_string, max_rows=MAX_NUM_ROWS):
+    """Checks that the SQL is a single query and bounds its number of rows.
+
+    A `LIMIT max_rows` clause is added to the outermost query if it has none,
+    and a larger literal limit is lowered to `max_rows`. Column names such as
+    `speed_limit` or `created_at` do not interfere, as the SQL is parsed.
+
+    Args:
+        sql_string (str): The SQL to check.
+        max_rows (int): The maximum number of rows the query may return.
+
+    Returns:
+        tuple[str, str]: The SQL to run, and an error message if it must not be
+          run, or None.
+    """
+    try:
+        statements = sqlglot.parse(sql_string, read="bigquery")
+    except sqlglot.errors.SqlglotError:
+        # Let BigQuery report the syntax errors, or accept the syntax SQLGlot
+        # does not support, with the text-based checks.
+        if re.search(DML_DDL_PATTERN, sql_string):
+            return sql_string, "Invalid SQL: Contains disallowed DML/DDL operations."
+        if not re.search(r"(?i)\blimit\b", sql_string):
+            sql_string = sql_string.rstrip().rstrip(";") + f" LIMIT {max_rows}"
+        return sql_string, None
+
+    statements = [statement for statement in statements if statement is not None]
+    if len(statements) != 1:
+        return sql_string, "Invalid SQL: Expected exactly one SQL statement."
+    query = statements[0]
+    if not isinstance(query, sqlglot.exp.Query) or any(
+        query.find_all(*DML_DDL_EXPRESSIONS)
+    ):
+        return sql_string, "Invalid SQL: Contains disallowed DML/DDL operations."
+
+    limit = query.args.get("limit")
+    if limit is None:
+        return query.limit(max_rows).sql("bigquery"), None
+    limit_value = limit.expression
+    if (
+        isinstance(limit_value, sqlglot.exp.Literal)
+        and not limit_value.is_string
+        and int(limit_value.this) > max_rows
+    ):
+        limit.set("expression", sqlglot.exp.Literal.number(max_rows))
+        return query.sql("bigquery"), None
+    return sql_string, None
+
+
+def arrow_to_rows(table):
+    """Converts an Arrow table to a list of dicts, with dates and timestamps
+    formatted as YYYY-MM-DD strings column by column."""
+    columns = []
+    for field, column in zip(table.schema, table.columns):
+        if pa.types.is_date(field.type) or pa.types.is_timestamp(field.type):
+            column = pc.strftime(column, format="%Y-%m-%d")
+        columns.append(column)
+    return pa.table(columns, names=table.column_names).to_pylist()
+
+
+async def save_result_file(table, tool_context):
+    """Saves a query result as a Parquet artifact for the analytics agent.
+
+    Args:
+        table (pyarrow.Table): The query result.
+        tool_context (ToolContext): The tool context.
+
+    Returns:
+        dict: The artifact "filename" and "version", and the "num_rows" and
+          "summary" of the result, or None if the artifact could not be saved.
+    """
+    try:
+        version = await tool_context.save_artifact(
+            result_file.QUERY_RESULT_FILE_NAME,
+            types.Part.from_bytes(
+                data=result_file.to_parquet_bytes(table),
+                mime_type=result_file.PARQUET_MIME_TYPE,
+            ),
+        )
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # E.g. no artifact service: the rows are passed in the prompt instead.
+        print(f"Could not save the query result file: {e}")
+        return None
+    return {
+        "filename": result_file.QUERY_RESULT_FILE_NAME,
+        "version": version,
+        "num_rows": table.num_rows,
+        "summary": result_file.summarize_table(table),
+    }
+
+
+def run_query(client, sql_string, max_rows):
+    """Runs a query within the byte budget and fetches up to `max_rows` rows.
+
+    This blocks on BigQuery: call it with `asyncio.to_thread` from async code.
+
+    Returns:
+        tuple[pyarrow.Table, int]: The fetched rows, or None if the query
+          returns no data, and the number of rows of the whole result.
+    """
+    query_job = client.query(
+        sql_string,
+        job_config=bigquery.QueryJobConfig(
+            maximum_bytes_billed=MAX_BYTES_PROCESSED or None
+        ),
+    )
+    results = query_job.result(max_results=max_rows)
+    if not results.schema:
+        return None, 0
+    table = results.to_arrow(create_bqstorage_client=False)
+    return table, results.total_rows or table.num_rows
+
+
+async def save_query_result_file(tool_context):
+    """Saves the result of the last validated query for the analytics agent.
+
+    The query is run again as the model wrote it, and up to
+    `MAX_RESULT_FILE_ROWS` of its rows are saved. The file description gives
+    the number of rows of the whole result in `total_rows`, so that a truncated
+    file is not taken for the complete data. The file is reused until another
+    query is validated.
+
+    Args:
+        tool_context (ToolContext): The tool context.
+
+    Returns:
+        dict: The file description of `save_result_file`, or None if there is
+          no query result or the file is disabled or cannot be saved.
+    """
+    sql_string = tool_context.state.get("query_result_sql")
+    if not sql_string or not MAX_RESULT_FILE_ROWS:
+        return None
+    saved = tool_context.state.get("query_result_file")
+    if saved and saved.get("sql") == sql_string:
+        return saved
+    _, error_message = enforce_read_only_limit(sql_string)
+    if error_message:
+        return None
+    try:
+        table, total_rows = await asyncio.to_thread(
+            run_query, get_bq_client(), sql_string, MAX_RESULT_FILE_ROWS
+        )
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(f"Could not fetch the query result file: {e}")
+        return None
+    saved = await save_result_file(table, tool_context) if table else None
+    if saved:
+        saved["sql"] = sql_string
+        saved["total_rows"] = total_rows
+    tool_context.state["query_result_file"] = saved
+    return saved
+
+
+def cleanup_sql(sql_string):
+    """Processes the SQL string to get a printable, valid SQL string."""
+
+    # 1. Remove backslashes escaping double quotes
+    sql_string = sql_string.replace('\\"', '"')
+
+    # 2. Remove backslashes before newlines (the key fix for this issue)
+    sql_string = sql_string.replace("\\\n", "\n")  # Corrected regex
+
+    # 3. Replace escaped single quotes
+    sql_string = sql_string.replace("\\'", "'")
+
+    # 4. Replace escaped newlines (those not preceded by a backslash)
+    sql_string = sql_string.replace("\\n", "\n")
+
+    return sql_string
+
+
+async def run_bigquery_validation(
     sql_string: str,
     tool_context: ToolContext,
 ) -> str:
@@ -219,12 +520,20 @@ def run_bigquery_validation(
     function
     2. **DML/DDL Restriction:**  Rejects any SQL queries containing DML or DDL
        statements (e.g., UPDATE, DELETE, INSERT, CREATE, ALTER) to ensure
-       read-only operations.
-    3. **Syntax and Execution:** Sends the cleaned SQL to BigQuery for validation.
-       If the query is syntactically correct and executable, it retrieves the
-       results.
-    4. **Result Analysis:**  Checks if the query produced any results. If so, it
-       formats the first few rows of the result set for inspection.
+       read-only operations, and bounds the number of returned rows with a
+       `LIMIT` clause.
+    3. **Dry Run:** Sends the cleaned SQL to BigQuery in dry-run mode, and
+       rejects the query if it would process more than `MAX_BYTES_PROCESSED`
+       bytes.
+    4. **Syntax and Execution:** Sends the cleaned SQL to BigQuery for validation.
+       If the query is syntactically correct and executable, it retrieves up
+       to `MAX_NUM_ROWS` rows of results.
+    5. **Result Analysis:**  Checks if the query produced any results. If so, it
+       formats the rows of the result set for inspection, and keeps the query
+       so that `save_query_result_file` fetches more of its rows if the result
+       goes to the analytics agent.
+
+    The BigQuery calls run in a worker thread, not in the event loop.
 
     Args:
         sql_string (str): The SQL query string to validate.
@@ -239,64 +548,54 @@ def run_bigquery_validation(
                 message from BigQuery.
     """
 
-    def cleanup_sql(sql_string):
-        """Processes the SQL string to get a printable, valid SQL string."""
-
-        # 1. Remove backslashes escaping double quotes
-        sql_string = sql_string.replace('\\"', '"')
-
-        # 2. Remove backslashes before newlines (the key fix for this issue)
-        sql_string = sql_string.replace("\\\n", "\n")  # Corrected regex
-
-        # 3. Replace escaped single quotes
-        sql_string = sql_string.replace("\\'", "'")
-
-        # 4. Replace escaped newlines (those not preceded by a backslash)
-        sql_string = sql_string.replace("\\n", "\n")
-
-        # 5. Add limit clause if not present
-        if "limit" not in sql_string.lower():
-            sql_string = sql_string + " limit " + str(MAX_NUM_ROWS)
-
-        return sql_string
-
     logging.info("Validating SQL: %s", sql_string)
     sql_string = cleanup_sql(sql_string)
-    logging.info("Validating SQL (after cleanup): %s", sql_string)
+    validated_sql = sql_string
 
     final_result = {"query_result": None, "error_message": None}
 
-    # More restrictive check for BigQuery - disallow DML and DDL
-    if re.search(
-        r"(?i)(update|delete|drop|insert|create|alter|truncate|merge)", sql_string
-    ):
-        final_result["error_message"] = (
-            "Invalid SQL: Contains disallowed DML/DDL operations."
-        )
+    # More restrictive check for BigQuery - disallow DML and DDL, and add or
+    # lower the limit clause.
+    sql_string, error_message = enforce_read_only_limit(sql_string, MAX_NUM_ROWS)
+    logging.info("Validating SQL (after cleanup): %s", sql_string)
+    if error_message:
+        final_result["error_message"] = error_message
+        settle_cached_sql(tool_context, validated_sql, valid=False)
         return final_result
 
     try:
-        query_job = get_bq_client().query(sql_string)
-        results = query_job.result()  # Get the query results
-
-        if results.schema:  # Check if query returned data
-            rows = [
-                {
-                    key: (
-                        value
-                        if not isinstance(value, datetime.date)
-                        else value.strftime("%Y-%m-%d")
-                    )
-                    for (key, value) in row.items()
-                }
-                for row in results
-            ][
-                :MAX_NUM_ROWS
-            ]  # Convert BigQuery RowIterator to list of dicts
+        client = get_bq_client()
+        # Dry run first: it validates the query and estimates its cost for free.
+        dry_run_job = await asyncio.to_thread(
+            client.query,
+            sql_string,
+            job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=False),
+        )
+        bytes_processed = dry_run_job.total_bytes_processed or 0
+        final_result["total_bytes_processed"] = bytes_processed
+        if MAX_BYTES_PROCESSED and bytes_processed > MAX_BYTES_PROCESSED:
+            final_result["error_message"] = (
+                f"Invalid SQL: The query would process {bytes_processed:,} bytes,"
+                f" over the budget of {MAX_BYTES_PROCESSED:,} bytes. Filter on"
+                " fewer rows or select fewer columns."
+            )
+            print("\n run_bigquery_validation final_result: \n", final_result)
+            settle_cached_sql(tool_context, validated_sql, valid=False)
+            return final_result
+
+        table, _ = await asyncio.to_thread(
+            run_query, client, sql_string, MAX_NUM_ROWS
+        )
+
+        if table is not None:  # Check if query returned data
+            rows = arrow_to_rows(table)  # Convert BigQuery rows to list of dicts
             # return f"Valid SQL. Results: {rows}"
             final_result["query_result"] = rows
+            final_result["num_rows"] = table.num_rows
 
             tool_context.state["query_result"] = rows
+            tool_context.state["query_result_sql"] = validated_sql
+            tool_context.state["query_result_file"] = None
 
         else:
             final_result["error_message"] = (
@@ -309,5 +608,10 @@ def run_bigquery_validation(
         final_result["error_message"] = f"Invalid SQL: {e}"
 
     print("\n run_bigquery_validation final_result: \n", final_result)
+    settle_cached_sql(
+        tool_context,
+        validated_sql,
+        valid=not (final_result["error_message"] or "").startswith("Invalid SQL"),
+    )
 
     return final_result
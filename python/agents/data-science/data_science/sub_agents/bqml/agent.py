@@ -21,7 +21,9 @@ from google.adk.agents.callback_context import CallbackContext
 
 
 from data_science.sub_agents.bqml.tools import (
+    cancel_bqml_job,
     check_bq_models,
+    check_bqml_job_status,
     execute_bqml_code,
     rag_response,
 )
@@ -89,5 +91,12 @@ root_agent = Agent(
     name="bq_ml_agent",
     instruction=return_instructions_bqml(),
     before_agent_callback=setup_before_agent_call,
-    tools=[execute_bqml_code, check_bq_models, call_db_agent, rag_response],
+    tools=[
+        execute_bqml_code,
+        check_bqml_job_status,
+        cancel_bqml_job,
+        check_bq_models,
+        call_db_agent,
+        rag_response,
+    ],
 )
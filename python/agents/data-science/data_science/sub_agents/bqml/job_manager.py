@@ -0,0 +1,347 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Non-blocking execution of BigQuery ML jobs.
+
+BQML statements such as CREATE MODEL can run for tens of minutes. The job
+manager submits them on a BigQuery client shared per project and returns a job
+handle right away. The jobs are polled with an exponential backoff, the
+blocking BigQuery calls running in worker threads, so that the agent can wait
+for a job for a while, check its status in a later turn, or cancel it. Jobs
+running longer than a timeout are cancelled: BigQuery enforces the timeout of
+the jobs submitted here through their `job_timeout_ms`, and the jobs tracked by
+ID only are cancelled when they are polled past the timeout. Finished jobs are
+no longer tracked once their status was reported.
+"""
+
+import asyncio
+import dataclasses
+import functools
+import os
+import time
+from typing import Any, Callable, Iterator
+
+from google.cloud import bigquery
+from tabulate import tabulate
+
+# Seconds `execute_bqml_code` waits for a job before returning its handle.
+WAIT_SECONDS = float(os.getenv("BQML_WAIT_SECONDS", "30"))
+# Seconds after which a running job is cancelled; 0 disables the timeout.
+JOB_TIMEOUT_SECONDS = float(os.getenv("BQML_JOB_TIMEOUT_SECONDS", 2 * 60 * 60))
+# Maximum number of result rows rendered, and width of a rendered value.
+MAX_RESULT_ROWS = 50
+MAX_CELL_WIDTH = 60
+
+
+@functools.lru_cache(maxsize=None)
+def get_bq_client(project_id: str | None = None) -> bigquery.Client:
+    """Returns the BigQuery client shared by the jobs of a project."""
+    return bigquery.Client(project=project_id)
+
+
+@dataclasses.dataclass(frozen=True)
+class PollPolicy:
+    """Exponential backoff between two polls of a job.
+
+    Attributes:
+      initial_delay: The delay in seconds before the first poll.
+      max_delay: The maximum delay in seconds between two polls.
+      multiplier: The growth factor of the delay after each poll.
+    """
+
+    initial_delay: float = 1.0
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+
+    def delays(self) -> Iterator[float]:
+        delay = self.initial_delay
+        while True:
+            yield delay
+            delay = min(self.max_delay, delay * self.multiplier)
+
+
+@dataclasses.dataclass
+class JobStatus:
+    """The status of a BQML job, as reported to the agent.
+
+    Attributes:
+      job_id: The BigQuery job ID, the handle of the job.
+      project_id: The project of the job.
+      location: The location of the job.
+      state: The BigQuery job state, "PENDING", "RUNNING" or "DONE".
+      elapsed_seconds: The time since the job was submitted or first tracked.
+      bytes_processed: The bytes processed by the job, once known.
+      error: The error of the job, if it failed or was cancelled.
+      cancel_requested: Whether the job was asked to be cancelled.
+      timed_out: Whether the job was cancelled because it ran for too long.
+      result: The rendered result rows of a successful job, if any.
+    """
+
+    job_id: str
+    project_id: str | None
+    location: str | None
+    state: str
+    elapsed_seconds: float
+    bytes_processed: int | None = None
+    error: str | None = None
+    cancel_requested: bool = False
+    timed_out: bool = False
+    result: str | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.state == "DONE"
+
+    def summary(self) -> str:
+        """Returns a message describing the status, for the agent."""
+        elapsed = f"{self.elapsed_seconds:.0f} seconds"
+        if not self.done:
+            message = (
+                f"BigQuery ML job {self.job_id} is {self.state} after {elapsed}."
+            )
+            if self.cancel_requested:
+                return message + " Its cancellation was requested."
+            return (
+                message + " Check it later with `check_bqml_job_status`, or"
+                " stop it with `cancel_bqml_job`, with project"
+                f" {self.project_id} and location {self.location}."
+            )
+        if self.timed_out:
+            return (
+                f"BigQuery ML job {self.job_id} was cancelled after running for"
+                f" {elapsed}, over the job timeout."
+            )
+        if self.error:
+            return f"Error executing BigQuery ML job {self.job_id}: {self.error}"
+        message = (
+            f"BigQuery ML code executed successfully in {elapsed}"
+            f" (job {self.job_id})."
+        )
+        if self.result:
+            return f"{message} Results:\n{self.result}"
+        return message
+
+    def to_dict(self) -> dict[str, Any]:
+        """Returns the status without its result, e.g. for the session state."""
+        status = dataclasses.asdict(self)
+        del status["result"]
+        return status
+
+
+def format_results(results: Any, max_rows: int = MAX_RESULT_ROWS) -> str | None:
+    """Renders at most `max_rows` result rows as a table.
+
+    Args:
+      results: The `RowIterator` of a job, fetched with `max_results=max_rows`.
+      max_rows: The maximum number of rows rendered.
+
+    Returns:
+      The table in Markdown, with a note if rows were left out, or None if the
+      job returned no rows.
+    """
+    if not results.schema:
+        return None
+    headers = [field.name for field in results.schema]
+    rows = []
+    for row in results:
+        if len(rows) == max_rows:
+            break
+        rows.append(
+            [
+                value
+                if isinstance(value, (int, float)) or value is None
+                else str(value)[:MAX_CELL_WIDTH]
+                for value in row.values()
+            ]
+        )
+    if not rows:
+        return None
+    table = tabulate(rows, headers=headers, tablefmt="github")
+    total_rows = results.total_rows
+    if total_rows is not None and total_rows > len(rows):
+        table += f"\n({len(rows)} of {total_rows} rows shown)"
+    return table
+
+
+@dataclasses.dataclass
+class _TrackedJob:
+    job: Any
+    started: float
+    cancel_requested: bool = False
+    timed_out: bool = False
+    result: str | None = None
+    result_fetched: bool = False
+
+
+class BQMLJobManager:
+    """Submits BQML jobs and tracks them by job ID."""
+
+    def __init__(
+        self,
+        client_factory: Callable[[str | None], Any] = get_bq_client,
+        poll_policy: PollPolicy = PollPolicy(),
+        timeout: float = JOB_TIMEOUT_SECONDS,
+        max_result_rows: int = MAX_RESULT_ROWS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initializes the job manager.
+
+        Args:
+          client_factory: Returns the BigQuery client of a project.
+          poll_policy: The backoff between two polls of a job.
+          timeout: Seconds after which a running job is cancelled, set as the
+            `job_timeout_ms` of the submitted jobs. There is no timeout if 0.
+          max_result_rows: The maximum number of result rows rendered.
+          clock: Returns the current time in seconds.
+        """
+        self.client_factory = client_factory
+        self.poll_policy = poll_policy
+        self.timeout = timeout
+        self.max_result_rows = max_result_rows
+        self.clock = clock
+        self._jobs: dict[str, _TrackedJob] = {}
+
+    async def submit(self, bqml_code: str, project_id: str | None = None) -> str:
+        """Starts a BQML job and returns its job ID without waiting for it."""
+        client = self.client_factory(project_id)
+        job_config = bigquery.QueryJobConfig()
+        if self.timeout:
+            job_config.job_timeout_ms = int(self.timeout * 1000)
+        job = await asyncio.to_thread(client.query, bqml_code, job_config=job_config)
+        self._jobs[job.job_id] = _TrackedJob(job, started=self.clock())
+        print(f"Submitted BigQuery ML job {job.job_id}")
+        return job.job_id
+
+    async def _tracked_job(
+        self,
+        job_id: str,
+        project_id: str | None = None,
+        location: str | None = None,
+    ) -> _TrackedJob:
+        tracked = self._jobs.get(job_id)
+        if tracked is None:
+            # E.g. a finished job, a job submitted before a restart, or by
+            # another worker.
+            client = self.client_factory(project_id)
+            job = await asyncio.to_thread(
+                client.get_job, job_id, project=project_id, location=location
+            )
+            tracked = self._jobs.setdefault(
+                job_id, _TrackedJob(job, started=self.clock())
+            )
+        return tracked
+
+    async def poll(
+        self,
+        job_id: str,
+        project_id: str | None = None,
+        location: str | None = None,
+    ) -> JobStatus:
+        """Refreshes the state of a job once, and returns its status.
+
+        A job running for longer than the timeout is cancelled. The results of
+        a successful job are fetched when it is seen done, after which the job
+        is no longer tracked: polling it again fetches it by ID.
+
+        Raises:
+          google.api_core.exceptions.NotFound: If the job does not exist.
+        """
+        tracked = await self._tracked_job(job_id, project_id, location)
+        job = tracked.job
+        await asyncio.to_thread(job.reload)
+        elapsed = self.clock() - tracked.started
+        done = job.done(reload=False)
+        if (
+            not done
+            and self.timeout
+            and elapsed > self.timeout
+            and not tracked.cancel_requested
+        ):
+            tracked.timed_out = True
+            await self._cancel(tracked)
+        if done and not job.error_result and not tracked.result_fetched:
+            results = await asyncio.to_thread(
+                job.result, max_results=self.max_result_rows
+            )
+            tracked.result = format_results(results, self.max_result_rows)
+            tracked.result_fetched = True
+        if done:
+            self._jobs.pop(job_id, None)
+        error = job.error_result
+        return JobStatus(
+            job_id=job_id,
+            project_id=job.project,
+            location=job.location,
+            state=job.state,
+            elapsed_seconds=elapsed,
+            bytes_processed=job.total_bytes_processed,
+            error=(error.get("message") or str(error)) if error else None,
+            cancel_requested=tracked.cancel_requested,
+            timed_out=tracked.timed_out,
+            result=tracked.result,
+        )
+
+    async def wait(
+        self,
+        job_id: str,
+        timeout: float | None = None,
+        project_id: str | None = None,
+        location: str | None = None,
+    ) -> JobStatus:
+        """Polls a job with backoff until it is done, or for `timeout` seconds.
+
+        The job keeps running when the wait times out.
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        delays = self.poll_policy.delays()
+        while True:
+            status = await self.poll(job_id, project_id, location)
+            print(
+                f"BigQuery ML job {job_id}: {status.state}, elapsed"
+                f" {status.elapsed_seconds:.0f} seconds"
+            )
+            if status.done:
+                return status
+            delay = next(delays)
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return status
+                delay = min(delay, remaining)
+            await asyncio.sleep(delay)
+
+    async def _cancel(self, tracked: _TrackedJob) -> None:
+        tracked.cancel_requested = True
+        await asyncio.to_thread(tracked.job.cancel)
+        print(f"Requested the cancellation of BigQuery ML job {tracked.job.job_id}")
+
+    async def cancel(
+        self,
+        job_id: str,
+        project_id: str | None = None,
+        location: str | None = None,
+    ) -> JobStatus:
+        """Requests the cancellation of a job, and returns its status."""
+        tracked = await self._tracked_job(job_id, project_id, location)
+        if not tracked.job.done(reload=False):
+            await self._cancel(tracked)
+        return await self.poll(job_id, project_id, location)
+
+
+_job_manager = BQMLJobManager()
+
+
+def get_job_manager() -> BQMLJobManager:
+    """Returns the job manager shared by the process."""
+    return _job_manager
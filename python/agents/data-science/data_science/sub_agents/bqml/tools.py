@@ -12,11 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import time
 import os
-from google.cloud import bigquery
+from data_science.utils.local_rag_index import get_local_rag_index
+from google.adk.tools import ToolContext
 from vertexai import rag
 
+from .job_manager import WAIT_SECONDS, get_bq_client, get_job_manager
+
 
 def check_bq_models(dataset_id: str) -> str:
     """Lists models in a BigQuery dataset and returns them as a string.
@@ -31,7 +33,7 @@ def check_bq_models(dataset_id: str) -> str:
     """
 
     try:
-        client = bigquery.Client()
+        client = get_bq_client()
 
         models = client.list_models(dataset_id)
         model_list = []  # Initialize as a list
@@ -48,51 +50,83 @@ def check_bq_models(dataset_id: str) -> str:
         return f"An error occurred: {str(e)}"
 
 
-def execute_bqml_code(bqml_code: str, project_id: str, dataset_id: str) -> str:
+def _record_status(tool_context: ToolContext, status) -> None:
+    """Records the status of a job in the session state."""
+    jobs = dict(tool_context.state.get("bqml_jobs", {}))
+    jobs[status.job_id] = status.to_dict()
+    tool_context.state["bqml_jobs"] = jobs
+
+
+async def execute_bqml_code(
+    bqml_code: str, project_id: str, dataset_id: str, tool_context: ToolContext
+) -> str:
     """
     Executes BigQuery ML code.
+
+    The job is submitted and waited for a short while. If it is still running,
+    e.g. when training a model, its job ID is returned right away: check it
+    later with `check_bqml_job_status`, or stop it with `cancel_bqml_job`.
     """
 
-    # timeout_seconds = 1500
+    job_manager = get_job_manager()
+    try:
+        job_id = await job_manager.submit(bqml_code, project_id)
+        status = await job_manager.wait(job_id, WAIT_SECONDS, project_id)
+    except Exception as e:
+        return f"An error occurred: {str(e)}"
+
+    _record_status(tool_context, status)
+    return status.summary()
+
 
-    client = bigquery.Client(project=project_id)
+async def check_bqml_job_status(
+    job_id: str, project_id: str, location: str, tool_context: ToolContext
+) -> str:
+    """Checks the status of a BigQuery ML job started by `execute_bqml_code`.
 
+    Args:
+        job_id: The ID of the BigQuery job.
+        project_id: The project of the job, as reported with its ID.
+        location: The location of the job, as reported with its ID.
+
+    Returns:
+        A message with the state of the job and its elapsed time, and its
+        results or error once it is done.
+    """
     try:
-        query_job = client.query(bqml_code)
-        start_time = time.time()
-
-        while not query_job.done():
-            elapsed_time = time.time() - start_time
-            # if elapsed_time > timeout_seconds:
-            #     return (
-            #         "Timeout: BigQuery job did not complete within"
-            #         f" {timeout_seconds} seconds. Job ID: {query_job.job_id}"
-            #     )
-
-            print(
-                f"Query Job Status: {query_job.state}, Elapsed Time:"
-                f" {elapsed_time:.2f} seconds. Job ID: {query_job.job_id}"
-            )
-            time.sleep(5)
+        status = await get_job_manager().poll(
+            job_id, project_id or None, location or None
+        )
+    except Exception as e:
+        return f"An error occurred: {str(e)}"
+
+    _record_status(tool_context, status)
+    return status.summary()
 
-        if query_job.error_result:
-            return f"Error executing BigQuery ML code: {query_job.error_result}"
 
-        if query_job.exception():
-            return f"Exception during BigQuery ML execution: {query_job.exception()}"
+async def cancel_bqml_job(
+    job_id: str, project_id: str, location: str, tool_context: ToolContext
+) -> str:
+    """Cancels a running BigQuery ML job started by `execute_bqml_code`.
 
-        results = query_job.result()
-        if results.total_rows > 0:
-            result_string = ""
-            for row in results:
-                result_string += str(dict(row.items())) + "\n"
-            return f"BigQuery ML code executed successfully. Results:\n{result_string}"
-        else:
-            return "BigQuery ML code executed successfully."
+    Args:
+        job_id: The ID of the BigQuery job.
+        project_id: The project of the job, as reported with its ID.
+        location: The location of the job, as reported with its ID.
 
+    Returns:
+        A message with the state of the job after the cancellation request.
+    """
+    try:
+        status = await get_job_manager().cancel(
+            job_id, project_id or None, location or None
+        )
     except Exception as e:
         return f"An error occurred: {str(e)}"
 
+    _record_status(tool_context, status)
+    return status.summary()
+
 
 def rag_response(query: str) -> str:
     """Retrieves contextually relevant information from a RAG corpus.
@@ -104,11 +138,21 @@ def rag_response(query: str) -> str:
         vertexai.rag.RagRetrievalQueryResponse: The response containing retrieved
         information from the corpus.
     """
+    top_k = 3
+    vector_distance_threshold = 0.5
+
+    # Answer from the local index of the reference guide, if it was built.
+    local_index = get_local_rag_index(os.getenv("BQML_RAG_INDEX_DIR"))
+    if local_index is not None:
+        return local_index.retrieval_query(query, top_k, vector_distance_threshold)
+
     corpus_name = os.getenv("BQML_RAG_CORPUS_NAME")
 
     rag_retrieval_config = rag.RagRetrievalConfig(
-        top_k=3,  # Optional
-        filter=rag.Filter(vector_distance_threshold=0.5),  # Optional
+        top_k=top_k,  # Optional
+        filter=rag.Filter(
+            vector_distance_threshold=vector_distance_threshold
+        ),  # Optional
     )
     response = rag.retrieval_query(
         rag_resources=[
@@ -18,10 +18,15 @@
 -- then, it use NL2Py to do further data analysis as needed
 """
 
+import base64
+
+from google.adk.code_executors.code_execution_utils import File
+from google.adk.code_executors.code_executor_context import CodeExecutorContext
 from google.adk.tools import ToolContext
 from google.adk.tools.agent_tool import AgentTool
 
 from .sub_agents import ds_agent, db_agent
+from .sub_agents.bigquery.tools import save_query_result_file
 
 
 async def call_db_agent(
@@ -43,6 +48,41 @@ async def call_db_agent(
     return db_agent_output
 
 
+async def load_query_result_file(tool_context: ToolContext):
+    """Saves and loads the Parquet artifact of the last query result, if any.
+
+    Returns:
+        tuple: The file description saved by `save_query_result_file`, and
+          the code executor `File` of the artifact, or (None, None).
+    """
+    result_file = await save_query_result_file(tool_context)
+    if not result_file:
+        return None, None
+    artifact = await tool_context.load_artifact(
+        result_file["filename"], version=result_file["version"]
+    )
+    if artifact is None or artifact.inline_data is None:
+        return None, None
+    return result_file, File(
+        name=result_file["filename"],
+        content=base64.b64encode(artifact.inline_data.data).decode(),
+        mime_type=artifact.inline_data.mime_type,
+    )
+
+
+def describe_rows(result_file: dict) -> str:
+    """Describes the rows of the query result file, saying if it is truncated."""
+    num_rows = result_file["num_rows"]
+    total_rows = result_file.get("total_rows", num_rows)
+    if total_rows > num_rows:
+        return (
+            f"with only the first {num_rows} of the {total_rows} rows of the"
+            " result (the file is truncated: say so when the answer depends on"
+            " all the rows)"
+        )
+    return f"with all {num_rows} rows"
+
+
 async def call_ds_agent(
     question: str,
     tool_context: ToolContext,
@@ -52,20 +92,45 @@ async def call_ds_agent(
     if question == "N/A":
         return tool_context.state["db_agent_output"]
 
-    input_data = tool_context.state["query_result"]
+    result_file, input_file = await load_query_result_file(tool_context)
+    if input_file is None:
+        input_data = tool_context.state["query_result"]
 
-    question_with_data = f"""
+        question_with_data = f"""
   Question to answer: {question}
 
   Actual data to analyze prevoius quesiton is already in the following:
   {input_data}
 
+  """
+    else:
+        # The code executor of the ds agent gets the file from the state of its
+        # session, which AgentTool copies from this one.
+        code_executor_context = CodeExecutorContext(tool_context.state)
+        code_executor_context.add_input_files([input_file])
+
+        question_with_data = f"""
+  Question to answer: {question}
+
+  Actual data to analyze previous question is in the available file
+  `{result_file["filename"]}`, {describe_rows(result_file)}. Load it with:
+  ```tool_code
+  df = pd.read_parquet("{result_file["filename"]}")
+  ```
+
+  Schema and statistics of the data:
+  {result_file["summary"]}
+
   """
 
     agent_tool = AgentTool(agent=ds_agent)
 
-    ds_agent_output = await agent_tool.run_async(
-        args={"request": question_with_data}, tool_context=tool_context
-    )
+    try:
+        ds_agent_output = await agent_tool.run_async(
+            args={"request": question_with_data}, tool_context=tool_context
+        )
+    finally:
+        if input_file is not None:
+            code_executor_context.clear_input_files()
     tool_context.state["ds_agent_output"] = ds_agent_output
     return ds_agent_output
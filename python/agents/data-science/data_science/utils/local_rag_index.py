@@ -0,0 +1,427 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local vector index of the BQML reference guide.
+
+The reference guide is a small, static set of documents, so instead of a Vertex
+AI RAG `retrieval_query` round trip per question, its chunks can be embedded
+once, offline, and searched locally:
+
+    python3 data_science/utils/local_rag_index.py --output_dir <index dir>
+
+The chunks are made like `reference_guide_RAG.ingest_files` (512 tokens with
+an overlap of 100, counted as whitespace separated words) and embedded with the
+same model as the RAG corpus. The index directory holds:
+
+- embeddings.npy: the L2-normalised float32 chunk embeddings, memory-mapped.
+- chunks.jsonl: the text and source of each chunk.
+- metadata.json: the embedding model and chunking parameters.
+- ivf_*.npy: an optional inverted file (IVF) of k-means clusters of chunks,
+  searched instead of all the chunks when the corpus is large.
+- query_cache.sqlite: the embeddings of the queries already seen.
+
+Distances are cosine distances, as in the RAG corpus, so `top_k` and
+`vector_distance_threshold` keep the semantics of `rag.RagRetrievalConfig`.
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+EMBEDDING_MODEL = "text-embedding-005"
+CHUNK_SIZE = 512
+CHUNK_OVERLAP = 100
+SOURCE_PATHS = ["gs://cloud-samples-data/adk-samples/data-science/bqml"]
+# Corpora with fewer chunks are always searched exhaustively.
+MIN_IVF_CHUNKS = 4096
+EMBEDDING_BATCH_SIZE = 16
+
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.jsonl"
+METADATA_FILE = "metadata.json"
+IVF_CENTROIDS_FILE = "ivf_centroids.npy"
+IVF_ORDER_FILE = "ivf_order.npy"
+IVF_OFFSETS_FILE = "ivf_offsets.npy"
+QUERY_CACHE_FILE = "query_cache.sqlite"
+
+
+def chunk_text(text, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Splits a text into chunks of `chunk_size` words overlapping by
+    `chunk_overlap` words."""
+    words = text.split()
+    step = chunk_size - chunk_overlap
+    chunks = []
+    for start in range(0, max(len(words) - chunk_overlap, 1), step):
+        chunks.append(" ".join(words[start : start + chunk_size]))
+    return [chunk for chunk in chunks if chunk]
+
+
+def embed_texts(texts, task_type, model_name=EMBEDDING_MODEL):
+    """Embeds texts with a Vertex AI text embedding model.
+
+    Args:
+        texts (list[str]): The texts to embed.
+        task_type (str): "RETRIEVAL_DOCUMENT" for chunks, "RETRIEVAL_QUERY" for
+          queries.
+        model_name (str): The embedding model.
+
+    Returns:
+        numpy.ndarray: The L2-normalised float32 embeddings, one row per text.
+    """
+    from vertexai.language_models import (  # pylint: disable=import-outside-toplevel
+        TextEmbeddingInput,
+        TextEmbeddingModel,
+    )
+
+    model = TextEmbeddingModel.from_pretrained(model_name)
+    embeddings = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        batch = texts[start : start + EMBEDDING_BATCH_SIZE]
+        embeddings += [
+            embedding.values
+            for embedding in model.get_embeddings(
+                [TextEmbeddingInput(text, task_type) for text in batch]
+            )
+        ]
+    return normalize(np.asarray(embeddings, dtype=np.float32))
+
+
+def normalize(vectors):
+    """L2-normalises the rows of a matrix, so that dot products are cosines."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def build_ivf(embeddings, num_lists, num_iterations=20, seed=0):
+    """Clusters normalised embeddings with spherical k-means.
+
+    Returns:
+        tuple: The (num_lists, dim) normalised centroids, the chunk indices
+          ordered by cluster, and the (num_lists + 1) offsets of each cluster
+          in that order.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = embeddings[
+        rng.choice(len(embeddings), size=num_lists, replace=False)
+    ].copy()
+    for _ in range(num_iterations):
+        assignments = np.argmax(embeddings @ centroids.T, axis=1)
+        for cluster in range(num_lists):
+            members = embeddings[assignments == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+        centroids = normalize(centroids)
+    assignments = np.argmax(embeddings @ centroids.T, axis=1)
+    order = np.argsort(assignments, kind="stable").astype(np.int32)
+    offsets = np.searchsorted(
+        assignments[order], np.arange(num_lists + 1)
+    ).astype(np.int64)
+    return centroids.astype(np.float32), order, offsets
+
+
+def save_index(output_dir, chunks, embeddings, metadata, num_lists=None):
+    """Writes an index directory.
+
+    Args:
+        output_dir (str): The index directory.
+        chunks (list[dict]): The "text", "source_uri" and "source_display_name"
+          of each chunk.
+        embeddings (numpy.ndarray): The normalised embeddings of the chunks.
+        metadata (dict): The embedding model and chunking parameters.
+        num_lists (int): The number of IVF clusters. Defaults to the square
+          root of the number of chunks, for corpora of at least
+          `MIN_IVF_CHUNKS` chunks; 0 disables the IVF.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, EMBEDDINGS_FILE), embeddings)
+    with open(os.path.join(output_dir, CHUNKS_FILE), "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk) + "\n")
+    if num_lists is None:
+        num_lists = (
+            int(np.sqrt(len(chunks))) if len(chunks) >= MIN_IVF_CHUNKS else 0
+        )
+    if num_lists:
+        centroids, order, offsets = build_ivf(embeddings, num_lists)
+        np.save(os.path.join(output_dir, IVF_CENTROIDS_FILE), centroids)
+        np.save(os.path.join(output_dir, IVF_ORDER_FILE), order)
+        np.save(os.path.join(output_dir, IVF_OFFSETS_FILE), offsets)
+    metadata = dict(metadata, num_chunks=len(chunks), ivf_lists=num_lists)
+    with open(os.path.join(output_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+
+
+class QueryEmbeddingCache:
+    """SQLite file of the query embeddings, keyed by model and query."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=10
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            " key TEXT PRIMARY KEY, embedding BLOB NOT NULL)"
+        )
+
+    @staticmethod
+    def key(model_name, query):
+        return hashlib.sha256(f"{model_name}\n{query.strip()}".encode()).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT embedding FROM query_embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        return None if row is None else np.frombuffer(row[0], dtype=np.float32)
+
+    def set(self, key, embedding):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?)",
+                (key, np.asarray(embedding, dtype=np.float32).tobytes()),
+            )
+
+
+class LocalRagIndex:
+    """Top-k cosine search over the chunks of an index directory."""
+
+    def __init__(self, index_dir, embed_query=None):
+        """Loads an index directory.
+
+        Args:
+            index_dir (str): The index directory, written by `save_index`.
+            embed_query: Returns the normalised embedding of a query string.
+              Defaults to the embedding model of the index.
+        """
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, METADATA_FILE), encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        with open(os.path.join(index_dir, CHUNKS_FILE), encoding="utf-8") as f:
+            self.chunks = [json.loads(line) for line in f]
+        self.embeddings = np.load(
+            os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode="r"
+        )
+        self.ivf = None
+        if self.metadata.get("ivf_lists"):
+            self.ivf = tuple(
+                np.load(os.path.join(index_dir, name))
+                for name in (IVF_CENTROIDS_FILE, IVF_ORDER_FILE, IVF_OFFSETS_FILE)
+            )
+        self.model_name = self.metadata.get("embedding_model", EMBEDDING_MODEL)
+        self._embed_query = embed_query or (
+            lambda query: embed_texts([query], "RETRIEVAL_QUERY", self.model_name)[0]
+        )
+        self.query_cache = QueryEmbeddingCache(
+            os.path.join(index_dir, QUERY_CACHE_FILE)
+        )
+
+    def embed_query(self, query):
+        """Returns the embedding of a query, from the query cache if possible."""
+        key = QueryEmbeddingCache.key(self.model_name, query)
+        embedding = self.query_cache.get(key)
+        if embedding is None:
+            embedding = np.asarray(self._embed_query(query), dtype=np.float32)
+            self.query_cache.set(key, embedding)
+        return embedding
+
+    def search(
+        self, query_embedding, top_k=3, vector_distance_threshold=None, nprobe=None
+    ):
+        """Finds the chunks closest to a query embedding.
+
+        Args:
+            query_embedding (numpy.ndarray): The normalised query embedding.
+            top_k (int): The maximum number of chunks returned.
+            vector_distance_threshold (float): Only the chunks at a cosine
+              distance smaller than this are returned, if set.
+            nprobe (int): The number of IVF clusters searched. All the chunks
+              are searched if there is no IVF, or if None and the IVF has a
+              single cluster. Defaults to a quarter of the clusters.
+
+        Returns:
+            list[tuple[int, float]]: The (chunk index, cosine distance) of the
+              closest chunks, closest first.
+        """
+        if self.ivf is None:
+            candidates = None
+            scores = np.asarray(self.embeddings @ query_embedding)
+        else:
+            centroids, order, offsets = self.ivf
+            nprobe = nprobe or max(1, len(centroids) // 4)
+            clusters = np.argsort(-(centroids @ query_embedding))[:nprobe]
+            candidates = np.concatenate(
+                [order[offsets[c] : offsets[c + 1]] for c in clusters]
+            )
+            candidates.sort()
+            scores = np.asarray(self.embeddings[candidates] @ query_embedding)
+
+        top_k = min(top_k, len(scores))
+        if top_k <= 0:
+            return []
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        results = []
+        for i in top:
+            distance = 1.0 - float(scores[i])
+            if (
+                vector_distance_threshold is not None
+                and distance >= vector_distance_threshold
+            ):
+                break
+            index = i if candidates is None else candidates[i]
+            results.append((int(index), distance))
+        return results
+
+    def retrieval_query(self, text, top_k=3, vector_distance_threshold=None):
+        """Retrieves the chunks relevant to a query, like `rag.retrieval_query`.
+
+        Returns:
+            str: The contexts in the text format of a
+              `RagRetrievalQueryResponse`.
+        """
+        results = self.search(
+            self.embed_query(text), top_k, vector_distance_threshold
+        )
+        lines = ["contexts {"]
+        for i, distance in results:
+            chunk = self.chunks[i]
+            lines += [
+                "  contexts {",
+                f"    source_uri: {json.dumps(chunk['source_uri'])}",
+                "    source_display_name:"
+                f" {json.dumps(chunk['source_display_name'])}",
+                f"    text: {json.dumps(chunk['text'])}",
+                f"    distance: {distance:.6g}",
+                "  }",
+            ]
+        lines.append("}")
+        return "\n".join(lines)
+
+
+_local_indexes = {}
+_local_indexes_lock = threading.Lock()
+
+
+def get_local_rag_index(index_dir):
+    """Returns the index of a directory, loaded once per process, or None if
+    the directory has no index."""
+    if not index_dir or not os.path.exists(os.path.join(index_dir, METADATA_FILE)):
+        return None
+    with _local_indexes_lock:
+        if index_dir not in _local_indexes:
+            _local_indexes[index_dir] = LocalRagIndex(index_dir)
+        return _local_indexes[index_dir]
+
+
+def extract_text(name, data):
+    """Extracts the text of a reference guide file."""
+    if name.lower().endswith(".pdf"):
+        import io  # pylint: disable=import-outside-toplevel
+
+        from pypdf import PdfReader  # pylint: disable=import-outside-toplevel
+
+        reader = PdfReader(io.BytesIO(data))
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    text = data.decode("utf-8", errors="replace")
+    if name.lower().endswith((".html", ".htm")):
+        text = re.sub(r"(?is)<(script|style).*?</\1>", " ", text)
+        text = html.unescape(re.sub(r"<[^>]+>", " ", text))
+    return text
+
+
+def read_source_files(paths):
+    """Yields the (uri, display name, text) of the files under GCS paths."""
+    from google.cloud import storage  # pylint: disable=import-outside-toplevel
+
+    client = storage.Client()
+    for path in paths:
+        bucket_name, _, prefix = path.removeprefix("gs://").partition("/")
+        for blob in client.list_blobs(bucket_name, prefix=prefix):
+            if blob.name.endswith("/"):
+                continue
+            yield (
+                f"gs://{bucket_name}/{blob.name}",
+                os.path.basename(blob.name),
+                extract_text(blob.name, blob.download_as_bytes()),
+            )
+
+
+def build_index(output_dir, paths=SOURCE_PATHS, num_lists=None):
+    """Chunks and embeds the reference guide, and writes its index."""
+    chunks = []
+    for uri, display_name, text in read_source_files(paths):
+        for chunk in chunk_text(text):
+            chunks.append(
+                {"text": chunk, "source_uri": uri, "source_display_name": display_name}
+            )
+    print(f"Embedding {len(chunks)} chunks with {EMBEDDING_MODEL}")
+    start = time.perf_counter()
+    embeddings = embed_texts(
+        [chunk["text"] for chunk in chunks], "RETRIEVAL_DOCUMENT"
+    )
+    print(f"Embedded in {time.perf_counter() - start:.1f} s")
+    save_index(
+        output_dir,
+        chunks,
+        embeddings,
+        {
+            "embedding_model": EMBEDDING_MODEL,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "source_paths": list(paths),
+        },
+        num_lists,
+    )
+    print(f"Index written to {output_dir}")
+
+
+if __name__ == "__main__":
+    from pathlib import Path  # pylint: disable=import-outside-toplevel
+
+    import vertexai  # pylint: disable=import-outside-toplevel
+    from dotenv import load_dotenv  # pylint: disable=import-outside-toplevel
+
+    load_dotenv(dotenv_path=Path(__file__).parent.parent.parent / ".env")
+    vertexai.init(
+        project=os.getenv("GOOGLE_CLOUD_PROJECT"),
+        location=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1"),
+    )
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output_dir", required=True, help="The index directory.")
+    parser.add_argument(
+        "--paths",
+        nargs="+",
+        default=SOURCE_PATHS,
+        help="The GCS paths of the reference guide.",
+    )
+    parser.add_argument(
+        "--num_lists",
+        type=int,
+        default=None,
+        help="Number of IVF clusters; 0 disables the IVF. Defaults to the square"
+        f" root of the number of chunks, from {MIN_IVF_CHUNKS} chunks.",
+    )
+    args = parser.parse_args()
+    build_index(args.output_dir, args.paths, args.num_lists)
@@ -0,0 +1,298 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the BQML job manager, with fake BigQuery jobs."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_science.sub_agents.bqml.job_manager import (  # noqa: E402
+    BQMLJobManager,
+    PollPolicy,
+)
+
+
+class FakeField:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeRow:
+    def __init__(self, values):
+        self._values = values
+
+    def values(self):
+        return self._values
+
+
+class FakeRowIterator:
+    def __init__(self, schema, rows, max_results=None):
+        self.schema = [FakeField(name) for name in schema]
+        self.total_rows = len(rows)
+        self._rows = rows[:max_results] if max_results is not None else rows
+
+    def __iter__(self):
+        return (FakeRow(values) for values in self._rows)
+
+
+class FakeJob:
+    """Stands in for a `QueryJob` that is done after `num_polls` reloads."""
+
+    def __init__(
+        self, job_id, num_polls, schema=(), rows=(), error_result=None, on_reload=None
+    ):
+        self.job_id = job_id
+        self.project = "project"
+        self.location = "US"
+        self.state = "PENDING"
+        self.total_bytes_processed = None
+        self.error_result = None
+        self.num_reloads = 0
+        self.cancelled = False
+        self._num_polls = num_polls
+        self._schema = list(schema)
+        self._rows = list(rows)
+        self._error_result = error_result
+        self._on_reload = on_reload
+
+    def reload(self):
+        self.num_reloads += 1
+        if self._on_reload:
+            self._on_reload()
+        if self.state == "DONE":
+            return
+        if self.cancelled:
+            self.state = "DONE"
+            self.error_result = {"reason": "stopped", "message": "Job cancelled"}
+        elif self.num_reloads >= self._num_polls:
+            self.state = "DONE"
+            self.total_bytes_processed = 1024
+            self.error_result = self._error_result
+        else:
+            self.state = "RUNNING"
+
+    def done(self, reload=True):
+        if reload:
+            self.reload()
+        return self.state == "DONE"
+
+    def cancel(self):
+        self.cancelled = True
+        return True
+
+    def result(self, max_results=None):
+        assert self.state == "DONE" and not self.error_result
+        return FakeRowIterator(self._schema, self._rows, max_results)
+
+
+class FakeClient:
+    def __init__(self, jobs):
+        self.jobs = {job.job_id: job for job in jobs}
+        self.submitted = {}
+        self.job_configs = {}
+        self.fetched = []
+
+    def query(self, bqml_code, job_config=None):
+        job = self.jobs[f"job_{len(self.submitted) + 1}"]
+        self.submitted[job.job_id] = bqml_code
+        self.job_configs[job.job_id] = job_config
+        return job
+
+    def get_job(self, job_id, project=None, location=None):
+        self.fetched.append((job_id, project, location))
+        return self.jobs[job_id]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_manager(jobs, clock=None, timeout=0, max_result_rows=50):
+    client = FakeClient(jobs)
+    manager = BQMLJobManager(
+        client_factory=lambda project_id: client,
+        poll_policy=PollPolicy(initial_delay=0, max_delay=0),
+        timeout=timeout,
+        max_result_rows=max_result_rows,
+        clock=clock or FakeClock(),
+    )
+    return manager, client
+
+
+@pytest.mark.asyncio
+async def test_submit_returns_before_the_job_is_done():
+    job = FakeJob("job_1", num_polls=100)
+    manager, client = make_manager([job])
+
+    job_id = await manager.submit("CREATE MODEL ...", "project")
+
+    assert job_id == "job_1"
+    assert client.submitted == {"job_1": "CREATE MODEL ..."}
+    assert job.num_reloads == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_polls_until_done_and_renders_bounded_results():
+    rows = [[i, f"label {i}", i / 10] for i in range(8)]
+    job = FakeJob("job_1", num_polls=3, schema=["id", "label", "score"], rows=rows)
+    manager, _ = make_manager([job], max_result_rows=5)
+
+    job_id = await manager.submit("SELECT * FROM ML.EVALUATE(...)")
+    status = await manager.wait(job_id)
+
+    assert status.done
+    assert job.num_reloads == 3
+    assert status.error is None
+    assert status.bytes_processed == 1024
+    assert status.result.splitlines()[0].split() == [
+        "|", "id", "|", "label", "|", "score", "|"
+    ]
+    assert "label 4" in status.result
+    assert "label 5" not in status.result
+    assert "(5 of 8 rows shown)" in status.result
+    assert "executed successfully" in status.summary()
+
+
+@pytest.mark.asyncio
+async def test_wait_returns_the_handle_of_a_running_job():
+    clock = FakeClock()
+
+    def tick():
+        # Each poll takes 10 seconds.
+        clock.now += 10
+
+    job = FakeJob("job_1", num_polls=100, on_reload=tick)
+    manager, _ = make_manager([job], clock=clock)
+
+    job_id = await manager.submit("CREATE MODEL ...")
+    status = await manager.wait(job_id, timeout=25)
+
+    assert not status.done
+    assert status.state == "RUNNING"
+    assert job.num_reloads == 3
+    assert "job_1" in status.summary()
+    assert "check_bqml_job_status" in status.summary()
+
+
+@pytest.mark.asyncio
+async def test_poll_reports_errors():
+    job = FakeJob(
+        "job_1", num_polls=1, error_result={"reason": "invalid", "message": "Bad SQL"}
+    )
+    manager, _ = make_manager([job])
+
+    job_id = await manager.submit("CREATE MODEL ...")
+    status = await manager.poll(job_id)
+
+    assert status.done
+    assert status.error == "Bad SQL"
+    assert status.result is None
+    assert "Bad SQL" in status.summary()
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_a_running_job():
+    job = FakeJob("job_1", num_polls=100)
+    manager, _ = make_manager([job])
+
+    job_id = await manager.submit("CREATE MODEL ...")
+    assert not (await manager.poll(job_id)).done
+    status = await manager.cancel(job_id)
+
+    assert job.cancelled
+    assert status.done
+    assert status.cancel_requested
+    assert status.error == "Job cancelled"
+
+
+@pytest.mark.asyncio
+async def test_jobs_running_past_the_timeout_are_cancelled():
+    clock = FakeClock()
+    job = FakeJob("job_1", num_polls=100)
+    manager, _ = make_manager([job], clock=clock, timeout=60)
+
+    job_id = await manager.submit("CREATE MODEL ...")
+    assert not (await manager.poll(job_id)).cancel_requested
+    clock.now = 61
+    status = await manager.poll(job_id)
+
+    assert job.cancelled
+    assert status.timed_out
+    status = await manager.poll(job_id)
+    assert status.done
+    assert "over the job timeout" in status.summary()
+
+
+@pytest.mark.asyncio
+async def test_jobs_submitted_elsewhere_are_fetched_by_id():
+    job = FakeJob("job_1", num_polls=1, schema=["loss"], rows=[[0.25]])
+    manager, client = make_manager([job])
+
+    # The job was submitted by another worker, or before a restart.
+    status = await manager.poll("job_1")
+
+    assert client.submitted == {}
+    assert status.done
+    assert "0.25" in status.result
+    assert client.fetched == [("job_1", None, None)]
+
+
+@pytest.mark.asyncio
+async def test_jobs_are_fetched_in_their_project_and_location():
+    job = FakeJob("job_1", num_polls=100)
+    manager, client = make_manager([job])
+
+    status = await manager.poll("job_1", "other-project", "EU")
+    await manager.cancel("job_1", "other-project", "EU")
+
+    assert client.fetched == [("job_1", "other-project", "EU")]
+    assert "project project and location US" in status.summary()
+
+
+@pytest.mark.asyncio
+async def test_submitted_jobs_carry_the_timeout():
+    jobs = [FakeJob("job_1", num_polls=1), FakeJob("job_2", num_polls=1)]
+    manager, client = make_manager(jobs, timeout=60)
+
+    await manager.submit("CREATE MODEL ...")
+    manager.timeout = 0
+    await manager.submit("CREATE MODEL ...")
+
+    assert int(client.job_configs["job_1"].job_timeout_ms) == 60000
+    assert client.job_configs["job_2"].job_timeout_ms is None
+
+
+@pytest.mark.asyncio
+async def test_finished_jobs_are_no_longer_tracked():
+    job = FakeJob("job_1", num_polls=2, schema=["loss"], rows=[[0.25]])
+    manager, client = make_manager([job])
+
+    job_id = await manager.submit("CREATE MODEL ...")
+    status = await manager.wait(job_id)
+
+    assert status.done
+    assert manager._jobs == {}
+    # A later check fetches the job again.
+    status = await manager.poll(job_id)
+    assert "0.25" in status.result
+    assert manager._jobs == {}
+    assert client.fetched == [("job_1", None, None)]
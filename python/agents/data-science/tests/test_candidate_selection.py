@@ -0,0 +1,154 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the selection of a SQL query among CHASE candidates."""
+
+import os
+import sys
+
+import duckdb
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_science.sub_agents.bigquery import tools  # noqa: E402
+from data_science.sub_agents.bigquery.chase_sql import chase_db_tools  # noqa: E402
+from data_science.sub_agents.bigquery.chase_sql.sql_postprocessor.candidate_selection import (  # noqa: E402
+    SampleExecutor,
+    SelectionMethod,
+    select_candidate,
+)
+
+PROJECT = "my-project"
+DATASET = "shop"
+
+SCHEMA = f"""CREATE OR REPLACE TABLE `{PROJECT}.{DATASET}.sales` (
+  `region` STRING,
+  `amount` INT64
+);
+"""
+
+ROWS = f"""-- Example values for table `{PROJECT}.{DATASET}.sales`:
+INSERT INTO `{PROJECT}.{DATASET}.sales` VALUES ('east', 10);
+INSERT INTO `{PROJECT}.{DATASET}.sales` VALUES ('west', 20);
+INSERT INTO `{PROJECT}.{DATASET}.sales` VALUES ('west', 5);
+"""
+
+TOTAL = f"SELECT SUM(amount) FROM `{PROJECT}.{DATASET}.sales`"
+COUNT_ROWS = f"SELECT COUNT(*) FROM `{PROJECT}.{DATASET}.sales`"
+COUNT_REGIONS = f"SELECT COUNT(region) FROM `{PROJECT}.{DATASET}.sales`"
+
+
+def select(responses, ddl_schema=SCHEMA + ROWS, **kwargs):
+    return select_candidate(
+        responses, db=DATASET, catalog=PROJECT, ddl_schema=ddl_schema, **kwargs
+    )
+
+
+def test_majority_selects_the_most_common_query():
+    selection = select(
+        [TOTAL, COUNT_ROWS, COUNT_ROWS], method=SelectionMethod.MAJORITY
+    )
+    assert selection.method == "majority"
+    assert selection.winner == 1
+    assert selection.sql == COUNT_ROWS
+    assert selection.agreement == 2
+    assert selection.num_distinct == 2
+
+
+def test_execution_selects_the_most_common_result():
+    # Three distinct queries: by majority the first one would win the tie.
+    selection = select([TOTAL, COUNT_ROWS, COUNT_REGIONS])
+    assert selection.method == "execution"
+    assert selection.winner == 1
+    assert selection.agreement == 2
+    assert selection.num_distinct == 3
+    results = [c.result for c in selection.candidates]
+    assert results == [((35,),), ((3,),), ((3,),)]
+
+
+def test_execution_without_example_rows_falls_back_to_majority():
+    selection = select([TOTAL, COUNT_ROWS, COUNT_REGIONS], ddl_schema=SCHEMA)
+    assert selection.method == "majority"
+    assert selection.winner == 0
+    assert all(c.result is None for c in selection.candidates)
+
+
+def test_candidates_failing_translation_are_skipped():
+    def translate(response):
+        if response == TOTAL:
+            raise ValueError("cannot translate")
+        return response
+
+    selection = select([TOTAL, COUNT_ROWS, COUNT_ROWS], translate=translate)
+    assert selection.winner == 1
+    assert selection.candidates[0].sql is None
+    assert selection.candidates[0].errors.startswith("Translation failed")
+
+
+def test_first_translation_error_is_raised_when_no_candidate_translates():
+    def translate(response):
+        raise ValueError(f"cannot translate {response}")
+
+    with pytest.raises(RuntimeError, match="cannot translate"):
+        select([TOTAL, COUNT_ROWS], translate=translate)
+
+
+def test_sample_executor_has_no_external_access(tmp_path):
+    executor = SampleExecutor(SCHEMA + ROWS)
+    assert executor.num_rows == 3
+    path = tmp_path / "secret.csv"
+    path.write_text("a\n1\n")
+    with pytest.raises(duckdb.Error):
+        executor.execute(f"SELECT * FROM read_csv('{path}')", "duckdb")
+
+
+class FailingModel:
+    """Stands in for `GeminiModel`, with every call failing."""
+
+    def __init__(self, **kwargs):
+        pass
+
+    def call_parallel(self, prompts, parser_func=None):
+        return [None] * len(prompts)
+
+
+class FakeToolContext:
+    def __init__(self, method):
+        self.state = {
+            "database_settings": {
+                "bq_ddl_schema": SCHEMA + ROWS,
+                "bq_ddl_schema_hash": "hash",
+                "bq_project_id": PROJECT,
+                "bq_dataset_id": DATASET,
+                "transpile_to_bigquery": False,
+                "process_input_errors": False,
+                "process_tool_output_errors": False,
+                "number_of_candidates": 3,
+                "candidate_selection": method,
+                "model": "model",
+                "temperature": 0.5,
+                "generate_sql_type": "dc",
+            }
+        }
+
+
+@pytest.mark.parametrize("method", ["first", "majority", "execution"])
+def test_nl2sql_raises_when_every_candidate_fails(monkeypatch, method):
+    monkeypatch.setattr(chase_db_tools, "GeminiModel", FailingModel)
+    monkeypatch.setattr(tools, "get_nl2sql_cache", lambda: None)
+    tool_context = FakeToolContext(method)
+    with pytest.raises(RuntimeError, match="No SQL query could be generated"):
+        chase_db_tools.initial_bq_nl2sql("total sales", tool_context)
+    assert "nl2sql_cache_entry" not in tool_context.state
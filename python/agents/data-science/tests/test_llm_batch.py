@@ -0,0 +1,236 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the CHASE-SQL batch LLM calls, with a fake model."""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_science.sub_agents.bigquery.chase_sql.llm_batch import (  # noqa: E402
+    ConcurrencyLimiter,
+    RetryPolicy,
+    call_with_retries,
+    deadline_after,
+    gather_with_deadline,
+    run_sync,
+)
+from data_science.sub_agents.bigquery.chase_sql.llm_utils import (  # noqa: E402
+    GeminiModel,
+)
+
+NO_BACKOFF = RetryPolicy(max_attempts=3, base_delay=0.0)
+
+
+class FakeModel:
+    """Answers each prompt after its latency, failing its first `failures`
+    calls."""
+
+    def __init__(self, latency=0.0, failures=0):
+        self.latency = latency
+        self.failures = failures
+        self.num_calls = 0
+
+    async def generate(self, prompt):
+        self.num_calls += 1
+        await asyncio.sleep(self.latency)
+        if self.num_calls <= self.failures:
+            raise RuntimeError(f"call {self.num_calls} failed")
+        return f"answer to {prompt}"
+
+
+async def _hold(limiter, name, order, release):
+    async with limiter:
+        order.append(name)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_limiter_hands_slots_over_in_fifo_order():
+    limiter = ConcurrencyLimiter(1)
+    order, release = [], asyncio.Event()
+    await limiter.acquire()
+    tasks = []
+    for name in range(3):
+        tasks.append(asyncio.create_task(_hold(limiter, name, order, release)))
+        await asyncio.sleep(0)
+    assert order == []
+    release.set()
+    limiter.release()
+    await asyncio.gather(*tasks)
+    assert order == [0, 1, 2]
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_skips_cancelled_waiters():
+    limiter = ConcurrencyLimiter(1)
+    order, release = [], asyncio.Event()
+    await limiter.acquire()
+    first = asyncio.create_task(_hold(limiter, "first", order, release))
+    second = asyncio.create_task(_hold(limiter, "second", order, release))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    limiter.release()
+    release.set()
+    await second
+    assert order == ["second"]
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_passes_on_a_slot_handed_to_a_cancelled_waiter():
+    limiter = ConcurrencyLimiter(1)
+    order, release = [], asyncio.Event()
+    await limiter.acquire()
+    first = asyncio.create_task(_hold(limiter, "first", order, release))
+    second = asyncio.create_task(_hold(limiter, "second", order, release))
+    await asyncio.sleep(0)
+    # The slot is handed over to the first waiter, cancelled before it wakes up.
+    limiter.release()
+    first.cancel()
+    release.set()
+    await second
+    assert first.cancelled()
+    assert order == ["second"]
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_call_with_retries_retries_until_success():
+    model = FakeModel(failures=2)
+    result = await call_with_retries(
+        lambda: model.generate("q"), policy=NO_BACKOFF, limiter=ConcurrencyLimiter(1)
+    )
+    assert result == "answer to q"
+    assert model.num_calls == 3
+
+
+@pytest.mark.asyncio
+async def test_call_with_retries_stops_after_max_attempts():
+    model = FakeModel(failures=5)
+    limiter = ConcurrencyLimiter(1)
+    with pytest.raises(RuntimeError, match="call 3 failed"):
+        await call_with_retries(
+            lambda: model.generate("q"), policy=NO_BACKOFF, limiter=limiter
+        )
+    assert model.num_calls == 3
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_call_with_retries_cancels_the_attempt_at_the_deadline():
+    model = FakeModel(latency=10.0)
+    limiter = ConcurrencyLimiter(1)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        await call_with_retries(
+            lambda: model.generate("q"), deadline=deadline_after(0.05), limiter=limiter
+        )
+    assert time.monotonic() - start < 1.0
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_call_with_retries_does_not_back_off_past_the_deadline():
+    model = FakeModel(failures=5)
+    policy = RetryPolicy(max_attempts=5, base_delay=10.0, max_delay=10.0)
+    start = time.monotonic()
+    with pytest.raises((RuntimeError, TimeoutError)):
+        await call_with_retries(
+            lambda: model.generate("q"),
+            policy=policy,
+            deadline=deadline_after(0.2),
+            limiter=ConcurrencyLimiter(1),
+        )
+    assert time.monotonic() - start < 1.0
+
+
+@pytest.mark.asyncio
+async def test_gather_cancels_the_stragglers_once_enough_succeeded():
+    limiter = ConcurrencyLimiter(3)
+    models = [FakeModel(0.01), FakeModel(0.01, failures=1), FakeModel(0.02)]
+    models.append(FakeModel(10.0))
+    start = time.monotonic()
+    results = await gather_with_deadline(
+        [
+            call_with_retries(
+                lambda m=m: m.generate("q"),
+                policy=RetryPolicy(max_attempts=1),
+                limiter=limiter,
+            )
+            for m in models
+        ],
+        num_required=2,
+    )
+    assert time.monotonic() - start < 1.0
+    assert results[0] == results[2] == "answer to q"
+    assert isinstance(results[1], RuntimeError)
+    assert isinstance(results[3], asyncio.CancelledError)
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_gather_times_out_the_calls_running_at_the_deadline():
+    models = [FakeModel(0.01), FakeModel(10.0)]
+    results = await gather_with_deadline(
+        [m.generate("q") for m in models], deadline=deadline_after(0.1)
+    )
+    assert results[0] == "answer to q"
+    assert isinstance(results[1], TimeoutError)
+
+
+class LoopBoundModel:
+    """Stands in for a `GenerativeModel`, whose grpc.aio client is bound to the
+    event loop of its first call."""
+
+    def __init__(self):
+        self.loop = None
+
+    async def generate_content_async(self, prompt, **kwargs):
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+        elif self.loop is not loop or self.loop.is_closed():
+            raise RuntimeError("Event loop is closed")
+        return FakeResponse(f"answer to {prompt}")
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+def test_calls_share_the_event_loop_of_the_model_client():
+    model = GeminiModel(generative_model=LoopBoundModel(), retry_policy=NO_BACKOFF)
+    assert model.call_parallel(["a", "b"], max_retries=0) == [
+        "answer to a",
+        "answer to b",
+    ]
+    assert model.call_parallel(["c"], max_retries=0) == ["answer to c"]
+    assert model.call("d") == "answer to d"
+
+
+@pytest.mark.asyncio
+async def test_run_sync_from_a_running_event_loop():
+    model = GeminiModel(generative_model=LoopBoundModel(), retry_policy=NO_BACKOFF)
+    assert model.call_parallel(["a"], max_retries=0) == ["answer to a"]
+    assert model.call_parallel(["b"], max_retries=0) == ["answer to b"]
+    assert run_sync(asyncio.sleep(0, result=1)) == 1
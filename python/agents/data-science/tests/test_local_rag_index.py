@@ -0,0 +1,100 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the local index of the BQML reference guide, with numpy
+embeddings instead of the embedding model."""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_science.utils.local_rag_index import (  # noqa: E402
+    LocalRagIndex,
+    chunk_text,
+    normalize,
+    save_index,
+)
+
+
+def test_chunks_overlap_by_chunk_overlap_words():
+    words = [f"w{i}" for i in range(1000)]
+    chunks = [chunk.split() for chunk in chunk_text(" ".join(words), 512, 100)]
+
+    assert [len(chunk) for chunk in chunks] == [512, 512, 176]
+    assert chunks[0][0] == "w0" and chunks[-1][-1] == "w999"
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous[-100:] == chunk[:100]
+
+
+def test_short_and_empty_texts():
+    assert chunk_text("a  b\nc", 512, 100) == ["a b c"]
+    assert chunk_text(" ".join(["w"] * 50), 512, 100) == [" ".join(["w"] * 50)]
+    assert chunk_text("   ", 512, 100) == []
+
+
+def make_index(tmp_path, embeddings, num_lists=0):
+    chunks = [
+        {
+            "text": f"chunk {i}",
+            "source_uri": f"gs://bucket/{i}.pdf",
+            "source_display_name": f"{i}.pdf",
+        }
+        for i in range(len(embeddings))
+    ]
+    save_index(str(tmp_path), chunks, normalize(embeddings), {}, num_lists)
+    return LocalRagIndex(str(tmp_path), embed_query=lambda query: None)
+
+
+@pytest.fixture
+def index(tmp_path):
+    # Chunk i is at a cosine distance of about i / 10 from the query [1, 0].
+    angles = np.arccos(1 - np.arange(6) / 10)
+    embeddings = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    return make_index(tmp_path, embeddings.astype(np.float32))
+
+
+QUERY = np.array([1.0, 0.0], dtype=np.float32)
+
+
+def test_search_returns_the_top_k_closest_chunks(index):
+    results = index.search(QUERY, top_k=3)
+
+    assert [i for i, _ in results] == [0, 1, 2]
+    assert [d for _, d in results] == pytest.approx([0.0, 0.1, 0.2], abs=1e-6)
+    assert len(index.search(QUERY, top_k=100)) == 6
+    assert index.search(QUERY, top_k=0) == []
+
+
+def test_search_drops_chunks_at_or_past_the_threshold(index):
+    results = index.search(QUERY, 5, vector_distance_threshold=0.25)
+    assert [i for i, _ in results] == [0, 1, 2]
+    assert index.search(-QUERY, 5, vector_distance_threshold=0.5) == []
+
+
+def test_ivf_search_probing_every_cluster_is_exhaustive(tmp_path):
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(200, 8)).astype(np.float32)
+    exhaustive = make_index(tmp_path / "flat", embeddings)
+    ivf = make_index(tmp_path / "ivf", embeddings, num_lists=4)
+    query = normalize(rng.normal(size=8).astype(np.float32))
+
+    assert ivf.ivf is not None
+    expected = exhaustive.search(query, top_k=5)
+    assert [i for i, _ in ivf.search(query, top_k=5, nprobe=4)] == [
+        i for i, _ in expected
+    ]
@@ -0,0 +1,224 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the NL2SQL cache, and its use by the SQL validation tool."""
+
+import os
+import sys
+
+import pyarrow as pa
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_science.sub_agents.bigquery import nl2sql_cache, tools  # noqa: E402
+from data_science.sub_agents.bigquery.nl2sql_cache import (  # noqa: E402
+    InMemoryBackend,
+    NL2SQLCache,
+    SQLiteBackend,
+    cache_key,
+    make_nl2sql_cache,
+    normalize_question,
+)
+
+SETTINGS = {"method": "BASELINE", "model": "model", "temperature": 0.1}
+QUERY = "SELECT name FROM `p.d.t` LIMIT 10"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(nl2sql_cache.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryBackend(max_entries=2)
+    return SQLiteBackend(str(tmp_path / "nl2sql.sqlite"), max_entries=2)
+
+
+def test_questions_are_normalised():
+    assert normalize_question("  How many\tORDERS ?? ") == "how many orders"
+    assert normalize_question("ｕｓｅｒｓ.") == "users"
+    assert cache_key("How many orders?", "h", SETTINGS) == cache_key(
+        "how  many orders", "h", dict(reversed(SETTINGS.items()))
+    )
+
+
+def test_key_depends_on_schema_and_settings():
+    key = cache_key("q", "h", SETTINGS)
+    assert key != cache_key("q", "other", SETTINGS)
+    assert key != cache_key("q", "h", dict(SETTINGS, temperature=0.5))
+
+
+def test_entries_expire_after_ttl(backend, clock):
+    cache = NL2SQLCache(backend, ttl=10)
+    cache.put("k", QUERY)
+    clock.now += 10
+    assert cache.get("k") == QUERY
+    clock.now += 1
+    assert cache.get("k") is None
+    assert cache.stats()["expired"] == 1
+    assert len(backend) == 0
+
+
+def test_least_recently_used_entries_are_evicted(backend, clock):
+    cache = NL2SQLCache(backend)
+    cache.put("a", "A")
+    clock.now += 1
+    cache.put("b", "B")
+    clock.now += 1
+    assert cache.get("a") == "A"
+    clock.now += 1
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert cache.stats()["evicted"] == 1
+
+
+def test_sqlite_entries_survive_restarts(tmp_path):
+    path = str(tmp_path / "cache" / "nl2sql.sqlite")
+    make_nl2sql_cache("sqlite", path=path).put("k", QUERY)
+    assert make_nl2sql_cache("sqlite", path=path).get("k") == QUERY
+
+
+def test_make_nl2sql_cache():
+    assert make_nl2sql_cache("none") is None
+    assert isinstance(make_nl2sql_cache("Memory").backend, InMemoryBackend)
+    with pytest.raises(ValueError):
+        make_nl2sql_cache("sqlite")
+    with pytest.raises(ValueError):
+        make_nl2sql_cache("redis")
+
+
+class FakeJob:
+    def __init__(self, sql, dry_run, bytes_processed):
+        self.sql = sql
+        self.dry_run = dry_run
+        self.total_bytes_processed = bytes_processed
+
+    def result(self, max_results=None):
+        if "missing" in self.sql:
+            raise RuntimeError("Unrecognized name: missing")
+        return FakeResults()
+
+
+class FakeResults:
+    schema = ["name"]
+    total_rows = 2
+
+    def to_arrow(self, create_bqstorage_client=True):
+        return pa.table({"name": ["a", "b"]})
+
+
+class FakeClient:
+    def __init__(self, bytes_processed=1000):
+        self.bytes_processed = bytes_processed
+
+    def query(self, sql, job_config=None):
+        return FakeJob(sql, job_config.dry_run, self.bytes_processed)
+
+
+class FakeToolContext:
+    def __init__(self):
+        self.state = {"database_settings": {"bq_ddl_schema_hash": "hash"}}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = NL2SQLCache(InMemoryBackend())
+    monkeypatch.setattr(tools, "get_nl2sql_cache", lambda: cache)
+    monkeypatch.setattr(tools, "get_bq_client", lambda: FakeClient())
+    return cache
+
+
+def generate(tool_context, question, sql):
+    """Looks up the question, and records `sql` as generated on a miss."""
+    cached = tools.get_cached_sql(question, tool_context, SETTINGS)
+    if cached is None:
+        tools.record_generated_sql(tool_context, sql)
+    return cached
+
+
+def key_of(question):
+    return cache_key(question, "hash", SETTINGS)
+
+
+@pytest.mark.asyncio
+async def test_generated_sql_is_cached_once_validated(cache):
+    tool_context = FakeToolContext()
+    assert generate(tool_context, "names", QUERY) is None
+    assert cache.get(key_of("names")) is None
+    result = await tools.run_bigquery_validation(QUERY, tool_context)
+    assert result["error_message"] is None
+    assert cache.get(key_of("names")) == QUERY
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "DELETE FROM `p.d.t` WHERE TRUE",
+        "SELECT missing FROM `p.d.t`",
+    ],
+)
+async def test_rejected_sql_is_not_cached(cache, sql):
+    tool_context = FakeToolContext()
+    generate(tool_context, "names", sql)
+    result = await tools.run_bigquery_validation(sql, tool_context)
+    assert result["error_message"].startswith("Invalid SQL")
+    assert cache.get(key_of("names")) is None
+
+
+@pytest.mark.asyncio
+async def test_sql_over_the_byte_budget_is_not_cached(cache, monkeypatch):
+    monkeypatch.setattr(tools, "MAX_BYTES_PROCESSED", 10)
+    tool_context = FakeToolContext()
+    generate(tool_context, "names", QUERY)
+    result = await tools.run_bigquery_validation(QUERY, tool_context)
+    assert "over the budget" in result["error_message"]
+    assert cache.get(key_of("names")) is None
+
+
+@pytest.mark.asyncio
+async def test_cached_sql_is_invalidated_when_rejected(cache, monkeypatch):
+    cache.put(key_of("names"), QUERY)
+    tool_context = FakeToolContext()
+    assert generate(tool_context, "names", None) == QUERY
+    monkeypatch.setattr(tools, "MAX_BYTES_PROCESSED", 10)
+    await tools.run_bigquery_validation(QUERY, tool_context)
+    assert cache.get(key_of("names")) is None
+
+
+@pytest.mark.asyncio
+async def test_other_rejected_sql_keeps_the_cached_entry(cache):
+    cache.put(key_of("names"), QUERY)
+    tool_context = FakeToolContext()
+    generate(tool_context, "names", None)
+    result = await tools.run_bigquery_validation(
+        "SELECT missing FROM `p.d.t`", tool_context
+    )
+    assert result["error_message"].startswith("Invalid SQL")
+    assert cache.get(key_of("names")) == QUERY
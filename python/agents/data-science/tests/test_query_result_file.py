@@ -0,0 +1,149 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the query result file handed to the analytics agent."""
+
+import os
+import sys
+import threading
+
+import pyarrow as pa
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_science import tools as root_tools  # noqa: E402
+from data_science.sub_agents.bigquery import result_file, tools  # noqa: E402
+
+
+class FakeResults:
+    def __init__(self, num_rows, total_rows):
+        self.schema = ["n"]
+        self.num_rows = num_rows
+        self.total_rows = total_rows
+
+    def to_arrow(self, create_bqstorage_client=True):
+        return pa.table({"n": list(range(self.num_rows))})
+
+
+class FakeJob:
+    def __init__(self, client, sql):
+        self.client = client
+        self.sql = sql
+        self.total_bytes_processed = 1000
+
+    def result(self, max_results=None):
+        self.client.fetches.append((self.sql, max_results))
+        self.client.threads.add(threading.get_ident())
+        num_rows = self.client.num_rows
+        if "LIMIT" in self.sql:
+            num_rows = min(num_rows, int(self.sql.rsplit("LIMIT", 1)[1]))
+        return FakeResults(min(max_results, num_rows), num_rows)
+
+
+class FakeClient:
+    def __init__(self, num_rows=500):
+        self.num_rows = num_rows
+        self.fetches = []
+        self.threads = set()
+
+    def query(self, sql, job_config=None):
+        self.threads.add(threading.get_ident())
+        return FakeJob(self, sql)
+
+
+class FakeToolContext:
+    def __init__(self):
+        self.state = {}
+        self.artifacts = []
+
+    async def save_artifact(self, filename, artifact):
+        self.artifacts.append(artifact)
+        return len(self.artifacts) - 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(tools, "get_bq_client", lambda: client)
+    monkeypatch.setattr(tools, "get_nl2sql_cache", lambda: None)
+    monkeypatch.setattr(tools, "MAX_RESULT_FILE_ROWS", 1000)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_validation_keeps_the_limit_and_fetches_few_rows(client):
+    tool_context = FakeToolContext()
+    sql = "SELECT n FROM `p.d.t` LIMIT 5"
+    result = await tools.run_bigquery_validation(sql, tool_context)
+    assert result["error_message"] is None
+    assert client.fetches == [(sql, tools.MAX_NUM_ROWS)]
+    assert tool_context.artifacts == []
+    assert threading.get_ident() not in client.threads
+
+
+@pytest.mark.asyncio
+async def test_validation_without_limit_adds_the_prompt_limit(client):
+    tool_context = FakeToolContext()
+    await tools.run_bigquery_validation("SELECT n FROM `p.d.t`", tool_context)
+    [(sql, max_rows)] = client.fetches
+    assert sql.endswith(f"LIMIT {tools.MAX_NUM_ROWS}")
+    assert max_rows == tools.MAX_NUM_ROWS
+
+
+@pytest.mark.asyncio
+async def test_result_file_is_fetched_once_for_the_analytics_agent(client):
+    tool_context = FakeToolContext()
+    await tools.run_bigquery_validation("SELECT n FROM `p.d.t`", tool_context)
+    saved = await tools.save_query_result_file(tool_context)
+    assert saved["num_rows"] == saved["total_rows"] == 500
+    assert client.fetches[-1] == ("SELECT n FROM `p.d.t`", 1000)
+    assert root_tools.describe_rows(saved) == "with all 500 rows"
+    table = result_file.from_parquet_bytes(tool_context.artifacts[0].inline_data.data)
+    assert table.num_rows == 500
+
+    assert await tools.save_query_result_file(tool_context) == saved
+    assert len(client.fetches) == 2
+
+
+@pytest.mark.asyncio
+async def test_result_file_is_disabled(client, monkeypatch):
+    monkeypatch.setattr(tools, "MAX_RESULT_FILE_ROWS", 0)
+    tool_context = FakeToolContext()
+    await tools.run_bigquery_validation("SELECT n FROM `p.d.t`", tool_context)
+    assert await tools.save_query_result_file(tool_context) is None
+    assert len(client.fetches) == 1
+
+
+@pytest.mark.asyncio
+async def test_truncated_result_file_gives_the_total_rows(client):
+    client.num_rows = 1500
+    tool_context = FakeToolContext()
+    await tools.run_bigquery_validation("SELECT n FROM `p.d.t`", tool_context)
+    saved = await tools.save_query_result_file(tool_context)
+    assert saved["num_rows"] == 1000
+    assert saved["total_rows"] == 1500
+    assert root_tools.describe_rows(saved).startswith(
+        "with only the first 1000 of the 1500 rows"
+    )
+
+
+@pytest.mark.asyncio
+async def test_result_file_keeps_the_limit_of_the_model(client):
+    tool_context = FakeToolContext()
+    sql = "SELECT n FROM `p.d.t` LIMIT 20"
+    await tools.run_bigquery_validation(sql, tool_context)
+    saved = await tools.save_query_result_file(tool_context)
+    assert client.fetches[-1] == (sql, 1000)
+    assert saved["num_rows"] == saved["total_rows"] == 20
@@ -0,0 +1,127 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the read-only check and row limit of the generated SQL, and
+the conversion of query results to rows."""
+
+import datetime
+import os
+import sys
+
+import pyarrow as pa
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_science.sub_agents.bigquery.tools import (  # noqa: E402
+    arrow_to_rows,
+    enforce_read_only_limit,
+)
+
+DML_DDL_ERROR = "Invalid SQL: Contains disallowed DML/DDL operations."
+
+
+def limit(sql):
+    sql, error_message = enforce_read_only_limit(sql, max_rows=80)
+    assert error_message is None
+    return sql
+
+
+def test_column_names_are_not_limits_or_ddl():
+    assert (
+        limit("SELECT speed_limit, created_at, update_time FROM `p.d.t`")
+        == "SELECT speed_limit, created_at, update_time FROM `p.d.t` LIMIT 80"
+    )
+    sql = "SELECT speed_limit FROM `p.d.t` WHERE created_at > '2024-01-01' LIMIT 5"
+    assert limit(sql) == sql
+
+
+@pytest.mark.parametrize(
+    "sql, error_message",
+    [
+        ("SELECT 1; SELECT 2", "Invalid SQL: Expected exactly one SQL statement."),
+        (
+            "SELECT 1; DROP TABLE `p.d.t`",
+            "Invalid SQL: Expected exactly one SQL statement.",
+        ),
+        ("WITH d AS (DELETE FROM `p.d.t` WHERE TRUE) SELECT 1", DML_DDL_ERROR),
+        ("INSERT INTO `p.d.t` SELECT 1", DML_DDL_ERROR),
+        ("CREATE TABLE `p.d.u` AS SELECT 1", DML_DDL_ERROR),
+    ],
+)
+def test_statements_other_than_one_query_are_rejected(sql, error_message):
+    assert enforce_read_only_limit(sql) == (sql, error_message)
+
+
+def test_larger_limits_are_lowered():
+    assert limit("SELECT x FROM `p.d.t` LIMIT 1000") == "SELECT x FROM `p.d.t` LIMIT 80"
+    assert limit("SELECT x FROM `p.d.t`;") == "SELECT x FROM `p.d.t` LIMIT 80"
+    # Only the outermost query is bounded.
+    assert (
+        limit("SELECT * FROM (SELECT x FROM `p.d.t` LIMIT 1000)")
+        == "SELECT * FROM (SELECT x FROM `p.d.t` LIMIT 1000) LIMIT 80"
+    )
+    assert limit("SELECT x FROM `p.d.t` UNION ALL SELECT y FROM `p.d.u`").endswith(
+        " LIMIT 80"
+    )
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT x FROM `p.d.t` LIMIT 10 OFFSET 5",
+        "SELECT x FROM `p.d.t` LIMIT @n",
+    ],
+)
+def test_smaller_and_parameter_limits_are_kept(sql):
+    assert limit(sql) == sql
+
+
+def test_unparsable_sql_falls_back_to_text_checks():
+    assert (
+        limit("SELECT speed_limit FROM `p.d.t` WHERE x = ((")
+        == "SELECT speed_limit FROM `p.d.t` WHERE x = (( LIMIT 80"
+    )
+    sql = "SELECT x FROM `p.d.t` WHERE x = (( LIMIT 3"
+    assert limit(sql) == sql
+    sql = "SELECT x FROM `p.d.t` WHERE x = (( ; DELETE FROM `p.d.t`"
+    assert enforce_read_only_limit(sql) == (sql, DML_DDL_ERROR)
+
+
+def test_dates_and_timestamps_are_formatted_as_days():
+    table = pa.table(
+        {
+            "day": pa.array([datetime.date(2025, 1, 2), None]),
+            "at": pa.array(
+                [datetime.datetime(2025, 1, 2, 23, 59), None],
+                pa.timestamp("us", tz="UTC"),
+            ),
+            "local": pa.array(
+                [datetime.datetime(2024, 12, 31, 8, 0), None], pa.timestamp("ms")
+            ),
+            "n": [1, None],
+            "name": ["a", None],
+        }
+    )
+    assert arrow_to_rows(table) == [
+        {
+            "day": "2025-01-02",
+            "at": "2025-01-02",
+            "local": "2024-12-31",
+            "n": 1,
+            "name": "a",
+        },
+        {"day": None, "at": None, "local": None, "n": None, "name": None},
+    ]
+    assert arrow_to_rows(pa.table({"n": pa.array([], pa.int64())})) == []
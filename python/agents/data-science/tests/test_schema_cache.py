@@ -0,0 +1,166 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the cache of the BigQuery dataset DDL, with a fake client."""
+
+import datetime
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_science.sub_agents.bigquery.schema_cache import (  # noqa: E402
+    NUM_EXAMPLE_ROWS,
+    SchemaCache,
+    table_ddl,
+)
+
+DATASET = "p.d"
+MODIFIED = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class FakeField:
+    def __init__(self, name, field_type, mode="NULLABLE", description=None):
+        self.name = name
+        self.field_type = field_type
+        self.mode = mode
+        self.description = description
+
+
+class FakeRow:
+    def __init__(self, values):
+        self._values = values
+
+    def values(self):
+        return self._values
+
+
+class FakeTable:
+    def __init__(self, table_id, table_type="TABLE"):
+        self.table_id = table_id
+        self.table_type = table_type
+        self.modified = MODIFIED
+        self.schema = [FakeField("id", "INTEGER"), FakeField("name", "STRING")]
+        self.rows = [FakeRow([1, table_id])]
+
+
+class FakeClient:
+    def __init__(self, *table_ids):
+        self.tables = {table_id: FakeTable(table_id) for table_id in table_ids}
+        self.rows_fetched = []
+
+    def list_tables(self, dataset):
+        assert dataset == DATASET
+        return list(self.tables.values())
+
+    def get_table(self, table_ref):
+        return self.tables[table_ref.split(".")[-1]]
+
+    def list_rows(self, table, max_results=None, page_size=None):
+        assert max_results == page_size == NUM_EXAMPLE_ROWS
+        self.rows_fetched.append(table.table_id)
+        return table.rows
+
+
+def get_ddl(cache, client):
+    return cache.get_ddl(client, "p", "d")
+
+
+def test_unchanged_tables_are_reused():
+    client = FakeClient("a", "b")
+    cache = SchemaCache()
+    ddl = get_ddl(cache, client)
+    assert ddl.index("`p.d.a`") < ddl.index("`p.d.b`")
+    assert get_ddl(cache, client) == ddl
+    assert client.rows_fetched == ["a", "b"]
+    assert (cache.num_fetched, cache.num_reused) == (2, 2)
+
+
+def test_modified_tables_are_fetched_again():
+    client = FakeClient("a", "b")
+    cache = SchemaCache()
+    get_ddl(cache, client)
+    client.tables["b"].modified += datetime.timedelta(hours=1)
+    client.tables["b"].rows = [FakeRow([2, "changed"])]
+    assert "(2,'changed')" in get_ddl(cache, client)
+    assert client.rows_fetched == ["a", "b", "b"]
+
+
+def test_tables_without_modified_time_are_always_fetched():
+    client = FakeClient("a")
+    client.tables["a"].modified = None
+    cache = SchemaCache()
+    get_ddl(cache, client)
+    get_ddl(cache, client)
+    assert client.rows_fetched == ["a", "a"]
+
+
+def test_dropped_tables_and_views_are_pruned():
+    client = FakeClient("a", "b")
+    cache = SchemaCache()
+    get_ddl(cache, client)
+    del client.tables["a"]
+    client.tables["b"].table_type = "VIEW"
+    client.tables["c"] = FakeTable("c", table_type="VIEW")
+    assert get_ddl(cache, client) == ""
+    assert cache.datasets[DATASET] == {}
+
+
+def test_cache_file_is_reloaded(tmp_path):
+    path = str(tmp_path / "cache" / "schema.json")
+    client = FakeClient("a", "b")
+    ddl = get_ddl(SchemaCache(path), client)
+
+    reloaded = SchemaCache(path)
+    assert get_ddl(reloaded, client) == ddl
+    assert client.rows_fetched == ["a", "b"]
+    assert reloaded.num_reused == 2
+
+
+@pytest.mark.parametrize("content", ["{not json", '{"version": 0, "datasets": {}}'])
+def test_unreadable_or_old_cache_files_are_ignored(tmp_path, content):
+    path = tmp_path / "schema.json"
+    path.write_text(content)
+    assert SchemaCache(str(path)).datasets == {}
+
+
+def test_example_values_are_rendered_from_their_native_types():
+    schema = [
+        FakeField("name", "STRING", description="Name"),
+        FakeField("day", "DATE"),
+        FakeField("at", "TIMESTAMP"),
+        FakeField("amount", "FLOAT"),
+        FakeField("tags", "STRING", mode="REPEATED"),
+    ]
+    rows = [
+        FakeRow(["x", datetime.date(2025, 1, 2), MODIFIED, 1.5, ["t"]]),
+        FakeRow([None, None, None, None, []]),
+    ]
+    assert table_ddl("p.d.t", schema, rows) == (
+        "CREATE OR REPLACE TABLE `p.d.t` (\n"
+        "  `name` STRING COMMENT 'Name',\n"
+        "  `day` DATE,\n"
+        "  `at` TIMESTAMP,\n"
+        "  `amount` FLOAT,\n"
+        "  `tags` STRING ARRAY\n"
+        ");\n\n"
+        "-- Example values for table `p.d.t`:\n"
+        "INSERT INTO `p.d.t` VALUES\n"
+        "('x','2025-01-02','2025-01-01 00:00:00+00:00',1.5,['t']);\n\n"
+        "INSERT INTO `p.d.t` VALUES\n"
+        "(NULL,NULL,NULL,NULL,[]);\n\n"
+    )
+    assert "Example values" not in table_ddl("p.d.t", schema, [])
@@ -0,0 +1,184 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Throughput of the Firestore transaction reads for a 10k-transaction user.
+
+Compares the former `FirestoreDataManager.get_transactions` with the current
+one. The former read whole documents in one query and converted the
+timestamps to strings and back. The current one reads projected pages with a
+cursor, converts the timestamps at once, and caches the result. Other users'
+transactions are also stored, so that the reads filter on the user.
+
+By default the documents are served by the in-memory fake of the tests. That
+measures the client-side costs without the network. With `--emulator`, they
+are written to and read from the Firestore emulator of FIRESTORE_EMULATOR_HOST,
+e.g. started with `gcloud emulators firestore start --host-port=localhost:8080`.
+Against the emulator, the former reads also create their client.
+
+    python benchmarks/bench_firestore_reads.py [--emulator]
+"""
+
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+import time
+
+import pandas as pd
+
+from financial_advisor.sub_agents.data_analyst.firestore_tool import (
+    TRANSACTION_FIELDS,
+    FirestoreDataManager,
+    transactions_frame,
+)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../tests"))
+
+from fake_firestore import FakeFirestoreClient  # noqa: E402
+
+NUM_TRANSACTIONS = 10_000
+NUM_OTHER_TRANSACTIONS = 10_000
+USER_ID = "bench-user"
+REPEATS = 3
+START = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def transaction(user_id, i):
+    return {
+        "userId": user_id,
+        "dateValue": START + datetime.timedelta(minutes=97 * i),
+        "mentionText": f"{i % 28 + 1:02d}/06/24 UPI-MERCHANT {i} 0000{i:012d}",
+        "amount": float(i % 5000) + 0.5,
+        "pageRefs": "[]",
+        "confidence": 0.9,
+        "normalizedText": "",
+    }
+
+
+def old_get_transactions(client, user_id, max_rows):
+    query = client.collection("transactions").where("userId", "==", user_id)
+    return old_transactions_frame(doc.to_dict() for doc in query.limit(max_rows).stream())
+
+
+def old_transactions_frame(documents):
+    transactions = []
+    for data in documents:
+        if "dateValue" in data:
+            data["dateValue"] = data["dateValue"].strftime("%d/%m/%y")
+        transactions.append(data)
+    df = pd.DataFrame(transactions)
+    if "dateValue" in df.columns:
+        df["dateValue"] = pd.to_datetime(
+            df["dateValue"], format="%d/%m/%y", errors="coerce"
+        )
+        df = df.sort_values("dateValue", ascending=False)
+    return df
+
+
+def timed_sync(fn, repeats=REPEATS):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+async def timed(coroutine_fn, repeats=REPEATS):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = await coroutine_fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+async def seed(manager):
+    await manager.add_transactions(
+        [transaction(USER_ID, i) for i in range(NUM_TRANSACTIONS)]
+        + [transaction("other-user", i) for i in range(NUM_OTHER_TRANSACTIONS)]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--emulator",
+        action="store_true",
+        help="Use the Firestore emulator of FIRESTORE_EMULATOR_HOST.",
+    )
+    args = parser.parse_args()
+
+    if args.emulator:
+        from google.cloud import firestore  # pylint: disable=import-outside-toplevel
+
+        if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+            sys.exit("Set FIRESTORE_EMULATOR_HOST to the emulator address.")
+        new_client = lambda: firestore.Client(project="bench")
+    else:
+        shared_fake = FakeFirestoreClient()
+        new_client = lambda: shared_fake
+    client = new_client()
+    manager = FirestoreDataManager(client, cache_ttl=60)
+    asyncio.run(seed(manager))
+
+    async def cold_read():
+        manager.invalidate()
+        return await manager.get_transactions(USER_ID, max_rows=None)
+
+    async def measure():
+        rows = []
+        old, seconds = await timed(
+            lambda: asyncio.to_thread(
+                old_get_transactions, new_client(), USER_ID, NUM_TRANSACTIONS
+            )
+        )
+        rows.append(("before: one query, whole documents, strftime", len(old), seconds))
+        new, seconds = await timed(cold_read)
+        rows.append(
+            (f"after: {manager.page_size}-row pages, projected", len(new), seconds)
+        )
+        _, seconds = await timed(
+            lambda: manager.get_transactions(USER_ID, max_rows=None)
+        )
+        rows.append(("after: cached, within the TTL", len(new), seconds))
+        return rows
+
+    rows = asyncio.run(measure())
+
+    # The conversion of the fetched documents alone, without the queries
+    documents = [transaction(USER_ID, i) for i in range(NUM_TRANSACTIONS)]
+    projected = [
+        {field: document[field] for field in TRANSACTION_FIELDS}
+        for document in documents
+    ]
+    old, seconds = timed_sync(lambda: old_transactions_frame(map(dict, documents)))
+    rows.append(("conversion before: strftime and parse", len(old), seconds))
+    new, seconds = timed_sync(lambda: transactions_frame(projected, TRANSACTION_FIELDS))
+    rows.append(("conversion after: to_datetime", len(new), seconds))
+    source = "Firestore emulator" if args.emulator else "in-memory fake"
+    print(f"{NUM_TRANSACTIONS} transactions of one user, {source}\n")
+    print(f"{'read':<48} {'rows':>7} {'ms':>9} {'rows/s':>12}")
+    for name, num_rows, seconds in rows:
+        print(
+            f"{name:<48} {num_rows:>7,} {seconds * 1000:>9.3f}"
+            f" {num_rows / max(seconds, 1e-9):>12,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
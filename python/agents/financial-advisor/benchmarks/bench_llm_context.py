@@ -0,0 +1,129 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Token counts of the transaction context of the LLM tools, before and after.
+
+Before, `csv_qa_llm_tool` rendered the date-sorted frame with
+`DataFrame.to_string`, all of it with `max_rows=None`, and the enhanced tool
+dumped `TransactionAnalyzer.get_context_for_llm` as indented JSON. After, both
+use the token-budgeted `llm_context.build_context`. The CSV has no `amount`
+column and few DD/MM/YY dates, so the analyzer gets the amounts and dates
+parsed by the query planner.
+
+Tokens are estimated at 4 characters per token, or counted by a Gemini model
+with `--count_with`, e.g. `--count_with gemini-2.0-flash-001`.
+
+    python benchmarks/bench_llm_context.py [--csv data/transactions.csv]
+"""
+
+import argparse
+import json
+import os
+
+import pandas as pd
+
+from financial_advisor.sub_agents.data_analyst.enhanced_csv_tool import (
+    TransactionAnalyzer,
+)
+from financial_advisor.sub_agents.data_analyst.llm_context import (
+    DEFAULT_MAX_TOKENS,
+    build_context,
+    estimate_tokens,
+)
+from financial_advisor.sub_agents.data_analyst.query_planner import (
+    prepare_transactions,
+)
+
+DEFAULT_CSV = os.path.join(
+    os.path.dirname(__file__), "../../../../data/transactions.csv"
+)
+QUESTIONS = [
+    "What are my spending patterns?",
+    "Show me my recent UPI payments",
+    "What is my monthly trend of bill payments in 2024?",
+]
+
+
+def old_csv_context(df, max_rows):
+    df = df.copy()
+    df["dateValue"] = pd.to_datetime(df["dateValue"], format="%d/%m/%y", errors="coerce")
+    df = df.sort_values("dateValue", ascending=False)
+    sample = df if max_rows is None else df.head(max_rows)
+    return sample.fillna("").to_string(index=False)
+
+
+def str_keys(value):
+    # json.dumps rejects the Period keys of the monthly statistics.
+    if isinstance(value, dict):
+        return {str(key): str_keys(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [str_keys(item) for item in value]
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="The transactions CSV.")
+    parser.add_argument(
+        "--count_with", help="Count the tokens with this Gemini model."
+    )
+    args = parser.parse_args()
+
+    count_tokens = estimate_tokens
+    if args.count_with:
+        import google.generativeai as genai  # pylint: disable=import-outside-toplevel
+
+        from financial_advisor.sub_agents.data_analyst.genai_setup import (  # pylint: disable=import-outside-toplevel
+            setup_genai,
+        )
+
+        setup_genai()
+        model = genai.GenerativeModel(args.count_with)
+        count_tokens = lambda text: model.count_tokens(text).total_tokens
+
+    df = pd.read_csv(args.csv)
+    features = prepare_transactions(df)
+    analyzer = TransactionAnalyzer(
+        df.assign(
+            amount=features["amount"],
+            dateValue=features["date"].dt.strftime("%d/%m/%y"),
+        )
+    )
+
+    rows = []
+    for question in QUESTIONS:
+        contexts = {
+            "csv, all rows, before": old_csv_context(df, None),
+            "csv, 20 rows, before": old_csv_context(df, 20),
+            "enhanced, before": json.dumps(
+                str_keys(analyzer.get_context_for_llm(question)), default=str, indent=2
+            ),
+            "csv, budget, after": build_context(features, question),
+            "csv, 20 rows, after": build_context(features, question, max_rows=20),
+            "enhanced, budget, after": analyzer.get_prompt_context(question),
+            "enhanced, 10 rows, after": analyzer.get_prompt_context(
+                question, max_rows=10
+            ),
+        }
+        for name, text in contexts.items():
+            rows.append((question, name, len(text), count_tokens(text)))
+
+    print(f"{len(df)} transactions, budget {DEFAULT_MAX_TOKENS} estimated tokens\n")
+    print(f"{'question':<52} {'context':<24} {'chars':>9} {'tokens':>8}")
+    for question, name, chars, tokens in rows:
+        print(f"{question:<52} {name:<24} {chars:>9,} {tokens:>8,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Latency of the query planner answers for 10k, 100k and 1M rows.
+
+Compares the per-row `Series.apply` total and per-year sums which
+`answer_csv_question` used to compute for every question with the query
+planner: the one-off `prepare_transactions` features, cached by the
+transaction store, then the aggregation answering each question. The rows are
+those of data/transactions.csv, repeated.
+
+    python benchmarks/bench_query_planner.py [--csv data/transactions.csv]
+"""
+
+import argparse
+import datetime
+import os
+import re
+import time
+
+import pandas as pd
+
+from financial_advisor.sub_agents.data_analyst.query_planner import (
+    answer_question,
+    prepare_transactions,
+)
+
+NUM_ROWS = (10_000, 100_000, 1_000_000)
+DEFAULT_CSV = os.path.join(
+    os.path.dirname(__file__), "../../../../data/transactions.csv"
+)
+QUESTIONS = {
+    "total": "What is the total amount I spent so far?",
+    "per year": "How much did I spend per year in the last 3 years?",
+    "per category": "Spending by category",
+    "top 5": "What are my top 5 highest value transactions?",
+}
+
+
+def extract_money(text):
+    if pd.isna(text):
+        return 0.0
+    matches = re.findall(r"[\d,]+\.\d{2}", str(text))
+    return sum(float(m.replace(",", "")) for m in matches)
+
+
+def extract_year(val):
+    try:
+        return datetime.datetime.strptime(str(val), "%d/%m/%y").year
+    except Exception:
+        return None
+
+
+def apply_total(df):
+    money = pd.to_numeric(df["moneyValue"], errors="coerce")
+    return (money.fillna(0) + df["mentionText"].apply(extract_money)).sum()
+
+
+def apply_per_year(df):
+    years = df["dateValue"].apply(extract_year)
+    recent_years = sorted(
+        [y for y in years.unique() if y is not None and not pd.isna(y)],
+        reverse=True,
+    )[:3]
+    return {
+        y: pd.to_numeric(df[years == y]["moneyValue"], errors="coerce").sum()
+        + df[years == y]["mentionText"].apply(extract_money).sum()
+        for y in recent_years
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="The transactions CSV.")
+    args = parser.parse_args()
+
+    base = pd.read_csv(args.csv)
+    print(
+        f"{'rows':>10} {'apply total s':>14} {'apply per year s':>17}"
+        f" {'features s':>11} "
+        + " ".join(f"{name + ' ms':>15}" for name in QUESTIONS)
+    )
+    for num_rows in NUM_ROWS:
+        df = pd.concat(
+            [base] * (num_rows // len(base) + 1), ignore_index=True
+        ).head(num_rows)
+        expected_total, apply_total_s = timed(lambda: apply_total(df))
+        _, apply_per_year_s = timed(lambda: apply_per_year(df))
+        features, features_s = timed(lambda: prepare_transactions(df))
+        assert abs(features["amount"].sum() - expected_total) < 1e-6 * max(
+            expected_total, 1
+        ), "the planner and apply totals differ"
+        answer_ms = []
+        for question in QUESTIONS.values():
+            _, seconds = timed(lambda: answer_question(question, features))
+            answer_ms.append(seconds * 1000)
+        print(
+            f"{num_rows:>10,} {apply_total_s:>14.3f} {apply_per_year_s:>17.3f}"
+            f" {features_s:>11.3f} "
+            + " ".join(f"{ms:>15.1f}" for ms in answer_ms)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Transaction classification cost for 10k, 100k and 1M rows.
+
+Compares the per-row `Series.apply` of `TransactionAnalyzer._classify_transaction`
+and `_categorize_transaction` with the vectorised `KeywordClassifier`s, on the
+descriptions of data/transactions.csv repeated to the number of rows, and
+checks that both give the same labels.
+
+    python benchmarks/bench_transaction_classifier.py [--csv data/transactions.csv]
+"""
+
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from financial_advisor.sub_agents.data_analyst.enhanced_csv_tool import (
+    TransactionAnalyzer,
+)
+from financial_advisor.sub_agents.data_analyst.transaction_classifier import (
+    KeywordClassifier,
+)
+
+NUM_ROWS = (10_000, 100_000, 1_000_000)
+DEFAULT_CSV = os.path.join(
+    os.path.dirname(__file__), "../../../../data/transactions.csv"
+)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="The transactions CSV.")
+    args = parser.parse_args()
+
+    descriptions = pd.read_csv(args.csv)["mentionText"]
+    # The scalar methods do not use the state of the analyzer.
+    analyzer = TransactionAnalyzer.__new__(TransactionAnalyzer)
+
+    print(f"{'rows':>10} {'apply s':>10} {'vectorised s':>13} {'speedup':>8}")
+    for num_rows in NUM_ROWS:
+        texts = pd.Series(
+            [descriptions.iloc[i % len(descriptions)] for i in range(num_rows)]
+        )
+
+        (types, categories), apply_time = timed(
+            lambda: (
+                texts.apply(analyzer._classify_transaction),
+                texts.apply(analyzer._categorize_transaction),
+            )
+        )
+
+        def vectorised():
+            lowered = KeywordClassifier.lowercase(texts)
+            return (
+                TransactionAnalyzer.TYPE_CLASSIFIER.classify(texts, lowered),
+                TransactionAnalyzer.CATEGORY_CLASSIFIER.classify(texts, lowered),
+            )
+
+        (vector_types, vector_categories), vector_time = timed(vectorised)
+        assert types.tolist() == vector_types.tolist()
+        assert categories.tolist() == vector_categories.tolist()
+        print(
+            f"{num_rows:>10,} {apply_time:>10.2f} {vector_time:>13.2f}"
+            f" {apply_time / vector_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -18,7 +18,7 @@ from google.adk import Agent
 from google.adk.tools import google_search
 
 from . import prompt
-from .csv_utils import load_transactions_csv, answer_csv_question
+from .csv_utils import load_transactions_csv, load_transaction_features, answer_csv_question
 from .csv_tool import csv_qa_llm
 
 MODEL = "gemini-2.5-pro-preview-05-06"
@@ -34,4 +34,4 @@ data_analyst_agent = Agent(
 # Example: function to answer questions about the CSV file
 def answer_question_about_csv(question: str) -> str:
     df = load_transactions_csv()
-    return answer_csv_question(df, question)
+    return answer_csv_question(df, question, load_transaction_features())
@@ -1,10 +1,13 @@
 from google.adk.tools.function_tool import FunctionTool
 import google.generativeai as genai
-import pandas as pd
 import json
 import os
 from pathlib import Path
 from .genai_setup import setup_genai
+from .llm_context import DEFAULT_MAX_TOKENS, build_context
+from .query_planner import answer_question, prepare_transactions
+from .transaction_store import get_transaction_store
+
 
 async def get_available_model():
     """Get basic model that's guaranteed to work"""
@@ -64,14 +67,30 @@ async def get_available_model():
         print(f"Error listing models: {str(e)}")
         return None
 
-async def csv_qa_llm_tool(question: str, max_rows: int | None = 20) -> str:
+async def csv_qa_llm_tool(question: str, max_rows: int | None = 20,
+                          max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
     """
     Enhanced tool for analyzing CSV transaction data using Google's Generative AI.
     
     Args:
         question: The question to analyze
-        max_rows: Maximum number of rows to analyze. Use None for all rows.
+        max_rows: Maximum number of sample transactions shown to the model, on
+            top of the aggregates of all rows. Use None to fit as many as the
+            token budget allows.
+        max_tokens: Estimated token budget of the transaction context.
     """
+    # Answer totals, counts, breakdowns and top transactions without the LLM
+    try:
+        features = get_transaction_store().derived(
+            'query_planner.features', prepare_transactions)
+        answer = answer_question(question, features)
+        if answer is not None:
+            return answer
+    except FileNotFoundError:
+        return "Error: Transaction data file not found"
+    except Exception as e:
+        print(f"Query planner failed, falling back to the LLM: {str(e)}")
+
     # Ensure GenAI is set up
     if not setup_genai():
         return "Error: Google Generative AI is not properly configured. Please check your API key."
@@ -85,48 +104,30 @@ async def csv_qa_llm_tool(question: str, max_rows: int | None = 20) -> str:
         # Model is now confirmed available
         print(f"Proceeding with model: {model_name}")
         
-        # Load data
-        data_path = Path('/workspaces/adk-samples/data/transactions.csv')
-        if not data_path.exists():
+        # Aggregates and samples of the transactions, within the token budget
+        store = get_transaction_store()
+        if not Path(store.csv_path).exists():
             return "Error: Transaction data file not found"
             
         try:
-            transactions_df = pd.read_csv(data_path)
-            # Sort by date if available
-            if 'dateValue' in transactions_df.columns:
-                transactions_df['dateValue'] = pd.to_datetime(transactions_df['dateValue'], format='%d/%m/%y', errors='coerce')
-                transactions_df = transactions_df.sort_values('dateValue', ascending=False)
+            features = store.derived('query_planner.features', prepare_transactions)
         except Exception as e:
             return f"Error loading transaction data: {str(e)}"
-        
-        # Get subset based on question
-        if 'highest' in question.lower() or 'top' in question.lower():
-            if 'amount' in transactions_df.columns:
-                transactions_df = transactions_df.nlargest(5, 'amount')
-        
-        # Create a subset of the data for analysis
-        if max_rows is not None:
-            sample = transactions_df.head(max_rows)
-        else:
-            sample = transactions_df  # Use all rows
-            print(f"Analyzing all {len(transactions_df)} rows...")
-            
-        sample = sample.fillna('')
-        transactions_text = sample.to_string(index=False)
+        transactions_text = build_context(features, question, max_tokens, max_rows)
         
         # Create a structured prompt for the LLM
         prompt = f"""You are a helpful financial analysis assistant. Answer this question about the transaction data:
 "{question}"
 
-Here is a sample of the transactions to analyze (limited to {max_rows} rows for brevity):
+Here are aggregates of all the transactions, and samples of the transactions relevant to the question, as CSV tables:
 
 {transactions_text}
 
 Columns explained:
-- dateValue: Date of transaction
-- mentionText: Transaction description
-- amount: Transaction amount (positive for credits, negative for debits)
-- Other columns: Additional transaction details
+- date: Date of transaction
+- amount: Transaction amount found in the transaction record
+- category: Category of the transaction, guessed from its description
+- description: Transaction description
 
 Please provide:
 1. Direct answer to the question with specific numbers
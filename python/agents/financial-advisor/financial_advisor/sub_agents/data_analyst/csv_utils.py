@@ -1,76 +1,47 @@
 # Utility functions for reading and analyzing CSV files for the financial advisor agent
 import pandas as pd
 from typing import Optional
-import re
-import datetime
+from .query_planner import answer_question, prepare_transactions
+from .transaction_store import get_transaction_store
 
-def load_transactions_csv(csv_path: str = "/workspaces/adk-samples/data/transactions.csv") -> pd.DataFrame:
-    """Load the transactions CSV file into a pandas DataFrame."""
-    return pd.read_csv(csv_path)
+def load_transactions_csv(csv_path: Optional[str] = None) -> pd.DataFrame:
+    """Load the transactions CSV file into a pandas DataFrame.
+
+    The file is read through the shared transaction store, so it is only parsed
+    again when it changes. Defaults to the `TRANSACTIONS_CSV_PATH` file.
+    """
+    return get_transaction_store(csv_path).frame().copy()
+
+
+def load_transaction_features(csv_path: Optional[str] = None) -> pd.DataFrame:
+    """Return the typed features of the transactions CSV used by the query plans.
+
+    They are computed once per version of the file, and shared: copy them
+    before modifying them.
+    """
+    return get_transaction_store(csv_path).derived(
+        'query_planner.features', prepare_transactions)
 
 
-def answer_csv_question(df: pd.DataFrame, question: str) -> str:
+def answer_csv_question(df: pd.DataFrame, question: str,
+                        features: Optional[pd.DataFrame] = None) -> str:
     """
     Answer a question about the transactions DataFrame using pandas.
-    This is a placeholder for more advanced logic or LLM integration.
+
+    Totals, counts, breakdowns per year, month or category and top transactions
+    are computed by the query planner; `df` is not modified.
+
+    Args:
+        df: The transactions.
+        question: The question.
+        features: `prepare_transactions(df)`, if already computed, e.g. by
+            `load_transaction_features`.
     """
-    # Try to extract money values from both 'moneyValue' and text columns
-    money = pd.to_numeric(df["moneyValue"], errors="coerce")
-    # Try to extract money values from 'mentionText' column if present
-    if "mentionText" in df.columns:
-        def extract_money(text):
-            if pd.isna(text):
-                return 0.0
-            matches = re.findall(r"[\d,]+\.\d{2}", str(text))
-            return sum(float(m.replace(",", "")) for m in matches)
-        mention_money = df["mentionText"].apply(extract_money)
-        money = money.fillna(0) + mention_money.fillna(0)
-    total = money.sum()
-    # Normalize question for flexible matching
-    q = question.lower().replace("spent", "spend").replace("so far", "").replace("so dar", "")
-    if ("total" in q or "sum" in q or "spend" in q or "amount" in q or "inr" in q):
-        return (
-            "Based on your transaction records, the total money value is: "
-            f"**₹{total:,.2f}** INR.\n\n"
-            "This includes all amounts found in both structured and unstructured fields of your CSV. "
-            "If you need a breakdown or more details, just ask!"
-        )
-    if "count" in q:
-        return (
-            f"You have **{len(df):,}** transactions recorded in your CSV.\n\n"
-            "Let me know if you want to analyze a specific type or time period!"
-        )
-    # Yearly breakdown for last 3 years
-    if ("per year" in q or "yearly" in q or "each year" in q) and ("last 3" in q or "past 3" in q or "three year" in q):
-        # Try to parse dateValue or mentionText for year
-        if "dateValue" in df.columns:
-            # Try to parse year from dateValue
-            def extract_year(val):
-                try:
-                    return datetime.datetime.strptime(str(val), "%d/%m/%y").year
-                except Exception:
-                    return None
-            years = df["dateValue"].apply(extract_year)
-        else:
-            years = None
-        if years is not None:
-            df["_year"] = years
-            recent_years = sorted([y for y in years.unique() if y is not None and not pd.isna(y)], reverse=True)[:3]
-            breakdown = []
-            for y in recent_years:
-                year_sum = pd.to_numeric(df[df["_year"] == y]["moneyValue"], errors="coerce").sum()
-                # Add mentionText extraction
-                if "mentionText" in df.columns:
-                    mention_money = df[df["_year"] == y]["mentionText"].apply(extract_money).sum()
-                    year_sum += mention_money
-                breakdown.append(f"{y}: **₹{year_sum:,.2f}** INR")
-            return (
-                "Here is your spending per year for the last 3 years (from your CSV):\n\n" +
-                "\n".join(breakdown) +
-                "\n\nLet me know if you want a different breakdown or more details!"
-            )
-        else:
-            return "Sorry, I couldn't extract years from your data. Please ensure 'dateValue' column is present and formatted as DD/MM/YY."
+    if features is None:
+        features = prepare_transactions(df)
+    answer = answer_question(question, features)
+    if answer is not None:
+        return answer
     return (
         "I'm sorry, I couldn't understand your question. "
         "Please ask about totals, counts, or specify a column or type of transaction you want to analyze."
@@ -2,9 +2,11 @@ from google.adk.tools.function_tool import FunctionTool
 from google.adk import Agent, InvocationContext
 from google.adk.tools.tool_context import ToolContext
 import pandas as pd
-from typing import Dict, Any
-import json
+from typing import Dict, Any, Optional
 from datetime import datetime
+from .llm_context import DEFAULT_MAX_TOKENS, build_context, estimate_tokens
+from .transaction_classifier import KeywordClassifier, KeywordRule
+from .transaction_store import get_transaction_store
 
 class TransactionAnalyzer:
     """Helper class for sophisticated financial transaction analysis"""
@@ -21,6 +23,29 @@ class TransactionAnalyzer:
         'EMI': ['emi', 'loan', 'mortgage', 'installment'],
         'TRAVEL': ['travel', 'flight', 'hotel', 'bus', 'train', 'taxi', 'uber']
     }
+
+    # Checked after the UPI-specific classification
+    TRANSACTION_TYPE_INDICATORS = {
+        'BILL_PAYMENT': ['billpay', 'bill payment', 'utility'],
+        'SALARY': ['salary', 'sal cr', 'monthly pay'],
+        'INTEREST': ['interest', 'int.', 'int cr'],
+        'ATM': ['atm', 'cash withdrawal'],
+        'TRANSFER': ['transfer', 'trf', 'neft', 'rtgs', 'imps'],
+        'INVESTMENT': ['investment', 'mutual fund', 'shares'],
+        'REFUND': ['refund', 'cashback', 'return'],
+        'LOAN': ['loan', 'emi', 'mortgage']
+    }
+    UPI_RECEIVED_INDICATORS = ['received', 'credit', 'credited']
+
+    # Vectorised equivalents of _classify_transaction and _categorize_transaction
+    TYPE_CLASSIFIER = KeywordClassifier(
+        [KeywordRule('UPI_RECEIVED', ['upi'], UPI_RECEIVED_INDICATORS),
+         KeywordRule('UPI_PAYMENT', ['upi'])]
+        + [KeywordRule(tx_type, indicators)
+           for tx_type, indicators in TRANSACTION_TYPE_INDICATORS.items()])
+    CATEGORY_CLASSIFIER = KeywordClassifier(
+        [KeywordRule(category, keywords)
+         for category, keywords in TRANSACTION_CATEGORIES.items()])
     
     def __init__(self, df: pd.DataFrame):
         """Initialize with transaction DataFrame and perform preprocessing"""
@@ -48,8 +73,11 @@ class TransactionAnalyzer:
             self.df['has_valid_date'] = ~self.df['parsed_date'].isna()
             
             # Enhanced transaction classification
-            self.df['transaction_type'] = self.df['mentionText'].apply(self._classify_transaction)
-            self.df['transaction_category'] = self.df['mentionText'].apply(self._categorize_transaction)
+            lowered_text = KeywordClassifier.lowercase(self.df['mentionText'])
+            self.df['transaction_type'] = self.TYPE_CLASSIFIER.classify(
+                self.df['mentionText'], lowered_text)
+            self.df['transaction_category'] = self.CATEGORY_CLASSIFIER.classify(
+                self.df['mentionText'], lowered_text)
             
             # Add derived time-based features
             self.df['month_year'] = self.df['parsed_date'].dt.to_period('M')
@@ -86,7 +114,7 @@ class TransactionAnalyzer:
         }
             
     def _classify_transaction(self, text: str) -> str:
-        """Enhanced transaction type classification"""
+        """Enhanced transaction type classification of a single description"""
         if pd.isna(text):
             return 'UNKNOWN'
         
@@ -94,30 +122,19 @@ class TransactionAnalyzer:
         
         # UPI-specific classification
         if 'upi' in text:
-            if any(word in text for word in ['received', 'credit', 'credited']):
+            if any(word in text for word in self.UPI_RECEIVED_INDICATORS):
                 return 'UPI_RECEIVED'
             return 'UPI_PAYMENT'
             
         # Other transaction types
-        type_indicators = {
-            'BILL_PAYMENT': ['billpay', 'bill payment', 'utility'],
-            'SALARY': ['salary', 'sal cr', 'monthly pay'],
-            'INTEREST': ['interest', 'int.', 'int cr'],
-            'ATM': ['atm', 'cash withdrawal'],
-            'TRANSFER': ['transfer', 'trf', 'neft', 'rtgs', 'imps'],
-            'INVESTMENT': ['investment', 'mutual fund', 'shares'],
-            'REFUND': ['refund', 'cashback', 'return'],
-            'LOAN': ['loan', 'emi', 'mortgage']
-        }
-        
-        for tx_type, indicators in type_indicators.items():
+        for tx_type, indicators in self.TRANSACTION_TYPE_INDICATORS.items():
             if any(ind in text for ind in indicators):
                 return tx_type
                 
         return 'OTHER'
         
     def _categorize_transaction(self, text: str) -> str:
-        """Categorize transaction into predefined categories"""
+        """Categorize a single transaction description into predefined categories"""
         if pd.isna(text):
             return 'UNKNOWN'
             
@@ -130,7 +147,12 @@ class TransactionAnalyzer:
         return 'OTHER'
         
     def get_context_for_llm(self, question: str) -> Dict[str, Any]:
-        """Prepare comprehensive context for LLM analysis"""
+        """Prepare comprehensive context for LLM analysis
+
+        The tools now prompt with `get_prompt_context`, within a token budget.
+        This structured context stays for the callers of this public method,
+        and as the baseline of benchmarks/bench_llm_context.py.
+        """
         try:
             # Start with basic statistics
             context = {
@@ -178,6 +200,26 @@ class TransactionAnalyzer:
                 'question': question
             }
 
+    def get_prompt_context(self, question: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                           max_rows: Optional[int] = None) -> str:
+        """Prepare compact aggregates and samples of the transactions for the
+        LLM prompt, within an estimated token budget and at most `max_rows`
+        sample rows"""
+        types = ', '.join(f"{tx_type} {count}" for tx_type, count
+                          in self.statistics['transaction_types'].items())
+        weekend = self.statistics['weekend_vs_weekday']
+        header = (f"transaction types: {types}\n"
+                  f"average amount: weekend {weekend['weekend_avg']:.2f}, "
+                  f"weekday {weekend['weekday_avg']:.2f}")
+        features = pd.DataFrame({
+            'amount': self.df['amount'],
+            'date': self.df['parsed_date'],
+            'category': self.df['transaction_category'],
+            'description': self.df['mentionText'],
+        })
+        return header + '\n' + build_context(
+            features, question, max_tokens - estimate_tokens(header) - 1, max_rows)
+
 async def csv_qa_llm_tool(question: str) -> str:
     """
     Enhanced ADK Tool for sophisticated financial transaction analysis.
@@ -186,21 +228,22 @@ async def csv_qa_llm_tool(question: str) -> str:
     try:
         # Load and analyze data with error handling
         try:
-            df = pd.read_csv('/workspaces/adk-samples/data/transactions.csv')
+            store = get_transaction_store()
+            store.frame()
         except Exception as e:
             return f"Error loading transaction data: {str(e)}"
 
-        # Initialize analyzer with validation
+        # Initialize analyzer with validation, once per version of the data
         try:
-            analyzer = TransactionAnalyzer(df)
+            analyzer = store.derived('enhanced_csv_tool.analyzer', TransactionAnalyzer)
         except ValueError as e:
             return f"Error in data validation: {str(e)}"
 
-        # Get enriched context for LLM
-        context = analyzer.get_context_for_llm(question)
-        
-        if 'error' in context:
-            return f"Error analyzing data: {context['error']}"
+        # Get compact context for LLM, within the token budget
+        try:
+            context = analyzer.get_prompt_context(question)
+        except Exception as e:
+            return f"Error analyzing data: {str(e)}"
 
         # Create a sophisticated prompt for the LLM
         prompt = f"""You are an expert financial data analyst with these advanced capabilities:
@@ -209,10 +252,9 @@ async def csv_qa_llm_tool(question: str) -> str:
 - Strategic financial insights and personalized recommendations
 - Clear explanation of complex financial patterns
 
-Analyze this comprehensive transaction data context:
-```json
-{json.dumps(context, default=str, indent=2)}
-```
+Analyze these aggregates of all the transactions, and samples of the transactions relevant to the question, as CSV tables:
+
+{context}
 
 Question: "{question}"
 
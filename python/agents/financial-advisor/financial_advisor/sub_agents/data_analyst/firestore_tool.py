@@ -2,56 +2,195 @@ from google.adk.tools.function_tool import FunctionTool
 import google.generativeai as genai
 import pandas as pd
 from google.cloud import firestore
+import asyncio
+import collections
+import functools
 import json
 import os
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
 from .genai_setup import setup_genai
+from .enhanced_csv_tool import TransactionAnalyzer
+from .llm_context import DEFAULT_MAX_TOKENS, build_context
+
+# Fields read from the transaction documents, and the query page size
+TRANSACTION_FIELDS = ('dateValue', 'mentionText', 'amount')
+PAGE_SIZE = int(os.getenv('FIRESTORE_PAGE_SIZE', '1000'))
+# Seconds the transactions of a user are served from the cache
+CACHE_TTL_SECONDS = float(os.getenv('FIRESTORE_CACHE_TTL_SECONDS', '60'))
+# Maximum number of (user, max_rows) queries whose transactions are cached
+CACHE_MAX_ENTRIES = int(os.getenv('FIRESTORE_CACHE_MAX_ENTRIES', '128'))
+# Maximum number of writes in a Firestore batch
+MAX_BATCH_WRITES = 500
+
+def transactions_frame(records: List[Dict[str, Any]],
+                       fields: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Convert transaction documents to a frame, most recent first"""
+    df = pd.DataFrame.from_records(records, columns=list(fields) if fields else None)
+    if 'dateValue' in df.columns:
+        # Firestore Timestamps are timezone-aware datetimes: convert them at
+        # once, to naive UTC datetime64
+        df['dateValue'] = pd.to_datetime(
+            df['dateValue'], utc=True, errors='coerce').dt.tz_convert(None)
+        df = df.sort_values('dateValue', ascending=False, ignore_index=True)
+    return df
+
+@functools.lru_cache(maxsize=None)
+def get_firestore_client() -> firestore.Client:
+    """Returns the Firestore client shared by the process"""
+    return firestore.Client()
 
 class FirestoreDataManager:
-    """Handles Firestore data operations"""
-    def __init__(self):
-        self.db = firestore.Client()
-        
-    async def get_transactions(self, user_id: str = None, max_rows: int = 20):
-        """Fetch transactions from Firestore"""
+    """Handles Firestore data operations
+
+    Transactions are read page by page with a cursor, projected to
+    `fields`, and cached per user and query for `cache_ttl` seconds. Expired
+    queries are dropped from the cache when a query is cached, and the least
+    recently used ones beyond `cache_max_entries`. Writes through the manager
+    invalidate the cached transactions of their users.
+    """
+    def __init__(self, client: Any = None, fields: Optional[Sequence[str]] = TRANSACTION_FIELDS,
+                 page_size: int = PAGE_SIZE, cache_ttl: float = CACHE_TTL_SECONDS,
+                 cache_max_entries: int = CACHE_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            client: The Firestore client. Defaults to the shared client.
+            fields: The fields read from the documents, or None for all.
+            page_size: The maximum number of documents read per query.
+            cache_ttl: Seconds the transactions are served from the cache;
+                0 disables the cache.
+            cache_max_entries: The maximum number of cached queries.
+            clock: Returns the current time in seconds.
+        """
+        self.db = client if client is not None else get_firestore_client()
+        self.fields = list(fields) if fields else None
+        self.page_size = page_size
+        self.cache_ttl = cache_ttl
+        self.cache_max_entries = cache_max_entries
+        self.clock = clock
+        self.num_queries = 0
+        self._cache = collections.OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _query(self, user_id: Optional[str]):
+        query = self.db.collection('transactions')
+        if user_id:
+            query = query.where('userId', '==', user_id)
+        if self.fields:
+            query = query.select(self.fields)
+        # A total order, for the cursor of the next page
+        return query.order_by('__name__')
+
+    def _read(self, user_id: Optional[str], max_rows: Optional[int]) -> pd.DataFrame:
+        """Reads the documents page by page, into typed columns"""
+        query = self._query(user_id)
+        records = []
+        last = None
+        while max_rows is None or len(records) < max_rows:
+            limit = self.page_size if max_rows is None else min(self.page_size, max_rows - len(records))
+            page = query.limit(limit)
+            if last is not None:
+                page = page.start_after(last)
+            docs = list(page.stream())
+            self.num_queries += 1
+            records.extend(doc.to_dict() for doc in docs)
+            if len(docs) < limit:
+                break
+            last = docs[-1]
+
+        return transactions_frame(records, self.fields)
+
+    async def get_transactions(self, user_id: str = None, max_rows: Optional[int] = 20):
+        """Fetch transactions from Firestore, or from the cache if fetched
+        less than `cache_ttl` seconds ago
+
+        The returned frame is shared with the cache: copy it before modifying
+        it. Use `max_rows=None` to fetch all the transactions.
+        """
+        key = (user_id or None, max_rows)
+        now = self.clock()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > now:
+                self._cache.move_to_end(key)
+                return cached[1]
         try:
-            # Reference to transactions collection
-            transactions_ref = self.db.collection('transactions')
-            
-            # Build query
-            query = transactions_ref
-            if user_id:
-                query = query.where('userId', '==', user_id)
-                
-            # Get documents
-            docs = query.limit(max_rows).stream()
-            
-            # Convert to list of dicts
-            transactions = []
-            for doc in docs:
-                data = doc.to_dict()
-                # Convert Firestore Timestamp to datetime if exists
-                if 'dateValue' in data:
-                    data['dateValue'] = data['dateValue'].strftime('%d/%m/%y')
-                transactions.append(data)
-                
-            # Convert to DataFrame for consistency with CSV tool
-            df = pd.DataFrame(transactions)
-            if 'dateValue' in df.columns:
-                df['dateValue'] = pd.to_datetime(df['dateValue'], format='%d/%m/%y', errors='coerce')
-                df = df.sort_values('dateValue', ascending=False)
-                
-            return df
-            
+            df = await asyncio.to_thread(self._read, user_id, max_rows)
         except Exception as e:
             print(f"Error fetching from Firestore: {str(e)}")
             return None
+        if self.cache_ttl:
+            with self._cache_lock:
+                for expired in [k for k, (expiry, _) in self._cache.items() if expiry <= now]:
+                    del self._cache[expired]
+                self._cache[key] = (now + self.cache_ttl, df)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_max_entries:
+                    self._cache.popitem(last=False)
+        return df
+
+    def invalidate(self, user_id: str = None):
+        """Drop the cached transactions of a user, or of all users if None"""
+        with self._cache_lock:
+            for key in list(self._cache):
+                # Queries of all the users include the user's transactions
+                if user_id is None or key[0] in (user_id, None):
+                    del self._cache[key]
+
+    async def add_transactions(self, transactions: List[Dict[str, Any]]) -> List[str]:
+        """Write new transaction documents, and invalidate the cached
+        transactions of their users
 
-async def firestore_qa_llm_tool(question: str, user_id: str = None, max_rows: int = 20) -> str:
+        Returns:
+            The IDs of the new documents.
+        """
+        collection = self.db.collection('transactions')
+        ids = []
+        for start in range(0, len(transactions), MAX_BATCH_WRITES):
+            batch = self.db.batch()
+            for data in transactions[start:start + MAX_BATCH_WRITES]:
+                ref = collection.document()
+                batch.set(ref, data)
+                ids.append(ref.id)
+            await asyncio.to_thread(batch.commit)
+        for user_id in {data.get('userId') for data in transactions}:
+            self.invalidate(user_id)
+        return ids
+
+_firestore_manager = None
+_firestore_manager_lock = threading.Lock()
+
+def get_firestore_manager() -> FirestoreDataManager:
+    """Returns the data manager shared by the process, created on first use"""
+    global _firestore_manager
+    with _firestore_manager_lock:
+        if _firestore_manager is None:
+            _firestore_manager = FirestoreDataManager()
+        return _firestore_manager
+
+def transaction_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Map Firestore transactions to the columns of the LLM context builder"""
+    def column(name, default):
+        return df[name] if name in df.columns else pd.Series(default, index=df.index)
+    description = column('mentionText', None)
+    return pd.DataFrame({
+        'amount': pd.to_numeric(column('amount', 0.0), errors='coerce').fillna(0.0),
+        'date': pd.to_datetime(column('dateValue', pd.NaT), errors='coerce'),
+        'category': TransactionAnalyzer.CATEGORY_CLASSIFIER.classify(description),
+        'description': description,
+    })
+
+async def firestore_qa_llm_tool(question: str, user_id: str = None, max_rows: int = 20,
+                                max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
     """
     Enhanced tool for analyzing Firestore transaction data using Google's Generative AI.
     Similar to csv_qa_llm_tool but uses Firestore as data source.
+    The prompt gets aggregates and samples of the fetched transactions,
+    within the estimated `max_tokens` budget.
     """
     # Ensure GenAI is set up
     if not setup_genai():
@@ -63,34 +202,29 @@ async def firestore_qa_llm_tool(question: str, user_id: str = None, max_rows: in
         print(f"Using model: {GENAI_MODEL}")
         
         # Initialize Firestore manager and get data
-        firestore_manager = FirestoreDataManager()
+        firestore_manager = get_firestore_manager()
         transactions_df = await firestore_manager.get_transactions(user_id, max_rows)
         
         if transactions_df is None or transactions_df.empty:
             return "Error: No transaction data found in Firestore"
         
-        # Get subset based on question
-        if 'highest' in question.lower() or 'top' in question.lower():
-            if 'amount' in transactions_df.columns:
-                transactions_df = transactions_df.nlargest(5, 'amount')
-        
-        # Create a subset of the data for analysis
-        sample = transactions_df.head(max_rows).fillna('')
-        transactions_text = sample.to_string(index=False)
+        # Aggregates and samples of the transactions, within the token budget
+        transactions_text = build_context(
+            transaction_features(transactions_df), question, max_tokens)
         
         # Create a structured prompt for the LLM
         prompt = f"""You are a helpful financial analysis assistant. Answer this question about the transaction data:
 "{question}"
 
-Here is a sample of the transactions to analyze (limited to {max_rows} rows for brevity):
+Here are aggregates of the transactions (the {max_rows} fetched at most), and samples of the transactions relevant to the question, as CSV tables:
 
 {transactions_text}
 
 Columns explained:
-- dateValue: Date of transaction
-- mentionText: Transaction description
+- date: Date of transaction
 - amount: Transaction amount (positive for credits, negative for debits)
-- Other columns: Additional transaction details
+- category: Category of the transaction, guessed from its description
+- description: Transaction description
 
 Please provide:
 1. Direct answer to the question with specific numbers
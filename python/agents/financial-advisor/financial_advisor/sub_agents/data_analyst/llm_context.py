@@ -0,0 +1,202 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Token-budgeted transaction context for the LLM prompts of the tools.
+
+Instead of whole frames rendered with `DataFrame.to_string` or statistics
+dumped as indented JSON, the prompt gets, within a token budget:
+
+1. Aggregates of all the transactions: a summary line, and the count and total
+   per month and per category.
+2. Stratified samples of the transactions relevant to the question, i.e. of
+   the categories and year it names: the top ones by amount, the most recent
+   ones, and the top ones of each category. Rows are taken from the samples in
+   turn until the budget is spent, and shown once.
+
+Tables are written as CSV, the densest tabular encoding for the model.
+Tokens are estimated at `CHARS_PER_TOKEN` characters per token.
+
+The tools pass frames of transaction features with the columns:
+- amount: The amount of the transaction.
+- date: The date of the transaction, datetime64.
+- category: The `TransactionAnalyzer` category of the transaction.
+- description: The transaction description.
+"""
+import os
+import re
+from typing import List, Optional
+
+import pandas as pd
+
+DEFAULT_MAX_TOKENS = int(os.getenv('LLM_CONTEXT_MAX_TOKENS', '4000'))
+CHARS_PER_TOKEN = 4
+MAX_DESCRIPTION_CHARS = 80
+# Share of the budget the aggregates may use before older months are left out
+MAX_AGGREGATE_SHARE = 0.5
+SAMPLE_COLUMNS = ['date', 'amount', 'category', 'description']
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of tokens of a text."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _csv(df: pd.DataFrame) -> str:
+    return df.to_csv(index=False, float_format='%.2f', lineterminator='\n').rstrip('\n')
+
+
+def _sample_rows(rows: pd.DataFrame) -> pd.DataFrame:
+    """Formats sample rows compactly: ISO dates, and single-line, truncated
+    descriptions."""
+    description = rows['description'].astype('string').fillna('').str.split().str.join(' ')
+    long = description.str.len() > MAX_DESCRIPTION_CHARS
+    description = description.where(
+        ~long, description.str.slice(0, MAX_DESCRIPTION_CHARS - 1) + '…')
+    return pd.DataFrame({
+        'date': rows['date'].dt.strftime('%Y-%m-%d').fillna(''),
+        'amount': rows['amount'],
+        'category': rows['category'],
+        'description': description,
+    })
+
+
+def _mentioned(question: str, values) -> List[str]:
+    """Returns the values, e.g. categories, named in the question."""
+    q = question.lower()
+    return [value for value in values
+            if isinstance(value, str) and re.search(rf"\b{re.escape(value.lower())}s?\b", q)]
+
+
+def _aggregates(features: pd.DataFrame, max_tokens: int) -> str:
+    amount = features['amount']
+    dates = features['date'].dropna()
+    summary = f"transactions: {len(features)}"
+    if len(dates):
+        summary += (f"; dates: {dates.min():%Y-%m-%d} to {dates.max():%Y-%m-%d}"
+                    f"; undated: {len(features) - len(dates)}")
+    summary += f"; total amount: {amount.sum():.2f}"
+    if (amount < 0).any():
+        summary += (f"; credits: {amount[amount > 0].sum():.2f}"
+                    f"; debits: {amount[amount < 0].sum():.2f}")
+
+    categories = features.groupby('category')['amount'].agg(['count', 'sum'])
+    categories = categories.sort_values('sum', ascending=False).reset_index()
+    sections = [summary, '## Per category', _csv(categories.rename(columns={'sum': 'total'}))]
+
+    months = features.groupby(features['date'].dt.to_period('M'))['amount'].agg(['count', 'sum'])
+    if len(months):
+        months = months.sort_index(ascending=False).reset_index()
+        months = months.rename(columns={'date': 'month', 'sum': 'total'})
+        lines = _csv(months).split('\n')
+        budget = max_tokens - estimate_tokens('\n'.join(sections)) - 10
+        kept = 1
+        while kept < len(lines) and estimate_tokens('\n'.join(lines[:kept + 1])) <= budget:
+            kept += 1
+        header = '## Per month, most recent first'
+        if kept < len(lines):
+            header += f' ({len(lines) - kept} older months left out)'
+        if kept > 1:
+            sections += [header, '\n'.join(lines[:kept])]
+    return '\n'.join(sections)
+
+
+def _strata(rows: pd.DataFrame, question: str):
+    """Returns the (title, ordered row labels) of the samples."""
+    by_amount = rows['amount'].abs().sort_values(ascending=False, kind='stable')
+    top = ('Top by amount', list(by_amount.index))
+    recent = ('Most recent', list(
+        rows['date'].dropna().sort_values(ascending=False, kind='stable').index))
+    # The top rows of each category in turn, so that every category is shown
+    rank = by_amount.groupby(rows.loc[by_amount.index, 'category']).cumcount()
+    per_category = ('Top per category', list(rank.sort_values(kind='stable').index))
+    q = question.lower()
+    if re.search(r"\b(recent|latest|last|new)", q) and not re.search(r"\b(top|highest|largest|biggest)\b", q):
+        return [recent, top, per_category]
+    return [top, recent, per_category]
+
+
+def build_context(features: pd.DataFrame, question: str,
+                  max_tokens: int = DEFAULT_MAX_TOKENS,
+                  max_rows: Optional[int] = None) -> str:
+    """Builds the transaction context of a question within a token budget.
+
+    Args:
+        features: The transactions, with the columns `amount`, `date`,
+            `category` and `description`.
+        question: The question, whose categories and year select the sampled
+            transactions.
+        max_tokens: The estimated token budget of the context.
+        max_rows: The maximum number of sampled transactions, or None to fit
+            as many as the budget allows.
+
+    Returns:
+        The context, in Markdown sections of CSV tables.
+    """
+    context = _aggregates(features, int(max_tokens * MAX_AGGREGATE_SHARE))
+
+    rows = features
+    scope = []
+    categories = _mentioned(question, features['category'].unique())
+    if categories:
+        rows = rows[rows['category'].isin(categories)]
+        scope.append(f"categories {', '.join(categories)}")
+    year = re.search(r"\b((?:19|20)\d{2})\b", question)
+    if year:
+        rows = rows[rows['date'].dt.year == int(year.group(1))]
+        scope.append(f"year {year.group(1)}")
+    rows = rows.reset_index(drop=True)
+    if scope:
+        context += f"\nSampled transactions restricted to {' and '.join(scope)}: {len(rows)} rows"
+
+    # Take rows from each sample in turn while they fit in the budget
+    lines = _csv(_sample_rows(rows)).split('\n')[1:] if len(rows) else []
+    line_tokens = dict(zip(rows.index, (estimate_tokens(line) + 1 for line in lines)))
+    header_tokens = estimate_tokens(f"\n## Top per category\n{','.join(SAMPLE_COLUMNS)}\n")
+    remaining = max_tokens - estimate_tokens(context)
+    strata = _strata(rows, question)
+    positions = [0] * len(strata)
+    # Length of the prefix of each sample taken
+    taken = [0] * len(strata)
+    seen = set()
+    while max_rows is None or len(seen) < max_rows:
+        added = False
+        for i, (_, order) in enumerate(strata):
+            while positions[i] < len(order) and order[positions[i]] in seen:
+                positions[i] += 1
+            if positions[i] == len(order):
+                continue
+            label = order[positions[i]]
+            cost = line_tokens[label] + (header_tokens if not taken[i] else 0)
+            if cost > remaining:
+                positions[i] = len(order)
+                continue
+            remaining -= cost
+            seen.add(label)
+            positions[i] += 1
+            taken[i] = positions[i]
+            added = True
+            if max_rows is not None and len(seen) >= max_rows:
+                break
+        if not added:
+            break
+
+    # Show each row in the first sample whose taken prefix holds it, e.g. the
+    # top row of a category in the top by amount if it is one of them.
+    unshown = set(seen)
+    for (title, order), length in zip(strata, taken):
+        labels = [label for label in order[:length] if label in unshown]
+        unshown.difference_update(labels)
+        if labels:
+            context += f"\n## {title}\n{_csv(_sample_rows(rows.loc[labels]))}"
+    return context
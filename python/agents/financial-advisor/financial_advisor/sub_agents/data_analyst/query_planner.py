@@ -0,0 +1,311 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Deterministic answers to common questions about the transactions.
+
+Questions asking for a total, a count, a breakdown per year, month or category,
+or the top N transactions are matched by keywords to a `QueryPlan`, and answered
+with vectorised pandas aggregations over a frame of typed transaction features
+instead of an LLM call. The features, the amount and date parsed from each row
+and its category, are computed once per version of the data with
+`TransactionStore.derived`.
+
+Questions no plan matches, asking for an analysis such as patterns or advice,
+or with qualifiers the plans do not parse, e.g. a merchant, a month, an amount
+threshold or a date range, are left to the LLM tools: a plan only answers a
+question all of whose words it covers.
+"""
+import re
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from .enhanced_csv_tool import TransactionAnalyzer
+
+# Money values written in the descriptions, e.g. "20,000.00"
+MONEY_PATTERN = r"[\d,]+\.\d{2}"
+# Statement lines start with the transaction date, e.g. "28/06/24 UPI-..."
+LEADING_DATE_PATTERN = r"\d{2}/\d{2}/\d{2}\b"
+
+# Questions asking for more than an aggregate are left to the LLM.
+ANALYSIS_WORDS = re.compile(
+    r"\b(pattern|trend|why|insight|recommend|advi[cs]e|suggest|should|compare"
+    r"|analy[sz]|unusual|anomal|habit|budget)")
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+}
+NUMBER = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+DEFAULT_TOP_N = 5
+
+# Words that do not qualify the transactions a plan aggregates. Any other word
+# left in a question once the plan's category, year and numbers are taken out,
+# e.g. "amazon", "june", "500" or "between", makes it fall through to the LLM.
+QUESTION_WORDS = frozenset("""
+    a all amount amounts an annual annually are at biggest by can categories
+    category count csv data did do does each far for from get give had has
+    have highest how i in inr is largest list many me money month monthly
+    months much my number of on overall per please recorded rs rupees show so
+    spend spending spends sum tell the to top total transaction transactions
+    value values was were what whats wise year yearly years you
+""".split())
+
+
+class QueryPlan(NamedTuple):
+    """An aggregation answering a question.
+
+    `intent` is 'total', 'count', 'per_period', 'per_category' or 'top_n'.
+    """
+    intent: str
+    period: Optional[str] = None  # 'year' or 'month', for 'per_period'
+    limit: Optional[int] = None  # Most recent periods, or top transactions
+    category: Optional[str] = None  # Only the transactions of a category
+    year: Optional[int] = None  # Only the transactions of a year
+
+
+def _money_in_texts(texts: pd.Series) -> np.ndarray:
+    """Sums the money values written in each text, like `re.findall` per row.
+
+    Most descriptions hold at most one money value: the regex engine counts
+    them and cuts out single values for all the rows at once, and only the
+    few texts with several values are scanned in Python.
+    """
+    counts = texts.str.count(MONEY_PATTERN).fillna(0).to_numpy()
+    amount = np.zeros(len(texts))
+    single = counts == 1
+    values = texts[single].str.replace(
+        rf"(?s)^.*?({MONEY_PATTERN}).*$", r"\1", regex=True)
+    amount[single] = pd.to_numeric(values.str.replace(',', '', regex=False))
+    several = np.flatnonzero(counts > 1)
+    amount[several] = [
+        sum(float(m.replace(',', '')) for m in re.findall(MONEY_PATTERN, text))
+        for text in texts.iloc[several]
+    ]
+    return amount
+
+
+def prepare_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """Computes the typed features the plans aggregate, without modifying `df`.
+
+    Returns:
+        A frame with the index of `df` and the columns:
+        - amount: `moneyValue` plus the money values written in `mentionText`.
+        - date: `dateValue` as DD/MM/YY or YYYY-MM-DD, else the date leading
+          the `mentionText` statement line, if any.
+        - year, month: The year and month period of the date.
+        - category: The `TransactionAnalyzer` category of `mentionText`.
+        - description: `mentionText`.
+    """
+    if 'moneyValue' in df.columns:
+        amount = pd.to_numeric(df['moneyValue'], errors='coerce').fillna(0.0)
+    else:
+        amount = pd.Series(0.0, index=df.index)
+    amount = amount.to_numpy(dtype=float)
+    date = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+
+    if 'mentionText' in df.columns:
+        texts = df['mentionText'].astype('string')
+        amount = amount + _money_in_texts(texts)
+        stripped = texts.str.lstrip()
+        leading_date = pd.to_datetime(
+            stripped.str.slice(0, 8).where(
+                stripped.str.match(LEADING_DATE_PATTERN, na=False)),
+            format='%d/%m/%y', errors='coerce')
+        date = date.fillna(leading_date.astype('datetime64[ns]'))
+        category = TransactionAnalyzer.CATEGORY_CLASSIFIER.classify(df['mentionText'])
+        description = df['mentionText']
+    else:
+        category = pd.Series('UNKNOWN', index=df.index, dtype=object)
+        description = pd.Series(pd.NA, index=df.index, dtype=object)
+
+    if 'dateValue' in df.columns:
+        values = df['dateValue'].astype('string')
+        date_value = pd.to_datetime(values, format='%d/%m/%y', errors='coerce').fillna(
+            pd.to_datetime(values, format='%Y-%m-%d', errors='coerce'))
+        date = date_value.astype('datetime64[ns]').fillna(date)
+
+    return pd.DataFrame({
+        'amount': amount,
+        'date': date,
+        'year': date.dt.year.astype('Int64'),
+        'month': date.dt.to_period('M'),
+        'category': category,
+        'description': description,
+    }, index=df.index)
+
+
+def _number(text: Optional[str]) -> Optional[int]:
+    if text is None:
+        return None
+    return NUMBER_WORDS.get(text) or int(text)
+
+
+def _mentioned_category(q: str) -> tuple[Optional[str], Optional[re.Match]]:
+    """Returns the category named in the question, e.g. 'bills', and its match,
+    if exactly one is."""
+    matches = [
+        (category, match)
+        for category in TransactionAnalyzer.TRANSACTION_CATEGORIES
+        if (match := re.search(rf"\b{category.lower()}s?\b", q))
+    ]
+    return matches[0] if len(matches) == 1 else (None, None)
+
+
+def _covers(q: str, matches) -> bool:
+    """Whether the question only has filler words outside the matched parts."""
+    chars = list(q)
+    for match in matches:
+        if match:
+            start, end = match.span()
+            chars[start:end] = " " * (end - start)
+    words = re.findall(r"[a-z]+|\d[\d,.]*", "".join(chars))
+    return all(word in QUESTION_WORDS for word in words)
+
+
+def plan_query(question: str) -> Optional[QueryPlan]:
+    """Matches a question to a plan, or returns None to leave it to the LLM."""
+    q = question.lower().replace("spent", "spend").replace("so far", "")
+    if ANALYSIS_WORDS.search(q):
+        return None
+
+    category, category_match = _mentioned_category(q)
+    year_match = re.search(r"\b(?:in|for|during) ((?:19|20)\d{2})\b", q)
+    year = int(year_match.group(1)) if year_match else None
+    filters = {'category': category, 'year': year}
+
+    top = re.search(rf"\b(?:top|highest|largest|biggest)(?: {NUMBER})?\b", q)
+
+    period = None
+    if re.search(r"\b(?:per|each|by) year\b|\byearly\b|\bannual|\byear[- ]wise\b", q):
+        period = 'year'
+    elif re.search(r"\b(?:per|each|by) month\b|\bmonthly\b|\bmonth[- ]wise\b", q):
+        period = 'month'
+    # Only a per period breakdown parses the most recent periods.
+    last = period and re.search(rf"\b(?:last|past|recent) {NUMBER} {period}s?\b", q)
+    if not _covers(q, [category_match, year_match, top, last]):
+        return None
+
+    if top and 'category' not in q:
+        return QueryPlan('top_n', limit=_number(top.group(1)) or DEFAULT_TOP_N,
+                         **filters)
+
+    if re.search(r"\b(?:per|by|each) categor|\bcategory[- ]wise\b", q):
+        return QueryPlan('per_category', **filters)
+
+    if period:
+        return QueryPlan('per_period', period=period,
+                         limit=_number(last.group(1)) if last else None, **filters)
+
+    if re.search(r"\bcount\b|\bhow many\b|\bnumber of\b", q):
+        return QueryPlan('count', **filters)
+
+    if re.search(r"\b(?:total|sum|spend\w*|amount|inr)\b", q):
+        return QueryPlan('total', **filters)
+    return None
+
+
+def _transactions(count: int) -> str:
+    return f"{count:,} transaction" + ("" if count == 1 else "s")
+
+
+def _scope(plan: QueryPlan) -> str:
+    scope = ""
+    if plan.category:
+        scope += f" in the {plan.category} category"
+    if plan.year:
+        scope += f" in {plan.year}"
+    return scope
+
+
+def execute_plan(plan: QueryPlan, features: pd.DataFrame) -> str:
+    """Answers a plan with aggregations over `prepare_transactions` features."""
+    rows = features
+    if plan.category:
+        rows = rows[rows['category'] == plan.category]
+    if plan.year:
+        rows = rows[rows['year'] == plan.year]
+    scope = _scope(plan)
+
+    if plan.intent == 'total':
+        return (
+            f"Based on your transaction records, the total money value{scope} is: "
+            f"**₹{rows['amount'].sum():,.2f}** INR.\n\n"
+            "This includes all amounts found in both structured and unstructured fields of your CSV. "
+            "If you need a breakdown or more details, just ask!"
+        )
+
+    if plan.intent == 'count':
+        return (
+            f"You have **{len(rows):,}** transactions{scope} recorded in your CSV.\n\n"
+            "Let me know if you want to analyze a specific type or time period!"
+        )
+
+    if plan.intent == 'per_period':
+        sums = rows.groupby(plan.period)['amount'].agg(['sum', 'count'])
+        sums = sums.sort_index(ascending=False)
+        if plan.limit:
+            sums = sums.head(plan.limit)
+        if sums.empty:
+            return ("Sorry, I couldn't find any dated transactions. Please ensure "
+                    "'dateValue' is formatted as DD/MM/YY or YYYY-MM-DD.")
+        label = 'year' if plan.period == 'year' else 'month'
+        recent = f"the last {len(sums)} {label}s" if plan.limit else f"each {label}"
+        breakdown = [
+            f"{period}: **₹{row['sum']:,.2f}** INR ({_transactions(int(row['count']))})"
+            for period, row in sums.iterrows()
+        ]
+        return (
+            f"Here is your spending{scope} for {recent} (from your CSV):\n\n" +
+            "\n".join(breakdown) +
+            "\n\nLet me know if you want a different breakdown or more details!"
+        )
+
+    if plan.intent == 'per_category':
+        sums = rows.groupby('category')['amount'].agg(['sum', 'count'])
+        sums = sums.sort_values('sum', ascending=False)
+        breakdown = [
+            f"{category}: **₹{row['sum']:,.2f}** INR ({_transactions(int(row['count']))})"
+            for category, row in sums.iterrows()
+        ]
+        return (
+            f"Here is your spending per category{scope} (from your CSV):\n\n" +
+            "\n".join(breakdown) +
+            "\n\nLet me know if you want a different breakdown or more details!"
+        )
+
+    if plan.intent == 'top_n':
+        top = rows[rows['amount'] > 0].nlargest(plan.limit, 'amount')
+        if top.empty:
+            return f"Sorry, I couldn't find any transaction amounts{scope} in your CSV."
+        lines = []
+        for i, row in enumerate(top.itertuples(index=False), 1):
+            date = row.date.strftime('%d/%m/%Y') if not pd.isna(row.date) else 'unknown date'
+            description = ' '.join(str(row.description).split())
+            lines.append(f"{i}. **₹{row.amount:,.2f}** INR on {date}: {description}")
+        return (
+            f"Here are your top {len(top)} transactions by amount{scope} (from your CSV):\n\n" +
+            "\n".join(lines) +
+            "\n\nLet me know if you want more details on any of them!"
+        )
+
+    raise ValueError(f"Unknown query plan intent: {plan.intent}")
+
+
+def answer_question(question: str, features: pd.DataFrame) -> Optional[str]:
+    """Answers a question without an LLM, or returns None if no plan matches."""
+    plan = plan_query(question)
+    if plan is None:
+        return None
+    return execute_plan(plan, features)
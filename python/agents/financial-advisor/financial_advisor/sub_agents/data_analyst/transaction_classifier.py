@@ -0,0 +1,110 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Vectorised keyword classification of transaction descriptions.
+
+A description gets the label of the first rule, in order, with a keyword
+contained in the lowercased description, like the `any(keyword in text ...)`
+loops of `TransactionAnalyzer`. The keywords are compiled into regular
+expressions matched against many descriptions at once with pandas string
+methods, instead of looping over the rows and keywords in Python:
+
+1. One pattern of all the keywords finds the descriptions any rule can match.
+2. The pattern of each rule, in order, is only matched against the candidate
+   descriptions that no earlier rule matched.
+"""
+import re
+from typing import NamedTuple, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class KeywordRule(NamedTuple):
+    """A label, given to descriptions containing one of its keywords.
+
+    `required` keywords, if any, must also be contained, e.g. to tell a
+    received UPI transfer from a UPI payment.
+    """
+    label: str
+    keywords: Sequence[str]
+    required: Sequence[str] = ()
+
+
+def keyword_pattern(keywords: Sequence[str]) -> str:
+    """Returns a regular expression matching any of the keywords literally."""
+    # Longest first, so that the regex engine can stop at the first match.
+    keywords = sorted(set(keywords), key=len, reverse=True)
+    return "|".join(re.escape(keyword) for keyword in keywords)
+
+
+class KeywordClassifier:
+    """Labels descriptions with the first matching rule, vectorised."""
+
+    def __init__(self, rules: Sequence[KeywordRule], default: str = 'OTHER',
+                 missing: str = 'UNKNOWN'):
+        """
+        Args:
+            rules: The rules, by precedence. Keywords must be lowercase.
+            default: The label of the descriptions no rule matches.
+            missing: The label of missing descriptions.
+        """
+        self.rules = list(rules)
+        self.default = default
+        self.missing = missing
+        self._patterns = [
+            (keyword_pattern(rule.keywords),
+             keyword_pattern(rule.required) if rule.required else None)
+            for rule in self.rules
+        ]
+        self._any_pattern = keyword_pattern(
+            [keyword for rule in self.rules for keyword in rule.keywords])
+        self._labels = np.array(
+            [rule.label for rule in self.rules] + [default, missing], dtype=object)
+
+    @staticmethod
+    def lowercase(texts: pd.Series) -> pd.Series:
+        """Lowercases the descriptions, once for all the classifiers."""
+        return texts.astype('string').str.lower()
+
+    @staticmethod
+    def _contains(lowered: pd.Series, pattern: str) -> np.ndarray:
+        return lowered.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool)
+
+    def classify(self, texts: pd.Series, lowered: pd.Series = None) -> pd.Series:
+        """Labels each description.
+
+        Args:
+            texts: The descriptions.
+            lowered: `lowercase(texts)`, if already computed.
+
+        Returns:
+            The labels, with the index of `texts`.
+        """
+        if lowered is None:
+            lowered = self.lowercase(texts)
+        codes = np.full(len(texts), len(self.rules), dtype=np.intp)
+        # Positions of the descriptions which may still match a rule
+        candidates = np.flatnonzero(self._contains(lowered, self._any_pattern))
+        for i, (pattern, required_pattern) in enumerate(self._patterns):
+            if not len(candidates):
+                break
+            candidate_texts = lowered.iloc[candidates]
+            matched = self._contains(candidate_texts, pattern)
+            if required_pattern is not None:
+                matched &= self._contains(candidate_texts, required_pattern)
+            codes[candidates[matched]] = i
+            candidates = candidates[~matched]
+        codes[texts.isna().to_numpy()] = len(self.rules) + 1
+        return pd.Series(self._labels[codes], index=texts.index, dtype=object)
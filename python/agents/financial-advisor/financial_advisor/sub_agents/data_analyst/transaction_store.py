@@ -0,0 +1,211 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Transaction dataset shared by the CSV tools of the data analyst.
+
+The transactions CSV is parsed once per process, and cached as a typed Parquet
+file keyed by the modification time and size of the CSV, so that restarts do
+not parse it again. When the CSV only grew, by rows appended after the last
+parsed record, only the new rows are parsed and appended to the cache.
+
+Values derived from the frame, such as the preprocessed frame and statistics
+of `TransactionAnalyzer`, are computed once per version of the data with
+`TransactionStore.derived`.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+DEFAULT_CSV_PATH = os.getenv(
+    'TRANSACTIONS_CSV_PATH', '/workspaces/adk-samples/data/transactions.csv')
+DEFAULT_CACHE_DIR = os.path.expanduser(os.getenv(
+    'TRANSACTIONS_CACHE_DIR', str(Path.home() / '.cache' / 'financial_advisor')))
+
+# Bytes before the end of the parsed part of the CSV which must be unchanged
+# for new rows to be appended instead of parsing the whole file again.
+TAIL_CHECK_BYTES = 4096
+
+
+def _normalize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Types the text columns as strings, so that they round-trip through
+    Parquet whatever values they hold."""
+    text_columns = [c for c in df.columns if df[c].dtype == object]
+    if text_columns:
+        df = df.astype({c: 'string' for c in text_columns})
+    return df
+
+
+class TransactionStore:
+    """Loads a transactions CSV once, and refreshes it when the file changes."""
+
+    def __init__(self, csv_path: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
+        """
+        Args:
+            csv_path: The transactions CSV.
+            cache_dir: Where the Parquet cache of the CSV is written, or None
+                to only keep the data in memory.
+        """
+        self.csv_path = str(csv_path)
+        self.cache_dir = cache_dir
+        self.num_full_loads = 0
+        self.num_appends = 0
+        self._lock = threading.RLock()
+        self._df = None
+        self._meta = None
+        self._derived = {}
+
+    @property
+    def _cache_stem(self) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        path_hash = hashlib.sha256(
+            os.path.abspath(self.csv_path).encode()).hexdigest()[:16]
+        return Path(self.cache_dir) / f'{Path(self.csv_path).stem}-{path_hash}'
+
+    def _tail_hash(self, f, size: int) -> str:
+        start = max(size - TAIL_CHECK_BYTES, 0)
+        f.seek(start)
+        return hashlib.sha256(f.read(size - start)).hexdigest()
+
+    def _read_full(self, size: int, mtime_ns: int):
+        with open(self.csv_path, 'rb') as f:
+            data = f.read(size)
+            tail_hash = self._tail_hash(f, size)
+        df = _normalize_dtypes(pd.read_csv(io.BytesIO(data)))
+        self.num_full_loads += 1
+        return df, {
+            'mtime_ns': mtime_ns,
+            'size': size,
+            'tail_hash': tail_hash,
+            'ends_with_newline': data.endswith(b'\n'),
+            'columns': list(df.columns),
+        }
+
+    def _read_appended(self, df: pd.DataFrame, meta: Dict[str, Any],
+                       size: int, mtime_ns: int):
+        """Parses the rows appended since `meta`, or returns None if the CSV
+        was modified otherwise."""
+        if size <= meta['size'] or not meta['ends_with_newline']:
+            return None
+        with open(self.csv_path, 'rb') as f:
+            if self._tail_hash(f, meta['size']) != meta['tail_hash']:
+                return None
+            f.seek(meta['size'])
+            data = f.read(size - meta['size'])
+            tail_hash = self._tail_hash(f, size)
+        new_rows = pd.read_csv(
+            io.BytesIO(data), header=None, names=meta['columns'])
+        try:
+            new_rows = new_rows.astype(df.dtypes.to_dict())
+        except (TypeError, ValueError):
+            # E.g. text in a numeric column: type the whole file again.
+            return None
+        self.num_appends += 1
+        return (pd.concat([df, new_rows], ignore_index=True),
+                dict(meta, mtime_ns=mtime_ns, size=size, tail_hash=tail_hash,
+                     ends_with_newline=data.endswith(b'\n')))
+
+    def _read_cache(self):
+        stem = self._cache_stem
+        if stem is None:
+            return None, None
+        try:
+            with open(f'{stem}.json', encoding='utf-8') as f:
+                meta = json.load(f)
+            return pd.read_parquet(f'{stem}.parquet'), meta
+        except (OSError, ValueError, ImportError):
+            return None, None
+
+    def _write_cache(self, df: pd.DataFrame, meta: Dict[str, Any]):
+        stem = self._cache_stem
+        if stem is None:
+            return
+        try:
+            stem.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so that readers never see a partial file.
+            df.to_parquet(f'{stem}.parquet.tmp', index=False)
+            os.replace(f'{stem}.parquet.tmp', f'{stem}.parquet')
+            with open(f'{stem}.json.tmp', 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(f'{stem}.json.tmp', f'{stem}.json')
+        except (OSError, ValueError, ImportError) as e:
+            print(f"Warning: could not cache the transactions: {e}")
+
+    def _refresh(self):
+        stat = os.stat(self.csv_path)
+        meta = self._meta
+        if meta is not None and (meta['mtime_ns'], meta['size']) == (
+                stat.st_mtime_ns, stat.st_size):
+            return
+        df = self._df
+        if df is None:
+            df, meta = self._read_cache()
+            if meta is not None and (meta['mtime_ns'], meta['size']) == (
+                    stat.st_mtime_ns, stat.st_size):
+                self._df, self._meta, self._derived = df, meta, {}
+                return
+        loaded = None
+        if df is not None:
+            loaded = self._read_appended(df, meta, stat.st_size, stat.st_mtime_ns)
+        if loaded is None:
+            loaded = self._read_full(stat.st_size, stat.st_mtime_ns)
+        self._df, self._meta = loaded
+        self._derived = {}
+        self._write_cache(self._df, self._meta)
+
+    def frame(self) -> pd.DataFrame:
+        """Returns the transactions, as read from the CSV.
+
+        The frame is shared: copy it before modifying it.
+
+        Raises:
+            FileNotFoundError: If the CSV does not exist.
+        """
+        with self._lock:
+            self._refresh()
+            return self._df
+
+    def derived(self, name: str, compute: Callable[[pd.DataFrame], Any]) -> Any:
+        """Returns `compute(frame)`, computed once per version of the data.
+
+        The result is shared: copy it before modifying it.
+        """
+        with self._lock:
+            self._refresh()
+            if name not in self._derived:
+                self._derived[name] = compute(self._df)
+            return self._derived[name]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_transaction_store(csv_path: Optional[str] = None) -> TransactionStore:
+    """Returns the store of a CSV, shared by the process.
+
+    Args:
+        csv_path: The transactions CSV. Defaults to `TRANSACTIONS_CSV_PATH`.
+    """
+    csv_path = str(csv_path or DEFAULT_CSV_PATH)
+    with _stores_lock:
+        if csv_path not in _stores:
+            _stores[csv_path] = TransactionStore(csv_path)
+        return _stores[csv_path]
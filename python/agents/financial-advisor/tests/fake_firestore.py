@@ -0,0 +1,105 @@
+"""In-memory fake of the Firestore client queries used by the data analyst"""
+import itertools
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeDocumentRef:
+    def __init__(self, collection, doc_id):
+        self._collection = collection
+        self.id = doc_id
+
+
+class FakeQuery:
+    def __init__(self, client, name, filters=(), fields=None, ordered=False,
+                 limit=None, after=None):
+        self._client = client
+        self._name = name
+        self._filters = filters
+        self._fields = fields
+        self._ordered = ordered
+        self._limit = limit
+        self._after = after
+
+    def _copy(self, **changes):
+        state = dict(filters=self._filters, fields=self._fields, ordered=self._ordered,
+                     limit=self._limit, after=self._after)
+        state.update(changes)
+        return FakeQuery(self._client, self._name, **state)
+
+    def where(self, field, op, value):
+        assert op == '=='
+        return self._copy(filters=self._filters + ((field, value),))
+
+    def select(self, fields):
+        return self._copy(fields=list(fields))
+
+    def order_by(self, field):
+        assert field == '__name__'
+        return self._copy(ordered=True)
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, snapshot):
+        assert self._ordered, 'cursors need an order'
+        return self._copy(after=snapshot.id)
+
+    def stream(self):
+        self._client.num_queries += 1
+        docs = self._client.collections.get(self._name, {})
+        ids = sorted(docs) if self._ordered else list(docs)
+        if self._after is not None:
+            ids = [doc_id for doc_id in ids if doc_id > self._after]
+        matches = (
+            doc_id for doc_id in ids
+            if all(docs[doc_id].get(field) == value for field, value in self._filters))
+        for doc_id in itertools.islice(matches, self._limit):
+            data = docs[doc_id]
+            if self._fields is not None:
+                data = {field: data[field] for field in self._fields if field in data}
+            self._client.num_reads += 1
+            yield FakeSnapshot(doc_id, data)
+
+
+class FakeCollection(FakeQuery):
+    def document(self, doc_id=None):
+        if doc_id is None:
+            doc_id = f'{next(self._client.ids):020d}'
+        return FakeDocumentRef(self, doc_id)
+
+
+class FakeBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, ref, data):
+        self._writes.append((ref, dict(data)))
+
+    def commit(self):
+        for ref, data in self._writes:
+            self._client.collections.setdefault(ref._collection._name, {})[ref.id] = data
+
+
+class FakeFirestoreClient:
+    """Stores documents in memory, and counts the queries and reads."""
+
+    def __init__(self):
+        self.collections = {}
+        self.ids = itertools.count()
+        self.num_queries = 0
+        self.num_reads = 0
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeBatch(self)
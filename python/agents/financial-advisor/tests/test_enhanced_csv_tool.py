@@ -41,6 +41,32 @@ def test_transaction_categorization(analyzer):
     assert 'INCOME' in categories
     assert 'SUBSCRIPTION' in categories
 
+def test_vectorised_classification_matches_first_match_wins(analyzer):
+    """Test the vectorised classifiers against the per-row classification"""
+    texts = pd.Series([
+        'UPI received from friend',
+        'UPI-credited cashback',
+        'upi payment billpay',
+        'BILLPAY utility bill payment',
+        'Monthly pay credit',
+        'INT. CR savings',
+        'cash withdrawal atm',
+        'NEFT transfer of mutual fund redemption',
+        'EMI loan mortgage',
+        'Amazon Prime subscription',
+        'Uber taxi ride',
+        'Refund of movie tickets',
+        'random text',
+        '',
+        None,
+    ])
+    types = TransactionAnalyzer.TYPE_CLASSIFIER.classify(texts)
+    categories = TransactionAnalyzer.CATEGORY_CLASSIFIER.classify(texts)
+    assert types.tolist() == [analyzer._classify_transaction(t) for t in texts]
+    assert categories.tolist() == [analyzer._categorize_transaction(t) for t in texts]
+    assert types.iloc[0] == 'UPI_RECEIVED'
+    assert types.iloc[-1] == 'UNKNOWN'
+
 def test_statistics_calculation(analyzer):
     """Test statistical calculations"""
     assert 'total_transactions' in analyzer.statistics
@@ -0,0 +1,117 @@
+import datetime
+import pandas as pd
+import pytest
+from financial_advisor.sub_agents.data_analyst.firestore_tool import FirestoreDataManager
+from fake_firestore import FakeFirestoreClient
+
+START = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+def transactions(user_id, count):
+    return [{
+        'userId': user_id,
+        'dateValue': START + datetime.timedelta(hours=i),
+        'mentionText': f'UPI-MERCHANT {i}',
+        'amount': float(i),
+        'raw': 'x' * 100,
+    } for i in range(count)]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def client():
+    client = FakeFirestoreClient()
+    client.collections['transactions'] = {
+        f'{i:06d}': data
+        for i, data in enumerate(transactions('alice', 2345) + transactions('bob', 10))
+    }
+    return client
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def manager(client, clock):
+    return FirestoreDataManager(client, page_size=1000, cache_ttl=60, clock=clock)
+
+@pytest.mark.asyncio
+async def test_paginated_projected_read(client, manager):
+    """Test that all pages are read, projected and typed"""
+    df = await manager.get_transactions('alice', max_rows=None)
+    assert len(df) == 2345
+    assert client.num_queries == 3
+    assert sorted(df.columns) == ['amount', 'dateValue', 'mentionText']
+    # Naive UTC datetime64, without a detour through strings
+    assert pd.api.types.is_datetime64_dtype(df['dateValue'])
+    assert df['dateValue'].iloc[0] == START.replace(tzinfo=None) + datetime.timedelta(hours=2344)
+    assert df['dateValue'].is_monotonic_decreasing
+
+@pytest.mark.asyncio
+async def test_max_rows(client, manager):
+    """Test that reads stop at max_rows"""
+    df = await manager.get_transactions('alice', max_rows=1500)
+    assert len(df) == 1500
+    assert client.num_queries == 2
+    assert client.num_reads == 1500
+    df = await manager.get_transactions('bob', max_rows=20)
+    assert len(df) == 10
+    assert set(df['mentionText']) == {f'UPI-MERCHANT {i}' for i in range(10)}
+
+@pytest.mark.asyncio
+async def test_cache_ttl(client, clock, manager):
+    """Test that reads are cached per user for the TTL"""
+    first = await manager.get_transactions('alice', max_rows=20)
+    assert await manager.get_transactions('alice', max_rows=20) is first
+    assert client.num_queries == 1
+    clock.now = 61
+    await manager.get_transactions('alice', max_rows=20)
+    assert client.num_queries == 2
+
+@pytest.mark.asyncio
+async def test_cache_drops_expired_queries(client, clock, manager):
+    """Test that the queries of past users do not stay cached"""
+    for max_rows in range(1, 6):
+        await manager.get_transactions('alice', max_rows=max_rows)
+    clock.now = 61
+    await manager.get_transactions('bob', max_rows=20)
+    assert list(manager._cache) == [('bob', 20)]
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used_queries(client, clock):
+    """Test that the cache keeps at most cache_max_entries queries"""
+    manager = FirestoreDataManager(client, cache_ttl=60, cache_max_entries=2, clock=clock)
+    await manager.get_transactions('alice', max_rows=1)
+    await manager.get_transactions('alice', max_rows=2)
+    await manager.get_transactions('alice', max_rows=1)
+    await manager.get_transactions('bob', max_rows=1)
+    assert list(manager._cache) == [('alice', 1), ('bob', 1)]
+    assert client.num_queries == 3
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_cache(client, manager):
+    """Test that new transactions of a user are read after a write"""
+    await manager.get_transactions('alice', max_rows=None)
+    await manager.get_transactions('bob', max_rows=None)
+    await manager.get_transactions(None, max_rows=5)
+    ids = await manager.add_transactions(transactions('bob', 3))
+    assert len(ids) == 3
+    num_queries = client.num_queries
+    await manager.get_transactions('alice', max_rows=None)
+    assert client.num_queries == num_queries
+    assert len(await manager.get_transactions('bob', max_rows=None)) == 13
+    await manager.get_transactions(None, max_rows=5)
+    assert client.num_queries == num_queries + 2
+
+@pytest.mark.asyncio
+async def test_read_error(clock):
+    """Test that read errors are reported as no data"""
+    class BrokenClient(FakeFirestoreClient):
+        def collection(self, name):
+            raise RuntimeError('unavailable')
+    manager = FirestoreDataManager(BrokenClient(), clock=clock)
+    assert await manager.get_transactions('alice') is None
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+from financial_advisor.sub_agents.data_analyst.llm_context import (
+    build_context, estimate_tokens)
+
+@pytest.fixture
+def features():
+    num_rows = 300
+    categories = ['PAYMENT', 'BILL', 'SUBSCRIPTION', 'OTHER']
+    return pd.DataFrame({
+        'amount': [float((i * 37) % 1000) for i in range(num_rows)],
+        'date': pd.date_range('2023-01-01', periods=num_rows, freq='3D'),
+        'category': [categories[i % 7 % 4] for i in range(num_rows)],
+        'description': [f'UPI-MERCHANT {i}\nREF {i:012d}' for i in range(num_rows)],
+    })
+
+@pytest.mark.parametrize('max_tokens', [300, 1000, 4000])
+def test_context_fits_budget(features, max_tokens):
+    """Test that the context stays within the token budget"""
+    context = build_context(features, "What are my spending patterns?", max_tokens)
+    assert estimate_tokens(context) <= max_tokens
+    assert context.startswith('transactions: 300; dates: 2023-01-01 to 2025-06-16')
+    assert '## Per category\ncategory,count,total\n' in context
+
+def test_context_samples(features):
+    """Test the stratified samples, each row shown once"""
+    context = build_context(features, "What are my spending patterns?", 4000, max_rows=12)
+    sections = context.split('\n## ')
+    titles = [section.split('\n')[0] for section in sections[1:]]
+    assert titles[-3:] == ['Top by amount', 'Most recent', 'Top per category']
+    rows = [line for section in sections[-3:] for line in section.split('\n')[2:]]
+    assert len(rows) == 12
+    assert len(set(rows)) == 12
+    # Top amount first, descriptions on a single line
+    assert rows[0].startswith('2023-03-23,999.00,')
+    assert 'UPI-MERCHANT 27 REF 000000000027' in rows[0]
+    # Every category has a row
+    for category in ['PAYMENT', 'BILL', 'SUBSCRIPTION', 'OTHER']:
+        assert any(f',{category},' in row for row in rows)
+
+def test_context_question_scope(features):
+    """Test that the samples are restricted to the category and year asked"""
+    context = build_context(features, "Show my recent bills in 2024", 1000)
+    assert 'restricted to categories BILL and year 2024' in context
+    recent = context.split('\n## Most recent\n')[1].split('\n## ')[0].split('\n')[1:]
+    assert recent[0].startswith('2024-12-')
+    assert all(row.startswith('2024-') and ',BILL,' in row for row in recent)
@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+from financial_advisor.sub_agents.data_analyst.csv_utils import answer_csv_question
+from financial_advisor.sub_agents.data_analyst.query_planner import (
+    QueryPlan, answer_question, plan_query, prepare_transactions)
+
+# Rows shaped like the Document AI entities of data/transactions.csv
+@pytest.fixture
+def transactions():
+    return pd.DataFrame({
+        'moneyValue': [None, None, None, None, None, 10.0],
+        'dateValue': [None, None, None, None, '2023-02-07', '05/01/23'],
+        'mentionText': [
+            '01/07/24 INTEREST PAID TILL 30-JUN-2024 19.00',
+            '28/06/24 UPI-ANKIT KUMAR 20,000.00',
+            '15/03/23 NETFLIX SUBSCRIPTION 199.00 REF 1.50',
+            'SINGH-ANKITDIPU92@IBL-HD',
+            '07/02/2023',
+            'ATM CASH 500.00',
+        ],
+    })
+
+def test_prepare_transactions(transactions):
+    """Test the vectorised amounts, dates and categories"""
+    features = prepare_transactions(transactions)
+    assert features['amount'].tolist() == [19.0, 20000.0, 200.5, 0.0, 0.0, 510.0]
+    assert features['year'].tolist()[:3] == [2024, 2024, 2023]
+    assert pd.isna(features['year'].iloc[3])
+    assert features['date'].iloc[4] == pd.Timestamp('2023-02-07')
+    assert features['date'].iloc[5] == pd.Timestamp('2023-01-05')
+    assert features['category'].tolist() == [
+        'INCOME', 'PAYMENT', 'SUBSCRIPTION', 'OTHER', 'OTHER', 'WITHDRAWAL']
+
+@pytest.mark.parametrize('question, plan', [
+    ("What is the total amount I spent so far?", QueryPlan('total')),
+    ("How many transactions do I have?", QueryPlan('count')),
+    ("How much did I spend per year in the last 3 years?",
+     QueryPlan('per_period', period='year', limit=3)),
+    ("Monthly spending in 2024", QueryPlan('per_period', period='month', year=2024)),
+    ("Spending by category", QueryPlan('per_category')),
+    ("Show my top 3 transactions", QueryPlan('top_n', limit=3)),
+    ("What are my highest value transactions?", QueryPlan('top_n', limit=5)),
+    ("Total spent on subscriptions", QueryPlan('total', category='SUBSCRIPTION')),
+    ("What are my monthly spending patterns?", None),
+    ("Which account is this?", None),
+    ("What are my top 5 highest value transactions?", QueryPlan('top_n', limit=5)),
+    ("Bills per month for the past 6 months",
+     QueryPlan('per_period', period='month', limit=6, category='BILL')),
+    # Qualifiers the plans do not parse are left to the LLM
+    ("How much did I spend on Amazon in June 2024?", None),
+    ("How much did I spend in June?", None),
+    ("How many transactions over 5,000?", None),
+    ("Total spent between 01/01/24 and 31/03/24", None),
+    ("Total spent in the last 3 months", None),
+    ("Spending per year in the last 2 months", None),
+    ("Top 3 transactions to Ankit Kumar", None),
+    ("Total spent 2024", None),
+])
+def test_plan_query(question, plan):
+    """Test the matching of questions to plans"""
+    assert plan_query(question) == plan
+
+def test_answers(transactions):
+    """Test the aggregations answering the plans"""
+    features = prepare_transactions(transactions)
+    assert "**₹20,729.50** INR" in answer_question("total spend", features)
+    assert "**6** transactions" in answer_question("count", features)
+    per_year = answer_question("spending per year for the last 2 years", features)
+    assert "2024: **₹20,019.00** INR (2 transactions)" in per_year
+    assert "2023: **₹710.50** INR (3 transactions)" in per_year
+    top = answer_question("top 1 transaction", features)
+    assert "1. **₹20,000.00** INR on 28/06/2024: 28/06/24 UPI-ANKIT KUMAR" in top
+    assert "2." not in top
+    assert "SUBSCRIPTION: **₹200.50** INR (1 transaction)" in answer_question(
+        "amount per category", features)
+    assert answer_question("why is my balance low?", features) is None
+    assert answer_question(
+        "How much did I spend on Amazon in June 2024?", features) is None
+
+def test_answer_csv_question_does_not_modify_frame(transactions):
+    """Test that the caller's frame is left untouched"""
+    before = transactions.copy()
+    answer = answer_csv_question(transactions, "yearly spending for the last 3 years")
+    assert "2024:" in answer
+    pd.testing.assert_frame_equal(transactions, before)
+    assert "couldn't understand" in answer_csv_question(transactions, "hello")
@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+from financial_advisor.sub_agents.data_analyst.transaction_store import TransactionStore
+
+HEADER = 'dateValue,mentionText,amount\n'
+ROWS = [
+    '01/06/25,UPI payment to grocery store,-500\n',
+    '02/06/25,"Salary credit, June",5000\n',
+    '03/06/25,"Netflix\nsubscription",-199\n',
+]
+NEW_ROWS = [
+    '04/06/25,ATM withdrawal,-1000\n',
+    '05/06/25,Refund,250\n',
+]
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'transactions.csv'
+    path.write_text(HEADER + ''.join(ROWS))
+    return path
+
+def append(path, rows):
+    with open(path, 'a') as f:
+        f.write(''.join(rows))
+
+def test_frame_is_loaded_once(csv_path, tmp_path):
+    """Test that the CSV is parsed once while unchanged"""
+    store = TransactionStore(csv_path, cache_dir=tmp_path / 'cache')
+    df = store.frame()
+    assert len(df) == 3
+    assert df['mentionText'].iloc[2] == 'Netflix\nsubscription'
+    assert store.frame() is df
+    assert store.num_full_loads == 1
+
+def test_parquet_cache_is_reused(csv_path, tmp_path):
+    """Test that a new store reads the cache instead of the CSV"""
+    expected = TransactionStore(csv_path, cache_dir=tmp_path / 'cache').frame()
+    store = TransactionStore(csv_path, cache_dir=tmp_path / 'cache')
+    pd.testing.assert_frame_equal(store.frame(), expected)
+    assert store.num_full_loads == 0
+
+def test_appended_rows_are_parsed_incrementally(csv_path, tmp_path):
+    """Test that only the rows appended to the CSV are parsed"""
+    store = TransactionStore(csv_path, cache_dir=tmp_path / 'cache')
+    store.frame()
+    append(csv_path, NEW_ROWS)
+    df = store.frame()
+    assert store.num_full_loads == 1
+    assert store.num_appends == 1
+    pd.testing.assert_frame_equal(
+        df, TransactionStore(csv_path, cache_dir=None).frame())
+
+    # After a restart, the cache is extended as well
+    append(csv_path, ['06/06/25,Mutual fund investment,-2000\n'])
+    restarted = TransactionStore(csv_path, cache_dir=tmp_path / 'cache')
+    assert len(restarted.frame()) == 6
+    assert restarted.num_full_loads == 0
+    assert restarted.num_appends == 1
+
+def test_rewritten_csv_is_parsed_again(csv_path, tmp_path):
+    """Test that a CSV modified other than by appending is parsed again"""
+    store = TransactionStore(csv_path, cache_dir=tmp_path / 'cache')
+    store.frame()
+    csv_path.write_text(HEADER + ''.join(reversed(ROWS)) + ''.join(NEW_ROWS))
+    df = store.frame()
+    assert store.num_full_loads == 2
+    assert store.num_appends == 0
+    assert df['mentionText'].iloc[0] == 'Netflix\nsubscription'
+
+def test_derived_values_follow_the_data(csv_path, tmp_path):
+    """Test that derived values are computed once per version of the data"""
+    store = TransactionStore(csv_path, cache_dir=None)
+    calls = []
+
+    def total(df):
+        calls.append(len(df))
+        return df['amount'].sum()
+
+    assert store.derived('total', total) == 4301
+    assert store.derived('total', total) == 4301
+    append(csv_path, NEW_ROWS)
+    assert store.derived('total', total) == 3551
+    assert calls == [3, 5]
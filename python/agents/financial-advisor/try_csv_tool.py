@@ -2,10 +2,11 @@ import asyncio
 import os
 from pathlib import Path
 from financial_advisor.sub_agents.data_analyst.csv_tool import csv_qa_llm_tool
+from financial_advisor.sub_agents.data_analyst.transaction_store import DEFAULT_CSV_PATH
 
 async def main():
     # Verify data file exists
-    data_path = Path('/workspaces/adk-samples/data/transactions.csv')
+    data_path = Path(DEFAULT_CSV_PATH)
     print(f"Checking for data file at: {data_path}")
     if not data_path.exists():
         print(f"❌ Error: Could not find transaction data at {data_path}")
@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Backend queries and latency of the meeting price lookups, before and after.
+
+Before, `compute_probabilities` queried the backend for the two dates of each
+meeting. After, the price store fetches whole date ranges and answers the
+lookups of the other meetings from memory. The prices are 20 years of daily
+synthetic prices for a few codes, read by the local file backend; the
+optional `--latency_ms` adds a fixed delay to each backend query, standing in
+for a BigQuery round trip.
+
+    python benchmarks/bench_price_store.py [--latency_ms 500]
+"""
+
+import argparse
+import datetime
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from fomc_research.shared_libraries.price_store import (
+    LocalPriceBackend,
+    PriceStore,
+)
+
+CODES = ["SFRH5", "SFRZ5", "SFRM5", "SFRU5"]
+START = datetime.date(2005, 1, 3)
+NUM_DAYS = 20 * 365
+MEETING_EVERY_DAYS = 45
+
+
+class CountingBackend:
+    """Counts the queries of a backend, and delays them by a fixed latency."""
+
+    def __init__(self, backend, latency_s):
+        self.backend = backend
+        self.latency_s = latency_s
+        self.num_queries = 0
+
+    def fetch(self, timeseries_codes, start, end):
+        self.num_queries += 1
+        time.sleep(self.latency_s)
+        return self.backend.fetch(timeseries_codes, start, end)
+
+
+def write_prices(path):
+    dates = [START + datetime.timedelta(days=i) for i in range(NUM_DAYS)]
+    rng = np.random.default_rng(0)
+    frames = [
+        pd.DataFrame(
+            {
+                "timeseries_code": code,
+                "date": dates,
+                "value": 96 + rng.normal(0, 0.01, NUM_DAYS).cumsum(),
+            }
+        )
+        for code in CODES
+    ]
+    pd.concat(frames).to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--latency_ms",
+        type=float,
+        default=0,
+        help="Delay added to each backend query.",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "prices.csv")
+        write_prices(path)
+        local = LocalPriceBackend(path)
+        local.fetch(CODES, START, START)  # Read the file outside the timings.
+
+        meetings = [
+            START + datetime.timedelta(days=i)
+            for i in range(1, NUM_DAYS, MEETING_EVERY_DAYS)
+        ]
+        codes = CODES[:2]
+        one_day = datetime.timedelta(days=1)
+
+        rows = []
+        backend = CountingBackend(local, args.latency_ms / 1000)
+        start = time.perf_counter()
+        for meeting in meetings:
+            backend.fetch(codes, meeting - one_day, meeting)
+        rows.append(
+            ("before: a query per meeting", backend.num_queries,
+             time.perf_counter() - start)
+        )
+
+        backend = CountingBackend(local, args.latency_ms / 1000)
+        store = PriceStore(backend)
+        start = time.perf_counter()
+        for meeting in meetings:
+            store.get_prices(codes, [meeting, meeting - one_day])
+        rows.append(
+            ("after: price store, first pass", backend.num_queries,
+             time.perf_counter() - start)
+        )
+        start = time.perf_counter()
+        for meeting in meetings:
+            store.get_prices(codes, [meeting, meeting - one_day])
+        rows.append(
+            ("after: price store, repeated", backend.num_queries,
+             time.perf_counter() - start)
+        )
+
+    print(f"{len(meetings)} meetings, {args.latency_ms:g} ms per query\n")
+    print(f"{'lookups':<34} {'queries':>8} {'total ms':>10} {'ms/meeting':>11}")
+    for name, num_queries, seconds in rows:
+        print(
+            f"{name:<34} {num_queries:>8} {seconds * 1000:>10.1f}"
+            f" {seconds * 1000 / len(meetings):>11.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
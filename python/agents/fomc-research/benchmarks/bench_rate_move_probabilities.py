@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rate move probabilities for ~10k meeting x contract pair combinations.
+
+Compares a loop of the scalar `number_of_moves` and
+`fed_meeting_probabilities` over the price store lookups of each meeting and
+pair, as `compute_probabilities` did for a single meeting, with
+`compute_probabilities_batch`. The prices are 20 years of daily synthetic
+prices, read by the local file backend and already in the price store.
+
+    python benchmarks/bench_rate_move_probabilities.py
+"""
+
+import argparse
+import datetime
+import itertools
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from fomc_research.shared_libraries.price_store import (
+    LocalPriceBackend,
+    PriceStore,
+)
+from fomc_research.shared_libraries.price_utils import (
+    compute_probabilities_batch,
+    fed_meeting_probabilities,
+    number_of_moves,
+)
+
+START = datetime.date(2005, 1, 3)
+NUM_DAYS = 20 * 365
+NUM_CODES = 12
+MEETINGS_PER_YEAR = 8
+
+
+def write_prices(path, codes):
+    dates = [START + datetime.timedelta(days=i) for i in range(NUM_DAYS)]
+    rng = np.random.default_rng(0)
+    frames = [
+        pd.DataFrame(
+            {
+                "timeseries_code": code,
+                "date": dates,
+                "value": 96 + rng.normal(0, 0.01, NUM_DAYS).cumsum(),
+            }
+        )
+        for code in codes
+    ]
+    pd.concat(frames).to_csv(path, index=False)
+
+
+def scalar_loop(store, meetings, pairs):
+    results = []
+    one_day = datetime.timedelta(days=1)
+    for meeting in meetings:
+        for near, far in pairs:
+            day_before = meeting - one_day
+            prices = store.get_prices([near, far], [meeting, day_before])
+            for date in (day_before, meeting):
+                nmoves = number_of_moves(prices[near][date], prices[far][date])
+                results.append((nmoves, fed_meeting_probabilities(nmoves)))
+    return results
+
+
+def timed(fn, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    codes = [f"SFR{i:02d}" for i in range(NUM_CODES)]
+    pairs = list(itertools.combinations(codes, 2))
+    step = 365 // MEETINGS_PER_YEAR
+    meetings = [
+        START + datetime.timedelta(days=i) for i in range(1, NUM_DAYS, step)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "prices.csv")
+        write_prices(path, codes)
+        store = PriceStore(LocalPriceBackend(path))
+        store.prefetch(codes, meetings)
+
+        loop, loop_seconds = timed(
+            lambda: scalar_loop(store, meetings, pairs), args.repeats
+        )
+        batch, batch_seconds = timed(
+            lambda: compute_probabilities_batch(meetings, pairs, store),
+            args.repeats,
+        )
+
+    np.testing.assert_allclose(
+        batch["num_moves"].to_numpy(), [nmoves for nmoves, _ in loop]
+    )
+    combinations = len(meetings) * len(pairs)
+    print(
+        f"{len(meetings)} meetings x {len(pairs)} pairs = {combinations:,}"
+        f" combinations, {len(batch):,} rows\n"
+    )
+    print(f"{'engine':<40} {'ms':>10} {'combinations/s':>16}")
+    for name, seconds in (
+        ("before: scalar loop", loop_seconds),
+        ("after: compute_probabilities_batch", batch_seconds),
+    ):
+        print(
+            f"{name:<40} {seconds * 1000:>10.1f}"
+            f" {combinations / seconds:>16,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Time-series price store for FOMC Research Agent.
+
+Prices are read from a backend, either the BigQuery table created by
+`deployment/bigquery_setup.py` or a local CSV/Parquet file with the same
+columns (timeseries_code, date, value). The store fetches whole date ranges
+per timeseries code, keeps them in memory (and optionally in a Parquet cache
+directory), and answers later lookups within those ranges locally.
+"""
+
+import datetime
+import functools
+import json
+import logging
+import os
+import threading
+from collections.abc import Iterable, Sequence
+from typing import Optional, Protocol
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["timeseries_code", "date", "value"]
+DATASET_NAME = os.getenv("GOOGLE_CLOUD_BQ_DATASET", "fomc_research_agent")
+# A local CSV or Parquet file of prices, used instead of BigQuery if set.
+PRICES_FILE = os.getenv("GOOGLE_GENAI_FOMC_AGENT_PRICES_FILE")
+# A directory where the prices fetched from BigQuery are cached as Parquet.
+PRICE_CACHE_DIR = os.getenv("GOOGLE_GENAI_FOMC_AGENT_PRICE_CACHE_DIR")
+# Days fetched on each side of the requested dates.
+PREFETCH_DAYS = int(os.getenv("GOOGLE_GENAI_FOMC_AGENT_PREFETCH_DAYS", "366"))
+
+DateRange = tuple[datetime.date, datetime.date]
+
+
+def _empty_prices() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "timeseries_code": pd.Series(dtype=object),
+            "date": pd.Series(dtype=object),
+            "value": pd.Series(dtype=float),
+        }
+    )
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the prices with datetime.date dates and float values."""
+    df = df[COLUMNS].copy()
+    df["timeseries_code"] = df["timeseries_code"].astype(str)
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    df["value"] = df["value"].astype(float)
+    return df
+
+
+class PriceBackend(Protocol):
+    """A source of timeseries prices."""
+
+    def fetch(
+        self, timeseries_codes: Sequence[str], start: datetime.date,
+        end: datetime.date
+    ) -> pd.DataFrame:
+        """Fetches the prices of the codes between start and end inclusive.
+
+        Returns:
+          A DataFrame with columns timeseries_code, date and value.
+        """
+
+
+class BigQueryPriceBackend:
+    """Fetches prices from the BigQuery timeseries_data table.
+
+    The BigQuery client is created on the first fetch.
+    """
+
+    def __init__(self, dataset_name: str = DATASET_NAME, client=None):
+        self.dataset_name = dataset_name
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                # pylint: disable=import-outside-toplevel
+                from google.cloud import bigquery
+
+                self._client = bigquery.Client()
+            return self._client
+
+    def fetch(
+        self, timeseries_codes: Sequence[str], start: datetime.date,
+        end: datetime.date
+    ) -> pd.DataFrame:
+        # pylint: disable=import-outside-toplevel
+        from google.cloud import bigquery
+
+        query = f"""
+SELECT DISTINCT timeseries_code, date, value
+FROM {self.dataset_name}.timeseries_data
+WHERE timeseries_code IN UNNEST(@timeseries_codes)
+  AND date BETWEEN @start AND @end
+"""
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter(
+                    "timeseries_codes", "STRING", list(timeseries_codes)
+                ),
+                bigquery.ScalarQueryParameter("start", "DATE", start),
+                bigquery.ScalarQueryParameter("end", "DATE", end),
+            ]
+        )
+        logger.debug(
+            "BigQueryPriceBackend.fetch: %s from %s to %s",
+            timeseries_codes, start, end,
+        )
+        results = self.client.query(query, job_config=job_config).result()
+        rows = [(row.timeseries_code, row.date, row.value) for row in results]
+        if not rows:
+            return _empty_prices()
+        return _normalize(pd.DataFrame(rows, columns=COLUMNS))
+
+
+class LocalPriceBackend:
+    """Reads prices from a local CSV or Parquet file.
+
+    The file has the columns of `deployment/sample_timeseries_data.csv`, which
+    `bigquery_setup.py` loads into BigQuery. It is read on the first fetch.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._prices = None
+        self._prices_lock = threading.Lock()
+
+    @property
+    def prices(self) -> pd.DataFrame:
+        with self._prices_lock:
+            if self._prices is None:
+                if self.path.endswith(".parquet"):
+                    df = pd.read_parquet(self.path)
+                else:
+                    df = pd.read_csv(self.path)
+                self._prices = _normalize(df).drop_duplicates(
+                    ["timeseries_code", "date"], keep="last"
+                )
+            return self._prices
+
+    def fetch(
+        self, timeseries_codes: Sequence[str], start: datetime.date,
+        end: datetime.date
+    ) -> pd.DataFrame:
+        df = self.prices
+        mask = (
+            df["timeseries_code"].isin(list(timeseries_codes))
+            & (df["date"] >= start)
+            & (df["date"] <= end)
+        )
+        return df[mask]
+
+
+class PriceStore:
+    """Serves prices from memory, fetching whole date ranges per code.
+
+    A lookup outside the dates already fetched for a code fetches the missing
+    dates, widened by `prefetch_days` on each side, so that the lookups of
+    nearby meetings are answered locally. Dates after yesterday are never
+    recorded as fetched, since their prices may not be published yet.
+
+    If `cache_dir` is set, the fetched prices and date ranges are also saved
+    there as Parquet and JSON, and reloaded by later stores.
+    """
+
+    def __init__(
+        self,
+        backend: PriceBackend,
+        prefetch_days: int = PREFETCH_DAYS,
+        cache_dir: Optional[str] = None,
+    ):
+        self.backend = backend
+        self.prefetch_days = prefetch_days
+        self.cache_dir = cache_dir
+        self.num_fetches = 0
+        # Code -> {date: price}, and code -> (first, last) date fetched.
+        self._prices: dict[str, dict[datetime.date, float]] = {}
+        self._ranges: dict[str, DateRange] = {}
+        # Code -> (sorted dates, prices) arrays, built on demand.
+        self._arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        if cache_dir:
+            self._load_cache()
+
+    def _cache_paths(self) -> tuple[str, str]:
+        return (
+            os.path.join(self.cache_dir, "prices.parquet"),
+            os.path.join(self.cache_dir, "ranges.json"),
+        )
+
+    def _load_cache(self) -> None:
+        prices_path, ranges_path = self._cache_paths()
+        if not (os.path.exists(prices_path) and os.path.exists(ranges_path)):
+            return
+        with open(ranges_path, "r", encoding="utf-8") as f:
+            ranges = json.load(f)
+        self._ranges = {
+            code: (
+                datetime.date.fromisoformat(first),
+                datetime.date.fromisoformat(last),
+            )
+            for code, (first, last) in ranges.items()
+        }
+        self._merge(_normalize(pd.read_parquet(prices_path)))
+        logger.debug("PriceStore: loaded %s from %s", ranges, self.cache_dir)
+
+    def _save_cache(self) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        prices_path, ranges_path = self._cache_paths()
+        rows = [
+            (code, date, value)
+            for code, prices in self._prices.items()
+            for date, value in prices.items()
+        ]
+        pd.DataFrame(rows, columns=COLUMNS).to_parquet(prices_path, index=False)
+        with open(ranges_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    code: [first.isoformat(), last.isoformat()]
+                    for code, (first, last) in self._ranges.items()
+                },
+                f,
+            )
+
+    def _merge(self, df: pd.DataFrame) -> None:
+        for code, date, value in zip(
+            df["timeseries_code"], df["date"], df["value"]
+        ):
+            self._prices.setdefault(code, {})[date] = value
+        for code in df["timeseries_code"].unique():
+            self._arrays.pop(code, None)
+
+    def _sorted_arrays(self, code: str) -> tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(code)
+        if arrays is None:
+            items = sorted(self._prices.get(code, {}).items())
+            arrays = (
+                np.array([date for date, _ in items], dtype="datetime64[D]"),
+                np.array([value for _, value in items], dtype=float),
+            )
+            self._arrays[code] = arrays
+        return arrays
+
+    def _missing_ranges(
+        self, code: str, first: datetime.date, last: datetime.date
+    ) -> list[DateRange]:
+        """Returns the date ranges to fetch for code to cover first..last."""
+        fetched = self._ranges.get(code)
+        if fetched and fetched[0] <= first and last <= fetched[1]:
+            return []
+        pad = datetime.timedelta(days=self.prefetch_days)
+        start, end = first - pad, last + pad
+        if not fetched:
+            return [(start, end)]
+        # Extend the fetched range, so that it stays contiguous.
+        one_day = datetime.timedelta(days=1)
+        missing = []
+        if start < fetched[0]:
+            missing.append((start, fetched[0] - one_day))
+        if end > fetched[1]:
+            missing.append((fetched[1] + one_day, end))
+        return missing
+
+    def prefetch(
+        self, timeseries_codes: Iterable[str], dates: Iterable[datetime.date]
+    ) -> None:
+        """Fetches the prices of the codes around the dates, if not fetched."""
+        dates = list(dates)
+        if not dates:
+            return
+        first, last = min(dates), max(dates)
+        yesterday = datetime.date.today() - datetime.timedelta(days=1)
+        with self._lock:
+            # Codes missing the same range are fetched by a single query.
+            codes_by_range: dict[DateRange, list[str]] = {}
+            for code in timeseries_codes:
+                for date_range in self._missing_ranges(code, first, last):
+                    codes_by_range.setdefault(date_range, []).append(code)
+            if not codes_by_range:
+                return
+            for (start, end), codes in codes_by_range.items():
+                self._merge(self.backend.fetch(codes, start, end))
+                self.num_fetches += 1
+                for code in codes:
+                    fetched = self._ranges.get(code, (start, end))
+                    self._ranges[code] = (
+                        min(fetched[0], start),
+                        min(max(fetched[1], end), yesterday),
+                    )
+            if self.cache_dir:
+                self._save_cache()
+
+    def get_prices(
+        self, timeseries_codes: Sequence[str], dates: Sequence[datetime.date]
+    ) -> dict[str, dict[datetime.date, float]]:
+        """Returns the prices of the codes on the dates.
+
+        Args:
+          timeseries_codes: List of timeseries codes to look up.
+          dates: List of dates to look up.
+
+        Returns:
+          Dictionary of timeseries codes to dictionaries of dates to prices,
+          like `price_utils.fetch_prices_from_bq`. Codes and dates without a
+          price are left out.
+        """
+        self.prefetch(timeseries_codes, dates)
+        prices = {}
+        for code in timeseries_codes:
+            code_prices = self._prices.get(code, {})
+            found = {d: code_prices[d] for d in dates if d in code_prices}
+            if found:
+                prices[code] = found
+        return prices
+
+    def get_price_matrix(
+        self, timeseries_codes: Sequence[str], dates: Sequence[datetime.date]
+    ) -> np.ndarray:
+        """Returns the prices of the codes on the dates, aligned.
+
+        Args:
+          timeseries_codes: List of timeseries codes to look up.
+          dates: List of dates to look up.
+
+        Returns:
+          A float array of shape (len(dates), len(timeseries_codes)), NaN
+          where a code has no price on a date.
+        """
+        self.prefetch(timeseries_codes, dates)
+        wanted = np.array(dates, dtype="datetime64[D]")
+        matrix = np.full((len(wanted), len(timeseries_codes)), np.nan)
+        with self._lock:
+            arrays = [self._sorted_arrays(code) for code in timeseries_codes]
+        for column, (code_dates, values) in enumerate(arrays):
+            if not len(code_dates):
+                continue
+            index = np.searchsorted(code_dates, wanted)
+            index[index == len(code_dates)] = 0
+            found = code_dates[index] == wanted
+            matrix[found, column] = values[index[found]]
+        return matrix
+
+
+def default_backend() -> PriceBackend:
+    """Returns the local file backend if configured, else BigQuery."""
+    if PRICES_FILE:
+        return LocalPriceBackend(PRICES_FILE)
+    return BigQueryPriceBackend()
+
+
+@functools.lru_cache(maxsize=None)
+def get_price_store() -> PriceStore:
+    """Returns the price store shared by the process."""
+    backend = default_backend()
+    # The local file is already in memory: there is no point caching it.
+    cache_dir = None if PRICES_FILE else PRICE_CACHE_DIR
+    return PriceStore(backend, cache_dir=cache_dir)
@@ -19,70 +19,22 @@ import logging
 import math
 import os
 from collections.abc import Sequence
+from typing import Optional, Union
 
+import numpy as np
+import pandas as pd
 from absl import app
-from google.cloud import bigquery
 
-bqclient = bigquery.Client()
+from .price_store import PriceStore, get_price_store
+
 logger = logging.getLogger(__name__)
 
 MOVE_SIZE_BP = 25
-DATASET_NAME = os.getenv("GOOGLE_CLOUD_BQ_DATASET", "fomc_research_agent")
 TIMESERIES_CODES = os.getenv(
     "GOOGLE_GENAI_FOMC_AGENT_TIMESERIES_CODES",
     "SFRH5,SFRZ5")
 
 
-def fetch_prices_from_bq(
-    timeseries_codes: list[str], dates: list[datetime.date]
-) -> dict[dict[datetime.date, float]]:
-    """Fetches prices from Bigquery.
-
-    Args:
-      timeseries_codes: List of timeseries codes to fetch.
-      dates: List of dates to fetch.
-
-    Returns:
-      Dictionary of timeseries codes to dictionaries of dates to prices.
-    """
-
-    logger.debug("fetch_prices_from_bq: timeseries_codes: %s", timeseries_codes)
-    logger.debug("fetch_prices_from_bq: dates: %s", dates)
-
-    query = f"""
-SELECT DISTINCT timeseries_code, date, value
-FROM {DATASET_NAME}.timeseries_data
-WHERE timeseries_code IN UNNEST(@timeseries_codes)
-  AND date IN UNNEST(@dates)
-"""
-
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ArrayQueryParameter(
-                "timeseries_codes", "STRING", timeseries_codes
-            ),
-            bigquery.ArrayQueryParameter("dates", "DATE", dates),
-        ]
-    )
-
-    prices = {}
-    query_job = bqclient.query(query, job_config=job_config)
-    results = query_job.result()
-    for row in results:
-        logger.debug(
-            "code: %s, date: %s, value: %s",
-            row.timeseries_code,
-            row.date,
-            row.value,
-        )
-        if row.timeseries_code not in prices:
-            prices[row.timeseries_code] = {row.date: row.value}
-        else:
-            prices[row.timeseries_code][row.date] = row.value
-
-    return prices
-
-
 def number_of_moves(
     front_ff_future_px: float, back_ff_future_px: float
 ) -> float:
@@ -125,6 +77,84 @@ def fed_meeting_probabilities(nmoves: float) -> dict:
     return output
 
 
+def compute_probabilities_batch(
+    meeting_dates: Sequence[Union[str, datetime.date]],
+    code_pairs: Sequence[tuple[str, str]],
+    store: Optional[PriceStore] = None,
+) -> pd.DataFrame:
+    """Computes the rate move probabilities for many meetings and code pairs.
+
+    The prices of all the codes on the meeting dates and the days before are
+    looked up at once, as a date by code matrix, and the implied rates, move
+    counts and odds are computed on arrays.
+
+    Args:
+      meeting_dates: Dates of the Fed meetings, as dates or ISO strings.
+      code_pairs: (near, far) timeseries code pairs.
+      store: The price store. Defaults to the shared store.
+
+    Returns:
+      A DataFrame with a row per meeting, code pair and observation (the day
+      before the meeting, then the meeting day), in that order, and columns
+      meeting_date, near_code, far_code, when ("before" or "after"), date,
+      near_price, far_price, near_implied_rate, far_implied_rate, num_moves,
+      move ("hike", "hikes" or "cut"), max_expected_move_bp, move_odds and
+      no_move_odds. The columns computed from a missing price are NaN/None.
+    """
+    store = store or get_price_store()
+    meetings = np.array(
+        [
+            datetime.date.fromisoformat(d) if isinstance(d, str) else d
+            for d in meeting_dates
+        ],
+        dtype="datetime64[D]",
+    )
+    codes = list(dict.fromkeys(code for pair in code_pairs for code in pair))
+    code_index = {code: i for i, code in enumerate(codes)}
+    near = np.array([code_index[near] for near, _ in code_pairs], dtype=int)
+    far = np.array([code_index[far] for _, far in code_pairs], dtype=int)
+
+    # (meeting, observation) dates, and their rows in the price matrix.
+    price_dates = np.stack([meetings - 1, meetings], axis=1)
+    dates, date_rows = np.unique(price_dates, return_inverse=True)
+    date_rows = date_rows.reshape(price_dates.shape)
+    prices = store.get_price_matrix(codes, dates.astype(object))
+
+    # Arrays of shape (meeting, pair, observation).
+    shape = (len(meetings), len(code_pairs), 2)
+    near_px = prices[date_rows[:, None, :], near[None, :, None]]
+    far_px = prices[date_rows[:, None, :], far[None, :, None]]
+    nmoves = number_of_moves(near_px, far_px)
+
+    abs_moves = np.abs(nmoves)
+    move = np.where(nmoves > 1, "hikes", np.where(nmoves > 0, "hike", "cut"))
+    move_odds = np.round(np.modf(abs_moves)[0], 2)
+
+    def column(values):
+        return np.broadcast_to(values, shape).ravel()
+
+    frame = pd.DataFrame(
+        {
+            "meeting_date": column(meetings[:, None, None]),
+            "near_code": column(np.array(codes, dtype=object)[near][None, :, None]),
+            "far_code": column(np.array(codes, dtype=object)[far][None, :, None]),
+            "when": column(np.array(["before", "after"], dtype=object)),
+            "date": column(price_dates[:, None, :]),
+            "near_price": near_px.ravel(),
+            "far_price": far_px.ravel(),
+            "near_implied_rate": 100 - near_px.ravel(),
+            "far_implied_rate": 100 - far_px.ravel(),
+            "num_moves": nmoves.ravel(),
+            "move": np.where(np.isnan(nmoves), None, move).ravel(),
+            "max_expected_move_bp": np.ceil(abs_moves).ravel() * MOVE_SIZE_BP,
+            "move_odds": move_odds.ravel(),
+            "no_move_odds": np.round(1 - move_odds, 2).ravel(),
+        }
+    )
+    frame["max_expected_move_bp"] = frame["max_expected_move_bp"].astype("Int64")
+    return frame
+
+
 def compute_probabilities(meeting_date_str: str) -> dict:
     """Computes the probabilities of a rate move for a specific date.
 
@@ -137,50 +167,47 @@ def compute_probabilities(meeting_date_str: str) -> dict:
     meeting_date = datetime.date.fromisoformat(meeting_date_str)
     meeting_date_day_before = meeting_date - datetime.timedelta(days=1)
     timeseries_codes = [x.strip() for x in TIMESERIES_CODES.split(",")]
-
-    prices = fetch_prices_from_bq(
-        timeseries_codes, [meeting_date, meeting_date_day_before]
-    )
-
-    error = None
-    for code in timeseries_codes:
-        if code not in prices:
-            error = f"No data for {code}"
-            break
-        elif meeting_date not in prices[code]:
-            error = f"No data for {code} on {meeting_date}"
-            break
-        elif meeting_date_day_before not in prices[code]:
-            error = f"No data for {code} on {meeting_date_day_before}"
-            break
-
-    logger.debug("compute_probabilities: found prices: %s", prices)
-
-    if error:
-        return {"status": "ERROR", "message": error}
-
     near_code = timeseries_codes[0]
     far_code = timeseries_codes[1]
-    num_moves_post = number_of_moves(
-        prices[near_code][meeting_date], prices[far_code][meeting_date]
-    )
-    num_moves_pre = number_of_moves(
-        prices[near_code][meeting_date_day_before],
-        prices[far_code][meeting_date_day_before],
-    )
 
-    probs_pre = fed_meeting_probabilities(num_moves_pre)
-    probs_post = fed_meeting_probabilities(num_moves_post)
+    probs = compute_probabilities_batch(
+        [meeting_date], [(near_code, far_code)]
+    ).set_index("when")
+
+    logger.debug("compute_probabilities: found prices: %s", probs)
+
+    for code, column in ((near_code, "near_price"), (far_code, "far_price")):
+        missing = probs[column].isna()
+        if missing.all():
+            return {"status": "ERROR", "message": f"No data for {code}"}
+        if missing["after"]:
+            return {
+                "status": "ERROR",
+                "message": f"No data for {code} on {meeting_date}",
+            }
+        if missing["before"]:
+            return {
+                "status": "ERROR",
+                "message": f"No data for {code} on {meeting_date_day_before}",
+            }
+
+    def odds(row):
+        return {
+            f"odds of {row.max_expected_move_bp}bp {row.move}": float(
+                row.move_odds
+            ),
+            f"odds of no {row.move}": float(row.no_move_odds),
+        }
 
     output = {
         (
             "Odds of a rate move within the next year ",
             "(computed before Fed meeting):",
-        ): (probs_pre),
+        ): odds(probs.loc["before"]),
         (
             "Odds of a rate move within the next year ",
             "(computed after Fed meeting)",
-        ): (probs_post),
+        ): odds(probs.loc["after"]),
     }
 
     return {"status": "OK", "output": output}
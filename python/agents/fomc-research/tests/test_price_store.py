@@ -0,0 +1,146 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the FOMC price store, over a local CSV of prices."""
+
+import datetime
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fomc_research.shared_libraries.price_store import (  # noqa: E402
+    LocalPriceBackend,
+    PriceStore,
+)
+
+DAY = datetime.timedelta(days=1)
+
+
+def date(text):
+    return datetime.date.fromisoformat(text)
+
+
+class RecordingBackend(LocalPriceBackend):
+    """Records the (codes, start, end) of each fetch."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.fetches = []
+
+    def fetch(self, timeseries_codes, start, end):
+        self.fetches.append((sorted(timeseries_codes), start, end))
+        return super().fetch(timeseries_codes, start, end)
+
+
+@pytest.fixture
+def prices_file(tmp_path):
+    # Daily prices of SFRH5 and SFRM5 until today, valued by day number.
+    first = date("2024-01-01")
+    days = pd.date_range(first, datetime.date.today()).date
+    rows = [
+        (code, day, offset + (day - first).days)
+        for code, offset in (("SFRH5", 0), ("SFRM5", 0.5))
+        for day in days
+    ]
+    path = tmp_path / "prices.csv"
+    pd.DataFrame(rows, columns=["timeseries_code", "date", "value"]).to_csv(
+        path, index=False
+    )
+    return str(path)
+
+
+@pytest.fixture
+def backend(prices_file):
+    return RecordingBackend(prices_file)
+
+
+def test_first_lookup_fetches_the_padded_range(backend):
+    store = PriceStore(backend, prefetch_days=10)
+    prices = store.get_prices(["SFRH5", "SFRM5"], [date("2024-03-01")])
+    assert prices == {
+        "SFRH5": {date("2024-03-01"): 60.0},
+        "SFRM5": {date("2024-03-01"): 60.5},
+    }
+    assert backend.fetches == [
+        (["SFRH5", "SFRM5"], date("2024-02-20"), date("2024-03-11"))
+    ]
+
+
+def test_lookups_within_the_fetched_range_are_local(backend):
+    store = PriceStore(backend, prefetch_days=10)
+    store.get_prices(["SFRH5"], [date("2024-03-01")])
+    assert store.get_prices(["SFRH5"], [date("2024-02-20"), date("2024-03-11")])
+    assert store.num_fetches == 1
+
+
+def test_missing_ranges_extend_the_fetched_range(backend):
+    store = PriceStore(backend, prefetch_days=10)
+    store.prefetch(["SFRH5"], [date("2024-03-01")])
+    assert store._missing_ranges(
+        "SFRH5", date("2024-02-25"), date("2024-03-05")
+    ) == []
+    assert store._missing_ranges(
+        "SFRH5", date("2024-02-15"), date("2024-03-15")
+    ) == [
+        (date("2024-02-05"), date("2024-02-19")),
+        (date("2024-03-12"), date("2024-03-25")),
+    ]
+    assert store._missing_ranges(
+        "SFRH5", date("2024-03-05"), date("2024-03-20")
+    ) == [(date("2024-03-12"), date("2024-03-30"))]
+
+
+def test_codes_missing_different_ranges_are_fetched_separately(backend):
+    store = PriceStore(backend, prefetch_days=10)
+    store.prefetch(["SFRH5"], [date("2024-03-01")])
+    prices = store.get_price_matrix(["SFRH5", "SFRM5"], [date("2024-03-15")])
+    assert prices.tolist() == [[74.0, 74.5]]
+    assert backend.fetches[1:] == [
+        (["SFRH5"], date("2024-03-12"), date("2024-03-25")),
+        (["SFRM5"], date("2024-03-05"), date("2024-03-25")),
+    ]
+    assert store._ranges["SFRH5"] == (date("2024-02-20"), date("2024-03-25"))
+
+
+def test_prefetch_does_not_record_dates_after_yesterday(backend):
+    today = datetime.date.today()
+    store = PriceStore(backend, prefetch_days=10)
+    store.prefetch(["SFRH5"], [today - 5 * DAY])
+    assert backend.fetches == [(["SFRH5"], today - 15 * DAY, today + 5 * DAY)]
+    assert store._ranges["SFRH5"] == (today - 15 * DAY, today - DAY)
+
+    store.prefetch(["SFRH5"], [today - DAY])
+    assert store.num_fetches == 1
+    # Today's price may not have been published at the first fetch.
+    store.prefetch(["SFRH5"], [today])
+    assert backend.fetches[-1] == (["SFRH5"], today, today + 10 * DAY)
+
+
+def test_cache_dir_is_reloaded_by_later_stores(backend, prices_file, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    store = PriceStore(backend, prefetch_days=10, cache_dir=cache_dir)
+    expected = store.get_prices(["SFRH5", "SFRM5"], [date("2024-03-01")])
+
+    reloaded_backend = RecordingBackend(prices_file)
+    reloaded = PriceStore(reloaded_backend, prefetch_days=10, cache_dir=cache_dir)
+    assert reloaded._ranges == store._ranges
+    assert reloaded.get_prices(["SFRH5", "SFRM5"], [date("2024-03-01")]) == expected
+    assert reloaded.get_price_matrix(["SFRH5"], [date("2024-02-20")]).tolist() == [
+        [50.0]
+    ]
+    assert reloaded_backend.fetches == []
@@ -0,0 +1,194 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the rate move probabilities, over a local CSV of prices."""
+
+import datetime
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fomc_research.shared_libraries import price_utils  # noqa: E402
+from fomc_research.shared_libraries.price_store import (  # noqa: E402
+    LocalPriceBackend,
+    PriceStore,
+)
+
+PRICES = [
+    # The day before 2025-01-29: -1.66 moves, then 2 moves.
+    ("SFRH5", "2025-01-28", 95.785),
+    ("SFRZ5", "2025-01-28", 96.2),
+    ("SFRH5", "2025-01-29", 96.0),
+    ("SFRZ5", "2025-01-29", 95.5),
+    # No SFRH5 price on the meeting day.
+    ("SFRH5", "2025-02-04", 95.9),
+    ("SFRZ5", "2025-02-04", 95.8),
+    ("SFRZ5", "2025-02-05", 95.8),
+    # No SFRH5 price on the day before.
+    ("SFRH5", "2025-02-12", 95.9),
+    ("SFRZ5", "2025-02-11", 95.8),
+    ("SFRZ5", "2025-02-12", 95.8),
+    # 0.4 moves on both days.
+    ("SFRH5", "2025-03-18", 95.9),
+    ("SFRZ5", "2025-03-18", 95.8),
+    ("SFRH5", "2025-03-19", 95.9),
+    ("SFRZ5", "2025-03-19", 95.8),
+]
+
+BEFORE = (
+    "Odds of a rate move within the next year ",
+    "(computed before Fed meeting):",
+)
+AFTER = (
+    "Odds of a rate move within the next year ",
+    "(computed after Fed meeting)",
+)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    path = tmp_path / "prices.csv"
+    pd.DataFrame(PRICES, columns=["timeseries_code", "date", "value"]).to_csv(
+        path, index=False
+    )
+    store = PriceStore(LocalPriceBackend(str(path)), prefetch_days=10)
+    monkeypatch.setattr(price_utils, "get_price_store", lambda: store)
+    monkeypatch.setattr(price_utils, "TIMESERIES_CODES", "SFRH5, SFRZ5")
+    return store
+
+
+def scalar_compute_probabilities(store, meeting_date_str):
+    """`compute_probabilities` as it was before the batch computation."""
+    meeting_date = datetime.date.fromisoformat(meeting_date_str)
+    day_before = meeting_date - datetime.timedelta(days=1)
+    codes = [x.strip() for x in price_utils.TIMESERIES_CODES.split(",")]
+    prices = store.get_prices(codes, [meeting_date, day_before])
+    for code in codes:
+        if code not in prices:
+            return {"status": "ERROR", "message": f"No data for {code}"}
+        if meeting_date not in prices[code]:
+            return {
+                "status": "ERROR",
+                "message": f"No data for {code} on {meeting_date}",
+            }
+        if day_before not in prices[code]:
+            return {"status": "ERROR", "message": f"No data for {code} on {day_before}"}
+    near, far = codes[0], codes[1]
+
+    def probabilities(date):
+        return price_utils.fed_meeting_probabilities(
+            price_utils.number_of_moves(prices[near][date], prices[far][date])
+        )
+
+    return {
+        "status": "OK",
+        "output": {
+            BEFORE: probabilities(day_before),
+            AFTER: probabilities(meeting_date),
+        },
+    }
+
+
+def test_odds_keys_and_values(store):
+    assert price_utils.compute_probabilities("2025-01-29") == {
+        "status": "OK",
+        "output": {
+            BEFORE: {"odds of 50bp cut": 0.66, "odds of no cut": 0.34},
+            AFTER: {"odds of 50bp hikes": 0.0, "odds of no hikes": 1.0},
+        },
+    }
+    assert price_utils.compute_probabilities("2025-03-19")["output"][AFTER] == {
+        "odds of 25bp hike": 0.4,
+        "odds of no hike": 0.6,
+    }
+
+
+@pytest.mark.parametrize(
+    "meeting_date, message",
+    [
+        ("2025-01-29", None),
+        ("2025-03-19", None),
+        ("2025-02-05", "No data for SFRH5 on 2025-02-05"),
+        ("2025-02-12", "No data for SFRH5 on 2025-02-11"),
+        ("2024-06-12", "No data for SFRH5"),
+    ],
+)
+def test_same_output_as_the_scalar_computation(store, meeting_date, message):
+    result = price_utils.compute_probabilities(meeting_date)
+    assert result == scalar_compute_probabilities(store, meeting_date)
+    assert result.get("message") == message
+    for odds in result.get("output", {}).values():
+        assert all(type(value) is float for value in odds.values())
+
+
+def test_missing_far_code(store, monkeypatch):
+    monkeypatch.setattr(price_utils, "TIMESERIES_CODES", "SFRH5,SFRU5")
+    assert price_utils.compute_probabilities("2025-01-29") == {
+        "status": "ERROR",
+        "message": "No data for SFRU5",
+    }
+
+
+def test_batch_frame(store):
+    frame = price_utils.compute_probabilities_batch(
+        ["2025-01-29", datetime.date(2025, 2, 5)],
+        [("SFRH5", "SFRZ5"), ("SFRZ5", "SFRH5")],
+        store=store,
+    )
+    assert list(frame.columns) == [
+        "meeting_date",
+        "near_code",
+        "far_code",
+        "when",
+        "date",
+        "near_price",
+        "far_price",
+        "near_implied_rate",
+        "far_implied_rate",
+        "num_moves",
+        "move",
+        "max_expected_move_bp",
+        "move_odds",
+        "no_move_odds",
+    ]
+    # A row per meeting, pair and observation, in that order.
+    assert len(frame) == 8
+    assert [str(d)[:10] for d in frame["meeting_date"]] == (
+        ["2025-01-29"] * 4 + ["2025-02-05"] * 4
+    )
+    assert list(frame["near_code"]) == ["SFRH5", "SFRH5", "SFRZ5", "SFRZ5"] * 2
+    assert list(frame["when"]) == ["before", "after"] * 4
+    assert [str(d)[:10] for d in frame["date"]] == [
+        "2025-01-28", "2025-01-29", "2025-01-28", "2025-01-29",
+        "2025-02-04", "2025-02-05", "2025-02-04", "2025-02-05",
+    ]  # fmt: skip
+
+    first = frame.iloc[0]
+    assert first.num_moves == pytest.approx(-1.66)
+    assert (first.move, first.max_expected_move_bp) == ("cut", 50)
+    assert (first.move_odds, first.no_move_odds) == (0.66, 0.34)
+    assert list(frame["move"][:4]) == ["cut", "hikes", "hikes", "cut"]
+    assert frame["max_expected_move_bp"].dtype == "Int64"
+
+    # No SFRH5 price on 2025-02-05: the columns computed from it are missing.
+    missing = frame.iloc[[5, 7]]
+    assert missing["near_price"].isna().tolist() == [True, False]
+    assert missing["far_price"].isna().tolist() == [False, True]
+    for column in ("num_moves", "move", "max_expected_move_bp", "move_odds"):
+        assert missing[column].isna().all(), column
+    assert frame.drop(index=[5, 7]).notna().all().all()
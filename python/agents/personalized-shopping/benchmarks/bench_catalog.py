@@ -0,0 +1,99 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Startup benchmark: raw JSON `load_products` vs. the compiled catalog.
+
+Besides `load_products`, times building the goal space as `SimServer` does at
+startup, which only decodes the catalog records of products having goals.
+
+Run from the `personalized-shopping` directory after downloading the data
+and running `build_catalog.py`:
+
+    python benchmarks/bench_catalog.py
+"""
+
+import os
+import sys
+import time
+
+from tabulate import tabulate
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(__file__), "../personalized_shopping/shared_libraries"),
+)
+
+from web_agent_site.engine.engine import load_products  # noqa: E402
+from web_agent_site.engine.goal_space import get_goal_space  # noqa: E402
+from web_agent_site.utils import DEFAULT_CATALOG_PATH, DEFAULT_FILE_PATH  # noqa: E402
+
+NUM_PRODUCTS = [1000, 10000, 50000]
+
+
+def time_load(num_products, catalog_path):
+    start = time.perf_counter()
+    all_products, product_item_dict, product_prices, _ = load_products(
+        filepath=DEFAULT_FILE_PATH,
+        num_products=num_products,
+        human_goals=True,
+        catalog_path=catalog_path,
+    )
+    loaded = time.perf_counter() - start
+    # Touch one product so the lazy path pays for at least one decode.
+    product_item_dict[all_products[len(all_products) // 2]["asin"]]
+    first = time.perf_counter() - start
+    get_goal_space(all_products, product_prices, human_goals=True)
+    return loaded, first, time.perf_counter() - start, len(all_products)
+
+
+def main():
+    if not os.path.exists(DEFAULT_CATALOG_PATH):
+        sys.exit(f"No compiled catalog at {DEFAULT_CATALOG_PATH}, run build_catalog.py")
+    rows = []
+    for num_products in NUM_PRODUCTS:
+        json_load, json_first, json_goals, n = time_load(num_products, catalog_path=None)
+        catalog_load, catalog_first, catalog_goals, _ = time_load(
+            num_products, DEFAULT_CATALOG_PATH
+        )
+        rows.append(
+            [
+                num_products,
+                n,
+                f"{json_load:.2f}",
+                f"{catalog_load:.3f}",
+                f"{catalog_first:.3f}",
+                f"{json_first / catalog_first:.0f}x",
+                f"{json_goals:.2f}",
+                f"{catalog_goals:.3f}",
+            ]
+        )
+    print(
+        tabulate(
+            rows,
+            headers=[
+                "num_products",
+                "loaded",
+                "json (s)",
+                "catalog open (s)",
+                "catalog + 1st product (s)",
+                "speedup",
+                "json + goals (s)",
+                "catalog + goals (s)",
+            ],
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Load test for `WebShopEnvPool`: throughput vs. number of concurrent sessions.
+
+Every simulated shopper searches, opens the first result and goes back to
+search, through the same `run` entry point the ADK tools use.
+
+    python benchmarks/bench_env_pool.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../personalized_shopping"))
+
+from shared_libraries.env_pool import WebShopEnvPool  # noqa: E402
+
+NUM_PRODUCTS = 1000
+CONCURRENCY = [1, 2, 4, 8, 16, 32]
+EPISODES_PER_SESSION = 5
+QUERIES = ["red dress", "running shoes", "coffee maker", "usb cable", "face cream"]
+
+
+def _episode(query):
+    def _run(env):
+        env.assign_instruction_text(f"Find me {query}.")
+        env.step(f"search[{query}]")
+        products = [
+            c for c in env.get_available_actions()["clickables"] if c.startswith("b0")
+        ]
+        steps = 1
+        if products:
+            env.step(f"click[{products[0]}]")
+            steps += 1
+        env.step("click[back to search]")
+        return steps + 1
+
+    return _run
+
+
+async def _shopper(pool, session_id):
+    steps = 0
+    for i in range(EPISODES_PER_SESSION):
+        steps += await pool.run(session_id, _episode(QUERIES[i % len(QUERIES)]))
+    return steps
+
+
+async def _load(pool, concurrency):
+    start = time.perf_counter()
+    steps = await asyncio.gather(
+        *(_shopper(pool, f"session-{concurrency}-{i}") for i in range(concurrency))
+    )
+    return sum(steps), time.perf_counter() - start
+
+
+def main():
+    pool = WebShopEnvPool(NUM_PRODUCTS, max_sessions=max(CONCURRENCY))
+    rows = []
+    baseline = None
+    for concurrency in CONCURRENCY:
+        steps, elapsed = asyncio.run(_load(pool, concurrency))
+        throughput = steps / elapsed
+        baseline = baseline or throughput
+        rows.append(
+            [
+                concurrency,
+                steps,
+                f"{elapsed:.2f}",
+                f"{throughput:.1f}",
+                f"{throughput / baseline:.2f}x",
+                len(pool),
+            ]
+        )
+    print(
+        tabulate(
+            rows,
+            headers=[
+                "sessions",
+                "steps",
+                "seconds",
+                "steps/s",
+                "vs 1 session",
+                "pooled envs",
+            ],
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-step latency: BeautifulSoup `text` observations vs. `structured` ones.
+
+Both environments share one `SimServer` and replay the same random walk
+(same goals, same actions). That both modes give the same observations is
+tested by `tests/test_page_model.py`.
+
+    python benchmarks/bench_observation.py
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../personalized_shopping"))
+
+from shared_libraries.web_agent_site.envs.web_agent_text_env import (  # noqa: E402
+    SimServer,
+    WebAgentTextEnv,
+)
+from shared_libraries.web_agent_site.utils import DEFAULT_FILE_PATH  # noqa: E402
+
+NUM_PRODUCTS = 1000
+NUM_EPISODES = 50
+MAX_STEPS = 15
+QUERIES = ["red dress", "running shoes", "coffee maker", "usb cable", "face cream"]
+
+
+def _walk(env, episode, rnd):
+    """Random walk through one episode, returns per-step latencies"""
+    latencies = []
+    env.reset(session=episode)
+    for _ in range(MAX_STEPS):
+        start = time.perf_counter()
+        actions = env.get_available_actions()
+        if actions["has_search_bar"]:
+            action = f"search[{rnd.choice(QUERIES)}]"
+        else:
+            action = f"click[{rnd.choice(actions['clickables'])}]"
+        _, _, done, _ = env.step(action)
+        env.observation
+        latencies.append(time.perf_counter() - start)
+        if done:
+            break
+    return latencies
+
+
+def main():
+    server = SimServer("http://127.0.0.1:3000", DEFAULT_FILE_PATH, num_products=NUM_PRODUCTS)
+    envs = {
+        mode: WebAgentTextEnv(observation_mode=mode, server=server, session_prefix=mode)
+        for mode in ("text", "structured")
+    }
+    latencies = {mode: [] for mode in envs}
+    for episode in range(NUM_EPISODES):
+        for mode, env in envs.items():
+            latencies[mode] += _walk(env, episode, random.Random(episode))
+
+    rows = []
+    for mode, values in latencies.items():
+        values = sorted(values)
+        rows.append(
+            [
+                mode,
+                len(values),
+                f"{statistics.mean(values) * 1000:.2f}",
+                f"{values[len(values) // 2] * 1000:.2f}",
+                f"{values[int(len(values) * 0.99)] * 1000:.2f}",
+            ]
+        )
+    print(tabulate(rows, headers=["mode", "steps", "mean ms", "p50 ms", "p99 ms"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Goal scoring throughput: `goal.get_reward` vs. `RewardEngine.score_many`.
+
+Scores the same random purchases with both; that the rewards are equal is
+tested by `tests/test_reward.py`.
+
+    python benchmarks/bench_reward.py
+"""
+
+import os
+import random
+import sys
+import time
+
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../personalized_shopping"))
+
+from shared_libraries.web_agent_site.engine.engine import load_products  # noqa: E402
+from shared_libraries.web_agent_site.engine.goal import (  # noqa: E402
+    get_goals,
+    get_reward,
+)
+from shared_libraries.web_agent_site.engine.reward import RewardEngine  # noqa: E402
+from shared_libraries.web_agent_site.utils import DEFAULT_FILE_PATH  # noqa: E402
+
+NUM_PRODUCTS = 1000
+NUM_PURCHASES = 5000
+
+
+def main():
+    all_products, _, product_prices, _ = load_products(
+        DEFAULT_FILE_PATH, num_products=NUM_PRODUCTS
+    )
+    goals = get_goals(all_products, product_prices)
+    rnd = random.Random(0)
+    purchases, purchase_goals = [], []
+    for _ in range(NUM_PURCHASES):
+        product = all_products[rnd.randrange(len(all_products))]
+        options = {name: rnd.choice(values) for name, values in product["options"].items()}
+        purchases.append((product, product_prices[product["asin"]], options))
+        purchase_goals.append(rnd.choice(goals))
+
+    start = time.perf_counter()
+    for (product, price, options), goal in zip(purchases, purchase_goals):
+        get_reward(product, goal, price=price, options=options)
+    rows = [["get_reward", f"{time.perf_counter() - start:.2f}"]]
+
+    for processes in (1, None):
+        engine = RewardEngine()
+        start = time.perf_counter()
+        engine.score_many(purchases, purchase_goals, processes=processes)
+        rows.append(
+            [f"score_many(processes={processes})", f"{time.perf_counter() - start:.2f}"]
+        )
+    print(tabulate(rows, headers=["scorer", f"{NUM_PURCHASES} purchases (s)"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Search latency with and without the shared search result cache.
+
+Replays a query log where each search is followed by a few Next/Prev page
+clicks, then searches a fresh set of queries with `SimServer.batch_search`.
+
+    python benchmarks/bench_search_cache.py
+"""
+
+import os
+import random
+import sys
+import time
+
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../personalized_shopping"))
+
+from shared_libraries.web_agent_site.envs.web_agent_text_env import (  # noqa: E402
+    SimServer,
+)
+from shared_libraries.web_agent_site.utils import DEFAULT_FILE_PATH  # noqa: E402
+
+NUM_PRODUCTS = 1000
+NUM_SEARCHES = 500
+PAGES_PER_SEARCH = 3
+WORDS = ["red", "dress", "running", "shoes", "coffee", "maker", "usb", "cable", "cream"]
+
+
+def _queries(rnd, n):
+    return [rnd.sample(WORDS, k=rnd.randint(1, 3)) for _ in range(n)]
+
+
+def _replay(server, queries):
+    server.user_sessions["bench"] = {"actions": {"search": 0}}
+    start = time.perf_counter()
+    for keywords in queries:
+        for page in range(1, PAGES_PER_SEARCH + 1):
+            server.search_results("bench", keywords=keywords, page=page)
+    return time.perf_counter() - start
+
+
+def main():
+    rnd = random.Random(0)
+    queries = _queries(rnd, NUM_SEARCHES)
+    rows = []
+    for cache_size in (0, 4096):
+        server = SimServer(
+            "http://127.0.0.1:3000",
+            DEFAULT_FILE_PATH,
+            num_products=NUM_PRODUCTS,
+            search_cache_size=cache_size,
+        )
+        elapsed = _replay(server, queries)
+        stats = server.search_stats()
+        rows.append(
+            [
+                cache_size,
+                len(queries) * PAGES_PER_SEARCH,
+                f"{elapsed / (len(queries) * PAGES_PER_SEARCH) * 1000:.3f}",
+                f"{stats['cache']['hit_rate']:.2%}",
+            ]
+        )
+    print(tabulate(rows, headers=["cache size", "searches", "mean ms", "hit rate"]))
+
+    batch = [" ".join(keywords) for keywords in _queries(rnd, NUM_SEARCHES)]
+    rows = []
+    for threads in (1, 8):
+        server.search_engine.cache.clear()
+        start = time.perf_counter()
+        server.search_engine.batch_search(batch, k=50, threads=threads)
+        rows.append([threads, len(batch), f"{time.perf_counter() - start:.3f}"])
+    print(tabulate(rows, headers=["threads", "queries", "batch_search s"]))
+
+
+if __name__ == "__main__":
+    main()
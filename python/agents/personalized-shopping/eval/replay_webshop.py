@@ -0,0 +1,140 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Replays WebShop episodes without the agent, to regression-test search
+ranking and reward changes.
+
+Scripted baseline over the first 500 goals, on 8 worker processes:
+
+    python eval/replay_webshop.py --num_goals 500 --num_workers 8 \
+        --output baseline.json
+
+Recorded traces (JSON lines of {"session_int": ..., "actions": [...]}),
+reporting the episodes whose reward changed since the baseline:
+
+    python eval/replay_webshop.py --traces traces.jsonl --baseline baseline.json
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../personalized_shopping"))
+
+from shared_libraries.eval_runner import (  # noqa: E402
+    DEFAULT_MAX_STEPS,
+    DEFAULT_SEED,
+    load_traces,
+    run_evaluation,
+)
+from shared_libraries.web_agent_site.utils import DEFAULT_FILE_PATH  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traces", help="JSON lines file of recorded episodes")
+    parser.add_argument(
+        "--num_goals",
+        type=int,
+        default=100,
+        help="Goals replayed with the scripted policy when --traces is not given",
+    )
+    parser.add_argument("--num_workers", type=int, default=os.cpu_count())
+    parser.add_argument("--num_products", type=int, default=1000)
+    parser.add_argument("--human_goals", type=int, default=1)
+    parser.add_argument("--max_steps", type=int, default=DEFAULT_MAX_STEPS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", help="Where to write the per-episode results")
+    parser.add_argument("--baseline", help="Results of a previous run to compare to")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    server_kwargs = dict(
+        base_url="http://127.0.0.1:3000",
+        file_path=DEFAULT_FILE_PATH,
+        num_products=args.num_products,
+        human_goals=args.human_goals,
+    )
+    if args.traces:
+        episodes = load_traces(args.traces)
+    else:
+        # Goals past the number of goals of the server are skipped
+        episodes = [{"session_int": i} for i in range(args.num_goals)]
+
+    report = run_evaluation(
+        server_kwargs,
+        episodes,
+        num_workers=args.num_workers,
+        max_steps=args.max_steps,
+        seed=args.seed,
+    )
+    summary = report.summary()
+
+    print(
+        tabulate(
+            [
+                [key, f"{summary[key]:.4g}"]
+                for key in (
+                    "episodes",
+                    "steps",
+                    "wall_time",
+                    "steps_per_sec",
+                    "mean_reward",
+                    "success_rate",
+                )
+            ]
+        )
+    )
+    print(
+        tabulate(
+            [
+                [
+                    action,
+                    latency["count"],
+                    f"{latency['mean'] * 1000:.2f}",
+                    f"{latency['p50'] * 1000:.2f}",
+                    f"{latency['p90'] * 1000:.2f}",
+                    f"{latency['p99'] * 1000:.2f}",
+                ]
+                for action, latency in summary["action_latency"].items()
+            ],
+            headers=["action", "count", "mean ms", "p50 ms", "p90 ms", "p99 ms"],
+        )
+    )
+    print(
+        tabulate(
+            [[name, f"{seconds:.3f}"] for name, seconds in summary["time_split"].items()],
+            headers=["time split", "seconds"],
+        )
+    )
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            changed = report.diff(json.load(f)["episodes"])
+        print(f"{len(changed)} episodes changed reward w.r.t. {args.baseline}")
+        if changed:
+            print(tabulate(changed, headers=["session_int", "baseline", "reward"]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"summary": summary, "episodes": report.episodes}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
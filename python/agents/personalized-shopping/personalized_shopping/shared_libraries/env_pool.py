@@ -0,0 +1,174 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Session-keyed pool of WebShop environments.
+
+All environments in a pool share one `SimServer`, i.e. one copy of the
+products, the search engine and the goals. Each ADK session only gets its own
+`WebAgentTextEnv` (a `SimBrowser` plus an entry in `SimServer.user_sessions`),
+which is evicted once idle for `ttl_seconds` or when more than `max_sessions`
+are alive.
+
+Tools key the pool with `session_key(tool_context.state)`, an id kept in the
+ADK session state, so that every call of a session gets the same environment.
+"""
+
+import asyncio
+from collections import OrderedDict
+import threading
+import time
+import uuid
+
+from .web_agent_site.envs.web_agent_text_env import SimServer, WebAgentTextEnv
+from .web_agent_site.utils import DEFAULT_FILE_PATH
+
+DEFAULT_MAX_SESSIONS = 256
+DEFAULT_TTL_SECONDS = 30 * 60
+
+# Session state key holding the pool key of an ADK session.
+SESSION_KEY_STATE = "webshop_session_id"
+
+
+def session_key(state):
+    """Pool key of the ADK session owning `state`, created on first use"""
+    if SESSION_KEY_STATE not in state:
+        state[SESSION_KEY_STATE] = uuid.uuid4().hex
+    return state[SESSION_KEY_STATE]
+
+
+class _PooledEnv:
+
+    def __init__(self, env):
+        self.env = env
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        # Number of `run` calls holding or waiting for this environment.
+        self.active = 0
+
+
+class WebShopEnvPool:
+    """LRU + TTL pool of per-session `WebAgentTextEnv`s over a shared `SimServer`"""
+
+    def __init__(
+        self,
+        num_products,
+        max_sessions=DEFAULT_MAX_SESSIONS,
+        ttl_seconds=DEFAULT_TTL_SECONDS,
+        observation_mode="text",
+        file_path=DEFAULT_FILE_PATH,
+        server=None,
+        **server_kwargs,
+    ):
+        """Arguments:
+
+        num_products (`int`) -- Number of products of the shared `SimServer`
+        max_sessions (`int`) -- Number of idle environments kept
+        ttl_seconds (`float`) -- Idle time after which an environment is dropped
+        observation_mode (`str`) -- Observation mode of the environments. The
+          tools save the page HTML on every step, which `structured` would
+          render anyway, hence `text`
+        file_path (`str`) -- Products file of the shared `SimServer`
+        server (`SimServer`) -- Server to share instead of creating one
+        """
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.observation_mode = observation_mode
+        self.server = (
+            SimServer(
+                "http://127.0.0.1:3000",
+                file_path,
+                num_products=num_products,
+                **server_kwargs,
+            )
+            if server is None
+            else server
+        )
+        self._envs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._envs)
+
+    def __contains__(self, session_id):
+        return session_id in self._envs
+
+    def get(self, session_id):
+        """Returns the environment of `session_id`, creating it if needed"""
+        return self._get_entry(session_id).env
+
+    def _get_entry(self, session_id, acquire=False):
+        with self._lock:
+            now = time.monotonic()
+            self._evict_expired(now)
+            entry = self._envs.get(session_id)
+            if entry is None:
+                entry = _PooledEnv(
+                    WebAgentTextEnv(
+                        observation_mode=self.observation_mode, server=self.server
+                    )
+                )
+                self._envs[session_id] = entry
+            else:
+                self._envs.move_to_end(session_id)
+            entry.last_used = now
+            if acquire:
+                entry.active += 1
+            self._evict_least_recently_used(keep=session_id)
+            return entry
+
+    async def run(self, session_id, fn):
+        """Runs `fn(env)` for the environment of `session_id`.
+
+        Calls for the same session are serialised, while calls for different
+        sessions run concurrently in worker threads so that they do not block
+        the event loop.
+        """
+        entry = self._get_entry(session_id, acquire=True)
+        try:
+            async with entry.lock:
+                return await asyncio.to_thread(fn, entry.env)
+        finally:
+            with self._lock:
+                entry.active -= 1
+                entry.last_used = time.monotonic()
+
+    def release(self, session_id):
+        """Drops the environment of `session_id`, if any"""
+        with self._lock:
+            if session_id in self._envs:
+                self._evict(session_id)
+
+    def _evict_expired(self, now):
+        expired = [
+            session_id
+            for session_id, entry in self._envs.items()
+            if not entry.active and now - entry.last_used >= self.ttl_seconds
+        ]
+        for session_id in expired:
+            self._evict(session_id)
+
+    def _evict_least_recently_used(self, keep):
+        # Environments in use are skipped, so the pool may briefly grow past
+        # `max_sessions` under a burst of concurrent sessions.
+        idle = [
+            session_id
+            for session_id, entry in self._envs.items()
+            if not entry.active and session_id != keep
+        ]
+        for session_id in idle[: max(0, len(self._envs) - self.max_sessions)]:
+            self._evict(session_id)
+
+    def _evict(self, session_id):
+        entry = self._envs.pop(session_id)
+        self.server.end_session(entry.env.session)
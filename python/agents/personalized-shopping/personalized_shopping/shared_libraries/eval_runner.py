@@ -0,0 +1,261 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Headless, process-parallel replay of WebShop episodes.
+
+An episode is a goal, designated by its `session_int`, plus either a recorded
+list of actions (`search[...]` / `click[...]`) or a scripted policy choosing
+them. `run_evaluation` shards the episodes by `session_int` across spawned
+worker processes, each building its own `SimServer` in its initializer: the
+Lucene searcher runs in a JVM, whose threads do not survive a fork. Each
+worker replays its episodes through a `WebAgentTextEnv` and sends back the
+rewards, the `verbose` reward breakdown and its latency histograms.
+
+Every server is built after seeding `random` with the same seed, so that all
+workers sample the same product prices and goals, and runs are reproducible.
+With a single worker the episodes are replayed in the current process, whose
+`random` state is restored afterwards.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import json
+import multiprocessing
+import random
+import time
+
+from .web_agent_site.engine.engine import parse_action
+from .web_agent_site.engine.metrics import PageTimings
+from .web_agent_site.envs.web_agent_text_env import SimServer, WebAgentTextEnv
+
+DEFAULT_MAX_STEPS = 15
+DEFAULT_SEED = 0
+
+# Server replayed by a worker process, built by `_init_worker`.
+_server = None
+
+
+def load_traces(path):
+    """Reads episodes from a JSON lines file of
+    `{"session_int": ..., "actions": [...]}` records
+    """
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def search_and_buy_policy(env, step):
+    """Scripted baseline: searches the goal query, opens the first result and
+    buys it with the goal options
+    """
+    session = env.server.user_sessions[env.session]
+    goal = session["goal"]
+    if step == 0:
+        return f"search[{goal['query']}]"
+    page = env.browser.page
+    if step == 1:
+        if not page.product_links:
+            return None
+        return f"click[{page.product_links[0].lower()}]"
+    if env.server.get_page_name(env.browser.current_url) != "item_page":
+        return None
+    goal_options = goal["goal_options"]
+    values = goal_options.values() if isinstance(goal_options, dict) else goal_options
+    chosen = session["options"].values()
+    for value in values:
+        if value.lower() in page.clickables and value not in chosen:
+            return f"click[{value}]"
+    return "click[buy now]"
+
+
+class EvaluationReport:
+    """Per-episode results and timings of a `run_evaluation` call"""
+
+    def __init__(self, episodes, wall_time, timings):
+        """Arguments:
+
+        episodes (`list`) -- One result dict per episode, by `session_int`
+        wall_time (`float`) -- Seconds spent replaying the episodes
+        timings (`dict`) -- "action", "search", "render" and "reward"
+          `PageTimings`, merged over all workers
+        """
+        self.episodes = episodes
+        self.wall_time = wall_time
+        self.timings = timings
+
+    @property
+    def steps(self):
+        return sum(e["steps"] for e in self.episodes)
+
+    def summary(self):
+        rewards = [e["reward"] for e in self.episodes]
+        action_total = self.timings["action"].total
+        time_split = {
+            name: self.timings[name].total for name in ("search", "render", "reward")
+        }
+        time_split["other"] = action_total - sum(time_split.values())
+        return dict(
+            episodes=len(self.episodes),
+            steps=self.steps,
+            wall_time=self.wall_time,
+            steps_per_sec=self.steps / self.wall_time if self.wall_time else 0.0,
+            mean_reward=sum(rewards) / len(rewards) if rewards else 0.0,
+            success_rate=(
+                sum(r == 1.0 for r in rewards) / len(rewards) if rewards else 0.0
+            ),
+            action_latency=self.timings["action"].summary(),
+            time_split=time_split,
+        )
+
+    def diff(self, baseline_episodes):
+        """(session_int, baseline reward, reward) of the episodes whose reward
+        changed w.r.t. `baseline_episodes`
+        """
+        baseline = {e["session_int"]: e["reward"] for e in baseline_episodes}
+        return [
+            (e["session_int"], baseline[e["session_int"]], e["reward"])
+            for e in self.episodes
+            if baseline.get(e["session_int"], e["reward"]) != e["reward"]
+        ]
+
+
+def run_evaluation(
+    server_kwargs,
+    episodes,
+    num_workers=1,
+    policy=search_and_buy_policy,
+    max_steps=DEFAULT_MAX_STEPS,
+    observation_mode="structured",
+    seed=DEFAULT_SEED,
+    server_factory=SimServer,
+):
+    """Replays `episodes` against servers built from `server_kwargs`.
+
+    Arguments:
+
+    server_kwargs (`dict`) -- `SimServer` arguments, built once per worker
+    episodes (`list`) -- Dicts with a `session_int` and, for recorded traces,
+      the `actions` to replay. Episodes whose `session_int` is not a goal of
+      the server are skipped
+    num_workers (`int`) -- Worker processes, spawned from this one; 1 replays
+      in the current process
+    policy (`callable`) -- `policy(env, step)` returns the next action, or
+      `None` to stop, for episodes without recorded actions; must be picklable
+    max_steps (`int`) -- Maximum number of actions per episode
+    observation_mode (`str`) -- Observation mode of the replaying environments
+    seed (`int`) -- Seed of `random` when building each server
+    server_factory (`callable`) -- Builds a server from `server_kwargs`; must be
+      picklable
+    """
+    shards = [
+        [e for e in episodes if e["session_int"] % num_workers == i]
+        for i in range(num_workers)
+    ]
+    args = (policy, max_steps, observation_mode)
+
+    start = time.perf_counter()
+    if num_workers <= 1:
+        with _seeded_random(seed):
+            server = server_factory(**server_kwargs)
+            outputs = [_run_shard(shards[0], *args, server=server)]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(server_factory, server_kwargs, seed),
+        ) as executor:
+            outputs = list(
+                executor.map(_run_shard, shards, *([arg] * num_workers for arg in args))
+            )
+    wall_time = time.perf_counter() - start
+
+    results, timings = [], {}
+    for shard_results, shard_timings in outputs:
+        results += shard_results
+        for name, page_timings in shard_timings.items():
+            timings.setdefault(name, PageTimings()).merge(page_timings)
+    results.sort(key=lambda e: e["session_int"])
+    return EvaluationReport(results, wall_time, timings)
+
+
+@contextmanager
+def _seeded_random(seed):
+    """Seeds `random`, which the engine draws from, and restores its state"""
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        yield
+    finally:
+        random.setstate(state)
+
+
+def _init_worker(server_factory, server_kwargs, seed):
+    global _server
+    random.seed(seed)
+    _server = server_factory(**server_kwargs)
+
+
+def _run_shard(episodes, policy, max_steps, observation_mode, server=None):
+    server = server if server is not None else _server
+    server.search_time = PageTimings()
+    server.render_time = PageTimings()
+    server.reward_time = PageTimings()
+    action_time = PageTimings()
+    env = WebAgentTextEnv(observation_mode=observation_mode, server=server)
+    server.end_session(env.session)
+    results = [
+        _run_episode(env, episode, policy, max_steps, action_time)
+        for episode in episodes
+        if 0 <= episode["session_int"] < len(server.goals)
+    ]
+    timings = dict(
+        action=action_time,
+        search=server.search_time,
+        render=server.render_time,
+        reward=server.reward_time,
+    )
+    return results, timings
+
+
+def _run_episode(env, episode, policy, max_steps, action_time):
+    session_int = episode["session_int"]
+    recorded = episode.get("actions")
+    env.reset(session=session_int)
+    goal = env.server.user_sessions[env.session]["goal"]
+
+    actions, reward, done = [], 0.0, False
+    for step in range(max_steps):
+        if recorded is not None:
+            action = recorded[step] if step < len(recorded) else None
+        else:
+            action = policy(env, step)
+        if action is None:
+            break
+        with action_time.time(parse_action(action)[0]):
+            _, reward, done, _ = env.step(action)
+        actions.append(action)
+        if done:
+            break
+
+    session = env.server.end_session(env.session)
+    return dict(
+        session_int=session_int,
+        goal_asin=goal["asin"],
+        purchased_asin=session.get("asin") if done else None,
+        reward=reward,
+        done=done,
+        steps=len(actions),
+        actions=actions,
+        info=session.get("verbose_info"),
+    )
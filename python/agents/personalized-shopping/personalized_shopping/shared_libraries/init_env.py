@@ -14,6 +14,8 @@
 
 import gym
 
+from .env_pool import WebShopEnvPool
+
 gym.envs.registration.register(
     id="WebAgentTextEnv-v0",
     entry_point=(
@@ -22,16 +24,8 @@ gym.envs.registration.register(
 )
 
 
-def init_env(num_products):
-    env = gym.make(
-        "WebAgentTextEnv-v0",
-        observation_mode="text",
-        num_products=num_products,
-    )
-    return env
-
-
 num_product_items = 50000
-webshop_env = init_env(num_product_items)
-webshop_env.reset()
-print(f"Finished initializing WebshopEnv with {num_product_items} items.")
+# Products, search engine and goals are loaded once and shared by all
+# sessions; each ADK session gets its own lightweight environment.
+webshop_env_pool = WebShopEnvPool(num_product_items)
+print(f"Finished initializing WebshopEnv pool with {num_product_items} items.")
@@ -0,0 +1,22 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+
+sys.path.insert(0, "../")
+
+from web_agent_site.engine.catalog import build_catalog
+from web_agent_site.utils import DEFAULT_CATALOG_PATH, DEFAULT_FILE_PATH
+
+build_catalog(filepath=DEFAULT_FILE_PATH, catalog_path=DEFAULT_CATALOG_PATH)
@@ -0,0 +1,408 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compiled, memory-mapped product catalog for the WebShop engine.
+
+`load_products` spends most of its time parsing the raw product JSON and
+re-normalising prices, options and keys. `build_catalog` runs that pipeline
+once and writes the result to a versioned directory:
+
+  manifest.json       -- format version, source fingerprints and vocabularies
+  asins.npy           -- fixed-width asin column
+  source_index.npy    -- position of each row in the source product list
+  category_codes.npy  -- index into the `categories` vocabulary
+  query_codes.npy     -- index into the `queries` vocabulary
+  pricing.npy         -- pre-parsed (low, high) price, NaN when single price
+  records.bin         -- one JSON record per product (options, text fields...)
+  records_offsets.npy -- byte offsets of each record in `records.bin`
+  attr_offsets.npy    -- CSR offsets of the attribute -> row index
+  attr_rows.npy       -- CSR row ids of the attribute -> row index
+  human_goal_rows.npy     -- rows of the products with human instructions
+  synthetic_goal_rows.npy -- rows of the products with a synthetic instruction
+  option_offsets.npy      -- CSR offsets of the row -> option radices column
+  option_radices.npy      -- number of values of each option, by option name
+  goal_attr_offsets.npy   -- CSR offsets of the row -> instruction attributes
+  goal_attr_codes.npy     -- index into the `instruction_attributes` vocabulary
+
+`CompiledCatalog` maps those files read-only and only decodes a product
+record when it is actually accessed. Decoded records are not cached: every
+access returns a fresh dict, so changes made to it are not seen by later
+accesses.
+"""
+
+from collections.abc import Mapping, Sequence
+import json
+import math
+import mmap
+import os
+import random
+import shutil
+
+import numpy as np
+from tqdm import tqdm
+
+from ..utils import DEFAULT_ATTR_PATH, HUMAN_ATTR_PATH
+
+CATALOG_VERSION = 3
+
+# Keys only meaningful for one of the two goal modes. Both are compiled into
+# the catalog and the irrelevant ones are dropped when a record is decoded.
+HUMAN_GOAL_KEYS = ("instructions",)
+SYNTHETIC_GOAL_KEYS = ("instruction_text", "instruction_attributes")
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def _source_fingerprints(filepath):
+    return [
+        _fingerprint(p)
+        for p in (filepath, DEFAULT_ATTR_PATH, HUMAN_ATTR_PATH)
+        if os.path.exists(p)
+    ]
+
+
+def build_catalog(filepath, catalog_path):
+    """Compile the products in `filepath` into a catalog at `catalog_path`.
+
+    Arguments:
+
+    filepath (`str`) -- Raw product file, e.g. `items_shuffle.json`
+    catalog_path (`str`) -- Output directory, replaced atomically
+    """
+    from .engine import load_products_from_json
+
+    all_products, source_index = load_products_from_json(
+        filepath, keep_all_goal_annotations=True
+    )
+
+    tmp_path = f"{catalog_path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    categories, queries, attributes = {}, {}, {}
+    category_codes = np.empty(len(all_products), dtype=np.int32)
+    query_codes = np.empty(len(all_products), dtype=np.int32)
+    pricing = np.full((len(all_products), 2), np.nan, dtype=np.float64)
+    offsets = np.zeros(len(all_products) + 1, dtype=np.int64)
+    attr_to_rows = []
+    human_goal_rows, synthetic_goal_rows = [], []
+    instruction_attributes = {}
+    option_offsets = np.zeros(len(all_products) + 1, dtype=np.int64)
+    option_radices = []
+    goal_attr_offsets = np.zeros(len(all_products) + 1, dtype=np.int64)
+    goal_attr_codes = []
+
+    with open(os.path.join(tmp_path, "records.bin"), "wb") as f:
+        for row, p in tqdm(enumerate(all_products), total=len(all_products)):
+            category_codes[row] = categories.setdefault(p["category"], len(categories))
+            query_codes[row] = queries.setdefault(p["query"], len(queries))
+            # `load_products_from_json` keeps at most a (low, high) range
+            prices = p["pricing"][:2]
+            pricing[row, : len(prices)] = prices
+            if "instructions" in p:
+                human_goal_rows.append(row)
+            if p.get("instruction_text") is not None:
+                synthetic_goal_rows.append(row)
+            # Goal spaces enumerate option combinations in option name order
+            option_radices += [len(p["options"][name]) for name in sorted(p["options"])]
+            option_offsets[row + 1] = len(option_radices)
+            goal_attr_codes += [
+                instruction_attributes.setdefault(a, len(instruction_attributes))
+                for a in p.get("instruction_attributes") or []
+            ]
+            goal_attr_offsets[row + 1] = len(goal_attr_codes)
+            for a in p["Attributes"]:
+                code = attributes.setdefault(a, len(attributes))
+                if code == len(attr_to_rows):
+                    attr_to_rows.append([])
+                attr_to_rows[code].append(row)
+            record = json.dumps(p, separators=(",", ":")).encode("utf-8")
+            f.write(record)
+            offsets[row + 1] = offsets[row] + len(record)
+
+    attr_offsets = np.zeros(len(attr_to_rows) + 1, dtype=np.int64)
+    attr_offsets[1:] = np.cumsum([len(rows) for rows in attr_to_rows])
+    attr_rows = np.fromiter(
+        (row for rows in attr_to_rows for row in rows),
+        dtype=np.int32,
+        count=int(attr_offsets[-1]),
+    )
+
+    columns = {
+        "asins": np.array([p["asin"] for p in all_products], dtype="S10"),
+        "source_index": np.asarray(source_index, dtype=np.int64),
+        "category_codes": category_codes,
+        "query_codes": query_codes,
+        "pricing": pricing,
+        "records_offsets": offsets,
+        "attr_offsets": attr_offsets,
+        "attr_rows": attr_rows,
+        "human_goal_rows": np.asarray(human_goal_rows, dtype=np.int64),
+        "synthetic_goal_rows": np.asarray(synthetic_goal_rows, dtype=np.int64),
+        "option_offsets": option_offsets,
+        "option_radices": np.asarray(option_radices, dtype=np.int64),
+        "goal_attr_offsets": goal_attr_offsets,
+        "goal_attr_codes": np.asarray(goal_attr_codes, dtype=np.int32),
+    }
+    for name, column in columns.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), column)
+
+    manifest = {
+        "version": CATALOG_VERSION,
+        "num_products": len(all_products),
+        "sources": _source_fingerprints(filepath),
+        "categories": list(categories),
+        "queries": list(queries),
+        "attributes": list(attributes),
+        "instruction_attributes": list(instruction_attributes),
+    }
+    with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(catalog_path, ignore_errors=True)
+    os.rename(tmp_path, catalog_path)
+    print(f"Compiled {len(all_products)} products into {catalog_path}.")
+    return catalog_path
+
+
+class CompiledCatalog:
+    """Read-only view over a catalog written by `build_catalog`."""
+
+    def __init__(self, catalog_path, num_products=None, human_goals=True):
+        with open(os.path.join(catalog_path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != CATALOG_VERSION:
+            raise ValueError(
+                f"Catalog version {self.manifest.get('version')} is not supported,"
+                f" expected {CATALOG_VERSION}."
+            )
+        self.catalog_path = catalog_path
+        self.human_goals = human_goals
+        self._drop_keys = SYNTHETIC_GOAL_KEYS if human_goals else HUMAN_GOAL_KEYS
+
+        def column(name):
+            return np.load(os.path.join(catalog_path, f"{name}.npy"), mmap_mode="r")
+
+        self.source_index = column("source_index")
+        # `num_products` truncates the source list before de-duplication, so
+        # the number of catalog rows kept is found on the source index.
+        self.num_rows = (
+            len(self.source_index)
+            if num_products is None
+            else int(np.searchsorted(self.source_index, num_products))
+        )
+        self.asins = column("asins")[: self.num_rows]
+        self.category_codes = column("category_codes")[: self.num_rows]
+        self.query_codes = column("query_codes")[: self.num_rows]
+        self.pricing = column("pricing")[: self.num_rows]
+        self.records_offsets = column("records_offsets")
+        self.attr_offsets = column("attr_offsets")
+        self.attr_rows = column("attr_rows")
+        goal_rows = column("human_goal_rows" if human_goals else "synthetic_goal_rows")
+        self.goal_rows = goal_rows[goal_rows < self.num_rows]
+        self.option_offsets = column("option_offsets")
+        self.option_radices = column("option_radices")
+        self.goal_attr_offsets = column("goal_attr_offsets")
+        self.goal_attr_codes = column("goal_attr_codes")
+
+        self.categories = self.manifest["categories"]
+        self.queries = self.manifest["queries"]
+        self.attribute_codes = {a: i for i, a in enumerate(self.manifest["attributes"])}
+
+        with open(os.path.join(catalog_path, "records.bin"), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._records = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            )
+        self._asin_to_row = None
+
+    @classmethod
+    def open_if_fresh(cls, catalog_path, filepath, num_products=None, human_goals=True):
+        """Open the catalog if it exists and was compiled from the current sources.
+
+        Returns `None` otherwise so callers can fall back to the raw JSON.
+        """
+        if catalog_path is None or not os.path.exists(
+            os.path.join(catalog_path, "manifest.json")
+        ):
+            return None
+        try:
+            catalog = cls(catalog_path, num_products=num_products, human_goals=human_goals)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring compiled catalog at {catalog_path}: {e}")
+            return None
+        if os.path.exists(filepath) and catalog.manifest["sources"] != (
+            _source_fingerprints(filepath)
+        ):
+            print(f"Compiled catalog at {catalog_path} is stale, rebuild it.")
+            return None
+        return catalog
+
+    def __len__(self):
+        return self.num_rows
+
+    def asin(self, row):
+        return self.asins[row].decode("utf-8")
+
+    def row_of(self, asin):
+        """Returns the row of `asin`, or `None` if it is not in the catalog"""
+        if self._asin_to_row is None:
+            self._asin_to_row = {
+                a.decode("utf-8"): row for row, a in enumerate(self.asins.tolist())
+            }
+        return self._asin_to_row.get(asin)
+
+    def record(self, row):
+        """Decodes the full product dict stored at `row`, a new dict every call"""
+        start, end = self.records_offsets[row], self.records_offsets[row + 1]
+        product = json.loads(self._records[start:end])
+        for key in self._drop_keys:
+            product.pop(key, None)
+        return product
+
+    def option_radices_of(self, row):
+        """Number of values of each option of `row`, in option name order"""
+        return self.option_radices[
+            self.option_offsets[row] : self.option_offsets[row + 1]
+        ]
+
+    def goal_attribute_codes(self, row):
+        """Codes of the synthetic goal ("instruction") attributes of `row`"""
+        return self.goal_attr_codes[
+            self.goal_attr_offsets[row] : self.goal_attr_offsets[row + 1]
+        ]
+
+    def rows_for_attribute(self, attribute):
+        code = self.attribute_codes.get(attribute)
+        if code is None:
+            return np.empty(0, dtype=np.int32)
+        rows = self.attr_rows[self.attr_offsets[code] : self.attr_offsets[code + 1]]
+        return rows[rows < self.num_rows]
+
+    def product_prices(self):
+        """Same sampling as `engine.generate_product_prices`, read off the columns"""
+        product_prices = dict()
+        for asin, (low, high) in zip(self.asins.tolist(), self.pricing.tolist()):
+            if math.isnan(low):
+                price = 100.0
+            elif math.isnan(high):
+                price = low
+            else:
+                price = random.uniform(low, high)
+            product_prices[asin.decode("utf-8")] = price
+        return product_prices
+
+    @property
+    def products(self):
+        return CatalogProducts(self)
+
+    @property
+    def product_item_dict(self):
+        return CatalogProductIndex(self)
+
+    @property
+    def attribute_to_asins(self):
+        return CatalogAttributeIndex(self)
+
+
+class CatalogProducts(Sequence):
+    """List-like access to the catalog products, decoded on demand.
+
+    Products are decoded on every access and not written back, so callers must
+    not rely on mutating them.
+    """
+
+    def __init__(self, catalog, rows=None):
+        """Arguments:
+
+        catalog (`CompiledCatalog`) -- Catalog to read the products from
+        rows (`array`) -- Catalog rows of the products, all rows by default
+        """
+        self.catalog = catalog
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.catalog) if self.rows is None else len(self.rows)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(len(self))[idx]]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("catalog index out of range")
+        return self.catalog.record(idx if self.rows is None else int(self.rows[idx]))
+
+    def goal_products(self):
+        """The products having goals in the catalog's goal mode"""
+        rows = self.catalog.goal_rows
+        if self.rows is not None:
+            rows = np.intersect1d(self.rows, rows)
+        return CatalogProducts(self.catalog, rows)
+
+
+class CatalogProductIndex(Mapping):
+    """Dict-like asin -> product access, decoded on demand like `CatalogProducts`"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def __getitem__(self, asin):
+        row = self.catalog.row_of(asin)
+        if row is None:
+            raise KeyError(asin)
+        return self.catalog.record(row)
+
+    def __contains__(self, asin):
+        return self.catalog.row_of(asin) is not None
+
+    def __iter__(self):
+        return (self.catalog.asin(row) for row in range(len(self.catalog)))
+
+    def __len__(self):
+        return len(self.catalog)
+
+
+class CatalogAttributeIndex(Mapping):
+    """Dict-like attribute -> set of asins; unknown attributes map to an empty set"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def __getitem__(self, attribute):
+        return {self.catalog.asin(row) for row in self.catalog.rows_for_attribute(attribute)}
+
+    def __contains__(self, attribute):
+        return len(self.catalog.rows_for_attribute(attribute)) > 0
+
+    def __iter__(self):
+        return (a for a in self.catalog.attribute_codes if a in self)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def goal_products(all_products):
+    """Products of `all_products` that goals are built from.
+
+    Only narrows a compiled catalog, whose goal rows are known without
+    decoding any record; `get_human_goals` and `get_synthetic_goals` skip the
+    other products anyway, so the goals and random draws are unchanged.
+    """
+    if isinstance(all_products, CatalogProducts):
+        return all_products.goal_products()
+    return all_products
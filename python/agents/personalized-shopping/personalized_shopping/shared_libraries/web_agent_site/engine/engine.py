@@ -22,16 +22,20 @@ import os
 import random
 import re
 
-from flask import render_template_string
+from jinja2 import Environment, FileSystemLoader
 from pyserini.search.lucene import LuceneSearcher
 from rich import print
 from tqdm import tqdm
+from werkzeug.routing import Map, Rule
 
 from ..utils import (
     BASE_DIR,
     DEFAULT_ATTR_PATH,
+    DEFAULT_CATALOG_PATH,
     HUMAN_ATTR_PATH,
 )
+from .catalog import CompiledCatalog
+from .search_index import DEFAULT_SEARCH_CACHE_SIZE, SearchIndex
 
 TEMPLATE_DIR = os.path.join(BASE_DIR, "templates")
 
@@ -39,6 +43,11 @@ SEARCH_RETURN_N = 50
 PRODUCT_WINDOW = 10
 TOP_K_ATTR = 10
 
+# Keyword prefixes selecting products without the search engine, see
+# `get_top_n_product_from_keywords`.
+FILTER_KEYWORDS = {"<c>": "category", "<q>": "query", "<a>": "attribute"}
+SPECIAL_KEYWORDS = ("<r>", *FILTER_KEYWORDS)
+
 END_BUTTON = "Buy Now"
 NEXT_PAGE = "Next >"
 PREV_PAGE = "< Prev"
@@ -50,21 +59,92 @@ ACTION_TO_TEMPLATE = {
     "Reviews": "review_page.html",
     "Attributes": "attributes_page.html",
 }
+PAGE_TEMPLATES = (
+    "search_page.html",
+    "results_page.html",
+    "item_page.html",
+    "done_page.html",
+    *ACTION_TO_TEMPLATE.values(),
+)
+
+
+# Endpoints of the WebShop web app referenced by `url_for` in the templates.
+# The simulator serves all of them from `/`, so their arguments end up in the
+# query string.
+WEB_APP_ENDPOINTS = ("index", "search_results", "item_page", "item_sub_page", "done")
+
 
+class TemplateRegistry:
+    """Loads and compiles every WebShop page template once.
+
+    Templates are rendered straight from the compiled Jinja objects, without
+    a Flask app or request context; `url_for` is resolved against a bound
+    `url_map` (the simulator's Flask app routes by default).
+    """
+
+    def __init__(self, template_dir=TEMPLATE_DIR, url_map=None):
+        if url_map is None:
+            url_map = Map(
+                [Rule("/", endpoint=endpoint) for endpoint in WEB_APP_ENDPOINTS]
+                + [Rule("/static/<path:filename>", endpoint="static")]
+            )
+        self.url_adapter = url_map.bind("localhost", script_name="/")
+        self.jinja_env = Environment(
+            loader=FileSystemLoader(template_dir),
+            autoescape=True,
+            auto_reload=False,
+        )
+        self.jinja_env.globals["url_for"] = self.url_for
+        self.templates = {
+            name: self.jinja_env.get_template(name) for name in PAGE_TEMPLATES
+        }
 
-def map_action_to_html(action, **kwargs):
+    def url_for(self, endpoint, **values):
+        return self.url_adapter.build(endpoint, values)
+
+    def render(self, template_name, **context):
+        return self.templates[template_name].render(**context)
+
+
+def action_to_template(action):
+    """Name of the template rendered for `action`"""
     action_name, action_arg = parse_action(action)
     if action_name == "start":
-        path = os.path.join(TEMPLATE_DIR, "search_page.html")
-        html = render_template_string(
-            read_html_template(path=path),
+        return "search_page.html"
+    elif action_name == "search":
+        return "results_page.html"
+    elif action_name == "click" and action_arg == END_BUTTON:
+        return "done_page.html"
+    elif action_name == "click" and action_arg in ACTION_TO_TEMPLATE:
+        return ACTION_TO_TEMPLATE[action_arg]
+    elif action_name == "click":
+        return "item_page.html"
+    else:
+        raise ValueError("Action name not recognized.")
+
+
+_default_templates = None
+
+
+def get_default_templates():
+    global _default_templates
+    if _default_templates is None:
+        _default_templates = TemplateRegistry()
+    return _default_templates
+
+
+def map_action_to_html(action, templates=None, **kwargs):
+    templates = templates if templates is not None else get_default_templates()
+    template_name = action_to_template(action)
+    if template_name == "search_page.html":
+        html = templates.render(
+            template_name,
             session_id=kwargs["session_id"],
             instruction_text=kwargs["instruction_text"],
         )
-    elif action_name == "search":
-        path = os.path.join(TEMPLATE_DIR, "results_page.html")
-        html = render_template_string(
-            read_html_template(path=path),
+    elif template_name == "results_page.html":
+        html = templates.render(
+            template_name,
             session_id=kwargs["session_id"],
             products=kwargs["products"],
             keywords=kwargs["keywords"],
@@ -72,10 +152,9 @@ def map_action_to_html(action, **kwargs):
             total=kwargs["total"],
             instruction_text=kwargs["instruction_text"],
         )
-    elif action_name == "click" and action_arg == END_BUTTON:
-        path = os.path.join(TEMPLATE_DIR, "done_page.html")
-        html = render_template_string(
-            read_html_template(path),
+    elif template_name == "done_page.html":
+        html = templates.render(
+            template_name,
             session_id=kwargs["session_id"],
             reward=kwargs["reward"],
             asin=kwargs["asin"],
@@ -89,10 +168,9 @@ def map_action_to_html(action, **kwargs):
             category=kwargs.get("category"),
             product_category=kwargs.get("product_category"),
         )
-    elif action_name == "click" and action_arg in ACTION_TO_TEMPLATE:
-        path = os.path.join(TEMPLATE_DIR, ACTION_TO_TEMPLATE[action_arg])
-        html = render_template_string(
-            read_html_template(path),
+    elif template_name in ACTION_TO_TEMPLATE.values():
+        html = templates.render(
+            template_name,
             session_id=kwargs["session_id"],
             product_info=kwargs["product_info"],
             keywords=kwargs["keywords"],
@@ -101,10 +179,9 @@ def map_action_to_html(action, **kwargs):
             options=kwargs["options"],
             instruction_text=kwargs.get("instruction_text"),
         )
-    elif action_name == "click":
-        path = os.path.join(TEMPLATE_DIR, "item_page.html")
-        html = render_template_string(
-            read_html_template(path),
+    else:
+        html = templates.render(
+            template_name,
             session_id=kwargs["session_id"],
             product_info=kwargs["product_info"],
             keywords=kwargs["keywords"],
@@ -114,8 +191,6 @@ def map_action_to_html(action, **kwargs):
             instruction_text=kwargs.get("instruction_text"),
             show_attrs=kwargs["show_attrs"],
         )
-    else:
-        raise ValueError("Action name not recognized.")
     return html
 
 
@@ -154,36 +229,56 @@ def convert_web_app_string_to_var(name, string):
     return var
 
 
+def parse_filter_keywords(keywords):
+    """Filters of a `<c>` / `<q>` / `<a>` special search.
+
+    Filters can be combined, e.g. `<c> beauty <a> long lasting` selects the
+    products of the beauty category having the "long lasting" attribute.
+    Categories are a single word, queries and attributes span up to the next
+    filter keyword.
+    """
+    filters, field, words = {}, None, []
+    for word in keywords + [None]:
+        if word is None or word in FILTER_KEYWORDS:
+            if field == "category":
+                filters[field] = words[0].strip() if words else ""
+            elif field is not None:
+                filters[field] = " ".join(words).strip()
+            field, words = FILTER_KEYWORDS.get(word), []
+        else:
+            words.append(word)
+    return filters
+
+
 def get_top_n_product_from_keywords(
     keywords,
     search_engine,
     all_products,
     product_item_dict,
-    attribute_to_asins=None,
+    product_index,
 ):
+    """Products returned for `keywords`, best first.
+
+    `product_index` is the `ProductIndex` of `all_products`, built once with
+    `build_product_index`, which serves the `<c>` / `<q>` / `<a>` searches.
+    """
     if keywords[0] == "<r>":
         top_n_products = random.sample(all_products, k=SEARCH_RETURN_N)
-    elif keywords[0] == "<a>":
-        attribute = " ".join(keywords[1:]).strip()
-        asins = attribute_to_asins[attribute]
-        top_n_products = [p for p in all_products if p["asin"] in asins]
-    elif keywords[0] == "<c>":
-        category = keywords[1].strip()
-        top_n_products = [p for p in all_products if p["category"] == category]
-    elif keywords[0] == "<q>":
-        query = " ".join(keywords[1:]).strip()
-        top_n_products = [p for p in all_products if p["query"] == query]
+    elif keywords[0] in FILTER_KEYWORDS:
+        top_n_products = product_index.products(
+            all_products, **parse_filter_keywords(keywords)
+        )
     else:
         keywords = " ".join(keywords)
-        hits = search_engine.search(keywords, k=SEARCH_RETURN_N)
-        docs = [search_engine.doc(hit.docid) for hit in hits]
-        top_n_asins = [json.loads(doc.raw())["id"] for doc in docs]
-        top_n_products = [
-            product_item_dict[asin] for asin in top_n_asins if asin in product_item_dict
-        ]
+        top_n_asins = search_engine.search(keywords, k=SEARCH_RETURN_N)
+        top_n_products = get_products_from_asins(top_n_asins, product_item_dict)
     return top_n_products
 
 
+def get_products_from_asins(asins, product_item_dict):
+    return [product_item_dict[asin] for asin in asins if asin in product_item_dict]
+
+
 def get_product_per_page(top_n_products, page):
     return top_n_products[(page - 1) * PRODUCT_WINDOW : page * PRODUCT_WINDOW]
 
@@ -203,7 +298,8 @@ def generate_product_prices(all_products):
     return product_prices
 
 
-def init_search_engine(num_products=None):
+def init_search_engine(num_products=None, cache_size=DEFAULT_SEARCH_CACHE_SIZE):
+    """Opens the product index for `num_products` as a cached `SearchIndex`"""
     if num_products == 100:
         indexes = "indexes_100"
     elif num_products == 1000:
@@ -221,7 +317,7 @@ def init_search_engine(num_products=None):
     search_engine = LuceneSearcher(
         os.path.join(BASE_DIR, f"../search_engine/{indexes}")
     )
-    return search_engine
+    return SearchIndex(search_engine, cache_size=cache_size)
 
 
 def clean_product_keys(products):
@@ -244,7 +340,49 @@ def clean_product_keys(products):
     return products
 
 
-def load_products(filepath, num_products=None, human_goals=True):
+def load_products(
+    filepath, num_products=None, human_goals=True, catalog_path=DEFAULT_CATALOG_PATH
+):
+    """Load products, preferring the compiled catalog at `catalog_path`.
+
+    When a fresh catalog built by `catalog.build_catalog` exists, the returned
+    product list and dicts are lazy views over its memory-mapped columns,
+    decoding a new product dict on every access (so changes made to a product
+    are not kept); otherwise the raw JSON files are parsed and normalised.
+    """
+    catalog = CompiledCatalog.open_if_fresh(
+        catalog_path, filepath, num_products=num_products, human_goals=human_goals
+    )
+    if catalog is not None:
+        print(f"Products loaded from compiled catalog {catalog_path}.")
+        return (
+            catalog.products,
+            catalog.product_item_dict,
+            catalog.product_prices(),
+            catalog.attribute_to_asins,
+        )
+
+    all_products, _ = load_products_from_json(filepath, num_products, human_goals)
+
+    attribute_to_asins = defaultdict(set)
+    for p in all_products:
+        for a in p["Attributes"]:
+            attribute_to_asins[a].add(p["asin"])
+
+    product_item_dict = {p["asin"]: p for p in all_products}
+    product_prices = generate_product_prices(all_products)
+    return all_products, product_item_dict, product_prices, attribute_to_asins
+
+
+def load_products_from_json(
+    filepath, num_products=None, human_goals=True, keep_all_goal_annotations=False
+):
+    """Parse and normalise the raw product JSON files.
+
+    Returns the processed products and, for each of them, its position in
+    the source file. `keep_all_goal_annotations` keeps the annotations of both
+    the human and synthetic goal modes, which is what `build_catalog` compiles.
+    """
     # TODO: move to preprocessing step -> enforce single source of truth
     with open(filepath) as f:
         products = json.load(f)
@@ -259,9 +397,6 @@ def load_products(filepath, num_products=None, human_goals=True):
     #     all_reviews[r['asin']] = r['reviews']
     #     all_ratings[r['asin']] = r['average_rating']
 
-    if human_goals:
-        with open(HUMAN_ATTR_PATH) as f:
-            human_attributes = json.load(f)
     with open(DEFAULT_ATTR_PATH) as f:
         attributes = json.load(f)
     with open(HUMAN_ATTR_PATH) as f:
@@ -270,7 +405,7 @@ def load_products(filepath, num_products=None, human_goals=True):
 
     asins = set()
     all_products = []
-    attribute_to_asins = defaultdict(set)
+    source_index = []
     if num_products is not None:
         # using item_shuffle.json, we assume products already shuffled
         products = products[:num_products]
@@ -360,10 +495,17 @@ def load_products(filepath, num_products=None, human_goals=True):
         else:
             products[i]["Attributes"] = ["DUMMY_ATTR"]
 
-        if human_goals:
+        if human_goals or keep_all_goal_annotations:
             if asin in human_attributes:
                 products[i]["instructions"] = human_attributes[asin]
-        else:
+        if keep_all_goal_annotations:
+            products[i]["instruction_text"] = attributes.get(asin, {}).get(
+                "instruction", None
+            )
+            products[i]["instruction_attributes"] = attributes.get(asin, {}).get(
+                "instruction_attributes", None
+            )
+        elif not human_goals:
             products[i]["instruction_text"] = attributes[asin].get("instruction", None)
 
             products[i]["instruction_attributes"] = attributes[asin].get(
@@ -374,11 +516,6 @@ def load_products(filepath, num_products=None, human_goals=True):
         products[i]["query"] = p["query"].lower().strip()
 
         all_products.append(products[i])
+        source_index.append(i)
 
-    for p in all_products:
-        for a in p["Attributes"]:
-            attribute_to_asins[a].add(p["asin"])
-
-    product_item_dict = {p["asin"]: p for p in all_products}
-    product_prices = generate_product_prices(all_products)
-    return all_products, product_item_dict, product_prices, attribute_to_asins
+    return all_products, source_index
@@ -20,6 +20,7 @@ import random
 from rich import print
 import spacy
 from thefuzz import fuzz
+from .catalog import goal_products
 from .normalize import normalize_color
 
 nlp = spacy.load("en_core_web_sm")
@@ -28,6 +29,7 @@ PRICE_RANGE = [10.0 * i for i in range(1, 100)]
 
 
 def get_goals(all_products, product_prices, human_goals=True):
+    all_products = goal_products(all_products)
     if human_goals:
         return get_human_goals(all_products, product_prices)
     else:
@@ -161,20 +163,23 @@ def get_type_reward(purchased_product, goal):
     purchased_type = purchased_product["name"]
     desired_type = goal["name"]
 
-    purchased_type_parse = nlp(purchased_type)
-    desired_type_parse = nlp(desired_type)
+    purchased_type_parse = get_noun_tokens(purchased_type)
+    desired_type_parse = get_noun_tokens(desired_type)
 
-    purchased_type_parse = [
-        t.text.lower()
-        for t in purchased_type_parse
-        if t.pos_ in ("PNOUN", "NOUN", "PROPN")
-    ]
-    desired_type_parse = [
-        t.text.lower()
-        for t in desired_type_parse
-        if t.pos_ in ("PNOUN", "NOUN", "PROPN")
-    ]
+    return score_type_match(
+        query_match, category_match, purchased_type_parse, desired_type_parse
+    )
+
+
+def get_noun_tokens(text):
+    """Lowercased noun tokens of `text`, in order"""
+    return [t.text.lower() for t in nlp(text) if t.pos_ in ("PNOUN", "NOUN", "PROPN")]
 
+
+def score_type_match(
+    query_match, category_match, purchased_type_parse, desired_type_parse
+):
+    """Type reward from the query/category matches and the name noun tokens"""
     n_intersect_type = len(set(purchased_type_parse) & set(desired_type_parse))
     if len(desired_type_parse) == 0:
         title_score = 0.2
@@ -266,6 +271,29 @@ def get_reward(purchased_product, goal, price, options, **kwargs):
         ),
     )
 
+    return combine_rewards(
+        goal,
+        r_type_dict,
+        r_price,
+        r_att,
+        num_attr_matches,
+        r_option,
+        num_option_matches,
+        verbose=kwargs.get("verbose", False),
+    )
+
+
+def combine_rewards(
+    goal,
+    r_type_dict,
+    r_price,
+    r_att,
+    num_attr_matches,
+    r_option,
+    num_option_matches,
+    verbose=False,
+):
+    """Total reward from the type, price, attribute and option sub-rewards"""
     total_reward = (num_attr_matches + num_option_matches + r_price) / (
         len(goal["attributes"]) + len(goal["goal_options"]) + 1
     )
@@ -273,7 +301,7 @@ def get_reward(purchased_product, goal, price, options, **kwargs):
     total_reward *= r_type_dict["r_type"]
 
     # If verbose flag enabled, store score sub-components into dictionary
-    if kwargs.get("verbose", False):
+    if verbose:
         info = {
             "r_type": r_type_dict["r_type"],
             "r_att": r_att,
@@ -0,0 +1,249 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compact, lazily decoded goal spaces for `SimServer`.
+
+`get_synthetic_goals` materialises one goal dict per combination of options
+of every product, i.e. millions of dicts for the full catalog, only for
+`SimServer` to sample one of them per episode. `SyntheticGoals` keeps, per
+product, the number of option combinations, the goal weight and the price
+bound, and decodes the goal at a given index on demand. Over a compiled
+catalog, these are read off its columns without decoding any product. `GoalSpace` holds the
+weights as NumPy arrays and the shuffled / filtered / limited selection of
+goals as an index array.
+
+Goals, their order and weights, and the random numbers drawn while building
+them are the same as with `get_goals`, so `session_int` still designates the
+same goal and `random_idx` samples with the same distribution.
+"""
+
+from array import array
+from collections import defaultdict
+from collections.abc import Sequence
+import math
+import random
+
+import numpy as np
+
+from .catalog import CatalogProducts, goal_products
+from .goal import PRICE_RANGE, get_human_goals
+
+
+class SyntheticGoals(Sequence):
+    """The goals of `get_synthetic_goals`, decoded on access"""
+
+    def __init__(self, all_products, product_prices):
+        self.products = all_products
+        rows, num_goals, price_uppers, price_in_text = [], [], [], []
+        product_attributes = []
+        cnt_atts = defaultdict(int)
+        for row, asin, attributes, radices in _goal_products(all_products):
+            assert len(attributes) > 0
+
+            # Same random draws as `get_synthetic_goals`
+            price_upper, price_text = 1000000, False
+            if product_prices is not None:
+                price = product_prices[asin]
+                price_range = [p for p in PRICE_RANGE if p > price][:4]
+                if len(price_range) >= 2:
+                    _, price_upper = sorted(random.sample(price_range, 2))
+                    price_text = True
+
+            n = math.prod(radices)
+            for att in attributes:
+                cnt_atts[att] += n
+            rows.append(row)
+            num_goals.append(n)
+            price_uppers.append(price_upper)
+            price_in_text.append(price_text)
+            product_attributes.append(attributes)
+
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum(num_goals, dtype=np.int64)
+        self.price_uppers = price_uppers
+        self.price_in_text = np.asarray(price_in_text, dtype=bool)
+        # Products without any option combination have no goal, and no weight
+        self.product_weights = np.array(
+            [
+                sum(1.0 / cnt_atts[att] for att in attributes) / len(attributes)
+                if n
+                else 0.0
+                for attributes, n in zip(product_attributes, num_goals)
+            ],
+            dtype=np.float64,
+        )
+        # Goals of a product are decoded in a row, keep its last decoded record
+        self._last_product = (None, None)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    @property
+    def weights(self):
+        return np.repeat(self.product_weights, np.diff(self.offsets))
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(len(self))[idx]]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("goal index out of range")
+        k = int(np.searchsorted(self.offsets, idx, side="right")) - 1
+        product = self._product(k)
+
+        # Mixed-radix decoding, the last option changing fastest as in
+        # `itertools.product`
+        options = product["options"]
+        option_names = sorted(options)
+        combination = int(idx - self.offsets[k])
+        values = []
+        for option_name in reversed(option_names):
+            combination, i = divmod(combination, len(options[option_name]))
+            values.append(options[option_name][i])
+        goal_options = dict(zip(option_names, reversed(values)))
+
+        option_text = ", and ".join(
+            [f"{name}: {value}" for name, value in goal_options.items()]
+        )
+        option_text = " with " + option_text if option_text else ""
+        price_upper = self.price_uppers[k]
+        price_text = (
+            f", and price lower than {price_upper:.2f} dollars"
+            if self.price_in_text[k]
+            else ""
+        )
+        return {
+            "asin": product["asin"],
+            "category": product["category"],
+            "query": product["query"],
+            "name": product["name"],
+            "product_category": product["product_category"],
+            "instruction_text": f"{product['instruction_text']}{option_text}{price_text}",
+            "attributes": product["instruction_attributes"],
+            "price_upper": price_upper,
+            "goal_options": goal_options,
+            "title": product["Title"],
+            "weight": float(self.product_weights[k]),
+        }
+
+    def _product(self, k):
+        last_k, product = self._last_product
+        if last_k != k:
+            product = self.products[int(self.rows[k])]
+            self._last_product = (k, product)
+        return product
+
+
+def _goal_products(all_products):
+    """(row, asin, instruction attributes, option radices) of the products of
+    `all_products` having a synthetic goal, in order.
+
+    Read off the catalog columns when `all_products` is a compiled catalog,
+    without decoding any record; attributes are then vocabulary codes.
+    """
+    if isinstance(all_products, CatalogProducts):
+        catalog = all_products.catalog
+        rows = (
+            np.arange(len(catalog), dtype=np.int64)
+            if all_products.rows is None
+            else np.asarray(all_products.rows)
+        )
+        for i in np.flatnonzero(np.isin(rows, catalog.goal_rows)).tolist():
+            row = int(rows[i])
+            yield (
+                i,
+                catalog.asin(row),
+                catalog.goal_attribute_codes(row).tolist(),
+                catalog.option_radices_of(row).tolist(),
+            )
+        return
+    for row, product in enumerate(all_products):
+        if "instruction_text" not in product or product["instruction_text"] is None:
+            continue
+        options = product["options"]
+        yield (
+            row,
+            product["asin"],
+            product["instruction_attributes"],
+            [len(options[name]) for name in sorted(options)],
+        )
+
+
+class GoalSpace(Sequence):
+    """Weighted selection of the goals of a goal sequence"""
+
+    def __init__(self, goals, weights, idxs=None):
+        """Arguments:
+
+        goals (`Sequence`) -- All goals, e.g. a list or `SyntheticGoals`
+        weights (`array`) -- Sampling weight of each goal of `goals`
+        idxs (`array`) -- Positions in `goals` of the selected goals, in order
+        """
+        self.goals = goals
+        self.all_weights = np.asarray(weights, dtype=np.float64)
+        self.idxs = (
+            np.arange(len(goals), dtype=np.int64)
+            if idxs is None
+            else np.asarray(idxs, dtype=np.int64)
+        )
+
+    def __len__(self):
+        return len(self.idxs)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self.goals[int(i)] for i in self.idxs[idx]]
+        return self.goals[int(self.idxs[idx])]
+
+    @property
+    def weights(self):
+        return self.all_weights[self.idxs]
+
+    @property
+    def cum_weights(self):
+        return np.concatenate(([0.0], np.cumsum(self.weights)))
+
+    def select(self, positions):
+        """Goals at `positions` of this selection"""
+        return GoalSpace(self.goals, self.all_weights, self.idxs[positions])
+
+    def shuffled(self):
+        """Same order as `random.shuffle` gives a list of these goals"""
+        order = array("q", range(len(self)))
+        random.shuffle(order)
+        return self.select(np.frombuffer(order, dtype=np.int64))
+
+    def filtered(self, filter_goals):
+        """Goals for which `filter_goals(i, goal)` holds, `i` being the position
+        of the goal in this selection.
+
+        Goals are passed to `filter_goals` in the order of `goals`, not of this
+        selection, so that the goals of a product are decoded together.
+        """
+        keep = np.zeros(len(self), dtype=bool)
+        for i in np.argsort(self.idxs, kind="stable").tolist():
+            keep[i] = filter_goals(i, self.goals[int(self.idxs[i])])
+        return self.select(np.flatnonzero(keep))
+
+
+def get_goal_space(all_products, product_prices, human_goals=True):
+    """`GoalSpace` over the goals `get_goals` returns"""
+    all_products = goal_products(all_products)
+    if human_goals:
+        goals = get_human_goals(all_products, product_prices)
+        return GoalSpace(goals, [goal["weight"] for goal in goals])
+    goals = SyntheticGoals(all_products, product_prices)
+    return GoalSpace(goals, goals.weights)
@@ -0,0 +1,120 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Latency histograms for the simulated WebShop server."""
+
+import bisect
+from collections import defaultdict
+from contextlib import contextmanager
+import threading
+import time
+
+# Log-spaced bucket upper bounds, from 10us to ~84s.
+LATENCY_BUCKETS = tuple(1e-5 * 2**i for i in range(24))
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of latencies in seconds"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the `q`-th percentile (0-100),
+        capped at the largest value observed
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self):
+        return dict(
+            count=self.count,
+            total=self.total,
+            mean=self.total / self.count if self.count else 0.0,
+            p50=self.percentile(50),
+            p90=self.percentile(90),
+            p99=self.percentile(99),
+            max=self.max,
+        )
+
+
+class PageTimings:
+    """Latency histograms keyed by page type.
+
+    Converts to `float` as the total time over all pages, which is what the
+    `search_time` / `render_time` counters of `SimServer` used to hold.
+    """
+
+    def __init__(self):
+        self.histograms = defaultdict(LatencyHistogram)
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Sent back from evaluation worker processes, without the lock
+        return {"histograms": dict(self.histograms)}
+
+    def __setstate__(self, state):
+        self.histograms = defaultdict(LatencyHistogram, state["histograms"])
+        self._lock = threading.Lock()
+
+    def observe(self, page, seconds):
+        with self._lock:
+            self.histograms[page].observe(seconds)
+
+    @contextmanager
+    def time(self, page):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(page, time.perf_counter() - start)
+
+    def merge(self, other):
+        with self._lock:
+            for page, histogram in other.histograms.items():
+                self.histograms[page].merge(histogram)
+
+    @property
+    def total(self):
+        return sum((h.total for h in self.histograms.values()), 0.0)
+
+    def __float__(self):
+        return self.total
+
+    def summary(self):
+        return {page: h.summary() for page, h in sorted(self.histograms.items())}
@@ -0,0 +1,281 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Structured model of the pages served by the simulated WebShop server.
+
+`build_page_model` produces, straight from the values passed to the page
+templates, what `WebAgentTextEnv` otherwise recovers by parsing the rendered
+HTML with BeautifulSoup: the visible text segments, the clickable elements
+and the option groups. The HTML itself is only rendered when asked for.
+
+Segments follow what `html.parser` yields for the templates, so the `text`
+observation built from a model is identical to the one built from the HTML;
+`tests/test_page_model.py` replays random walks in both modes to catch
+template changes that are not mirrored here. The done page, shown once per
+episode, is parsed from its HTML instead.
+"""
+
+from bs4 import BeautifulSoup
+from bs4.element import Comment
+
+from .engine import ACTION_TO_TEMPLATE, action_to_template
+
+TEXT = "text"
+BUTTON = "button"
+OPTION = "option"
+PRODUCT_LINK = "product_link"
+
+_INVISIBLE_PARENTS = {"style", "script", "head", "title", "meta", "[document]"}
+
+
+class PageModel:
+    """Visible text, clickables and option groups of one rendered page"""
+
+    def __init__(
+        self,
+        segments,
+        clickables,
+        option_groups=None,
+        has_search_bar=False,
+        instruction_text=None,
+        render_html=None,
+        html=None,
+    ):
+        """Arguments:
+
+        segments (`list`) -- (kind, text) pairs of visible text, in page order;
+          kind is one of `TEXT`, `BUTTON`, `OPTION`, `PRODUCT_LINK`
+        clickables (`dict`) -- clickable name -> attributes of the element, as
+          keyed by `WebAgentTextEnv.get_available_actions`
+        option_groups (`dict`) -- option name -> option values
+        has_search_bar (`bool`) -- Whether the page has a search input
+        instruction_text (`str`) -- Text of the instruction header, if any
+        render_html (`callable`) -- Renders the page HTML on first access
+        html (`str`) -- Already rendered HTML
+        """
+        self.segments = segments
+        self.clickables = clickables
+        self.option_groups = option_groups or {}
+        self.has_search_bar = has_search_bar
+        self.instruction_text = instruction_text
+        self._render_html = render_html
+        self._html = html
+
+    @property
+    def html(self):
+        if self._html is None:
+            self._html = self._render_html()
+        return self._html
+
+    @property
+    def buttons(self):
+        return [text for kind, text in self.segments if kind == BUTTON]
+
+    @property
+    def product_links(self):
+        return [text for kind, text in self.segments if kind == PRODUCT_LINK]
+
+    def text(self):
+        """Same as `WebAgentTextEnv.convert_html_to_text(html, simple=True)`"""
+        return " [SEP] ".join(text for _, text in self.segments)
+
+    @classmethod
+    def from_html(cls, html):
+        """Builds the model by parsing already rendered HTML"""
+        html_obj = BeautifulSoup(html, "html.parser")
+        segments = []
+        for t in html_obj.find_all(string=True):
+            if t.parent.name in _INVISIBLE_PARENTS or isinstance(t, Comment):
+                continue
+            if t == "\n":
+                continue
+            if t.parent.name == "button":
+                kind = BUTTON
+            elif t.parent.name == "label":
+                kind = OPTION
+            elif t.parent.get("class") == ["product-link"]:
+                kind = PRODUCT_LINK
+            else:
+                kind = TEXT
+            segments.append((kind, t.strip()))
+
+        buttons = html_obj.find_all(class_="btn")
+        product_links = html_obj.find_all(class_="product-link")
+        clickables = {
+            f"{b.get_text()}".lower(): dict(b.attrs) for b in buttons + product_links
+        }
+        option_groups = {}
+        for opt in html_obj.select('input[type="radio"]'):
+            clickables[f"{opt.get('value')}"] = dict(opt.attrs)
+            option_groups.setdefault(opt.get("name"), []).append(opt.get("value"))
+
+        instruction = html_obj.find(id="instruction-text")
+        return cls(
+            segments,
+            clickables,
+            option_groups=option_groups,
+            has_search_bar=html_obj.find(id="search_input") is not None,
+            instruction_text=(
+                instruction.h4.text if instruction is not None and instruction.h4 else None
+            ),
+            html=html,
+        )
+
+
+class _PageBuilder:
+    """Accumulates segments and clickables in page order"""
+
+    def __init__(self):
+        self.segments = []
+        self.buttons = {}
+        self.product_links = {}
+        self.options = {}
+        self.option_groups = {}
+
+    def text(self, value, prefix="", kind=TEXT):
+        # Mirror `html.parser`: no node for empty strings, whitespace-only
+        # strings collapse to "\n" (dropped by the text observation) or " ".
+        value = f"{prefix}{value}"
+        if value == "" or (value.isspace() and ("\n" in value or "\r" in value)):
+            return
+        self.segments.append((kind, value.strip()))
+
+    def button(self, label, classes):
+        self.text(label, kind=BUTTON)
+        self.buttons[label.lower()] = {"type": "submit", "class": classes}
+
+    def product_link(self, asin, href):
+        self.text(asin, kind=PRODUCT_LINK)
+        self.product_links[f"{asin}".lower()] = {"class": ["product-link"], "href": href}
+
+    def option(self, name, value, radio_id, url):
+        self.text(value, kind=OPTION)
+        self.options[f"{value}"] = {
+            "type": "radio",
+            "id": radio_id,
+            "name": f"{name}",
+            "value": f"{value}",
+            "data-url": url,
+        }
+        self.option_groups.setdefault(f"{name}", []).append(f"{value}")
+
+    def instruction(self, instruction_text, separator=""):
+        self.text(f"Instruction:{separator}")
+        self.text(instruction_text)
+        return f"Instruction:{separator}{instruction_text}"
+
+    def build(self, **kwargs):
+        # Buttons, then product links, then radio options, like
+        # `get_available_actions`
+        clickables = {**self.buttons, **self.product_links, **self.options}
+        return PageModel(
+            self.segments, clickables, option_groups=self.option_groups, **kwargs
+        )
+
+
+def build_page_model(action, render_html, url_for, **kwargs):
+    """Builds the `PageModel` of the page `map_action_to_html` renders for `action`.
+
+    Arguments:
+
+    action (`str`) -- Action being rendered, as passed to `map_action_to_html`
+    render_html (`callable`) -- Renders the HTML of the page when needed
+    url_for (`callable`) -- Builds the URLs embedded in clickables
+    kwargs -- Same template values as `map_action_to_html`
+    """
+    template_name = action_to_template(action)
+    page = _PageBuilder()
+    session_id = kwargs["session_id"]
+
+    if template_name == "search_page.html":
+        page.text("WebShop")
+        instruction_text = page.instruction(kwargs["instruction_text"], separator=" ")
+        page.button("Search", ["btn", "btn-success"])
+        return page.build(
+            has_search_bar=True,
+            instruction_text=instruction_text,
+            render_html=render_html,
+        )
+
+    if template_name == "done_page.html":
+        # Terminal page, shown once per episode: parse it rather than mirror it.
+        return PageModel.from_html(render_html())
+
+    instruction_text = page.instruction(kwargs.get("instruction_text"))
+    page.button("Back to Search", ["btn", "btn-success"])
+    keywords, page_num = kwargs["keywords"], kwargs["page"]
+
+    if template_name == "results_page.html":
+        page.text(f"Page {page_num} (Total results: {kwargs['total']})")
+        if page_num > 1:
+            page.button("< Prev", ["btn", "btn-primary"])
+        page.button("Next >", ["btn", "btn-primary"])
+        for item in kwargs["products"]:
+            href = url_for(
+                "item_page",
+                session_id=session_id,
+                asin=item["asin"],
+                keywords=keywords,
+                page=page_num,
+                options=dict(),
+            )
+            page.product_link(item["asin"], href)
+            page.text(item["Title"])
+            page.text(item["Price"])
+        return page.build(instruction_text=instruction_text, render_html=render_html)
+
+    page.button("< Prev", ["btn", "btn-primary"])
+    product_info = kwargs["product_info"]
+    options = kwargs["options"]
+
+    if template_name == "item_page.html":
+        for option_name, option_contents in product_info["options"].items():
+            page.text(option_name)
+            for i, option_content in enumerate(option_contents):
+                current_options = {**options, option_name: option_content}
+                url = url_for(
+                    "item_page",
+                    session_id=session_id,
+                    asin=kwargs["asin"],
+                    keywords=keywords,
+                    page=page_num,
+                    options=current_options,
+                )
+                page.option(option_name, option_content, f"radio_{option_name}{i}", url)
+        page.text(product_info["Title"])
+        page.text(product_info["Price"], prefix="Price: ")
+        page.text(product_info["Rating"], prefix="Rating: ")
+        sub_pages = ["Description", "Features", "Reviews"]
+        if kwargs["show_attrs"]:
+            sub_pages.append("Attributes")
+        for sub_page in sub_pages:
+            page.button(sub_page, ["btn", "btn-primary"])
+        page.button("Buy Now", ["btn", "btn-lg", "purchase"])
+    elif template_name == ACTION_TO_TEMPLATE["Description"]:
+        page.text(product_info["Description"])
+    elif template_name == ACTION_TO_TEMPLATE["Features"]:
+        for bulletpoint in product_info["BulletPoints"]:
+            page.text(bulletpoint, prefix=" ")
+    elif template_name == ACTION_TO_TEMPLATE["Reviews"]:
+        for review in product_info["Reviews"]:
+            page.text(f'"{review.get("title", "")}"')
+            page.text(review.get("score", ""))
+            page.text(review.get("body", ""))
+    elif template_name == ACTION_TO_TEMPLATE["Attributes"]:
+        for attribute in product_info["Attributes"]:
+            page.text(attribute, prefix=" ")
+        page.text(product_info["category"])
+        page.text(product_info["query"])
+        page.text(product_info["product_category"])
+    return page.build(instruction_text=instruction_text, render_html=render_html)
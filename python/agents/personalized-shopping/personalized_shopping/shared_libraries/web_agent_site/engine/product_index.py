@@ -0,0 +1,133 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Inverted category / query / attribute indexes over the loaded products.
+
+Each index maps a value to the sorted positions ("rows") of the matching
+products in `all_products`, so the `<c>`, `<q>` and `<a>` special searches
+only touch the products they return, in catalog order. Filters can be
+combined, in which case the row lists are intersected.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+from .catalog import CatalogProducts
+
+FILTERS = ("category", "query", "attribute")
+
+_EMPTY_ROWS = np.empty(0, dtype=np.int64)
+
+
+class ProductIndex:
+    """Category, query and attribute -> sorted rows of `all_products`"""
+
+    def __init__(self, category_rows, query_rows, attribute_rows):
+        """Arguments:
+
+        category_rows (`dict`) -- category -> sorted rows
+        query_rows (`dict`) -- query -> sorted rows
+        attribute_rows (`callable`) -- attribute -> sorted rows
+        """
+        self.category_rows = category_rows
+        self.query_rows = query_rows
+        self._attribute_rows = attribute_rows
+
+    @classmethod
+    def from_products(cls, all_products, attribute_to_asins=None):
+        """Index of a list of products; the attribute index is read off
+        `attribute_to_asins` when given, else off the products' attributes
+        """
+        category_rows = defaultdict(list)
+        query_rows = defaultdict(list)
+        attribute_rows = defaultdict(list)
+        asin_to_row = {}
+        for row, p in enumerate(all_products):
+            category_rows[p["category"]].append(row)
+            query_rows[p["query"]].append(row)
+            asin_to_row[p["asin"]] = row
+            if attribute_to_asins is None:
+                for a in dict.fromkeys(p["Attributes"]):
+                    attribute_rows[a].append(row)
+        if attribute_to_asins is not None:
+            for a, asins in attribute_to_asins.items():
+                attribute_rows[a] = sorted(
+                    asin_to_row[asin] for asin in asins if asin in asin_to_row
+                )
+        attribute_rows = _freeze(attribute_rows)
+        return cls(
+            _freeze(category_rows),
+            _freeze(query_rows),
+            lambda a: attribute_rows.get(a, _EMPTY_ROWS),
+        )
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        """Index read off the code columns of a `CompiledCatalog`, without
+        decoding any product record
+        """
+        return cls(
+            _group_rows(catalog.category_codes, catalog.categories),
+            _group_rows(catalog.query_codes, catalog.queries),
+            lambda a: np.unique(catalog.rows_for_attribute(a)).astype(np.int64),
+        )
+
+    def attribute_rows(self, attribute):
+        return self._attribute_rows(attribute)
+
+    def rows(self, category=None, query=None, attribute=None):
+        """Sorted rows of the products matching all the given filters"""
+        selected = []
+        if category is not None:
+            selected.append(self.category_rows.get(category, _EMPTY_ROWS))
+        if query is not None:
+            selected.append(self.query_rows.get(query, _EMPTY_ROWS))
+        if attribute is not None:
+            selected.append(self.attribute_rows(attribute))
+        if not selected:
+            raise ValueError(f"At least one of {FILTERS} is required.")
+        selected.sort(key=len)
+        rows = selected[0]
+        for other in selected[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def products(self, all_products, **filters):
+        """Products of `all_products` matching `filters`, in catalog order"""
+        return [all_products[row] for row in self.rows(**filters).tolist()]
+
+
+def build_product_index(all_products, attribute_to_asins=None):
+    """Indexes `all_products` and, optionally, `attribute_to_asins`, as returned
+    by `load_products`
+    """
+    if isinstance(all_products, CatalogProducts):
+        return ProductIndex.from_catalog(all_products.catalog)
+    return ProductIndex.from_products(all_products, attribute_to_asins)
+
+
+def _freeze(value_to_rows):
+    return {v: np.asarray(rows, dtype=np.int64) for v, rows in value_to_rows.items()}
+
+
+def _group_rows(codes, vocabulary):
+    codes = np.asarray(codes)
+    order = np.argsort(codes, kind="stable").astype(np.int64)
+    bounds = np.cumsum(np.bincount(codes, minlength=len(vocabulary)))[:-1]
+    return {
+        value: rows
+        for value, rows in zip(vocabulary, np.split(order, bounds))
+        if len(rows)
+    }
@@ -0,0 +1,227 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cached and batched goal scoring, with the same rewards as `goal.get_reward`.
+
+`get_reward` parses both product names with spaCy, lowercases and joins the
+product text, and fuzzy matches every goal attribute against every product
+attribute one pair at a time, on every purchase. `RewardEngine` instead:
+
+  - caches the noun tokens of every product / goal name it has parsed,
+  - keeps the fuzzy-matching form of the attributes and the lowercased
+    title, features and description of the most recently scored products,
+  - scores a goal's attributes against all the product attributes with a
+    single `rapidfuzz.process.cdist` call,
+  - scores many purchases across worker processes with `score_many`.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import threading
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from thefuzz.utils import full_process
+
+from .goal import (
+    combine_rewards,
+    get_noun_tokens,
+    get_option_reward,
+    score_type_match,
+)
+
+DEFAULT_PRODUCT_CACHE_SIZE = 8192
+DEFAULT_CHUNKSIZE = 64
+
+# Compared to scores rounded to integers, as `thefuzz` returns them.
+ATTRIBUTE_MATCH_THRESHOLD = 85
+
+
+@functools.lru_cache(maxsize=65536)
+def cached_noun_tokens(text):
+    return tuple(get_noun_tokens(text))
+
+
+@functools.lru_cache(maxsize=65536)
+def _fuzz_processed(text):
+    # Same preprocessing as `thefuzz.fuzz.token_set_ratio`
+    return full_process(text, force_ascii=True)
+
+
+@functools.lru_cache(maxsize=65536)
+def _category_parts(product_category):
+    return frozenset(x.strip() for x in product_category.split("›"))
+
+
+class _ProductFeatures:
+    """What scoring needs from a product, precomputed once"""
+
+    def __init__(self, product):
+        self.name_tokens = cached_noun_tokens(product["name"])
+        self.attributes = [_fuzz_processed(a) for a in product["Attributes"]]
+        self.title = product["Title"].lower()
+        self.bullet_points = " ".join(product["BulletPoints"]).lower()
+        self.description = product["Description"].lower()
+
+    def mentions(self, attribute):
+        return (
+            attribute in self.title
+            or attribute in self.bullet_points
+            or attribute in self.description
+        )
+
+
+class RewardEngine:
+    """Drop-in replacement of `goal.get_reward` caching per product and per name work"""
+
+    def __init__(self, product_cache_size=DEFAULT_PRODUCT_CACHE_SIZE):
+        self.product_cache_size = product_cache_size
+        self._features = OrderedDict()
+        self._lock = threading.Lock()
+
+    def features(self, product):
+        asin = product["asin"]
+        with self._lock:
+            features = self._features.get(asin)
+            if features is not None:
+                self._features.move_to_end(asin)
+                return features
+        features = _ProductFeatures(product)
+        with self._lock:
+            self._features[asin] = features
+            while len(self._features) > self.product_cache_size:
+                self._features.popitem(last=False)
+        return features
+
+    def get_type_reward(self, purchased_product, goal):
+        """Same as `goal.get_type_reward`"""
+        query_match = purchased_product["query"] == goal["query"]
+        category_match = (
+            len(
+                _category_parts(purchased_product["product_category"])
+                & _category_parts(goal["product_category"])
+            )
+            >= 2
+        )
+        return score_type_match(
+            query_match,
+            category_match,
+            self.features(purchased_product).name_tokens,
+            cached_noun_tokens(goal["name"]),
+        )
+
+    def get_attribute_reward(self, purchased_product, goal):
+        """Same as `goal.get_attribute_reward`"""
+        features = self.features(purchased_product)
+        goal_attrs = goal["attributes"]
+
+        fuzzy_matched = np.zeros(len(goal_attrs), dtype=bool)
+        if features.attributes and goal_attrs:
+            scores = process.cdist(
+                features.attributes,
+                [_fuzz_processed(g_attr) for g_attr in goal_attrs],
+                scorer=fuzz.token_set_ratio,
+                processor=None,
+                dtype=np.float64,
+            )
+            fuzzy_matched = (np.round(scores) > ATTRIBUTE_MATCH_THRESHOLD).any(axis=0)
+
+        num_attr_matches = sum(
+            1
+            for g_attr, matched in zip(goal_attrs, fuzzy_matched.tolist())
+            if matched or features.mentions(g_attr)
+        )
+        r_attr = num_attr_matches / len(goal_attrs)
+        return r_attr, num_attr_matches
+
+    def get_reward(self, purchased_product, goal, price, options, **kwargs):
+        """Same as `goal.get_reward`"""
+        r_type_dict = self.get_type_reward(purchased_product, goal)
+
+        r_price = (price <= goal["price_upper"]) if goal["price_upper"] > 0 else None
+
+        r_att, num_attr_matches = self.get_attribute_reward(purchased_product, goal)
+
+        r_option, num_option_matches = get_option_reward(
+            list(options.values()),
+            (
+                goal["goal_options"].items()
+                if isinstance(goal["goal_options"], dict)
+                else goal["goal_options"]
+            ),
+        )
+
+        return combine_rewards(
+            goal,
+            r_type_dict,
+            r_price,
+            r_att,
+            num_attr_matches,
+            r_option,
+            num_option_matches,
+            verbose=kwargs.get("verbose", False),
+        )
+
+    def score_many(
+        self,
+        purchases,
+        goals,
+        processes=None,
+        chunksize=DEFAULT_CHUNKSIZE,
+        verbose=False,
+    ):
+        """Rewards of each purchase for the goal at the same position.
+
+        Arguments:
+
+        purchases (`list`) -- (purchased_product, price, options) triples
+        goals (`list`) -- Goal of each purchase
+        processes (`int`) -- Worker processes, `None` for one per CPU and 1 to
+          score in the current process
+        chunksize (`int`) -- Purchases sent to a worker at once
+        verbose (`bool`) -- Return (reward, info) pairs, as `get_reward` does
+        """
+        if len(purchases) != len(goals):
+            raise ValueError(
+                f"Got {len(purchases)} purchases for {len(goals)} goals."
+            )
+        items = list(zip(purchases, goals))
+        if processes == 1 or len(items) <= chunksize:
+            return _score_chunk(items, verbose, engine=self)
+
+        chunks = [items[i : i + chunksize] for i in range(0, len(items), chunksize)]
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_worker,
+            initargs=(self.product_cache_size,),
+        ) as executor:
+            results = executor.map(_score_chunk, chunks, [verbose] * len(chunks))
+            return [reward for chunk in results for reward in chunk]
+
+
+_worker_engine = None
+
+
+def _init_worker(product_cache_size):
+    global _worker_engine
+    _worker_engine = RewardEngine(product_cache_size)
+
+
+def _score_chunk(items, verbose, engine=None):
+    engine = engine or _worker_engine
+    return [
+        engine.get_reward(product, goal, price=price, options=options, verbose=verbose)
+        for (product, price, options), goal in items
+    ]
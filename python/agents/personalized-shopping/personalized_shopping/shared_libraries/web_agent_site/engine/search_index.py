@@ -0,0 +1,144 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cached keyword search over the Lucene product index.
+
+`SearchIndex` wraps a `LuceneSearcher` so that a search returns the ranked
+asins directly: `DefaultLuceneDocumentGenerator` stores the JSON "id", i.e.
+the asin, as the collection docid that every hit carries, so the raw stored
+document of a hit never needs to be fetched and parsed. Ranked results are kept in an LRU cache shared
+by all sessions of a `SimServer`, so paging through results or repeating a
+query does not hit Lucene again.
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+from .metrics import PageTimings
+
+DEFAULT_SEARCH_CACHE_SIZE = 4096
+DEFAULT_SEARCH_THREADS = 8
+
+
+class SearchResultCache:
+    """Thread-safe LRU cache of query -> ranked asins"""
+
+    def __init__(self, maxsize=DEFAULT_SEARCH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the cached asins for `key`, or `None` on a miss"""
+        with self._lock:
+            asins = self._entries.get(key)
+            if asins is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return asins
+
+    def put(self, key, asins):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = tuple(asins)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hit_rate,
+            size=len(self._entries),
+            maxsize=self.maxsize,
+        )
+
+
+class SearchIndex:
+    """`LuceneSearcher` returning ranked asins, with a shared result cache"""
+
+    def __init__(self, searcher, cache_size=DEFAULT_SEARCH_CACHE_SIZE):
+        """Arguments:
+
+        searcher (`LuceneSearcher`) -- Searcher over the product index
+        cache_size (`int`) -- Number of queries to keep results for, 0 to disable
+        """
+        self.searcher = searcher
+        self.cache = SearchResultCache(cache_size)
+        # Latency of `search` per outcome ("cache_hit", "cache_miss") and of
+        # whole `batch_search` calls ("batch").
+        self.timings = PageTimings()
+
+    @staticmethod
+    def _asins(hits):
+        return tuple(hit.docid for hit in hits)
+
+    def search(self, query, k):
+        """Returns the asins of the top `k` products for `query`, best first"""
+        start = time.perf_counter()
+        key = (query, k)
+        asins = self.cache.get(key)
+        if asins is not None:
+            self.timings.observe("cache_hit", time.perf_counter() - start)
+            return asins
+        asins = self._asins(self.searcher.search(query, k=k))
+        self.cache.put(key, asins)
+        self.timings.observe("cache_miss", time.perf_counter() - start)
+        return asins
+
+    def batch_search(self, queries, k, threads=DEFAULT_SEARCH_THREADS):
+        """Same as `search` for every query in `queries`, uncached queries being
+        searched by Lucene across `threads` threads at once.
+
+        Returns a list of asin tuples, in the order of `queries`.
+        """
+        with self.timings.time("batch"):
+            results = {}
+            misses = []
+            for query in dict.fromkeys(queries):
+                asins = self.cache.get((query, k))
+                if asins is None:
+                    misses.append(query)
+                else:
+                    results[query] = asins
+            if misses:
+                qids = [str(i) for i in range(len(misses))]
+                hits = self.searcher.batch_search(misses, qids, k=k, threads=threads)
+                for qid, query in zip(qids, misses):
+                    results[query] = self._asins(hits.get(qid, []))
+                    self.cache.put((query, k), results[query])
+        return [results[query] for query in queries]
+
+    def stats(self):
+        return dict(cache=self.cache.stats(), latency=self.timings.summary())
@@ -14,15 +14,14 @@
 
 from collections import defaultdict
 import json
+import os
 import random
 import string
-import time
 from bs4 import BeautifulSoup
 from bs4.element import Comment
 from flask import Flask
 import gym
 from gym.envs.registration import register
-import numpy as np
 import torch
 from ..engine.engine import (
     ACTION_TO_TEMPLATE,
@@ -30,15 +29,26 @@ from ..engine.engine import (
     END_BUTTON,
     NEXT_PAGE,
     PREV_PAGE,
+    SEARCH_RETURN_N,
+    SPECIAL_KEYWORDS,
+    TemplateRegistry,
+    action_to_template,
     get_product_per_page,
+    get_products_from_asins,
     get_top_n_product_from_keywords,
     init_search_engine,
     load_products,
     map_action_to_html,
     parse_action,
 )
-from ..engine.goal import get_goals, get_reward
+from ..engine.goal_space import get_goal_space
+from ..engine.metrics import PageTimings
+from ..engine.page_model import build_page_model
+from ..engine.product_index import build_product_index
+from ..engine.reward import RewardEngine
+from ..engine.search_index import DEFAULT_SEARCH_CACHE_SIZE, DEFAULT_SEARCH_THREADS
 from ..utils import (
+    DEFAULT_CATALOG_PATH,
     DEFAULT_FILE_PATH,
     FEAT_CONV,
     FEAT_IDS,
@@ -63,12 +73,16 @@ class WebAgentTextEnv(gym.Env):
 
         Arguments:
 
-        observation_mode (`str`) -- ['html' | 'text'] (default 'html')
+        observation_mode (`str`) -- ['html' | 'text' | 'text_rich' | 'url' |
+          'structured'] (default 'html'). 'structured' gives the same
+          observation as 'text', derived from the server's `PageModel`
+          instead of re-parsing the page HTML
         get_image
         filter_goals
         limit_goals
         num_products
         human_goals
+        catalog_path
         session
         session_prefix
         show_attrs
@@ -89,6 +103,7 @@ class WebAgentTextEnv(gym.Env):
                 self.kwargs.get("num_products"),
                 self.kwargs.get("human_goals"),
                 self.kwargs.get("show_attrs", False),
+                self.kwargs.get("catalog_path", DEFAULT_CATALOG_PATH),
             )
             if server is None
             else server
@@ -150,6 +165,14 @@ class WebAgentTextEnv(gym.Env):
 
     def get_available_actions(self):
         """Returns list of available actions at the current step"""
+        if self.observation_mode == "structured":
+            page = self.browser.page
+            self.text_to_clickable = dict(page.clickables)
+            return dict(
+                has_search_bar=page.has_search_bar,
+                clickables=list(self.text_to_clickable.keys()),
+            )
+
         html_obj = self._parse_html()
 
         # Collect search bar, buttons, links, and options as clickables
@@ -184,6 +207,8 @@ class WebAgentTextEnv(gym.Env):
 
     def get_instruction_text(self):
         """Get corresponding instruction text for current environment session"""
+        if self.observation_mode == "structured":
+            return self.browser.page.instruction_text
         html_obj = self._parse_html(self.browser.page_source)
         instruction_text = html_obj.find(id="instruction-text").h4.text
         return instruction_text
@@ -204,15 +229,16 @@ class WebAgentTextEnv(gym.Env):
     @property
     def observation(self):
         """Compiles state into either the `html` or `text` observation mode"""
-        html = self.state["html"]
         if self.observation_mode == "html":
-            return html
+            return self.state["html"]
         elif self.observation_mode == "text":
-            return self.convert_html_to_text(html, simple=True)
+            return self.convert_html_to_text(self.state["html"], simple=True)
         elif self.observation_mode == "text_rich":
-            return self.convert_html_to_text(html, simple=False)
+            return self.convert_html_to_text(self.state["html"], simple=False)
         elif self.observation_mode == "url":
-            return self.state["url"]
+            return self.browser.current_url
+        elif self.observation_mode == "structured":
+            return self.browser.page.text()
         else:
             raise ValueError(f"Observation mode {self.observation_mode} not supported.")
 
@@ -286,6 +312,10 @@ class WebAgentTextEnv(gym.Env):
         self.prev_actions = []
         return obs, None
 
+    def assign_instruction_text(self, instruction_text):
+        """Overrides the instruction text rendered for the current session"""
+        self.server.assign_instruction_text(self.session, instruction_text)
+
     def render(self, mode="human"):
         pass
 
@@ -299,7 +329,10 @@ def tag_visible(element):
 
 
 class SimServer:
-    """Lightweight simulator of WebShop Flask application for generating HTML observations"""
+    """Lightweight simulator of WebShop Flask application for generating HTML observations
+
+    Handlers return a `PageModel`; its HTML is only rendered when accessed.
+    """
 
     def __init__(
         self,
@@ -310,6 +343,8 @@ class SimServer:
         num_products=None,
         human_goals=0,
         show_attrs=False,
+        catalog_path=DEFAULT_CATALOG_PATH,
+        search_cache_size=DEFAULT_SEARCH_CACHE_SIZE,
     ):
         """Constructor for simulated server serving WebShop application
 
@@ -321,61 +356,78 @@ class SimServer:
         num_products (`int`) -- Number of products to search across
         human_goals (`bool`) -- If true, load human goals; otherwise, load synthetic
           goals
+        catalog_path (`str`) -- Compiled product catalog to open instead of parsing
+          `file_path`, if it exists and is up to date
+        search_cache_size (`int`) -- Number of keyword searches whose results are
+          cached across sessions, 0 to disable
         """
         # Load all products, goals, and search engine
         self.base_url = base_url
-        self.all_products, self.product_item_dict, self.product_prices, _ = (
-            load_products(
-                filepath=file_path,
-                num_products=num_products,
-                human_goals=human_goals,
-            )
+        (
+            self.all_products,
+            self.product_item_dict,
+            self.product_prices,
+            self.attribute_to_asins,
+        ) = load_products(
+            filepath=file_path,
+            num_products=num_products,
+            human_goals=human_goals,
+            catalog_path=catalog_path,
+        )
+        self.product_index = build_product_index(
+            self.all_products, self.attribute_to_asins
+        )
+        self.search_engine = init_search_engine(
+            num_products=num_products, cache_size=search_cache_size
+        )
+        self.goals = get_goal_space(
+            self.all_products, self.product_prices, human_goals
         )
-        self.search_engine = init_search_engine(num_products=num_products)
-        self.goals = get_goals(self.all_products, self.product_prices, human_goals)
         self.show_attrs = show_attrs
 
         # Fix outcome for random shuffling of goals
         random.seed(233)
-        random.shuffle(self.goals)
+        self.goals = self.goals.shuffled()
 
         # Apply `filter_goals` parameter if exists to select speific goal(s)
         if filter_goals is not None:
-            self.goals = [
-                goal for (i, goal) in enumerate(self.goals) if filter_goals(i, goal)
-            ]
+            self.goals = self.goals.filtered(filter_goals)
 
         # Imposes `limit` on goals via random selection
         if limit_goals != -1 and limit_goals < len(self.goals):
-            self.weights = [goal["weight"] for goal in self.goals]
-            self.cum_weights = [0] + np.cumsum(self.weights).tolist()
+            self.cum_weights = self.goals.cum_weights
             idxs = []
             while len(idxs) < limit_goals:
                 idx = random_idx(self.cum_weights)
                 if idx not in idxs:
                     idxs.append(idx)
-            self.goals = [self.goals[i] for i in idxs]
+            self.goals = self.goals.select(idxs)
         print(f"Loaded {len(self.goals)} goals.")
 
         # Set extraneous housekeeping variables
-        self.weights = [goal["weight"] for goal in self.goals]
-        self.cum_weights = [0] + np.cumsum(self.weights).tolist()
+        self.weights = self.goals.weights
+        self.cum_weights = self.goals.cum_weights
         self.user_sessions = dict()
-        self.search_time = 0
-        self.render_time = 0
+        # Instruction texts assigned per session, possibly before it started
+        self.assigned_instruction_texts = dict()
+        self.templates = TemplateRegistry(url_map=app.url_map)
+        self.reward_engine = RewardEngine()
+        self.search_time = PageTimings()
+        self.render_time = PageTimings()
+        self.reward_time = PageTimings()
         self.sample_time = 0
         self.assigned_instruction_text = None  # TODO: very hacky, should remove
 
     @app.route("/", methods=["GET", "POST"])
     def index(self, session_id, **kwargs):
         """Redirect to the search page with the given session ID"""
-        html = map_action_to_html(
+        page = self.render(
             "start",
             session_id=session_id,
             instruction_text=kwargs["instruction_text"],
         )
         url = f"{self.base_url}/{session_id}"
-        return html, url
+        return page, url
 
     @app.route("/", methods=["GET", "POST"])
     def search_results(self, session_id, **kwargs):
@@ -393,14 +445,14 @@ class SimServer:
         session["options"] = {}
 
         # Perform search on keywords from items and record amount of time it takes
-        old_time = time.time()
-        top_n_products = get_top_n_product_from_keywords(
-            keywords,
-            self.search_engine,
-            self.all_products,
-            self.product_item_dict,
-        )
-        self.search_time += time.time() - old_time
+        with self.search_time.time("search_results"):
+            top_n_products = get_top_n_product_from_keywords(
+                keywords,
+                self.search_engine,
+                self.all_products,
+                self.product_item_dict,
+                product_index=self.product_index,
+            )
 
         # Get product list from search result asins and get list of corresponding URLs
         products = get_product_per_page(top_n_products, page)
@@ -411,9 +463,8 @@ class SimServer:
             f"{keywords_url_string}/{page}"
         )
 
-        # Render HTML search page and record amount of time taken
-        old_time = time.time()
-        html = map_action_to_html(
+        # Build search results page
+        page = self.render(
             "search",
             session_id=session_id,
             products=products,
@@ -423,10 +474,9 @@ class SimServer:
             # This is used for reward computation
             # instruction_text=session['goal']['instruction_text'],
             # This is used for rendering the page
-            instruction_text=self.assigned_instruction_text,
+            instruction_text=self.get_assigned_instruction_text(session_id),
         )
-        self.render_time += time.time() - old_time
-        return html, url
+        return page, url
 
     @app.route("/", methods=["GET", "POST"])
     def item_page(self, session_id, **kwargs):
@@ -460,7 +510,7 @@ class SimServer:
             f'{session["page"]}/{option_string}'
         )
 
-        html = map_action_to_html(
+        page = self.render(
             "click",
             session_id=session_id,
             product_info=product_info,
@@ -471,10 +521,10 @@ class SimServer:
             # This is used for reward computation
             # instruction_text=session['goal']['instruction_text'],
             # This is used for rendering the page
-            instruction_text=self.assigned_instruction_text,
+            instruction_text=self.get_assigned_instruction_text(session_id),
             show_attrs=self.show_attrs,
         )
-        return html, url
+        return page, url
 
     @app.route("/", methods=["GET", "POST"])
     def item_sub_page(self, session_id, **kwargs):
@@ -498,7 +548,7 @@ class SimServer:
             f'{session["asin"]}/{keywords_url_string}/{session["page"]}/'
             f'{clickable_name}/{session["options"]}'
         )
-        html = map_action_to_html(
+        page = self.render(
             f"click[{clickable_name}]",
             session_id=session_id,
             product_info=product_info,
@@ -509,9 +559,9 @@ class SimServer:
             # This is used for reward computation
             # instruction_text=session['goal']['instruction_text'],
             # This is used for rendering the page
-            instruction_text=self.assigned_instruction_text,
+            instruction_text=self.get_assigned_instruction_text(session_id),
         )
-        return html, url
+        return page, url
 
     @app.route("/", methods=["GET", "POST"])
     def done(self, session_id, **kwargs):
@@ -523,13 +573,14 @@ class SimServer:
         price = self.product_prices.get(session["asin"])
 
         # Calculate reward for selected product and set variables for page details
-        reward, info = get_reward(
-            purchased_product,
-            goal,
-            price=price,
-            options=session["options"],
-            verbose=True,
-        )
+        with self.reward_time.time("reward"):
+            reward, info = self.reward_engine.get_reward(
+                purchased_product,
+                goal,
+                price=price,
+                options=session["options"],
+                verbose=True,
+            )
 
         self.user_sessions[session_id]["verbose_info"] = info
         self.user_sessions[session_id]["done"] = True
@@ -539,7 +590,7 @@ class SimServer:
             f"{self.base_url}/done/{session_id}/"
             f'{session["asin"]}/{session["options"]}'
         )
-        html = map_action_to_html(
+        page = self.render(
             f"click[{END_BUTTON}]",
             session_id=session_id,
             reward=reward,
@@ -548,111 +599,180 @@ class SimServer:
             # This is used for reward computation
             # instruction_text=session['goal']['instruction_text'],
             # This is used for rendering the page
-            instruction_text=self.assigned_instruction_text,
+            instruction_text=self.get_assigned_instruction_text(session_id),
         )
-        return html, url, reward
+        return page, url, reward
 
     def receive(self, session_id, current_url, session_int=None, **kwargs):
         """Map action to the corresponding page"""
         status = dict(reward=0.0, done=False)
 
-        with app.app_context(), app.test_request_context():
-            # Create/determine goal, instruction_text from current session
-            if session_id not in self.user_sessions:
-                idx = (
-                    session_int
-                    if (session_int is not None and isinstance(session_int, int))
-                    else random_idx(self.cum_weights)
+        # Create/determine goal, instruction_text from current session
+        if session_id not in self.user_sessions:
+            idx = (
+                session_int
+                if (session_int is not None and isinstance(session_int, int))
+                else random_idx(self.cum_weights)
+            )
+            # Copy the goal, sessions may override its instruction text
+            goal = dict(self.goals[idx])
+            instruction_text = goal["instruction_text"]
+            self.user_sessions[session_id] = {"goal": goal, "done": False}
+        else:
+            instruction_text = self.user_sessions[session_id]["goal"][
+                "instruction_text"
+            ]
+        assigned_instruction_text = self.get_assigned_instruction_text(session_id)
+        if assigned_instruction_text is not None:
+            instruction_text = (
+                assigned_instruction_text
+            )  # TODO: very hacky, should remove
+            self.user_sessions[session_id]["goal"][
+                "instruction_text"
+            ] = instruction_text
+        session = self.user_sessions[session_id]
+
+        if not kwargs:
+            # If no action, reset the session variables
+            kwargs["instruction_text"] = instruction_text
+            page, url = self.index(session_id, **kwargs)
+            self.user_sessions[session_id].update(
+                {
+                    "keywords": None,
+                    "page": None,
+                    "asin": None,
+                    "asins": set(),
+                    "options": dict(),
+                    "actions": defaultdict(int),
+                }
+            )
+        elif "keywords" in kwargs:
+            # If search keywords are available, run a search
+            page, url = self.search_results(session_id, **kwargs)
+        elif "clickable_name" in kwargs:
+            clickable_name = kwargs["clickable_name"].lower()
+            if clickable_name == END_BUTTON.lower():
+                # If "buy now" clicked, calculate reward and flag session as terminated
+                page, url, reward = self.done(session_id, **kwargs)
+                status["reward"] = reward
+                status["done"] = True
+            elif clickable_name == BACK_TO_SEARCH.lower():
+                # If "back to search" clicked, recursively reset the session back to search page
+                page, url, status = self.receive(session_id, current_url)
+            elif (
+                clickable_name == NEXT_PAGE.lower()
+                and self.get_page_name(current_url) == "search_results"
+            ):
+                # If "next page" clicked from search results, re-render with `page` enumerated
+                page, url, status = self.receive(
+                    session_id,
+                    current_url,
+                    keywords=session["keywords"],
+                    page=session["page"] + 1,
+                )
+            elif (
+                clickable_name == PREV_PAGE.lower()
+                and self.get_page_name(current_url) == "search_results"
+            ):
+                # If "prev page" clicked from search results, re-render with `page` denumerated
+                page, url, status = self.receive(
+                    session_id,
+                    current_url,
+                    keywords=session["keywords"],
+                    page=session["page"] - 1,
                 )
-                goal = self.goals[idx]
-                instruction_text = goal["instruction_text"]
-                self.user_sessions[session_id] = {"goal": goal, "done": False}
+            elif (
+                clickable_name == PREV_PAGE.lower()
+                and self.get_page_name(current_url) == "item_sub_page"
+            ):
+                # If "prev page" clicked from sub page, return to corresponding item page
+                page, url = self.item_page(session_id, **kwargs)
+            elif (
+                clickable_name == PREV_PAGE.lower()
+                and self.get_page_name(current_url) == "item_page"
+            ):
+                # If "prev page" clicked from item page, return to search results page
+                page, url = self.search_results(
+                    session_id,
+                    keywords=session["keywords"],
+                    page=session["page"],
+                    **kwargs,
+                )
+            elif clickable_name in [k.lower() for k in ACTION_TO_TEMPLATE]:
+                # Render item_sub_page if clickable is description, features, or reviews
+                page, url = self.item_sub_page(session_id, **kwargs)
             else:
-                instruction_text = self.user_sessions[session_id]["goal"][
-                    "instruction_text"
-                ]
-            if self.assigned_instruction_text is not None:
-                instruction_text = (
-                    self.assigned_instruction_text
-                )  # TODO: very hacky, should remove
-                self.user_sessions[session_id]["goal"][
-                    "instruction_text"
-                ] = instruction_text
-            session = self.user_sessions[session_id]
-
-            if not kwargs:
-                # If no action, reset the session variables
-                kwargs["instruction_text"] = instruction_text
-                html, url = self.index(session_id, **kwargs)
-                self.user_sessions[session_id].update(
-                    {
-                        "keywords": None,
-                        "page": None,
-                        "asin": None,
-                        "asins": set(),
-                        "options": dict(),
-                        "actions": defaultdict(int),
-                    }
+                # Otherwise, render current item page
+                page, url = self.item_page(session_id, **kwargs)
+        return page, url, status
+
+    def render(self, action, **kwargs):
+        """Build the `PageModel` for `action`; its HTML is rendered on demand"""
+        return build_page_model(
+            action,
+            render_html=lambda: self.render_html(action, **kwargs),
+            url_for=self.templates.url_for,
+            **kwargs,
+        )
+
+    def render_html(self, action, **kwargs):
+        """Render the page for `action`, recording the time taken per page type"""
+        page = os.path.splitext(action_to_template(action))[0]
+        with self.render_time.time(page):
+            return map_action_to_html(action, templates=self.templates, **kwargs)
+
+    def batch_search(self, queries, threads=DEFAULT_SEARCH_THREADS):
+        """Top products for each of `queries` (lists of keywords), as returned to
+        the search results page, searching uncached queries across `threads`
+        threads. Results are cached for later `search_results` calls.
+        """
+        plain = [
+            " ".join(keywords)
+            for keywords in queries
+            if keywords[0] not in SPECIAL_KEYWORDS
+        ]
+        ranked = iter(
+            self.search_engine.batch_search(plain, k=SEARCH_RETURN_N, threads=threads)
+        )
+        return [
+            (
+                get_top_n_product_from_keywords(
+                    keywords,
+                    self.search_engine,
+                    self.all_products,
+                    self.product_item_dict,
+                    product_index=self.product_index,
                 )
-            elif "keywords" in kwargs:
-                # If search keywords are available, run a search
-                html, url = self.search_results(session_id, **kwargs)
-            elif "clickable_name" in kwargs:
-                clickable_name = kwargs["clickable_name"].lower()
-                if clickable_name == END_BUTTON.lower():
-                    # If "buy now" clicked, calculate reward and flag session as terminated
-                    html, url, reward = self.done(session_id, **kwargs)
-                    status["reward"] = reward
-                    status["done"] = True
-                elif clickable_name == BACK_TO_SEARCH.lower():
-                    # If "back to search" clicked, recursively reset the session back to search page
-                    html, url, status = self.receive(session_id, current_url)
-                elif (
-                    clickable_name == NEXT_PAGE.lower()
-                    and self.get_page_name(current_url) == "search_results"
-                ):
-                    # If "next page" clicked from search results, re-render with `page` enumerated
-                    html, url, status = self.receive(
-                        session_id,
-                        current_url,
-                        keywords=session["keywords"],
-                        page=session["page"] + 1,
-                    )
-                elif (
-                    clickable_name == PREV_PAGE.lower()
-                    and self.get_page_name(current_url) == "search_results"
-                ):
-                    # If "prev page" clicked from search results, re-render with `page` denumerated
-                    html, url, status = self.receive(
-                        session_id,
-                        current_url,
-                        keywords=session["keywords"],
-                        page=session["page"] - 1,
-                    )
-                elif (
-                    clickable_name == PREV_PAGE.lower()
-                    and self.get_page_name(current_url) == "item_sub_page"
-                ):
-                    # If "prev page" clicked from sub page, return to corresponding item page
-                    html, url = self.item_page(session_id, **kwargs)
-                elif (
-                    clickable_name == PREV_PAGE.lower()
-                    and self.get_page_name(current_url) == "item_page"
-                ):
-                    # If "prev page" clicked from item page, return to search results page
-                    html, url = self.search_results(
-                        session_id,
-                        keywords=session["keywords"],
-                        page=session["page"],
-                        **kwargs,
-                    )
-                elif clickable_name in [k.lower() for k in ACTION_TO_TEMPLATE]:
-                    # Render item_sub_page if clickable is description, features, or reviews
-                    html, url = self.item_sub_page(session_id, **kwargs)
-                else:
-                    # Otherwise, render current item page
-                    html, url = self.item_page(session_id, **kwargs)
-            return html, url, status
+                if keywords[0] in SPECIAL_KEYWORDS
+                else get_products_from_asins(next(ranked), self.product_item_dict)
+            )
+            for keywords in queries
+        ]
+
+    def search_stats(self):
+        """Search result cache hit rate and search latencies, in seconds"""
+        return dict(
+            **self.search_engine.stats(),
+            search_results=self.search_time.summary().get("search_results"),
+        )
+
+    def get_assigned_instruction_text(self, session_id):
+        """Instruction text assigned to `session_id`, else the server-wide one"""
+        return self.assigned_instruction_texts.get(
+            session_id, self.assigned_instruction_text
+        )
+
+    def assign_instruction_text(self, session_id, instruction_text):
+        """Overrides the instruction text rendered for `session_id` only.
+
+        The session does not need to have been started yet.
+        """
+        self.assigned_instruction_texts[session_id] = instruction_text
+
+    def end_session(self, session_id):
+        """Forgets `session_id`; returns its session state, `None` if unknown"""
+        self.assigned_instruction_texts.pop(session_id, None)
+        return self.user_sessions.pop(session_id, None)
 
     def get_page_name(self, url):
         """Determine which page (i.e.
@@ -674,20 +794,25 @@ class SimBrowser:
     def __init__(self, server):
         self.server = server
         self.current_url = None
-        self.page_source = None
+        self.page = None
         self.session_id = None
 
+    @property
+    def page_source(self):
+        """HTML of the current page, rendered on first access"""
+        return None if self.page is None else self.page.html
+
     def get(self, url, session_id=None, session_int=None):
         """Set browser variables to corresponding link, page HTML for URL"""
         self.session_id = url.split("/")[-1] if session_id is None else session_id
-        self.page_source, _, _ = self.server.receive(
+        self.page, _, _ = self.server.receive(
             self.session_id, self.current_url, session_int=session_int
         )
         self.current_url = url
 
     def click(self, clickable_name, text_to_clickable):
         """Wrapper for `receive` handler for performing click action on current page"""
-        self.page_source, self.current_url, status = self.server.receive(
+        self.page, self.current_url, status = self.server.receive(
             self.session_id,
             current_url=self.current_url,
             clickable_name=clickable_name,
@@ -699,7 +824,7 @@ class SimBrowser:
         """Wrapper for `receive` handler for performing search action on current page"""
         if isinstance(keywords, str):
             keywords = keywords.split(" ")
-        self.page_source, self.current_url, status = self.server.receive(
+        self.page, self.current_url, status = self.server.receive(
             self.session_id,
             current_url=self.current_url,
             keywords=keywords,
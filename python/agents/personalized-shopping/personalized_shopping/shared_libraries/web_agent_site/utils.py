@@ -23,6 +23,7 @@ DEBUG_PROD_SIZE = None  # set to `None` to disable
 
 DEFAULT_ATTR_PATH = join(BASE_DIR, "../data/items_ins_v2.json")
 DEFAULT_FILE_PATH = join(BASE_DIR, "../data/items_shuffle.json")
+DEFAULT_CATALOG_PATH = join(BASE_DIR, "../data/catalog")
 
 DEFAULT_REVIEW_PATH = join(BASE_DIR, "../data/reviews.json")
 
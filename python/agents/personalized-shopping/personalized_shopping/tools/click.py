@@ -15,7 +15,8 @@
 from google.adk.tools import ToolContext
 from google.genai import types
 
-from ..shared_libraries.init_env import webshop_env
+from ..shared_libraries.env_pool import session_key
+from ..shared_libraries.init_env import webshop_env_pool
 
 
 async def click(button_name: str, tool_context: ToolContext) -> str:
@@ -30,9 +31,15 @@ async def click(button_name: str, tool_context: ToolContext) -> str:
     """
     status = {"reward": None, "done": False}
     action_string = f"click[{button_name}]"
-    _, status["reward"], status["done"], _ = webshop_env.step(action_string)
 
-    ob = webshop_env.observation
+    def _click(webshop_env):
+        _, status["reward"], status["done"], _ = webshop_env.step(action_string)
+        ob = webshop_env.observation
+        if button_name == "Back to Search":
+            webshop_env.assign_instruction_text("Back to Search")
+        return ob, webshop_env.state["html"]
+
+    ob, html = await webshop_env_pool.run(session_key(tool_context.state), _click)
     index = ob.find("Back to Search")
     if index >= 0:
         ob = ob[index:]
@@ -43,16 +50,11 @@ async def click(button_name: str, tool_context: ToolContext) -> str:
     print(f"observation: {ob}")
     print("#" * 50)
 
-    if button_name == "Back to Search":
-        webshop_env.server.assigned_instruction_text = "Back to Search"
-
     # Show artifact in the UI.
     try:
         await tool_context.save_artifact(
             "html",
-            types.Part.from_uri(
-                file_uri=webshop_env.state["html"], mime_type="text/html"
-            ),
+            types.Part.from_uri(file_uri=html, mime_type="text/html"),
         )
     except ValueError as e:
         print(f"Error saving artifact: {e}")
@@ -15,7 +15,8 @@
 from google.adk.tools import ToolContext
 from google.genai import types
 
-from ..shared_libraries.init_env import webshop_env
+from ..shared_libraries.env_pool import session_key
+from ..shared_libraries.init_env import webshop_env_pool
 
 
 async def search(keywords: str, tool_context: ToolContext) -> str:
@@ -30,11 +31,14 @@ async def search(keywords: str, tool_context: ToolContext) -> str:
     """
     status = {"reward": None, "done": False}
     action_string = f"search[{keywords}]"
-    webshop_env.server.assigned_instruction_text = f"Find me {keywords}."
-    print(f"env instruction_text: {webshop_env.instruction_text}")
-    _, status["reward"], status["done"], _ = webshop_env.step(action_string)
 
-    ob = webshop_env.observation
+    def _search(webshop_env):
+        webshop_env.assign_instruction_text(f"Find me {keywords}.")
+        print(f"env instruction_text: {webshop_env.instruction_text}")
+        _, status["reward"], status["done"], _ = webshop_env.step(action_string)
+        return webshop_env.observation, webshop_env.state["html"]
+
+    ob, html = await webshop_env_pool.run(session_key(tool_context.state), _search)
     index = ob.find("Back to Search")
     if index >= 0:
         ob = ob[index:]
@@ -49,9 +53,7 @@ async def search(keywords: str, tool_context: ToolContext) -> str:
     try:
         await tool_context.save_artifact(
             "html",
-            types.Part.from_uri(
-                file_uri=webshop_env.state["html"], mime_type="text/html"
-            ),
+            types.Part.from_uri(file_uri=html, mime_type="text/html"),
         )
     except ValueError as e:
         print(f"Error saving artifact: {e}")
@@ -0,0 +1,115 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Shared fixtures for the WebShop engine unit tests.
+
+The engine modules are imported as `web_agent_site.*` and
+`shared_libraries.*`, like the benchmarks do, so that the tests do not build
+the agent's 50k products environment pool on import.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+for path in ("../personalized_shopping", "../personalized_shopping/shared_libraries"):
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), path))
+
+CATEGORIES = ("beauty", "fashion", "garden")
+QUERIES = ("lipstick", "dress", "hose")
+COLORS = ("red", "blue", "green")
+SIZES = ("small", "large")
+
+
+def make_raw_products():
+    """Raw products in the `items_shuffle.json` format, with their synthetic
+    (`items_ins_v2.json`) and human (`items_human_ins.json`) annotations
+    """
+    products, attributes, human_attributes = [], {}, {}
+    for i in range(24):
+        asin = f"B{i:09d}"
+        options = {}
+        if i % 2 == 0:
+            options["Color"] = [{"value": c} for c in COLORS[: 1 + i % 3]]
+        if i % 4 == 0:
+            options["Size"] = [{"value": s, "image": None} for s in SIZES]
+        if i % 5 == 0:
+            pricing = ""
+        elif i % 3 == 0:
+            pricing = f"${i}.50 - ${i + 20}.00 - ${i + 40}.00"
+        else:
+            pricing = f"${i + 1}.99"
+        products.append(
+            {
+                "asin": asin,
+                "category": CATEGORIES[i % 3],
+                "query": f" {QUERIES[i % 3].upper()} ",
+                "product_category": f"Store › {CATEGORIES[i % 3]} › item",
+                "name": f"{QUERIES[i % 3]} number {i}",
+                "full_description": f"description of product {i}",
+                "small_description": [f"feature {i}"],
+                "images": [f"https://example.com/{asin}.jpg"],
+                "pricing": pricing,
+                "customization_options": options or None,
+                "brand": "brand",
+            }
+        )
+        attrs = ["long lasting", "soft"][: 1 + i % 2]
+        attributes[asin] = {"attributes": attrs}
+        if i % 7 != 6:
+            attributes[asin]["instruction"] = f"i want a {QUERIES[i % 3]} {i}"
+            attributes[asin]["instruction_attributes"] = attrs[:1]
+        if i % 3 == 1:
+            human_attributes[asin] = [
+                {
+                    "instruction": f"find me a {QUERIES[i % 3]}.",
+                    "instruction_attributes": ["long lasting"],
+                    "instruction_options": ["red"],
+                },
+                {
+                    "instruction": "no attributes",
+                    "instruction_attributes": [],
+                    "instruction_options": [],
+                },
+            ]
+    # A duplicate asin and an invalid one, both skipped when loading.
+    products.append(dict(products[1]))
+    products.append(dict(products[2], asin="nan"))
+    return products, attributes, human_attributes
+
+
+@pytest.fixture
+def product_files(tmp_path, monkeypatch):
+    """Writes the raw product files and points the engine at them.
+
+    Returns the path of the products file.
+    """
+    from web_agent_site.engine import catalog, engine
+
+    products, attributes, human_attributes = make_raw_products()
+    paths = {}
+    for name, data in (
+        ("items_shuffle.json", products),
+        ("items_ins_v2.json", attributes),
+        ("items_human_ins.json", human_attributes),
+    ):
+        paths[name] = str(tmp_path / name)
+        with open(paths[name], "w") as f:
+            json.dump(data, f)
+    for module in (catalog, engine):
+        monkeypatch.setattr(module, "DEFAULT_ATTR_PATH", paths["items_ins_v2.json"])
+        monkeypatch.setattr(module, "HUMAN_ATTR_PATH", paths["items_human_ins.json"])
+    return paths["items_shuffle.json"]
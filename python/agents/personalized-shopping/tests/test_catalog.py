@@ -0,0 +1,97 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Catalog-backed `load_products` against the raw JSON loader."""
+
+import pytest
+from web_agent_site.engine.catalog import (
+    CatalogProducts,
+    CompiledCatalog,
+    build_catalog,
+    goal_products,
+)
+from web_agent_site.engine.engine import load_products, load_products_from_json
+
+
+@pytest.fixture
+def catalog_path(product_files, tmp_path):
+    return build_catalog(product_files, str(tmp_path / "catalog"))
+
+
+@pytest.mark.parametrize("human_goals", [True, False])
+@pytest.mark.parametrize("num_products", [None, 10])
+def test_load_products_matches_json(product_files, catalog_path, human_goals, num_products):
+    kwargs = dict(human_goals=human_goals, num_products=num_products)
+    products, item_dict, prices, attr_to_asins = load_products(
+        product_files, catalog_path=None, **kwargs
+    )
+    c_products, c_item_dict, c_prices, c_attr_to_asins = load_products(
+        product_files, catalog_path=catalog_path, **kwargs
+    )
+
+    assert isinstance(c_products, CatalogProducts)
+    assert list(c_products) == products
+    assert dict(c_item_dict) == item_dict
+    assert {a: c_attr_to_asins[a] for a in c_attr_to_asins} == dict(attr_to_asins)
+    assert c_prices.keys() == prices.keys()
+    for p in products:
+        low, *high = p["pricing"]
+        if high:
+            assert low <= c_prices[p["asin"]] <= high[0]
+        else:
+            assert c_prices[p["asin"]] == prices[p["asin"]] == low
+
+
+def test_load_products_from_json_skips_invalid_and_duplicate_asins(product_files):
+    products, source_index = load_products_from_json(product_files)
+    asins = [p["asin"] for p in products]
+    assert len(asins) == len(set(asins)) == 24
+    assert "nan" not in asins
+    assert source_index == list(range(24))
+
+
+def test_prices_of_unpriced_and_ranged_products(product_files, catalog_path):
+    catalog = CompiledCatalog(catalog_path)
+    prices = catalog.product_prices()
+    # Products without a price default to 100, ranges keep their first two bounds
+    assert prices["B000000000"] == 100.0
+    assert 3.5 <= prices["B000000003"] <= 23.0
+    assert prices["B000000001"] == 2.99
+
+
+def test_decoded_products_are_fresh_dicts(product_files, catalog_path):
+    products = CompiledCatalog(catalog_path).products
+    products[0]["Title"] = "changed"
+    assert products[0]["Title"] != "changed"
+
+
+@pytest.mark.parametrize("human_goals", [True, False])
+def test_goal_products_only_keep_products_with_goals(
+    product_files, catalog_path, human_goals
+):
+    products, *_ = load_products(
+        product_files, human_goals=human_goals, catalog_path=catalog_path
+    )
+    key = "instructions" if human_goals else "instruction_text"
+    expected = [p for p in products if p.get(key) is not None]
+    assert list(goal_products(products)) == expected
+    assert 0 < len(expected) < len(products)
+
+
+def test_stale_catalog_is_ignored(product_files, catalog_path):
+    with open(product_files, "a") as f:
+        f.write(" ")
+    assert CompiledCatalog.open_if_fresh(catalog_path, product_files) is None
+    products, *_ = load_products(product_files, catalog_path=catalog_path)
+    assert isinstance(products, list)
@@ -0,0 +1,136 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""LRU and TTL eviction of `WebShopEnvPool`."""
+
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from shared_libraries import env_pool
+from shared_libraries.env_pool import WebShopEnvPool, session_key
+
+
+class FakeServer:
+
+    def __init__(self):
+        self.ended = []
+
+    def end_session(self, session_id):
+        self.ended.append(session_id)
+
+
+class FakeEnv:
+    _ids = itertools.count()
+
+    def __init__(self, observation_mode, server):
+        self.observation_mode = observation_mode
+        self.server = server
+        self.session = f"env{next(self._ids)}"
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(env_pool, "time", SimpleNamespace(monotonic=clock))
+    monkeypatch.setattr(env_pool, "WebAgentTextEnv", FakeEnv)
+    return clock
+
+
+def make_pool(**kwargs):
+    return WebShopEnvPool(None, server=FakeServer(), **kwargs)
+
+
+def test_same_session_gets_same_env(clock):
+    pool = make_pool()
+    env = pool.get("a")
+    assert pool.get("a") is env
+    assert pool.get("b") is not env
+    assert env.server is pool.server
+
+
+def test_least_recently_used_sessions_are_evicted(clock):
+    pool = make_pool(max_sessions=2)
+    a = pool.get("a")
+    pool.get("b")
+    pool.get("a")
+    pool.get("c")
+    assert "b" not in pool
+    assert "a" in pool and "c" in pool
+    assert pool.get("a") is a
+    assert len(pool.server.ended) == 1
+
+
+def test_idle_sessions_expire(clock):
+    pool = make_pool(ttl_seconds=10)
+    a = pool.get("a")
+    clock.now = 5
+    pool.get("b")
+    clock.now = 12
+    pool.get("b")
+    assert "a" not in pool
+    assert pool.server.ended == [a.session]
+    assert pool.get("a") is not a
+
+
+def test_sessions_in_use_are_not_evicted(clock):
+    pool = make_pool(max_sessions=1, ttl_seconds=10)
+
+    async def scenario():
+        started, proceed = asyncio.Event(), asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def use(env):
+            loop.call_soon_threadsafe(started.set)
+            asyncio.run_coroutine_threadsafe(proceed.wait(), loop).result()
+            return env
+
+        task = asyncio.create_task(pool.run("a", use))
+        await started.wait()
+        clock.now = 100
+        pool.get("b")
+        assert "a" in pool
+        proceed.set()
+        return await task
+
+    env = asyncio.run(scenario())
+    assert env is not None
+    pool.get("c")
+    assert "a" not in pool
+
+
+def test_release_ends_the_server_session(clock):
+    pool = make_pool()
+    env = pool.get("a")
+    pool.release("a")
+    pool.release("unknown")
+    assert "a" not in pool
+    assert pool.server.ended == [env.session]
+
+
+def test_session_key_is_kept_in_state():
+    state = {}
+    key = session_key(state)
+    assert session_key(state) == key
+    assert session_key({}) != key
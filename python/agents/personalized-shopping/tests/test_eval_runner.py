@@ -0,0 +1,90 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Reproducibility of `run_evaluation` in process and across workers."""
+
+import os
+import random
+
+import pytest
+from shared_libraries import eval_runner
+from shared_libraries.eval_runner import run_evaluation
+from shared_libraries.web_agent_site.engine import catalog, engine
+from shared_libraries.web_agent_site.envs import web_agent_text_env
+
+
+class FakeSearchEngine:
+    """Returns the products whose query matches a keyword, in catalog order"""
+
+    def __init__(self, all_products):
+        self.all_products = all_products
+
+    def search(self, query, k):
+        words = set(query.split())
+        return [p["asin"] for p in self.all_products if p["query"] in words][:k]
+
+
+def make_server(file_path):
+    """Builds a `SimServer` over the `product_files`, with a fake search
+    engine; runs in the spawned workers, without the test's monkeypatches
+    """
+    data_dir = os.path.dirname(file_path)
+    for module in (catalog, engine):
+        module.DEFAULT_ATTR_PATH = os.path.join(data_dir, "items_ins_v2.json")
+        module.HUMAN_ATTR_PATH = os.path.join(data_dir, "items_human_ins.json")
+    web_agent_text_env.init_search_engine = lambda **kwargs: None
+    server = web_agent_text_env.SimServer(
+        "http://127.0.0.1:3000", file_path, show_attrs=True, catalog_path=None
+    )
+    server.search_engine = FakeSearchEngine(server.all_products)
+    return server
+
+
+@pytest.fixture
+def files(product_files, monkeypatch):
+    """The products file; the engine globals `make_server` sets in this process
+    are restored after the test
+    """
+    for module in (catalog, engine, web_agent_text_env):
+        for name in ("DEFAULT_ATTR_PATH", "HUMAN_ATTR_PATH", "init_search_engine"):
+            if hasattr(module, name):
+                monkeypatch.setattr(module, name, getattr(module, name))
+    return product_files
+
+
+def evaluate(product_files, num_workers, seed=0):
+    return run_evaluation(
+        dict(file_path=product_files),
+        [{"session_int": i} for i in range(12)],
+        num_workers=num_workers,
+        seed=seed,
+        server_factory=make_server,
+    )
+
+
+def test_same_seed_gives_same_report_in_process_and_across_workers(files):
+    in_process = evaluate(files, num_workers=1)
+    assert [e["session_int"] for e in in_process.episodes] == list(range(12))
+    assert any(e["done"] for e in in_process.episodes)
+    assert evaluate(files, num_workers=2).episodes == in_process.episodes
+    assert evaluate(files, num_workers=1).episodes == in_process.episodes
+
+
+def test_in_process_run_leaves_the_globals_alone(files):
+    random.seed(1234)
+    state = random.getstate()
+    report = evaluate(files, num_workers=1)
+    assert report.steps > 0
+    assert random.getstate() == state
+    assert eval_runner._server is None
@@ -0,0 +1,89 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""`GoalSpace` and `SyntheticGoals` against the eager `get_goals`."""
+
+import random
+
+import pytest
+from web_agent_site.engine.catalog import build_catalog
+from web_agent_site.engine.engine import load_products
+from web_agent_site.engine.goal import get_goals, get_synthetic_goals
+from web_agent_site.engine.goal_space import SyntheticGoals, get_goal_space
+
+
+@pytest.fixture(params=["json", "catalog"])
+def catalog_path(request, product_files, tmp_path):
+    if request.param == "json":
+        return None
+    return build_catalog(product_files, str(tmp_path / "catalog"))
+
+
+def load(product_files, catalog_path, human_goals):
+    all_products, _, product_prices, _ = load_products(
+        product_files, human_goals=human_goals, catalog_path=catalog_path
+    )
+    return all_products, product_prices
+
+
+def test_synthetic_goals_enumerate_get_synthetic_goals(product_files, catalog_path):
+    all_products, product_prices = load(product_files, catalog_path, False)
+    random.seed(1)
+    expected = get_synthetic_goals(list(all_products), product_prices)
+    state = random.getstate()
+
+    random.seed(1)
+    goals = SyntheticGoals(all_products, product_prices)
+    # Same goals, weights and random draws
+    assert random.getstate() == state
+    assert len(goals) == len(expected) > 0
+    assert list(goals) == expected
+    assert goals.weights.tolist() == [goal["weight"] for goal in expected]
+    assert goals[-1] == expected[-1]
+    assert goals[3:7] == expected[3:7]
+
+
+@pytest.mark.parametrize("human_goals", [True, False])
+def test_goal_space_matches_get_goals(product_files, catalog_path, human_goals):
+    all_products, product_prices = load(product_files, catalog_path, human_goals)
+    random.seed(2)
+    expected = get_goals(all_products, product_prices, human_goals)
+    random.seed(2)
+    space = get_goal_space(all_products, product_prices, human_goals)
+    assert list(space) == expected
+    assert space.weights.tolist() == [goal["weight"] for goal in expected]
+
+
+def test_shuffled_and_filtered_match_list_operations(product_files, catalog_path):
+    all_products, product_prices = load(product_files, catalog_path, False)
+    random.seed(3)
+    expected = get_goals(all_products, product_prices, human_goals=False)
+    random.seed(3)
+    space = get_goal_space(all_products, product_prices, human_goals=False)
+
+    random.seed(4)
+    random.shuffle(expected)
+    random.seed(4)
+    space = space.shuffled()
+    assert list(space) == expected
+
+    def filter_goals(i, goal):
+        return i % 3 != 0 and "red" in goal["instruction_text"]
+
+    expected = [goal for i, goal in enumerate(expected) if filter_goals(i, goal)]
+    space = space.filtered(filter_goals)
+    assert list(space) == expected
+    assert space.cum_weights[-1] == pytest.approx(
+        sum(goal["weight"] for goal in expected)
+    )
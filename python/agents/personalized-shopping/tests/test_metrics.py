@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Latency histograms of the simulated WebShop server."""
+
+import pickle
+
+import pytest
+from web_agent_site.engine.metrics import LATENCY_BUCKETS, LatencyHistogram, PageTimings
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = LatencyHistogram(buckets=(0.001, 0.01, 0.1))
+    for seconds in (0.0005, 0.001, 0.005, 0.005, 0.05, 2.0):
+        histogram.observe(seconds)
+    # Bucket i counts the latencies up to buckets[i], the last one the rest.
+    assert histogram.counts == [2, 2, 1, 1]
+    assert histogram.count == 6
+    assert histogram.total == pytest.approx(2.0615)
+    assert histogram.max == 2.0
+    assert histogram.percentile(50) == 0.01
+    assert histogram.percentile(80) == 0.1
+    assert histogram.percentile(100) == 2.0
+    summary = histogram.summary()
+    assert summary["mean"] == pytest.approx(2.0615 / 6)
+    assert summary["p99"] == 2.0
+
+
+def test_percentile_is_capped_at_the_largest_latency():
+    histogram = LatencyHistogram()
+    histogram.observe(0.003)
+    assert histogram.percentile(50) == 0.003
+    assert LatencyHistogram().percentile(50) == 0.0
+    assert len(histogram.counts) == len(LATENCY_BUCKETS) + 1
+
+
+def test_histograms_merge():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    a.observe(0.001)
+    b.observe(0.5)
+    b.observe(0.001)
+    a.merge(b)
+    assert a.count == 3
+    assert a.max == 0.5
+    assert a.total == pytest.approx(0.502)
+    assert sum(a.counts) == 3
+
+
+def test_page_timings_keep_a_histogram_per_page():
+    timings = PageTimings()
+    timings.observe("search", 0.25)
+    timings.observe("item", 0.5)
+    timings.observe("search", 0.25)
+    with timings.time("done"):
+        pass
+    assert timings.histograms["search"].count == 2
+    assert timings.histograms["item"].count == 1
+    assert timings.histograms["done"].count == 1
+    assert float(timings) == pytest.approx(1.0 + timings.histograms["done"].total)
+    assert list(timings.summary()) == ["done", "item", "search"]
+    assert float(PageTimings()) == 0.0
+
+
+def test_page_timings_merge_and_pickle():
+    timings, other = PageTimings(), PageTimings()
+    timings.observe("search", 0.25)
+    other.observe("search", 0.5)
+    other.observe("item", 0.125)
+    timings.merge(pickle.loads(pickle.dumps(other)))
+    assert timings.histograms["search"].count == 2
+    assert float(timings) == pytest.approx(0.875)
+    # The unpickled timings still record latencies, under their own lock.
+    copy = pickle.loads(pickle.dumps(timings))
+    copy.observe("new", 0.125)
+    assert float(copy) == pytest.approx(1.0)
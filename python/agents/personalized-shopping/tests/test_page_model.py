@@ -0,0 +1,106 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""`structured` observations against the ones parsed from the rendered HTML.
+
+`build_page_model` mirrors the page templates; replaying the same random
+walks in `text` and `structured` mode catches any template change that is not
+mirrored.
+"""
+
+import random
+
+from conftest import QUERIES
+import pytest
+from web_agent_site.envs import web_agent_text_env
+from web_agent_site.envs.web_agent_text_env import SimServer, WebAgentTextEnv
+
+NUM_EPISODES = 20
+MAX_STEPS = 12
+
+
+class FakeSearchEngine:
+    """Returns the products whose query matches a keyword, in catalog order"""
+
+    def __init__(self, all_products):
+        self.all_products = all_products
+
+    def search(self, query, k):
+        words = set(query.split())
+        return [p["asin"] for p in self.all_products if p["query"] in words][:k]
+
+
+@pytest.fixture(params=[False, True], ids=["synthetic", "human"])
+def server(request, product_files, monkeypatch):
+    monkeypatch.setattr(web_agent_text_env, "init_search_engine", lambda **kwargs: None)
+    server = SimServer(
+        "http://127.0.0.1:3000",
+        product_files,
+        human_goals=request.param,
+        show_attrs=True,
+        catalog_path=None,
+    )
+    server.search_engine = FakeSearchEngine(server.all_products)
+    return server
+
+
+def _walk(env, episode):
+    rnd = random.Random(episode)
+    env.reset(session=episode % len(env.server.goals))
+    steps = [(env.observation, env.instruction_text)]
+    for _ in range(MAX_STEPS):
+        actions = env.get_available_actions()
+        if actions["has_search_bar"]:
+            action = f"search[{rnd.choice(QUERIES)} {rnd.choice(['red', 'x'])}]"
+        else:
+            action = f"click[{rnd.choice(actions['clickables'])}]"
+        state, reward, done, _ = env.step(action)
+        steps.append((action, actions, state, reward, done, env.observation))
+        if done:
+            break
+    return steps
+
+
+def test_structured_observations_match_html(server):
+    envs = [
+        WebAgentTextEnv(observation_mode=mode, server=server, session_prefix=mode)
+        for mode in ("text", "structured")
+    ]
+    pages = set()
+    for episode in range(NUM_EPISODES):
+        text_steps, structured_steps = (_walk(env, episode) for env in envs)
+        assert structured_steps == text_steps, episode
+        pages.update(server.get_page_name(env.browser.current_url) for env in envs)
+    # The walks reach the terminal page
+    assert "done" in pages
+
+
+def test_page_model_of_every_page_type(server):
+    env = WebAgentTextEnv(observation_mode="structured", server=server)
+    product = next(p for p in server.all_products if p["options"])
+    env.step(f"search[{product['query']}]")
+    env.step(f"click[{product['asin'].lower()}]")
+    for sub_page in ("Description", "Features", "Reviews", "Attributes"):
+        env.step(f"click[{sub_page.lower()}]")
+        page = env.browser.page
+        html_page = type(page).from_html(page.html)
+        assert page.segments == html_page.segments, sub_page
+        assert page.clickables.keys() == html_page.clickables.keys(), sub_page
+        env.step("click[< prev]")
+    page = env.browser.page
+    html_page = type(page).from_html(page.html)
+    assert page.segments == html_page.segments
+    assert page.clickables == html_page.clickables
+    assert page.option_groups == html_page.option_groups
+    assert page.instruction_text == html_page.instruction_text
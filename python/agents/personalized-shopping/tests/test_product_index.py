@@ -0,0 +1,112 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""`<c>` / `<q>` / `<a>` searches served by the product index."""
+
+import pytest
+from web_agent_site.engine.catalog import build_catalog
+from web_agent_site.engine.engine import (
+    get_top_n_product_from_keywords,
+    load_products,
+    parse_filter_keywords,
+)
+from web_agent_site.engine.product_index import build_product_index
+
+
+@pytest.mark.parametrize(
+    "keywords, filters",
+    [
+        ("<c> beauty", {"category": "beauty"}),
+        ("<c> beauty extra words", {"category": "beauty"}),
+        ("<q> red lipstick", {"query": "red lipstick"}),
+        ("<a> long lasting", {"attribute": "long lasting"}),
+        (
+            "<c> beauty <a> long lasting",
+            {"category": "beauty", "attribute": "long lasting"},
+        ),
+        (
+            "<q> dress <c> fashion <a> soft",
+            {"query": "dress", "category": "fashion", "attribute": "soft"},
+        ),
+        ("<c>", {"category": ""}),
+        ("<a>", {"attribute": ""}),
+    ],
+)
+def test_parse_filter_keywords(keywords, filters):
+    assert parse_filter_keywords(keywords.split(" ")) == filters
+
+
+def brute_force(all_products, category=None, query=None, attribute=None):
+    return [
+        p
+        for p in all_products
+        if (category is None or p["category"] == category)
+        and (query is None or p["query"] == query)
+        and (attribute is None or attribute in p["Attributes"])
+    ]
+
+
+@pytest.fixture(params=["json", "json+attributes", "catalog"])
+def products(request, product_files, tmp_path):
+    catalog_path = None
+    if request.param == "catalog":
+        catalog_path = build_catalog(product_files, str(tmp_path / "catalog"))
+    all_products, product_item_dict, _, attribute_to_asins = load_products(
+        product_files, catalog_path=catalog_path
+    )
+    product_index = build_product_index(
+        all_products,
+        attribute_to_asins if request.param == "json+attributes" else None,
+    )
+    return all_products, product_item_dict, product_index
+
+
+@pytest.mark.parametrize(
+    "keywords",
+    [
+        "<c> beauty",
+        "<c> garden",
+        "<c> unknown",
+        "<q> dress",
+        "<q> dress unknown",
+        "<a> long lasting",
+        "<a> soft",
+        "<a> unknown",
+        "<c> beauty <a> long lasting",
+        "<c> fashion <q> dress <a> soft",
+        "<c> fashion <q> hose",
+        "<a> soft <c> garden",
+    ],
+)
+def test_filtered_searches_match_brute_force(products, keywords):
+    all_products, product_item_dict, product_index = products
+    keywords = keywords.split(" ")
+    result = get_top_n_product_from_keywords(
+        keywords, None, all_products, product_item_dict, product_index
+    )
+    assert result == brute_force(all_products, **parse_filter_keywords(keywords))
+
+
+def test_combined_filters_intersect(products):
+    all_products, _, product_index = products
+    beauty = set(product_index.rows(category="beauty").tolist())
+    soft = set(product_index.rows(attribute="soft").tolist())
+    both = product_index.rows(category="beauty", attribute="soft").tolist()
+    assert both == sorted(beauty & soft)
+    assert both
+
+
+def test_rows_requires_a_filter(products):
+    with pytest.raises(ValueError):
+        products[2].rows()
@@ -0,0 +1,79 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""`RewardEngine` gives the same rewards as `goal.get_reward`."""
+
+import itertools
+
+import pytest
+from web_agent_site.engine.engine import load_products
+from web_agent_site.engine.goal import get_goals, get_reward
+from web_agent_site.engine.reward import RewardEngine
+
+
+@pytest.fixture
+def purchases_and_goals(product_files):
+    all_products, _, product_prices, _ = load_products(product_files, catalog_path=None)
+    goals = get_goals(all_products, product_prices, human_goals=False)
+    goals += get_goals(all_products, product_prices, human_goals=True)
+    # Attributes scoring around the fuzzy matching threshold, or only found in
+    # the product text
+    goals += [
+        dict(goals[0], attributes=attributes, goal_options=goal_options, price_upper=1.0)
+        for attributes, goal_options in [
+            (["long-lasting"], {"color": "red"}),
+            (["Long Lasting!", "very soft"], ["Red", "small"]),
+            (["lasting long soft"], {}),
+            (["feature"], ["blue", "large"]),
+            (["description of product"], []),
+        ]
+    ]
+    purchases = []
+    for i, product in enumerate(all_products):
+        option_values = list(itertools.product(*product["options"].values()))
+        options = dict(zip(product["options"], option_values[i % len(option_values)]))
+        purchases.append((product, product_prices[product["asin"]], options))
+    pairs = list(itertools.product(purchases, goals[::3]))
+    return [purchase for purchase, _ in pairs], [goal for _, goal in pairs]
+
+
+@pytest.mark.parametrize("verbose", [False, True])
+def test_get_reward_matches_goal_get_reward(purchases_and_goals, verbose):
+    purchases, goals = purchases_and_goals
+    engine = RewardEngine(product_cache_size=4)
+    for (product, price, options), goal in zip(purchases, goals):
+        expected = get_reward(product, goal, price=price, options=options, verbose=verbose)
+        assert (
+            engine.get_reward(product, goal, price=price, options=options, verbose=verbose)
+            == expected
+        ), (product["asin"], goal)
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_score_many_matches_goal_get_reward(purchases_and_goals, processes):
+    purchases, goals = purchases_and_goals
+    expected = [
+        get_reward(product, goal, price=price, options=options)
+        for (product, price, options), goal in zip(purchases, goals)
+    ]
+    rewards = RewardEngine().score_many(
+        purchases, goals, processes=processes, chunksize=16
+    )
+    assert rewards == expected
+
+
+def test_score_many_checks_lengths(purchases_and_goals):
+    purchases, goals = purchases_and_goals
+    with pytest.raises(ValueError):
+        RewardEngine().score_many(purchases, goals[:-1])
@@ -0,0 +1,79 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""`SearchResultCache` eviction and `SearchIndex` over a fake Lucene searcher."""
+
+from types import SimpleNamespace
+
+from web_agent_site.engine.search_index import SearchIndex, SearchResultCache
+
+
+class FakeSearcher:
+    """Ranks the asins `A<query><i>`, recording the queries it is sent"""
+
+    def __init__(self):
+        self.searched = []
+
+    def _hits(self, query, k):
+        return [SimpleNamespace(docid=f"A{query}{i}") for i in range(k)]
+
+    def search(self, query, k):
+        self.searched.append(query)
+        return self._hits(query, k)
+
+    def batch_search(self, queries, qids, k, threads):
+        self.searched += queries
+        return {qid: self._hits(query, k) for qid, query in zip(qids, queries)}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = SearchResultCache(maxsize=2)
+    cache.put("a", ["1"])
+    cache.put("b", ["2"])
+    assert cache.get("a") == ("1",)
+    cache.put("c", ["3"])
+    assert cache.get("b") is None
+    assert cache.get("a") == ("1",)
+    assert cache.get("c") == ("3",)
+    assert len(cache) == 2
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+
+def test_cache_disabled():
+    cache = SearchResultCache(maxsize=0)
+    cache.put("a", ["1"])
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_search_returns_hit_docids_and_caches():
+    searcher = FakeSearcher()
+    index = SearchIndex(searcher)
+    assert index.search("x", k=2) == ("Ax0", "Ax1")
+    assert index.search("x", k=2) == ("Ax0", "Ax1")
+    assert index.search("x", k=3) == ("Ax0", "Ax1", "Ax2")
+    assert searcher.searched == ["x", "x"]
+
+
+def test_batch_search_keeps_query_order():
+    searcher = FakeSearcher()
+    index = SearchIndex(searcher)
+    index.search("b", k=1)
+    queries = ["c", "b", "a", "c", "d"]
+    results = index.batch_search(queries, k=1, threads=2)
+    assert results == [(f"A{q}0",) for q in queries]
+    # Cached and repeated queries are only searched once
+    assert searcher.searched == ["b", "c", "a", "d"]
+    assert index.batch_search(["d", "a"], k=1) == [("Ad0",), ("Aa0",)]
+    assert searcher.searched == ["b", "c", "a", "d"]
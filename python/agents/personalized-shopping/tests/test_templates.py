@@ -0,0 +1,102 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""`TemplateRegistry` pages against the ones Flask renders.
+
+Every page the simulator renders along a few episodes is rendered again with
+Flask's `render_template_string` in a request context, as the simulator did
+before the templates were precompiled, and the HTML must be identical.
+"""
+
+import os
+
+from flask import render_template_string
+import pytest
+from web_agent_site.engine.engine import (
+    PAGE_TEMPLATES,
+    TEMPLATE_DIR,
+    read_html_template,
+)
+from web_agent_site.envs import web_agent_text_env
+from web_agent_site.envs.web_agent_text_env import SimServer, WebAgentTextEnv, app
+
+
+class FakeSearchEngine:
+    """Returns the products whose query matches a keyword, in catalog order"""
+
+    def __init__(self, all_products):
+        self.all_products = all_products
+
+    def search(self, query, k):
+        words = set(query.split())
+        return [p["asin"] for p in self.all_products if p["query"] in words][:k]
+
+
+@pytest.fixture
+def server(product_files, monkeypatch):
+    monkeypatch.setattr(web_agent_text_env, "init_search_engine", lambda **kwargs: None)
+    server = SimServer(
+        "http://127.0.0.1:3000",
+        product_files,
+        show_attrs=True,
+        catalog_path=None,
+    )
+    server.search_engine = FakeSearchEngine(server.all_products)
+    return server
+
+
+def flask_render(template_name, **context):
+    path = os.path.join(TEMPLATE_DIR, template_name)
+    with app.app_context(), app.test_request_context():
+        return render_template_string(read_html_template(path), **context)
+
+
+@pytest.fixture
+def rendered(server, monkeypatch):
+    """Records the (template name, html, Flask html) of every rendered page.
+
+    Flask renders the page right away, as the context (e.g. the selected
+    options) changes along the episode.
+    """
+    pages = []
+    render = server.templates.render
+
+    def recording_render(template_name, **context):
+        html = render(template_name, **context)
+        pages.append((template_name, html, flask_render(template_name, **context)))
+        return html
+
+    monkeypatch.setattr(server.templates, "render", recording_render)
+    return pages
+
+
+def test_pages_match_flask_rendering(server, rendered):
+    env = WebAgentTextEnv(observation_mode="html", server=server)
+    products = [p for p in server.all_products if p["options"]]
+    for episode, product in enumerate(products[:3]):
+        env.reset(session=episode)
+        env.step(f"search[{product['query']}]")
+        env.step("click[next >]")
+        env.step("click[< prev]")
+        env.step(f"click[{product['asin'].lower()}]")
+        for option in list(product["options"].values())[0]:
+            env.step(f"click[{option}]")
+        for sub_page in ("Description", "Features", "Reviews", "Attributes"):
+            env.step(f"click[{sub_page.lower()}]")
+            env.step("click[< prev]")
+        env.step("click[buy now]")
+
+    assert {name for name, _, _ in rendered} == set(PAGE_TEMPLATES)
+    for template_name, html, flask_html in rendered:
+        assert html == flask_html, template_name